@@ -0,0 +1,320 @@
+"""
+Общий пул соединений с базой данных.
+
+Вместо того чтобы открывать новое соединение (и новый поток aiosqlite) на каждый
+вызов модели, модели берут соединения из пула:
+
+    conn = await db_pool.reader()   # для чтения
+    conn = await db_pool.writer()   # для записи (через общую очередь записи)
+
+Выданное соединение возвращается в пул вызовом conn.close(), поэтому код моделей
+остается прежним: try / finally: await conn.close().
+
+База работает в режиме WAL: читатели не мешают писателю и друг другу.
+Все записи идут через одну очередь: операции записи выполняются по одной, каждая
+в своей транзакции, и COMMIT выполняется сразу после conn.commit() операции -
+следующая в очереди на это время не держит ее фиксацию. conn.commit() возвращает
+управление только после того, как COMMIT выполнен, поэтому после него изменения
+видны всем читателям.
+
+Пул открывается при старте бота (main.run) и закрывается при остановке.
+"""
+
+import asyncio
+import logging
+import sqlite3
+from typing import Awaitable, Callable
+
+import aiosqlite
+
+DATABASE_PATH = 'app/data/database/database.db'
+
+# Количество соединений для чтения на каждый набор detect_types
+READERS_COUNT = 4
+
+# Сколько ждать возврата выданных соединений при закрытии пула (секунды)
+DRAIN_TIMEOUT = 10.0
+
+# Настройки, которые применяются к каждому соединению
+CONNECTION_PRAGMAS = {
+    'synchronous': 'NORMAL',  # в режиме WAL безопасно и заметно быстрее FULL
+    'busy_timeout': 5000,  # мс ожидания блокировки вместо мгновенного "database is locked"
+    'cache_size': -16000,  # 16 МБ кэша страниц на соединение
+    'mmap_size': 268435456,  # 256 МБ файла читаются через mmap
+    'temp_store': 'MEMORY',
+}
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """Соединение, выданное пулом. close() не закрывает его, а возвращает в пул"""
+
+    def __init__(self, conn: aiosqlite.Connection,
+                 release: Callable[[aiosqlite.Connection], Awaitable[None]] | None):
+        self._conn = conn
+        self._release = release
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Соединение уже возвращено в пул')
+        return getattr(self._conn, name)
+
+    async def close(self) -> None:
+        # Повторный close() ничего не делает (в некоторых моделях он вызывается дважды)
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        await self._release(conn)
+
+    async def __aenter__(self) -> 'PooledConnection':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+
+class _WriteJob:
+    """Одна операция записи в очереди писателя"""
+
+    def __init__(self):
+        loop = asyncio.get_running_loop()
+        self.granted = loop.create_future()  # писатель начал транзакцию и отдал соединение
+        self.finished = loop.create_future()  # True - зафиксировать, False - откатить
+        self.committed = loop.create_future()  # COMMIT транзакции операции
+        self.owner: asyncio.Task | None = None
+
+
+class WriterConnection(PooledConnection):
+    """
+    Соединение писателя, выданное одной операции записи.
+
+    commit() завершает операцию и ждет ее COMMIT, rollback() и close() без commit()
+    откатывают изменения этой операции.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, job: _WriteJob):
+        super().__init__(conn, None)
+        self._job = job
+
+    async def commit(self) -> None:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Соединение уже возвращено в пул')
+        self._conn = None
+        self._job.finished.set_result(True)
+        await self._job.committed
+
+    async def rollback(self) -> None:
+        if self._conn is None:
+            return
+        self._conn = None
+        self._job.finished.set_result(False)
+
+    async def close(self) -> None:
+        await self.rollback()
+
+
+class _Acquire:
+    """Позволяет использовать как `await db_pool.reader()`, так и `async with db_pool.reader() as conn`"""
+
+    def __init__(self, acquire: Callable[[], Awaitable[PooledConnection]]):
+        self._acquire = acquire
+        self._conn = None
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self) -> PooledConnection:
+        self._conn = await self._acquire()
+        return self._conn
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self._conn.close()
+
+
+class ConnectionPool:
+    """Пул долгоживущих соединений: несколько читателей и один писатель с очередью"""
+
+    def __init__(self, database: str = DATABASE_PATH, readers: int = READERS_COUNT):
+        self.database = database
+        self.readers_count = readers
+        self._readers: dict[int, asyncio.Queue] = {}
+        self._created: dict[int, int] = {}
+        self._connections: list[aiosqlite.Connection] = []
+        self._writer: aiosqlite.Connection | None = None
+        self._write_queue: asyncio.Queue | None = None
+        self._writer_task: asyncio.Task | None = None
+        self._current_job: _WriteJob | None = None
+        self._open_lock = asyncio.Lock()
+        self._opened = False
+
+    @property
+    def opened(self) -> bool:
+        return self._opened
+
+    async def _connect(self, detect_types: int = 0, **kwargs) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(database=self.database, detect_types=detect_types, **kwargs)
+        for pragma, value in CONNECTION_PRAGMAS.items():
+            await conn.execute(f'PRAGMA {pragma} = {value}')
+        self._connections.append(conn)
+        return conn
+
+    async def open(self) -> None:
+        async with self._open_lock:
+            if self._opened:
+                return
+            # Транзакциями писателя управляет очередь записи, поэтому autocommit
+            self._writer = await self._connect(isolation_level=None)
+            cursor = await self._writer.execute('PRAGMA journal_mode = WAL')
+            journal_mode = (await cursor.fetchone())[0]
+            await cursor.close()
+            if journal_mode != 'wal':
+                logger.warning(f'Не удалось включить WAL, режим журнала: {journal_mode}')
+
+            queue = self._readers.setdefault(0, asyncio.Queue())
+            for _ in range(self.readers_count):
+                queue.put_nowait(await self._connect())
+            self._created[0] = self.readers_count
+
+            self._write_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer_loop())
+            self._opened = True
+            logger.info(f'Пул соединений с БД открыт: {self.readers_count} читателей, 1 писатель, '
+                        f'журнал {journal_mode}')
+
+    async def close(self) -> None:
+        """Дожидается завершения записей и возврата читателей, затем закрывает соединения"""
+        async with self._open_lock:
+            if not self._opened:
+                return
+
+            try:
+                await asyncio.wait_for(self._drain(), timeout=DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning('Не все соединения вернулись в пул до закрытия, закрываем принудительно')
+                self._writer_task.cancel()
+
+            for conn in self._connections:
+                try:
+                    await conn.close()
+                except Exception as e:
+                    logger.error(f'Ошибка при закрытии соединения с БД: {e}')
+
+            self._connections.clear()
+            self._readers.clear()
+            self._created.clear()
+            self._writer = None
+            self._write_queue = None
+            self._writer_task = None
+            self._opened = False
+            logger.info('Пул соединений с БД закрыт')
+
+    async def _drain(self) -> None:
+        # None в очереди - сигнал писателю завершиться после уже поставленных записей
+        self._write_queue.put_nowait(None)
+        await asyncio.shield(self._writer_task)
+        for detect_types, queue in self._readers.items():
+            while queue.qsize() < self._created.get(detect_types, 0):
+                await asyncio.sleep(0.05)
+
+    async def _ensure_open(self) -> None:
+        # Скрипты, которые используют модели без main.run(), получают пул при первом обращении
+        if not self._opened:
+            await self.open()
+
+    def reader(self, detect_types: int = 0) -> _Acquire:
+        """Соединение для чтения. detect_types - как в aiosqlite.connect"""
+        return _Acquire(lambda: self._acquire_reader(detect_types))
+
+    def writer(self) -> _Acquire:
+        """Соединение для записи из общей очереди"""
+        return _Acquire(self._acquire_writer)
+
+    async def _acquire_reader(self, detect_types: int) -> PooledConnection:
+        await self._ensure_open()
+        queue = self._readers.setdefault(detect_types, asyncio.Queue())
+        if queue.empty() and self._created.get(detect_types, 0) < self.readers_count:
+            self._created[detect_types] = self._created.get(detect_types, 0) + 1
+            try:
+                conn = await self._connect(detect_types)
+            except Exception:
+                self._created[detect_types] -= 1
+                raise
+        else:
+            conn = await queue.get()
+
+        async def release(released: aiosqlite.Connection) -> None:
+            try:
+                # Читатель не должен держать открытую транзакцию между вызовами
+                if released.in_transaction:
+                    await released.rollback()
+            finally:
+                queue.put_nowait(released)
+
+        return PooledConnection(conn, release)
+
+    async def _acquire_writer(self) -> WriterConnection:
+        await self._ensure_open()
+        current = asyncio.current_task()
+        active = self._current_job
+        if active is not None and active.owner is current and not active.finished.done():
+            # Повторный захват в той же задаче привел бы к вечному ожиданию
+            raise RuntimeError('Соединение для записи уже занято этой же задачей')
+        job = _WriteJob()
+        job.owner = current
+        self._write_queue.put_nowait(job)
+        try:
+            await job.granted
+        except asyncio.CancelledError:
+            # Соединение уже выдано, но забрать его некому - отпускаем очередь
+            if job.granted.done() and not job.granted.cancelled() and not job.finished.done():
+                job.finished.set_result(False)
+            raise
+        self._current_job = job
+        return WriterConnection(self._writer, job)
+
+    async def _writer_loop(self) -> None:
+        """Выполняет операции записи по очереди, каждую в своей транзакции"""
+        conn = self._writer
+        queue = self._write_queue
+        while True:
+            job = await queue.get()
+            if job is None:
+                break
+            if job.granted.done():
+                # Вызывающий отменился, не дождавшись соединения
+                continue
+
+            commit = False
+            try:
+                await conn.execute('BEGIN IMMEDIATE')
+                if job.granted.done():
+                    await conn.execute('ROLLBACK')
+                    continue
+                job.granted.set_result(None)
+                commit = await job.finished
+                # Фиксируем сразу: commit() операции не должен ждать работы следующих в очереди
+                await conn.execute('COMMIT' if commit else 'ROLLBACK')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'Ошибка записи в БД, операция откатывается: {e}')
+                try:
+                    if conn.in_transaction:
+                        await conn.execute('ROLLBACK')
+                except Exception as rollback_error:
+                    logger.error(f'Ошибка ROLLBACK: {rollback_error}')
+                self._fail_job(job, e)
+            else:
+                if commit:
+                    job.committed.set_result(None)
+
+    @staticmethod
+    def _fail_job(job: _WriteJob, error: Exception) -> None:
+        if not job.granted.done():
+            job.granted.set_exception(error)
+        elif job.finished.done() and not job.committed.done():
+            job.committed.set_exception(error)
+
+
+db_pool = ConnectionPool()
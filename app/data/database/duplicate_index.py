@@ -0,0 +1,250 @@
+"""
+Индекс почти одинаковых объявлений в памяти: проверка нового объявления на повтор.
+
+Раньше новое объявление сравнивалось SequenceMatcher только с объявлениями того же заказчика
+(в ветке с фото - только с последним). Это O(n·m) на пару, повтор старого объявления
+и то же объявление со второго аккаунта не находились.
+
+Теперь у каждого живого объявления (abs.relevance = 1) есть MinHash-подпись текста задачи.
+Подписи разложены по корзинам LSH отдельно для каждой пары (city_id, work_type_id),
+поэтому новое объявление сравнивается только с объявлениями из тех же корзин, а кандидаты
+проверяются точным коэффициентом Жаккара по множествам шинглов.
+
+- Текст задачи - строка после «Задача:» до «Время:» (без шапки с типом работ и даты публикации),
+  в нижнем регистре, ё -> е, leet-написания заменены русскими буквами, только буквы и цифры.
+- Шинглы - куски по SHINGLE_SIZE символов. Подпись - one permutation hashing: один хеш на шингл,
+  минимум в каждой из SIGNATURE_SIZE корзин, пустые корзины заполняются из соседних.
+- Похожими считаются тексты с коэффициентом Жаккара не меньше SIMILARITY_THRESHOLD.
+  Объявление другого заказчика считается повтором, только если текст задачи не короче
+  MIN_FOREIGN_LENGTH: короткие «нужен грузчик» разные люди пишут одинаково.
+
+Строится при старте бота (main.run) и обновляется из Abs.save, Abs.update(relevance=...) и Abs.delete.
+Пока индекс не построен (скрипты без main.run), find ничего не находит.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+
+from app.data.database.connection_pool import db_pool
+from app.untils.text_normalizer import normalize_leet, replace_yo_with_e
+
+logger = logging.getLogger(__name__)
+
+# Коэффициент Жаккара, начиная с которого объявления считаются повтором
+SIMILARITY_THRESHOLD = 0.6
+# Минимальная длина текста задачи для поиска повтора среди объявлений других заказчиков
+MIN_FOREIGN_LENGTH = 40
+
+SHINGLE_SIZE = 5
+# Подпись из BANDS полос по ROWS значений. При J = 0.6 кандидатом объявление становится
+# с вероятностью ~0.99, при J = 0.1 - ~0.02
+BANDS = 20
+ROWS = 3
+SIGNATURE_SIZE = BANDS * ROWS
+
+_HASH_LIMIT = 1 << 64
+# Сдвиг для значений, взятых из соседней корзины, чтобы они не совпадали со своими
+_BIN_RANGE = _HASH_LIMIT // SIGNATURE_SIZE + 1
+
+_task_re = re.compile(r'Задача:(.*?)\n\s*Время:', re.DOTALL)
+_date_re = re.compile(r'Дата публикации.*$', re.MULTILINE)
+_word_re = re.compile(r'[^\W_]+')
+
+
+def task_text(text: str) -> str:
+    """Нормализованный текст задачи из полного текста объявления"""
+    if match := _task_re.search(text):
+        text = match.group(1)
+    else:
+        text = _date_re.sub('', text)
+    text = normalize_leet(replace_yo_with_e(text.lower()))
+    return ' '.join(_word_re.findall(text))
+
+
+def shingles(task: str) -> frozenset[int]:
+    """Хеши кусков текста по SHINGLE_SIZE символов"""
+    if not task:
+        return frozenset()
+    pieces = {task[i: i + SHINGLE_SIZE] for i in range(max(1, len(task) - SHINGLE_SIZE + 1))}
+    return frozenset(int.from_bytes(hashlib.blake2b(piece.encode(), digest_size=8).digest(), 'little')
+                     for piece in pieces)
+
+
+def signature(hashes: frozenset[int]) -> tuple[int, ...]:
+    """MinHash-подпись за один проход по шинглам (one permutation hashing с заполнением пустых корзин)"""
+    bins = [None] * SIGNATURE_SIZE
+    for value in hashes:
+        position, bin_index = divmod(value, SIGNATURE_SIZE)
+        if bins[bin_index] is None or position < bins[bin_index]:
+            bins[bin_index] = position
+    if not hashes:
+        return tuple(bins)
+    result = list(bins)
+    for index, value in enumerate(bins):
+        if value is None:
+            shift = 1
+            while bins[(index + shift) % SIGNATURE_SIZE] is None:
+                shift += 1
+            result[index] = bins[(index + shift) % SIGNATURE_SIZE] + shift * _BIN_RANGE
+    return tuple(result)
+
+
+def band_keys(sig: tuple[int, ...]) -> list[tuple]:
+    return [(band,) + sig[band * ROWS: (band + 1) * ROWS] for band in range(BANDS)]
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+@dataclass(frozen=True)
+class IndexedAd:
+    """Объявление в индексе"""
+    id: int
+    customer_id: int
+    city_id: int
+    work_type_id: int
+    task_length: int
+    hashes: frozenset
+    keys: tuple
+
+
+@dataclass(frozen=True)
+class DuplicateMatch:
+    """Найденный повтор: объявление и коэффициент Жаккара с новым текстом"""
+    ad_id: int
+    customer_id: int
+    similarity: float
+
+
+class DuplicateIndex:
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, min_foreign_length: int = MIN_FOREIGN_LENGTH):
+        self.threshold = threshold
+        self.min_foreign_length = min_foreign_length
+        self._ads: dict[int, IndexedAd] = {}
+        # (city_id, work_type_id) -> ключ полосы -> id объявлений
+        self._buckets: dict[tuple[int, int], dict[tuple, set[int]]] = {}
+        self._lock = asyncio.Lock()
+        self._ready = False
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def __len__(self) -> int:
+        return len(self._ads)
+
+    @staticmethod
+    async def _load(conn, ad_id: int = None) -> list[tuple]:
+        """(id, customer_id, city_id, work_type_id, text) живых объявлений или одного объявления"""
+        ad_filter = '' if ad_id is None else 'AND a.id = ?'
+        params = [] if ad_id is None else [ad_id]
+        cursor = await conn.execute(f'''
+                                    SELECT a.id, a.customer_id, a.city_id, a.work_type_id, t.text
+                                    FROM abs a
+                                             JOIN ad_texts t ON t.key = a.text_path
+                                    WHERE a.relevance = 1 {ad_filter}
+                                    ''', params)
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return rows
+
+    @staticmethod
+    def _make(ad_id: int, customer_id: int, city_id: int, work_type_id: int, text: str) -> IndexedAd:
+        task = task_text(text)
+        hashes = shingles(task)
+        return IndexedAd(id=ad_id, customer_id=customer_id, city_id=city_id, work_type_id=work_type_id,
+                         task_length=len(task), hashes=hashes,
+                         keys=tuple(band_keys(signature(hashes))) if hashes else ())
+
+    def _add(self, ad: IndexedAd) -> None:
+        self._ads[ad.id] = ad
+        buckets = self._buckets.setdefault((ad.city_id, ad.work_type_id), {})
+        for key in ad.keys:
+            buckets.setdefault(key, set()).add(ad.id)
+
+    def _remove(self, ad_id: int) -> None:
+        ad = self._ads.pop(ad_id, None)
+        if ad is None:
+            return
+        pair = (ad.city_id, ad.work_type_id)
+        buckets = self._buckets.get(pair)
+        if buckets is None:
+            return
+        for key in ad.keys:
+            ad_ids = buckets.get(key)
+            if ad_ids is not None:
+                ad_ids.discard(ad_id)
+                if not ad_ids:
+                    del buckets[key]
+        if not buckets:
+            del self._buckets[pair]
+
+    async def build(self) -> None:
+        """Полностью перестраивает индекс из БД"""
+        async with self._lock:
+            async with db_pool.reader() as conn:
+                rows = await self._load(conn)
+            self._ads = {}
+            self._buckets = {}
+            for row in rows:
+                self._add(self._make(*row))
+            self._ready = True
+        logger.info(f'Индекс повторов объявлений построен: {len(self._ads)} объявлений, '
+                     f'{len(self._buckets)} пар (город, направление)')
+
+    async def refresh_ad(self, ad_id: int) -> None:
+        """Перечитывает объявление после сохранения или смены relevance"""
+        if not self._ready or ad_id is None:
+            return
+        try:
+            async with self._lock:
+                async with db_pool.reader() as conn:
+                    rows = await self._load(conn, ad_id)
+                self._remove(ad_id)
+                for row in rows:
+                    self._add(self._make(*row))
+        except Exception as e:
+            # Индекс не должен ломать операцию записи, которая уже зафиксирована
+            logger.error(f'Не удалось обновить индекс повторов для объявления {ad_id}: {e}')
+
+    def remove_ad(self, ad_id: int) -> None:
+        self._remove(ad_id)
+
+    def find(self, city_id: int, work_type_id: int, text: str, customer_id: int = None,
+             threshold: float = None) -> DuplicateMatch | None:
+        """
+        Самое похожее живое объявление той же пары (город, направление) или None.
+        Объявления других заказчиков учитываются, только если текст задачи не короче min_foreign_length
+        """
+        buckets = self._buckets.get((city_id, work_type_id))
+        if not buckets:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+        task = task_text(text)
+        hashes = shingles(task)
+        if not hashes:
+            return None
+
+        candidates = set()
+        for key in band_keys(signature(hashes)):
+            candidates.update(buckets.get(key, ()))
+
+        best = None
+        for ad_id in candidates:
+            ad = self._ads[ad_id]
+            if ad.customer_id != customer_id and min(ad.task_length, len(task)) < self.min_foreign_length:
+                continue
+            similarity = jaccard(hashes, ad.hashes)
+            if similarity >= threshold and (best is None or similarity > best.similarity):
+                best = DuplicateMatch(ad_id=ad.id, customer_id=ad.customer_id, similarity=similarity)
+        return best
+
+
+duplicate_index = DuplicateIndex()
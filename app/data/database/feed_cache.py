@@ -0,0 +1,98 @@
+"""
+Снимки ленты объявлений исполнителей в памяти.
+
+Снимок - упорядоченные id объявлений ленты исполнителя (от новых к старым, те же правила,
+что в Abs.get_feed_page): жалобы, скрытые объявления и отклики исполнителя в нее не входят.
+Пока снимок жив, кнопки «Дальше» и «Назад» находят соседнее объявление по словарю позиций,
+не пересчитывая ленту в БД.
+
+Снимки живут TTL секунд (новые объявления появляются в ленте не позже чем через TTL)
+и не больше MAX_WORKERS штук (вытесняются давно не использованные).
+Методы моделей сбрасывают снимок исполнителя при отклике, жалобе, скрытии объявления
+и смене направлений или городов, а снимки с объявлением - при его удалении или снятии с показа.
+"""
+
+import bisect
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Время жизни снимка (секунды)
+TTL = 300
+
+# Сколько исполнителей держать в памяти
+MAX_WORKERS = 1000
+
+
+class FeedSnapshot:
+    def __init__(self, ad_ids: list[int]):
+        self.ad_ids = ad_ids
+        self.positions = {ad_id: position for position, ad_id in enumerate(ad_ids)}
+        # Для поиска позиции объявления, которого уже нет в снимке (id идут по убыванию)
+        self._negated_ids = [-ad_id for ad_id in ad_ids]
+        self.created_at = time.monotonic()
+
+    def __contains__(self, ad_id: int) -> bool:
+        return ad_id in self.positions
+
+    def page(self, before_id: int = None, after_id: int = None, limit: int = 1) -> tuple[list[int], bool, bool]:
+        """Те же страницы, что у Abs.get_feed_page: (id объявлений, есть ли дальше, есть ли назад)"""
+        if after_id is not None:
+            if after_id in self.positions:
+                end = self.positions[after_id]
+            else:
+                end = bisect.bisect_left(self._negated_ids, -after_id)
+            start = max(0, end - limit)
+        else:
+            if before_id is None:
+                start = 0
+            elif before_id in self.positions:
+                start = self.positions[before_id] + 1
+            else:
+                start = bisect.bisect_right(self._negated_ids, -before_id)
+            end = min(len(self.ad_ids), start + limit)
+        return self.ad_ids[start:end], end < len(self.ad_ids), start > 0
+
+
+class FeedCache:
+    def __init__(self, ttl: float = TTL, max_workers: int = MAX_WORKERS):
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._snapshots: OrderedDict[int, FeedSnapshot] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(self, worker_id: int) -> FeedSnapshot | None:
+        snapshot = self._snapshots.get(worker_id)
+        if snapshot is None:
+            return None
+        if time.monotonic() - snapshot.created_at > self.ttl:
+            del self._snapshots[worker_id]
+            return None
+        self._snapshots.move_to_end(worker_id)
+        return snapshot
+
+    def put(self, worker_id: int, ad_ids: list[int]) -> FeedSnapshot:
+        snapshot = FeedSnapshot(ad_ids)
+        self._snapshots[worker_id] = snapshot
+        self._snapshots.move_to_end(worker_id)
+        while len(self._snapshots) > self.max_workers:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def invalidate_worker(self, worker_id: int) -> None:
+        self._snapshots.pop(worker_id, None)
+
+    def invalidate_ad(self, ad_id: int) -> None:
+        """Сбрасывает снимки, в которых есть это объявление"""
+        for worker_id in [worker_id for worker_id, snapshot in self._snapshots.items() if ad_id in snapshot]:
+            del self._snapshots[worker_id]
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+
+feed_cache = FeedCache()
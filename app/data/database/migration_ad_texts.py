@@ -0,0 +1,100 @@
+"""
+Миграция текстов объявлений из .txt файлов (app/data/text/, app/data/banned/text/) в таблицу ad_texts.
+
+Для abs и banned_abs, у которых text_path - путь к файлу, текст переносится в ad_texts,
+а text_path заменяется ключом AdText ("db:<sha256>"). Перенесенные файлы удаляются.
+Записи, файл которых не найден, остаются как есть.
+
+Миграция идемпотентна и запускается при старте бота (main.run), можно запустить и вручную:
+    python -m app.data.database.migration_ad_texts
+"""
+
+import asyncio
+import logging
+import os
+
+from app.data.database.connection_pool import db_pool
+from app.data.database.models import AdText
+
+logger = logging.getLogger(__name__)
+
+AD_TABLES = ('abs', 'banned_abs')
+
+
+async def get_file_text_paths() -> dict[str, list[int]]:
+    """{таблица: [id, ...]} объявлений, текст которых еще лежит в файле"""
+    conn = await db_pool.reader()
+    try:
+        records = {}
+        for table in AD_TABLES:
+            cursor = await conn.execute(
+                f"SELECT id, text_path FROM {table} WHERE text_path IS NOT NULL AND text_path NOT LIKE 'db:%'")
+            records[table] = await cursor.fetchall()
+            await cursor.close()
+        return records
+    finally:
+        await conn.close()
+
+
+def read_files(records: dict) -> tuple[dict[str, list[tuple[int, str, str]]], int]:
+    """Читает файлы: {таблица: [(id, путь, текст), ...]} и количество ненайденных файлов"""
+    texts = {}
+    missing = 0
+    for table, rows in records.items():
+        texts[table] = []
+        for ad_id, text_path in rows:
+            try:
+                with open(text_path, 'r', encoding='utf-8') as file:
+                    texts[table].append((ad_id, text_path, file.read()))
+            except OSError:
+                missing += 1
+                logger.debug(f'{table} {ad_id}: файл текста не найден: {text_path}')
+    return texts, missing
+
+
+async def migrate_ad_texts() -> None:
+    """Создает ad_texts и переносит в нее тексты из файлов"""
+    await AdText.create_table_if_not_exists()
+
+    texts, missing = read_files(await get_file_text_paths())
+    if not any(texts.values()):
+        if missing:
+            logger.info(f'ad_texts: нечего переносить, у {missing} объявлений нет файла текста')
+        return
+
+    conn = await db_pool.writer()
+    try:
+        for table, rows in texts.items():
+            for ad_id, _, text in rows:
+                key = await AdText.save(text, conn=conn)
+                await conn.execute(f'UPDATE {table} SET text_path = ? WHERE id = ?', [key, ad_id])
+        await conn.commit()
+    finally:
+        await conn.close()
+
+    # Файлы удаляются только после COMMIT: при ошибке записи они остаются для повторного запуска
+    moved = 0
+    for rows in texts.values():
+        for _, text_path, _ in rows:
+            try:
+                os.remove(text_path)
+            except OSError as e:
+                logger.warning(f'Не удалось удалить перенесенный файл {text_path}: {e}')
+            moved += 1
+
+    logger.info(f"✅ ad_texts: перенесено {moved} текстов объявлений, не найдено файлов: {missing}")
+
+
+async def main():
+    """Запуск миграции"""
+    logger.info("Starting migration: ad_texts...")
+    try:
+        await migrate_ad_texts()
+    finally:
+        await db_pool.close()
+    logger.info("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
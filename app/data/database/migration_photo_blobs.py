@@ -0,0 +1,141 @@
+"""
+Миграция фото из папок пользователей (app/data/photo/<tg_id>/...) в хранилище по содержимому
+(app/untils/photo_store.py).
+
+Фото abs, banned_abs, портфолио и профиля исполнителей переносятся в app/data/photo/blobs/,
+одинаковые файлы остаются в одном экземпляре, в photo_refs записываются ссылки,
+пути в таблицах заменяются путями хранилища. Исходный файл удаляется после записи нового пути,
+соответствие старого пути хранилищу запоминается в photo_sources в той же транзакции - прерванная
+миграция при следующем запуске продолжается без потери фото. Опустевшие папки удаляются.
+Пути, файла которых нет на диске, остаются как есть.
+
+Миграция идемпотентна и запускается при старте бота (main.run), можно запустить и вручную:
+    python -m app.data.database.migration_photo_blobs
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+from app.data.database.connection_pool import db_pool
+from app.data.database.models import PhotoBlob
+from app.untils.photo_store import blob_path, blob_sha256, is_blob, parse_photo_path, photo_paths, photo_store, \
+    remove_empty_dirs
+
+logger = logging.getLogger(__name__)
+
+AD_TABLES = ('abs', 'banned_abs')
+
+
+def needs_migration(photo_path, moved: dict[str, str]) -> bool:
+    """Есть фото вне хранилища, файл которого лежит на диске или уже перенесен для другой записи"""
+    return any(not is_blob(path) and (os.path.normpath(path) in moved or os.path.isfile(path))
+               for path in photo_paths(photo_path))
+
+
+async def get_rows(query: str) -> list[tuple]:
+    conn = await db_pool.reader()
+    try:
+        cursor = await conn.execute(query)
+        records = await cursor.fetchall()
+        await cursor.close()
+        return records
+    finally:
+        await conn.close()
+
+
+async def save_row(query: str, params: list, sources: dict[str, str]) -> None:
+    """Записывает новые пути записи и соответствия {старый путь: путь в хранилище} одной транзакцией"""
+    conn = await db_pool.writer()
+    try:
+        await conn.execute(query, params)
+        await PhotoBlob.save_sources({path: blob_sha256(blob) for path, blob in sources.items()}, conn)
+        await conn.commit()
+    finally:
+        await conn.close()
+
+
+async def store(owner_type: str, owner_id: int, photo_path, moved: dict[str, str], query: str, to_value):
+    """
+    Переносит фото записи в хранилище и записывает новые пути: query с параметрами
+    (to_value(photo_path), owner_id). moved - {старый путь: путь в хранилище}: один файл
+    может быть указан у нескольких записей (объявление и его копия в banned_abs), а исходный
+    файл удаляется сразу после записи первой из них. Соответствия сохраняются в той же транзакции,
+    что и пути, поэтому после перезапуска миграции остальные записи получают путь хранилища
+    """
+    if isinstance(photo_path, dict):
+        old_paths = dict(photo_path)
+        for key, path in photo_path.items():
+            photo_path[key] = moved.get(os.path.normpath(path), path) if path else path
+    else:
+        old_paths = {'': photo_path}
+        photo_path = moved.get(os.path.normpath(photo_path), photo_path) if photo_path else photo_path
+
+    async def save(new_photo_path) -> None:
+        new_paths = new_photo_path if isinstance(new_photo_path, dict) else {'': new_photo_path}
+        sources = {os.path.normpath(path): new_paths[key] for key, path in old_paths.items()
+                   if path and not is_blob(path) and is_blob(new_paths[key])}
+        await save_row(query, [to_value(new_photo_path), owner_id], sources)
+        moved.update(sources)
+
+    return await photo_store.attach(owner_type, owner_id, photo_path, save)
+
+
+async def migrate_ads(table: str, moved: dict[str, str]) -> int:
+    migrated = 0
+    for ad_id, value in await get_rows(f'SELECT id, photo_path FROM {table}'):
+        photo_path = parse_photo_path(value)
+        if not needs_migration(photo_path, moved):
+            continue
+        await store(table, ad_id, photo_path, moved, f'UPDATE {table} SET photo_path = ? WHERE id = ?', json.dumps)
+        migrated += 1
+    return migrated
+
+
+async def migrate_workers(moved: dict[str, str]) -> int:
+    migrated = 0
+    for worker_id, portfolio_value, profile_photo in await get_rows(
+            'SELECT id, portfolio_photo, profile_photo FROM workers'):
+        portfolio_photo = json.loads(portfolio_value) if portfolio_value else None
+        if needs_migration(portfolio_photo, moved):
+            await store('portfolio', worker_id, portfolio_photo, moved,
+                        'UPDATE workers SET portfolio_photo = ? WHERE id = ?',
+                        lambda photo_path: json.dumps(photo_path) if photo_path else None)
+            migrated += 1
+        if needs_migration(profile_photo, moved):
+            await store('profile', worker_id, profile_photo, moved,
+                        'UPDATE workers SET profile_photo = ? WHERE id = ?', lambda photo_path: photo_path)
+            migrated += 1
+    return migrated
+
+
+async def migrate_photo_blobs() -> None:
+    """Создает таблицы хранилища фото и переносит в него фото из папок пользователей"""
+    await photo_store.load()
+
+    # Соответствия прошлых запусков: миграция могла прерваться, когда часть файлов уже удалена
+    moved = {path: blob_path(sha256) for path, sha256 in (await PhotoBlob.get_sources()).items()}
+    known = len(moved)
+    migrated = {table: await migrate_ads(table, moved) for table in AD_TABLES}
+    migrated['workers'] = await migrate_workers(moved)
+    if not any(migrated.values()):
+        return
+
+    await asyncio.to_thread(remove_empty_dirs, list(moved))
+    logger.info(f"✅ photo_blobs: перенесено фото: {len(moved) - known}, обновлено записей: {migrated}")
+
+
+async def main():
+    """Запуск миграции"""
+    logger.info("Starting migration: photo_blobs...")
+    try:
+        await migrate_photo_blobs()
+    finally:
+        await db_pool.close()
+    logger.info("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Миграция для перехода со строковых колонок на таблицы связей:
+- workers.city_id ("1 | 2 | 3") -> worker_cities (subscription_id IS NULL)
+- worker_city_subscriptions.city_ids ("1|2|3") -> worker_cities (subscription_id = id подписки)
+- worker_and_subscription.work_type_ids ("1|2|3") -> worker_work_types
+
+Миграция идемпотентна: заполняются только исполнители и подписки, для которых еще нет строк.
+Запускается при старте бота (main.run), можно запустить и вручную:
+    python -m app.data.database.migration_worker_links
+"""
+
+import asyncio
+import logging
+
+from app.data.database.connection_pool import db_pool
+from app.data.database.models import WorkerCity, WorkerCitySubscription, WorkerWorkType
+
+logger = logging.getLogger(__name__)
+
+
+def parse_ids(value, owner: str) -> list[int]:
+    """Разбирает строку вида "1 | 2 | 3" или "1|2|3" в список id"""
+    ids = []
+    for part in str(value or '').split('|'):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            logger.warning(f"{owner}: пропущено некорректное значение '{part}'")
+            continue
+        ids.append(int(part))
+    return ids
+
+
+async def backfill_worker_links(conn) -> tuple[int, int, int]:
+    """Заполняет таблицы связей из строковых колонок, возвращает количество обработанных записей"""
+    cursor = await conn.execute('''
+                                SELECT id, city_id
+                                FROM workers
+                                WHERE id NOT IN (SELECT worker_id FROM worker_cities WHERE subscription_id IS NULL)
+                                ''')
+    workers = await cursor.fetchall()
+    await cursor.close()
+    for worker_id, city_id in workers:
+        await WorkerCity.replace(conn, worker_id, parse_ids(city_id, f'worker {worker_id}'))
+
+    cursor = await conn.execute('''
+                                SELECT id, worker_id, city_ids
+                                FROM worker_city_subscriptions
+                                WHERE id NOT IN (SELECT subscription_id
+                                                 FROM worker_cities
+                                                 WHERE subscription_id IS NOT NULL)
+                                ''')
+    subscriptions = await cursor.fetchall()
+    await cursor.close()
+    for subscription_id, worker_id, city_ids in subscriptions:
+        await WorkerCity.replace(conn, worker_id, parse_ids(city_ids, f'city subscription {subscription_id}'),
+                                 subscription_id=subscription_id)
+
+    # При дублях worker_and_subscription побеждает самая новая запись, как в WorkerAndSubscription.get_by_worker
+    cursor = await conn.execute('''
+                                SELECT worker_id, work_type_ids
+                                FROM worker_and_subscription
+                                WHERE work_type_ids IS NOT NULL
+                                  AND work_type_ids != ''
+                                  AND worker_id NOT IN (SELECT worker_id FROM worker_work_types)
+                                ORDER BY id
+                                ''')
+    work_types = await cursor.fetchall()
+    await cursor.close()
+    for worker_id, work_type_ids in work_types:
+        await WorkerWorkType.replace(conn, worker_id, parse_ids(work_type_ids, f'worker {worker_id} work types'))
+
+    return len(workers), len(subscriptions), len(work_types)
+
+
+async def migrate_worker_links() -> None:
+    """Создает таблицы связей и заполняет их недостающими данными"""
+    await WorkerCitySubscription.create_table_if_not_exists()
+    await WorkerCity.create_table_if_not_exists()
+    await WorkerWorkType.create_table_if_not_exists()
+
+    conn = await db_pool.writer()
+    try:
+        workers_count, subscriptions_count, work_types_count = await backfill_worker_links(conn)
+        await conn.commit()
+    finally:
+        await conn.close()
+
+    if workers_count or subscriptions_count or work_types_count:
+        logger.info(f"✅ worker_cities / worker_work_types: перенесено {workers_count} исполнителей, "
+                    f"{subscriptions_count} подписок на города, {work_types_count} наборов направлений")
+
+
+async def main():
+    """Запуск миграции"""
+    logger.info("Starting migration: worker_cities / worker_work_types...")
+    try:
+        await migrate_worker_links()
+    finally:
+        await db_pool.close()
+    logger.info("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
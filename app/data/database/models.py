@@ -1,18 +1,50 @@
+import hashlib
 import json
 import logging
 import sqlite3
+from collections import OrderedDict
 from datetime import date, datetime
 from random import randint
 from typing import Optional
-import aiosqlite
 
 # help_defs импортируется локально в методах для избежания циклических зависимостей
 from telegraph import Telegraph
 
+from app.data.database.connection_pool import db_pool
+from app.data.database.duplicate_index import duplicate_index
+from app.data.database.feed_cache import feed_cache
+from app.data.database.routing_index import routing_index
+
 telegraph = Telegraph()
 logger = logging.getLogger()
 
 
+async def store_photos(owner_type: str, owner_id: int, photo_path, save):
+    """
+    photo_path с путями хранилища фото и ссылками владельца на них (app/untils/photo_store.py).
+    save(photo_path) записывает новые пути у владельца, исходные файлы удаляются после нее
+    """
+    # Локальный импорт для избежания циклических зависимостей
+    from app.untils.photo_store import photo_store
+
+    return await photo_store.attach(owner_type, owner_id, photo_path, save)
+
+
+async def release_photos(owner_type: str, owner_id: int, delete_files: bool = True) -> None:
+    # Локальный импорт для избежания циклических зависимостей
+    from app.untils.photo_store import photo_store
+
+    await photo_store.release(owner_type, owner_id, delete_files=delete_files)
+
+
+def group_pairs(records) -> dict[int, list[int]]:
+    """[(key, value), ...] -> {key: [value, ...]} с сохранением порядка"""
+    grouped = {}
+    for key, value in records:
+        grouped.setdefault(key, []).append(value)
+    return grouped
+
+
 class Customer:
     def __init__(self, id: int | None, tg_id: int, city_id: int, tg_name: str, abs_count: int = None,
                  access_token: str = None, author_name: str = None, public_id: str = None,
@@ -29,37 +61,38 @@ class Customer:
         self.phone_number = phone_number
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        # Аккаунт Telegraph создаем до захвата соединения для записи,
+        # чтобы сетевой запрос не держал очередь записи до 10 секунд
+        import asyncio
+        try:
+            # Выполняем синхронный вызов в отдельном потоке с таймаутом
+            result = await asyncio.wait_for(
+                asyncio.get_event_loop().run_in_executor(
+                    None,
+                    telegraph.create_account,
+                    f'customer_{self.tg_id}',
+                    'haltura customer',
+                    'https://t.me/Rus_haltura_bot'
+                ),
+                timeout=10.0  # Таймаут 10 секунд
+            )
+            access_token = result['access_token']
+            author_name = result['author_name']
+        except asyncio.TimeoutError:
+            # Если Telegraph API недоступен, используем значения по умолчанию
+            access_token = f'customer_{self.tg_id}_default'
+            author_name = 'haltura customer'
+        except Exception as e:
+            # В случае любой другой ошибки, используем значения по умолчанию
+            access_token = f'customer_{self.tg_id}_default'
+            author_name = 'haltura customer'
+
+        # Генерируем public_id, если его нет
+        from app.untils.public_id_generator import generate_public_id
+        public_id = self.public_id or generate_public_id("C")
+
+        conn = await db_pool.writer()
         try:
-            # Асинхронно создаем аккаунт Telegraph с таймаутом
-            import asyncio
-            try:
-                # Выполняем синхронный вызов в отдельном потоке с таймаутом
-                result = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(
-                        None,
-                        telegraph.create_account,
-                        f'customer_{self.tg_id}',
-                        'haltura customer',
-                        'https://t.me/Rus_haltura_bot'
-                    ),
-                    timeout=10.0  # Таймаут 10 секунд
-                )
-                access_token = result['access_token']
-                author_name = result['author_name']
-            except asyncio.TimeoutError:
-                # Если Telegraph API недоступен, используем значения по умолчанию
-                access_token = f'customer_{self.tg_id}_default'
-                author_name = 'haltura customer'
-            except Exception as e:
-                # В случае любой другой ошибки, используем значения по умолчанию
-                access_token = f'customer_{self.tg_id}_default'
-                author_name = 'haltura customer'
-
-            # Генерируем public_id, если его нет
-            from app.untils.public_id_generator import generate_public_id
-            public_id = self.public_id or generate_public_id("C")
-
             cursor = await conn.execute(
                 'INSERT INTO customers (tg_id, city_id, tg_name, access_token, author_name, public_id) VALUES (?, ?, ?, ?, ?, ?)',
                 (self.tg_id, self.city_id, self.tg_name, access_token, author_name, public_id))
@@ -70,7 +103,7 @@ class Customer:
 
     @classmethod
     async def get_customer(cls, id: int = None, tg_id: int = None) -> Optional['Customer'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             if id:
                 cursor = await conn.execute('SELECT * FROM customers WHERE id = ?', [id])
@@ -90,10 +123,10 @@ class Customer:
             await conn.close()
 
     async def create_telegra_login(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        result = telegraph.create_account(short_name=f'customer_{self.tg_id}', author_name='haltura customer',
+                                          author_url='https://t.me/Rus_haltura_bot')
+        conn = await db_pool.writer()
         try:
-            result = telegraph.create_account(short_name=f'customer_{self.tg_id}', author_name='haltura customer',
-                                              author_url='https://t.me/Rus_haltura_bot')
             query = 'UPDATE customers SET access_token = ?, author_name =? WHERE id = ?'
             params = (result['access_token'], result['author_name'], self.id)
             cursor = await conn.execute(query, params)
@@ -104,7 +137,7 @@ class Customer:
 
     @classmethod
     async def get_all_in_city(cls, city_id: int) -> list['Customer'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM customers WHERE city_id = ?', [city_id])
             records = await cursor.fetchall()
@@ -123,7 +156,7 @@ class Customer:
 
     @classmethod
     async def get_all(cls) -> list['Customer']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM customers')
             records = await cursor.fetchall()
@@ -139,7 +172,7 @@ class Customer:
 
     async def update_contacts(self, contact_type: str = None, phone_number: str = None) -> None:
         """Обновляет контакты заказчика"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             if self.id:
                 cursor = await conn.execute(
@@ -180,7 +213,7 @@ class Customer:
 
     async def delete(self) -> None:
         if self.id or self.tg_id:
-            conn = await aiosqlite.connect(database='app/data/database/database.db')
+            conn = await db_pool.writer()
             try:
                 cursor = await conn.execute('DELETE FROM customers WHERE id = ?', [self.id])
                 await conn.commit()
@@ -189,7 +222,7 @@ class Customer:
                 await conn.close()
 
     async def update_city(self, city_id: int) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE customers SET city_id = ? WHERE id = ?'
             params = (city_id, self.id)
@@ -200,7 +233,7 @@ class Customer:
             await conn.close()
 
     async def update_abs_count(self, abs_count: int) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE customers SET abs_count = ? WHERE id = ?'
             params = (abs_count, self.id)
@@ -212,7 +245,7 @@ class Customer:
 
     @classmethod
     async def count(cls) -> int:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT COUNT(1) FROM customers')
             record = await cursor.fetchone()
@@ -267,7 +300,7 @@ class Worker:
         self.activity_level = activity_level
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             city_id = [str(x) for x in self.city_id]
             city_id = ' | '.join(city_id)
@@ -281,15 +314,18 @@ class Worker:
                 (self.tg_id, self.tg_name, city_id, self.phone_number, self.confirmation_code, self.tg_id,
                  self.registration_data, self.purchased_contacts, self.unlimited_contacts_until, public_id,
                  self.activity_level))
+            self.id = cursor.lastrowid
+            await WorkerCity.replace(conn, self.id, self.city_id)
             await conn.commit()
             await cursor.close()
         finally:
             await conn.close()
+        await routing_index.refresh_worker(self.id)
 
     @classmethod
     async def get_worker(cls, id: int = None, tg_id: int = None, ref_code: int = None) -> Optional['Worker']:
         if id or tg_id:
-            conn = await aiosqlite.connect(database='app/data/database/database.db')
+            conn = await db_pool.reader()
             try:
                 if id:
                     cursor = await conn.execute('SELECT * FROM workers WHERE id = ?', [id])
@@ -300,12 +336,13 @@ class Worker:
                 record = await cursor.fetchone()
                 await cursor.close()
                 if record:
+                    city_ids = await WorkerCity.get_main_city_ids(conn, worker_id=record[0])
                     return cls(
                         id=record[0],
                         tg_id=record[1],
                         tg_name=record[2],
                         phone_number=record[3],
-                        city_id=[int(x) for x in record[4].split(' | ')],
+                        city_id=city_ids.get(record[0], []),
                         confirmed=True if record[5] else False,
                         stars=record[6],
                         count_ratings=record[7],
@@ -335,45 +372,62 @@ class Worker:
 
     @classmethod
     async def get_all_in_city(cls, city_id: int) -> list['Worker'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
-            cursor = await conn.execute('SELECT * FROM workers')
+            cursor = await conn.execute('''
+                                        SELECT *
+                                        FROM workers
+                                        WHERE id IN (SELECT worker_id
+                                                     FROM worker_cities
+                                                     WHERE city_id = ?
+                                                       AND subscription_id IS NULL)
+                                        ''', [city_id])
             records = await cursor.fetchall()
             await cursor.close()
 
             if records:
+                cursor = await conn.execute('''
+                                            SELECT worker_id, city_id
+                                            FROM worker_cities
+                                            WHERE subscription_id IS NULL
+                                              AND worker_id IN (SELECT worker_id
+                                                                FROM worker_cities
+                                                                WHERE city_id = ?
+                                                                  AND subscription_id IS NULL)
+                                            ORDER BY worker_id, position
+                                            ''', [city_id])
+                city_ids = group_pairs(await cursor.fetchall())
+                await cursor.close()
+
                 matching_records = []
-                city_id_str = str(city_id)
                 for record in records:
-                    record_city_ids = record[4].split(' | ')
-                    if city_id_str in record_city_ids:
-                        worker = cls(
-                            id=record[0],
-                            tg_id=record[1],
-                            tg_name=record[2],
-                            phone_number=record[3],
-                            city_id=[int(x) for x in record_city_ids],  # Преобразуем каждый city_id в int
-                            confirmed=record[5],
-                            stars=record[6],
-                            count_ratings=record[7],
-                            order_count=record[8],
-                            order_count_on_week=record[9],
-                            confirmation_code=record[10],
-                            ref_code=record[11],
-                            active=True if record[12] == 1 else False,
-                            access_token=record[13],
-                            author_name=record[14],
-                            individual_entrepreneur=True if record[15] == 1 else False,
-                            registration_data=record[16],
-                            profile_photo=record[17],
-                            profile_name=record[18],
-                            portfolio_photo=json.loads(record[19]) if record[19] else None,
-                            purchased_contacts=record[20] if len(record) > 20 else 0,
-                            unlimited_contacts_until=record[21] if len(record) > 21 else None,
-                            public_id=record[22] if len(record) > 22 else None,
-                            activity_level=record[23] if len(record) > 23 else 100
-                        )
-                        matching_records.append(worker)
+                    worker = cls(
+                        id=record[0],
+                        tg_id=record[1],
+                        tg_name=record[2],
+                        phone_number=record[3],
+                        city_id=city_ids.get(record[0], []),
+                        confirmed=record[5],
+                        stars=record[6],
+                        count_ratings=record[7],
+                        order_count=record[8],
+                        order_count_on_week=record[9],
+                        confirmation_code=record[10],
+                        ref_code=record[11],
+                        active=True if record[12] == 1 else False,
+                        access_token=record[13],
+                        author_name=record[14],
+                        individual_entrepreneur=True if record[15] == 1 else False,
+                        registration_data=record[16],
+                        profile_photo=record[17],
+                        profile_name=record[18],
+                        portfolio_photo=json.loads(record[19]) if record[19] else None,
+                        purchased_contacts=record[20] if len(record) > 20 else 0,
+                        unlimited_contacts_until=record[21] if len(record) > 21 else None,
+                        public_id=record[22] if len(record) > 22 else None,
+                        activity_level=record[23] if len(record) > 23 else 100
+                    )
+                    matching_records.append(worker)
 
                 return matching_records if matching_records else None
             else:
@@ -384,142 +438,93 @@ class Worker:
     @classmethod
     async def get_active_workers_for_advertisement(cls, city_id: int, work_type_id: int) -> list['Worker']:
         """
-        Получение активных исполнителей по городу и типу работы.
-        Учитывает основной город из workers.city_id и дополнительные города из worker_city_subscriptions
+        Получение активных исполнителей по городу и типу работы одним запросом.
+        Учитывает основные города исполнителя и города из активных подписок worker_city_subscriptions.
+        Тип работы: нет направлений или безлимит ('0') - подходят все типы, иначе нужен точный тип.
         """
-        import logging
-        logger = logging.getLogger()
-        logger.info(f'[DEBUG] get_active_workers_for_advertisement: city_id={city_id}, work_type_id={work_type_id}')
-
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
-            # Получаем всех активных исполнителей (используем DISTINCT для избежания дублирования)
-            query = '''
-                    SELECT DISTINCT w.*, ws.work_type_ids
-                    FROM workers w
-                             LEFT JOIN worker_and_subscription ws ON w.id = ws.worker_id
-                    WHERE w.active = 1
-                    '''
-            cursor = await conn.execute(query)
+            cursor = await conn.execute('''
+                                        WITH worker_city_list AS (SELECT wc.worker_id,
+                                                                         wc.city_id,
+                                                                         wc.subscription_id,
+                                                                         wc.position
+                                                                  FROM worker_cities wc
+                                                                           LEFT JOIN worker_city_subscriptions s
+                                                                                     ON s.id = wc.subscription_id
+                                                                  WHERE wc.subscription_id IS NULL
+                                                                     OR s.active = 1)
+                                        SELECT w.*,
+                                               (SELECT group_concat(city_id, '|')
+                                                FROM (SELECT c.city_id
+                                                      FROM worker_city_list c
+                                                      WHERE c.worker_id = w.id
+                                                      ORDER BY c.subscription_id IS NOT NULL, c.subscription_id,
+                                                               c.position)) AS all_city_ids
+                                        FROM workers w
+                                        WHERE w.active = 1
+                                          AND w.id IN (SELECT worker_id FROM worker_city_list WHERE city_id = ?)
+                                          AND (NOT EXISTS (SELECT 1 FROM worker_work_types t WHERE t.worker_id = w.id)
+                                            OR EXISTS (SELECT 1
+                                                       FROM worker_work_types t
+                                                       WHERE t.worker_id = w.id
+                                                         AND t.work_type_id = ?)
+                                            OR (SELECT COUNT(*) = 1 AND MIN(t.work_type_id) = 0
+                                                FROM worker_work_types t
+                                                WHERE t.worker_id = w.id))
+                                        ORDER BY w.id
+                                        ''', [city_id, work_type_id])
             records = await cursor.fetchall()
             await cursor.close()
-
-            logger.info(f'[DEBUG] Found {len(records)} active workers in database')
-
-            matching_workers = []
-            work_type_id_str = str(work_type_id)
-
-            for record in records:
-                worker_tg_id = record[1]
-                worker_id = record[0]
-                logger.info(f'[DEBUG] Processing worker {worker_tg_id}')
-
-                # Проверяем основной город (формат: "1 | 2 | 3")
-                try:
-                    main_city_ids = str(record[4]).split(' | ') if record[4] is not None else []
-                except (AttributeError, TypeError):
-                    logger.info(f'[DEBUG] Worker {worker_tg_id}: invalid main city_id format')
-                    continue
-
-                # Проверяем дополнительные города из подписок
-                additional_city_ids = []
-                cursor = await conn.execute('''
-                                            SELECT city_ids
-                                            FROM worker_city_subscriptions
-                                            WHERE worker_id = ?
-                                              AND active = 1
-                                            ''', [worker_id])
-                subscription_records = await cursor.fetchall()
-                await cursor.close()
-
-                for sub_record in subscription_records:
-                    if sub_record[0]:  # city_ids не пустые
-                        additional_city_ids.extend(sub_record[0].split('|'))
-
-                # Объединяем основной город и дополнительные города
-                all_city_ids = main_city_ids + [str(cid).strip() for cid in additional_city_ids if cid.strip()]
-
-                logger.info(
-                    f'[DEBUG] Worker {worker_tg_id}: main_cities={main_city_ids}, additional_cities={additional_city_ids}, all_cities={all_city_ids}')
-
-                # Проверяем, есть ли нужный город в списке всех городов
-                if str(city_id) not in all_city_ids:
-                    logger.info(f'[DEBUG] Worker {worker_tg_id}: city {city_id} not in {all_city_ids}')
-                    continue
-
-                # Проверяем тип работы (work_type_ids из таблицы worker_and_subscription)
-                # w.* дает 24 поля (0-23), ws.work_type_ids это поле 24
-                logger.info(
-                    f'[DEBUG] Worker {worker_tg_id}: record length={len(record)}, record[24]={record[24] if len(record) > 24 else "N/A"}')
-                try:
-                    work_type_ids = str(record[24]).split('|') if len(record) > 24 and record[24] is not None else []
-                except (AttributeError, TypeError, IndexError):
-                    work_type_ids = []
-
-                # Убираем пустые строки из списка
-                work_type_ids = [id for id in work_type_ids if id and id.strip()]
-
-                logger.info(
-                    f'[DEBUG] Worker {worker_tg_id}: work_type_ids={work_type_ids}, looking for {work_type_id_str}')
-
-                # Проверяем тип работы
-                # Если work_type_ids=['0'] - это безлимитная подписка (получает все типы)
-                # Если work_type_ids пустой - тоже получает все типы
-                # Если есть конкретные типы - проверяем совпадение
-                is_unlimited = len(work_type_ids) == 1 and work_type_ids[0] == '0'
-
-                if work_type_ids and not is_unlimited and work_type_id_str not in work_type_ids:
-                    logger.info(f'[DEBUG] Worker {worker_tg_id}: work_type {work_type_id_str} not in {work_type_ids}')
-                    continue
-
-                logger.info(f'[DEBUG] Worker {worker_tg_id}: MATCH! Adding to list')
-
-                worker = cls(
-                    id=record[0],
-                    tg_id=record[1],
-                    tg_name=record[2],
-                    phone_number=record[3],
-                    city_id=[int(x) for x in all_city_ids],
-                    confirmed=record[5],
-                    stars=record[6],
-                    count_ratings=record[7],
-                    order_count=record[8],
-                    order_count_on_week=record[9],
-                    confirmation_code=record[10],
-                    ref_code=record[11],
-                    active=True if record[12] == 1 else False,
-                    access_token=record[13],
-                    author_name=record[14],
-                    individual_entrepreneur=True if record[15] == 1 else False,
-                    registration_data=record[16],
-                    profile_photo=record[17],
-                    profile_name=record[18],
-                    portfolio_photo=json.loads(record[19]) if record[19] else None,
-                    purchased_contacts=record[20] if len(record) > 20 else 0,
-                    unlimited_contacts_until=record[21] if len(record) > 21 else None,
-                    public_id=record[22] if len(record) > 22 else None,
-                    activity_level=record[23] if len(record) > 23 else 100
-                )
-                matching_workers.append(worker)
-
-            logger.info(f'[DEBUG] Final result: {len(matching_workers)} matching workers found')
-            return matching_workers
         finally:
             await conn.close()
 
+        # all_city_ids - последняя колонка, сразу после всех колонок workers
+        matching_workers = [cls(
+            id=record[0],
+            tg_id=record[1],
+            tg_name=record[2],
+            phone_number=record[3],
+            city_id=[int(x) for x in record[-1].split('|')] if record[-1] else [],
+            confirmed=record[5],
+            stars=record[6],
+            count_ratings=record[7],
+            order_count=record[8],
+            order_count_on_week=record[9],
+            confirmation_code=record[10],
+            ref_code=record[11],
+            active=True if record[12] == 1 else False,
+            access_token=record[13],
+            author_name=record[14],
+            individual_entrepreneur=True if record[15] == 1 else False,
+            registration_data=record[16],
+            profile_photo=record[17],
+            profile_name=record[18],
+            portfolio_photo=json.loads(record[19]) if record[19] else None,
+            purchased_contacts=record[20] if len(record) > 21 else 0,
+            unlimited_contacts_until=record[21] if len(record) > 22 else None,
+            public_id=record[22] if len(record) > 23 else None,
+            activity_level=record[23] if len(record) > 24 else 100
+        ) for record in records]
+
+        logger.debug(f'get_active_workers_for_advertisement: city_id={city_id}, work_type_id={work_type_id}, '
+                     f'found {len(matching_workers)} workers')
+        return matching_workers
+
     @classmethod
     async def get_all(cls) -> list['Worker']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM workers')
             records = await cursor.fetchall()
             await cursor.close()
+            city_ids = await WorkerCity.get_main_city_ids(conn)
             return [cls(
                 id=record[0],
                 tg_id=record[1],
                 tg_name=record[2],
                 phone_number=record[3],
-                city_id=[int(x) for x in record[4].split(' | ')],
+                city_id=city_ids.get(record[0], []),
                 confirmed=record[5],
                 stars=record[6],
                 count_ratings=record[7],
@@ -543,6 +548,10 @@ class Worker:
         # Локальный импорт для избежания циклических зависимостей
         from app.untils import help_defs
 
+        # Фото из хранилища удаляются, когда на них не остается ссылок
+        await release_photos('portfolio', self.id)
+        await release_photos('profile', self.id)
+
         # Удаляем все файлы портфолио перед удалением из БД
         if self.portfolio_photo:
             for photo_path in self.portfolio_photo.values():
@@ -555,19 +564,36 @@ class Worker:
             logger.info(f"Фото профиля удалено при удалении исполнителя: {self.profile_photo}")
 
         # Удаляем из базы данных
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             if self.id:
+                await WorkerCity.delete_by_worker(conn, self.id)
+                await WorkerWorkType.delete_by_worker(conn, self.id)
                 cursor = await conn.execute('DELETE FROM workers WHERE id = ?', [self.id])
             else:
+                await conn.execute(
+                    'DELETE FROM worker_cities WHERE worker_id IN (SELECT id FROM workers WHERE tg_id = ?)',
+                    [self.tg_id])
+                await conn.execute(
+                    'DELETE FROM worker_work_types WHERE worker_id IN (SELECT id FROM workers WHERE tg_id = ?)',
+                    [self.tg_id])
                 cursor = await conn.execute('DELETE FROM workers WHERE tg_id = ?', [self.tg_id])
             await conn.commit()
             await cursor.close()
         finally:
             await conn.close()
+        if self.id:
+            await routing_index.refresh_worker(self.id)
+            feed_cache.invalidate_worker(self.id)
+        else:
+            await routing_index.remove_by_tg_id(self.tg_id)
 
     async def update_portfolio_photo(self, portfolio_photo: dict) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        # Фото копируются в хранилище, пути в словаре заменяются на месте
+        await store_photos('portfolio', self.id, portfolio_photo, self._save_portfolio_photo)
+
+    async def _save_portfolio_photo(self, portfolio_photo: dict) -> None:
+        conn = await db_pool.writer()
         try:
             portfolio_photo_json = json.dumps(portfolio_photo)
             query = 'UPDATE workers SET portfolio_photo = ? WHERE id = ?'
@@ -579,7 +605,7 @@ class Worker:
             await conn.close()
 
     async def update_order_counter(self, order_count: int) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET order_count = ? WHERE id = ?'
             params = (order_count, self.id)
@@ -593,13 +619,17 @@ class Worker:
         # Локальный импорт для избежания циклических зависимостей
         from app.untils import help_defs
 
+        # Новое фото копируется в хранилище, старое удаляется, если на него не осталось ссылок
+        profile_photo = await store_photos('profile', self.id, profile_photo, self._save_profile_photo)
+
         # Удаляем старое фото профиля если оно есть
         if self.profile_photo and self.profile_photo != profile_photo:
             help_defs.delete_file(self.profile_photo)
             logger.info(f"Старое фото профиля удалено: {self.profile_photo}")
+        self.profile_photo = profile_photo
 
-        # Обновляем в базе данных
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+    async def _save_profile_photo(self, profile_photo: str | None) -> None:
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET profile_photo = ? WHERE id = ?'
             params = (profile_photo, self.id)
@@ -610,7 +640,7 @@ class Worker:
             await conn.close()
 
     async def update_profile_name(self, profile_name: str) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET profile_name = ? WHERE id = ?'
             params = (profile_name, self.id)
@@ -621,7 +651,7 @@ class Worker:
             await conn.close()
 
     async def update_active(self, active: bool) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET active = ? WHERE id = ?'
             params = (active, self.id)
@@ -630,9 +660,11 @@ class Worker:
             await cursor.close()
         finally:
             await conn.close()
+        await routing_index.refresh_worker(self.id)
+        feed_cache.invalidate_worker(self.id)
 
     async def update_phone_number(self, phone_number: str) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET phone_number = ? WHERE id = ?'
             params = (phone_number, self.id)
@@ -643,8 +675,9 @@ class Worker:
             await conn.close()
 
     async def update_city(self, city_id: list) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
+            await WorkerCity.replace(conn, self.id, city_id)
             query = 'UPDATE workers SET city_id = ? WHERE id = ?'
             city_id = [str(x) for x in city_id]
             params = (' | '.join(city_id), self.id)
@@ -653,9 +686,11 @@ class Worker:
             await cursor.close()
         finally:
             await conn.close()
+        await routing_index.refresh_worker(self.id)
+        feed_cache.invalidate_worker(self.id)
 
     async def update_stars(self, stars: int, count_ratings: int) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET stars = ?, count_ratings = ? WHERE id = ?'
             params = (stars, count_ratings, self.id)
@@ -667,7 +702,7 @@ class Worker:
 
     @classmethod
     async def count(cls) -> int:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT COUNT(1) FROM workers')
             record = await cursor.fetchone()
@@ -677,7 +712,7 @@ class Worker:
             await conn.close()
 
     async def update_confirmed(self, confirmed: bool) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET confirmed = ? WHERE id = ?'
             params = (confirmed, self.id)
@@ -688,7 +723,7 @@ class Worker:
             await conn.close()
 
     async def update_individual_entrepreneur(self, individual_entrepreneur: bool) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET individual_entrepreneur = ? WHERE id = ?'
             params = (individual_entrepreneur, self.id)
@@ -699,7 +734,7 @@ class Worker:
             await conn.close()
 
     async def update_order_count(self, order_count: int) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET order_count = ? WHERE id = ?'
             params = (order_count, self.id)
@@ -710,7 +745,7 @@ class Worker:
             await conn.close()
 
     async def update_order_count_on_week(self, order_count_on_week: int) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             query = 'UPDATE workers SET order_count_on_week = ? WHERE id = ?'
             params = (order_count_on_week, self.id)
@@ -723,7 +758,7 @@ class Worker:
     async def update_purchased_contacts(self, purchased_contacts: int = None,
                                         unlimited_contacts_until: str = None) -> None:
         """Обновляет количество купленных контактов или безлимитный период"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -753,7 +788,7 @@ class Worker:
 
     async def update_activity_level(self, new_level: int) -> None:
         """Обновляет уровень активности исполнителя"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'UPDATE workers SET activity_level = ? WHERE id = ?',
@@ -812,7 +847,7 @@ class City:
         self.city_en = city_en
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO cities (city, city_en) VALUES (?, ?)', [self.city, self.city_en])
             await conn.commit()
@@ -823,7 +858,7 @@ class City:
     @classmethod
     async def get_city(cls, id: int = None, city_name: str = None, city_en: str = None) -> Optional['City'] | None:
         if id or city_name or city_en:
-            conn = await aiosqlite.connect(database='app/data/database/database.db')
+            conn = await db_pool.reader()
             try:
                 if id:
                     cursor = await conn.execute('SELECT * FROM cities WHERE id = ?', [id])
@@ -841,7 +876,7 @@ class City:
 
     @classmethod
     async def get_all(cls, sort: bool = True) -> list['City']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             if sort:
                 cursor = await conn.execute('SELECT * FROM cities  ORDER BY city')
@@ -854,7 +889,7 @@ class City:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM cities WHERE id = ?', [self.id])
             await conn.commit()
@@ -876,9 +911,7 @@ class Banned:
         self.ban_reason = ban_reason
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO ban_list (tg_id, ban_end, ban_reason) VALUES (?, ?, ?)',
                                         [self.tg_id, self.ban_end, self.ban_reason])
@@ -888,21 +921,19 @@ class Banned:
             await conn.close()
 
     async def save_war(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
-        cursor = await conn.execute('INSERT INTO ban_list (tg_id, warning, ban_now, ban_reason) VALUES (?, ?, ?, ?)',
-                                    [self.tg_id, self.warning, False, self.ban_reason])
-        await conn.commit()
-        await cursor.close()
-        await conn.close()
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute('INSERT INTO ban_list (tg_id, warning, ban_now, ban_reason) VALUES (?, ?, ?, ?)',
+                                        [self.tg_id, self.warning, False, self.ban_reason])
+            await conn.commit()
+            await cursor.close()
+        finally:
+            await conn.close()
 
     @classmethod
     async def get_banned(cls, id: int = None, tg_id: int = None) -> Optional['Banned'] | None:
         if id or tg_id:
-            conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                           detect_types=sqlite3.PARSE_DECLTYPES |
-                                                        sqlite3.PARSE_COLNAMES)
+            conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
             try:
                 if id:
                     cursor = await conn.execute('SELECT * FROM ban_list WHERE id = ?', [id])
@@ -927,9 +958,7 @@ class Banned:
 
     @classmethod
     async def get_all(cls) -> list['Banned'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM ban_list')
             records = await cursor.fetchall()
@@ -953,8 +982,7 @@ class Banned:
 
     @classmethod
     async def count_active(cls) -> int:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute(
                 'SELECT COUNT(1) FROM ban_list WHERE COALESCE(ban_now, 0) = 1 OR COALESCE(forever, 0) = 1')
@@ -966,9 +994,7 @@ class Banned:
 
     @classmethod
     async def get_all_banned_now(cls) -> list['Banned'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM ban_list WHERE ban_now = ? and forever = ?',
                                         [True, False])
@@ -993,9 +1019,7 @@ class Banned:
 
     async def update(self, ban_counter: int = None, ban_end: str = None, ban_now: bool = None,
                      forever: bool = None, warning: int = None, ban_reason: str = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -1033,9 +1057,7 @@ class Banned:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM ban_list WHERE id = ?', [self.id])
             await conn.commit()
@@ -1050,7 +1072,7 @@ class BlockWord:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1060,7 +1082,7 @@ class BlockWord:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list WHERE id = ?', [self.id])
             await conn.commit()
@@ -1070,7 +1092,7 @@ class BlockWord:
 
     @classmethod
     async def get_all(cls) -> list['BlockWord']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list')
             records = await cursor.fetchall()
@@ -1086,7 +1108,7 @@ class BlockWordMessage:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list_message (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1096,7 +1118,7 @@ class BlockWordMessage:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list_message WHERE id = ?', [self.id])
             await conn.commit()
@@ -1106,7 +1128,7 @@ class BlockWordMessage:
 
     @classmethod
     async def get_all(cls) -> list['BlockWordMessage']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list_message')
             records = await cursor.fetchall()
@@ -1122,7 +1144,7 @@ class BlockWordPersonal:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list_personal (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1132,7 +1154,7 @@ class BlockWordPersonal:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list_personal WHERE id = ?', [self.id])
             await conn.commit()
@@ -1142,7 +1164,7 @@ class BlockWordPersonal:
 
     @classmethod
     async def get_all(cls) -> list['BlockWordPersonal']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list_personal')
             records = await cursor.fetchall()
@@ -1158,7 +1180,7 @@ class BlockWordPhoto:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list_photo (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1168,7 +1190,7 @@ class BlockWordPhoto:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list_photo WHERE id = ?', [self.id])
             await conn.commit()
@@ -1178,7 +1200,7 @@ class BlockWordPhoto:
 
     @classmethod
     async def get_all(cls) -> list['BlockWordPhoto']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list_photo')
             records = await cursor.fetchall()
@@ -1194,7 +1216,7 @@ class BlockWordShort:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list_short (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1204,7 +1226,7 @@ class BlockWordShort:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list_short WHERE id = ?', [self.id])
             await conn.commit()
@@ -1214,7 +1236,7 @@ class BlockWordShort:
 
     @classmethod
     async def get_all(cls) -> list['BlockWordShort']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list_short')
             records = await cursor.fetchall()
@@ -1230,7 +1252,7 @@ class BlockWordShortMessage:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list_short_message (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1240,7 +1262,7 @@ class BlockWordShortMessage:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list_short_message WHERE id = ?', [self.id])
             await conn.commit()
@@ -1250,7 +1272,7 @@ class BlockWordShortMessage:
 
     @classmethod
     async def get_all(cls) -> list['BlockWordShortMessage']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list_short_message')
             records = await cursor.fetchall()
@@ -1266,7 +1288,7 @@ class BlockWordShortPersonal:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list_short_personal (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1276,7 +1298,7 @@ class BlockWordShortPersonal:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list_short_personal WHERE id = ?', [self.id])
             await conn.commit()
@@ -1286,7 +1308,7 @@ class BlockWordShortPersonal:
 
     @classmethod
     async def get_all(cls) -> list['BlockWordShortPersonal']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list_short_personal')
             records = await cursor.fetchall()
@@ -1302,7 +1324,7 @@ class BlockWordShortPhoto:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO block_list_short_photo (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1312,7 +1334,7 @@ class BlockWordShortPhoto:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM block_list_short_photo WHERE id = ?', [self.id])
             await conn.commit()
@@ -1322,7 +1344,7 @@ class BlockWordShortPhoto:
 
     @classmethod
     async def get_all(cls) -> list['BlockWordShortPhoto']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM block_list_short_photo')
             records = await cursor.fetchall()
@@ -1338,7 +1360,7 @@ class ProfanityWord:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO profanity_word (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1348,7 +1370,7 @@ class ProfanityWord:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM profanity_word WHERE id = ?', [self.id])
             await conn.commit()
@@ -1358,7 +1380,7 @@ class ProfanityWord:
 
     @classmethod
     async def get_all(cls) -> list['ProfanityWord']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM profanity_word')
             records = await cursor.fetchall()
@@ -1374,7 +1396,7 @@ class WhiteWord:
         self.word = word
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO white_list (word) VALUES (?)', [self.word])
             await conn.commit()
@@ -1384,7 +1406,7 @@ class WhiteWord:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM white_list WHERE id = ?', [self.id])
             await conn.commit()
@@ -1394,7 +1416,7 @@ class WhiteWord:
 
     @classmethod
     async def get_all(cls) -> list['WhiteWord']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM white_list')
             records = await cursor.fetchall()
@@ -1404,6 +1426,55 @@ class WhiteWord:
             await conn.close()
 
 
+class StopWordsVersion:
+    """
+    Номер версии списков стоп-слов (block_list*, profanity_word, white_list).
+    Увеличивается при каждом изменении списков, по нему app/untils/stop_words.py перечитывает слова.
+    """
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS stop_words_version
+                               (
+                                   id      INTEGER PRIMARY KEY CHECK (id = 1),
+                                   version INTEGER NOT NULL DEFAULT 0
+                               )
+                               ''')
+            await conn.execute('INSERT OR IGNORE INTO stop_words_version (id, version) VALUES (1, 0)')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def get(cls) -> int:
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT version FROM stop_words_version WHERE id = 1')
+            record = await cursor.fetchone()
+            await cursor.close()
+            return record[0] if record else 0
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def bump(cls) -> int:
+        """Увеличивает версию и возвращает новую"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('UPDATE stop_words_version SET version = version + 1 WHERE id = 1')
+            cursor = await conn.execute('SELECT version FROM stop_words_version WHERE id = 1')
+            record = await cursor.fetchone()
+            await cursor.close()
+            await conn.commit()
+            return record[0] if record else 0
+        finally:
+            await conn.close()
+
+
 class SubscriptionType:
     def __init__(self, id: int | None, subscription_type: str, count_work_types: int,
                  count_guaranteed_orders: int, notification: bool, unlimited: bool, price: int, count_cites: int):
@@ -1417,7 +1488,7 @@ class SubscriptionType:
         self.count_cites = count_cites
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO subscription_types (subscription_type, count_work_types, count_guaranteed_orders, notification, unlimited, price, count_cites) VALUES (?, ?, ?, ?, ?, ?, ?)',
@@ -1430,7 +1501,7 @@ class SubscriptionType:
 
     async def update(self, count_work_types: int = None, count_guaranteed_orders: int = None,
                      notification: bool = None, unlimited: bool = None, price: int = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -1465,7 +1536,7 @@ class SubscriptionType:
 
     @classmethod
     async def get_subscription_type(cls, id: int = None) -> Optional['SubscriptionType']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM subscription_types WHERE id = ?', [id])
             record = await cursor.fetchone()
@@ -1487,7 +1558,7 @@ class SubscriptionType:
 
     @classmethod
     async def get_all(cls) -> list['SubscriptionType'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM subscription_types')
             records = await cursor.fetchall()
@@ -1519,7 +1590,7 @@ class WorkType:
         self.template_photo = template_photo
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO work_types (work_type) VALUES (?)', [self.work_type])
             await conn.commit()
@@ -1528,7 +1599,7 @@ class WorkType:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM work_types WHERE id = ?', [self.id])
             await conn.commit()
@@ -1539,7 +1610,7 @@ class WorkType:
     @classmethod
     async def get_work_type(cls, id: int = None, work_type: str = None) -> Optional['WorkType'] | None:
         if id or work_type:
-            conn = await aiosqlite.connect(database='app/data/database/database.db')
+            conn = await db_pool.reader()
             try:
                 cursor = await conn.execute('SELECT * FROM work_types WHERE id = ?', [id])
                 record = await cursor.fetchone()
@@ -1554,7 +1625,7 @@ class WorkType:
 
     @classmethod
     async def get_all(cls) -> list['WorkType']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM work_types')
             records = await cursor.fetchall()
@@ -1575,7 +1646,7 @@ class WorkSubType:
         self.template_photo = template_photo
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO work_sub_types (work_mine_type_id, work_type) VALUES (?, ?)',
                                         [self.work_mine_type_id, self.work_type])
@@ -1585,7 +1656,7 @@ class WorkSubType:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM work_sub_types WHERE id = ?', [self.id])
             await conn.commit()
@@ -1596,7 +1667,7 @@ class WorkSubType:
     @classmethod
     async def get_work_type(cls, id: int = None, work_type: str = None) -> Optional['WorkSubType'] | None:
         if id or work_type:
-            conn = await aiosqlite.connect(database='app/data/database/database.db')
+            conn = await db_pool.reader()
             try:
                 cursor = await conn.execute('SELECT * FROM work_sub_types WHERE id = ?', [id])
                 record = await cursor.fetchone()
@@ -1612,7 +1683,7 @@ class WorkSubType:
 
     @classmethod
     async def get_work_sub_types(cls, work_mine_type_id: int) -> list['WorkSubType'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM work_sub_types WHERE work_mine_type_id = ?', [work_mine_type_id])
             records = await cursor.fetchall()
@@ -1626,7 +1697,7 @@ class WorkSubType:
 
     @classmethod
     async def get_all(cls) -> list['WorkSubType']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM work_sub_types')
             records = await cursor.fetchall()
@@ -1649,7 +1720,7 @@ class WorkerAndRefsAssociation:
         self.ref_bonus = ref_bonus
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO worker_and_refs_association (worker_id, ref_id, work_condition) VALUES (?, ?, ?)',
@@ -1661,7 +1732,7 @@ class WorkerAndRefsAssociation:
 
     async def update(self, work_condition: bool = None, ref_condition: bool = None, worker_bonus: bool = None,
                      ref_bonus: bool = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -1687,7 +1758,7 @@ class WorkerAndRefsAssociation:
 
     @classmethod
     async def get_refs_by_worker(cls, worker_id) -> Optional['WorkerAndRefsAssociation'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_refs_association WHERE worker_id = ?', [worker_id])
             record = await cursor.fetchone()
@@ -1705,7 +1776,7 @@ class WorkerAndRefsAssociation:
 
     @classmethod
     async def get_by_ref(cls, ref_id) -> Optional['WorkerAndRefsAssociation'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_refs_association WHERE ref_id = ?', [ref_id])
             record = await cursor.fetchone()
@@ -1724,7 +1795,7 @@ class WorkerAndRefsAssociation:
 
     @classmethod
     async def get_all(cls) -> list['WorkerAndRefsAssociation'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_refs_association')
             records = await cursor.fetchall()
@@ -1754,7 +1825,7 @@ class Admin:
         self.order_price = order_price
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO admins (tg_id, tg_name) VALUES (?, ?)',
@@ -1765,7 +1836,7 @@ class Admin:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM admins WHERE id = ?', [self.id])
             await conn.commit()
@@ -1775,7 +1846,7 @@ class Admin:
 
     @classmethod
     async def get_all(cls) -> list['Admin']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM admins')
             records = await cursor.fetchall()
@@ -1792,7 +1863,7 @@ class Admin:
 
     @classmethod
     async def get_by_tg_id(cls, tg_id: int) -> Optional['Admin'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM admins WHERE tg_id = ?', [tg_id])
             record = await cursor.fetchall()
@@ -1811,7 +1882,7 @@ class Admin:
             await conn.close()
 
     async def update(self, deleted_abs: int = None, done_abs: int = None, order_price: int = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -1838,7 +1909,7 @@ class Admin:
 
     @staticmethod
     async def count_distinct_users() -> int:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             query = 'SELECT COUNT(DISTINCT tg_id) FROM (SELECT tg_id FROM customers UNION ALL SELECT tg_id FROM workers) AS all_users'
             cursor = await conn.execute(query)
@@ -1865,9 +1936,7 @@ class Abs:
         self.count_photo = count_photo
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             photo_path_json = json.dumps(self.photo_path)
             cursor = await conn.execute(
@@ -1880,32 +1949,55 @@ class Abs:
             await cursor.close()
         finally:
             await conn.close()
+        await self._store_photos()
+        await duplicate_index.refresh_ad(self.id)
 
     async def delete(self, delite_photo: bool) -> None:
         # Локальный импорт для избежания циклических зависимостей
         from app.untils import help_defs
 
+        # Фото из хранилища удаляются, когда на них не остается ссылок
+        await release_photos('abs', self.id, delete_files=delite_photo)
         if delite_photo:
             if isinstance(self.photo_path, dict):
                 for _, item in self.photo_path.items():
                     help_defs.delete_file(item)
             else:
                 help_defs.delete_file(self.photo_path)
-        help_defs.delete_file(self.text_path)
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        # Текст хранится в ad_texts и может быть общим, его убирает AdText.delete_unused
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM abs WHERE id = ?', [self.id])
             await conn.commit()
             await cursor.close()
         finally:
             await conn.close()
+        feed_cache.invalidate_ad(self.id)
+        duplicate_index.remove_ad(self.id)
+
+    async def _store_photos(self) -> None:
+        """
+        Копирует фото в хранилище (app/untils/photo_store.py) и записывает их новые пути.
+        Исходные файлы удаляются только после записи: до нее запись указывает на них
+        """
+        photo_path_json = json.dumps(self.photo_path)
+
+        async def save(photo_path) -> None:
+            if json.dumps(photo_path) == photo_path_json:
+                return
+            conn = await db_pool.writer()
+            try:
+                cursor = await conn.execute('UPDATE abs SET photo_path = ? WHERE id = ?',
+                                            [json.dumps(photo_path), self.id])
+                await conn.commit()
+                await cursor.close()
+            finally:
+                await conn.close()
+
+        self.photo_path = await store_photos('abs', self.id, self.photo_path, save)
 
     async def update(self, relevance: bool = None, views: int = None, date_to_delite=None, photo_path=None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -1937,12 +2029,15 @@ class Abs:
                 await conn.commit()
         finally:
             await conn.close()
+        if photo_path is not None:
+            await self._store_photos()
+        if relevance is not None:
+            feed_cache.invalidate_ad(self.id)
+            await duplicate_index.refresh_ad(self.id)
 
     @classmethod
     async def get_all(cls) -> list['Abs']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM abs')
             records = await cursor.fetchall()
@@ -1965,9 +2060,7 @@ class Abs:
 
     @classmethod
     async def count(cls) -> int:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT COUNT(1) FROM abs')
             record = await cursor.fetchone()
@@ -1978,9 +2071,7 @@ class Abs:
 
     @classmethod
     async def get_all_in_city(cls, city_id: int) -> list['Abs'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM abs WHERE city_id = ?', [city_id])
             records = await cursor.fetchall()
@@ -2005,9 +2096,7 @@ class Abs:
 
     @classmethod
     async def get_all_by_customer(cls, customer_id: int) -> list['Abs'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM abs WHERE customer_id = ?', [customer_id])
             records = await cursor.fetchall()
@@ -2032,9 +2121,7 @@ class Abs:
 
     @classmethod
     async def get_one(cls, id: int) -> Optional['Abs'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM abs WHERE id = ?', [id])
             record = await cursor.fetchone()
@@ -2057,6 +2144,149 @@ class Abs:
         finally:
             await conn.close()
 
+    @classmethod
+    async def create_feed_indexes_if_not_exist(cls) -> None:
+        """Индексы для ленты объявлений исполнителя (get_feed_page)"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('CREATE INDEX IF NOT EXISTS idx_abs_city_id ON abs (city_id, id)')
+            # Проверки NOT EXISTS по (исполнитель, объявление)
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_workers_and_abs_worker_id
+                                   ON workers_and_abs (worker_id, abs_id)
+                               ''')
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_worker_and_report_worker_id
+                                   ON worker_and_report (worker_id, abs_id)
+                               ''')
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_worker_and_bad_response_worker_id
+                                   ON worker_and_bad_response (worker_id, abs_id)
+                               ''')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @staticmethod
+    def _feed_query(worker_id: int, work_type_ids: list | None) -> tuple[str, dict]:
+        """
+        CTE feed с лентой объявлений исполнителя и параметры к нему.
+
+        В ленту попадают актуальные объявления из городов исполнителя (worker_cities с активными подписками)
+        с подходящим типом работы, кроме собственных объявлений исполнителя, объявлений с жалобой,
+        скрытых и тех, на которые он уже откликнулся.
+        work_type_ids = None - подходят все типы работ.
+        """
+        params = {'worker_id': worker_id}
+        work_type_filter = ''
+        if work_type_ids is not None:
+            placeholders = ', '.join(f':work_type_{i}' for i in range(len(work_type_ids)))
+            work_type_filter = f'AND a.work_type_id IN ({placeholders})'
+            params.update({f'work_type_{i}': work_type_id for i, work_type_id in enumerate(work_type_ids)})
+
+        return f'''
+               WITH feed AS (SELECT a.*
+                             FROM abs a
+                                      JOIN customers c ON c.id = a.customer_id
+                             WHERE a.relevance = 1
+                               AND a.city_id IN (SELECT wc.city_id
+                                                 FROM worker_cities wc
+                                                          LEFT JOIN worker_city_subscriptions s
+                                                                    ON s.id = wc.subscription_id
+                                                 WHERE wc.worker_id = :worker_id
+                                                   AND (wc.subscription_id IS NULL OR s.active = 1))
+                               {work_type_filter}
+                               AND c.tg_id != (SELECT tg_id FROM workers WHERE id = :worker_id)
+                               AND NOT EXISTS (SELECT 1
+                                               FROM worker_and_report r
+                                               WHERE r.worker_id = :worker_id
+                                                 AND r.abs_id = a.id)
+                               AND NOT EXISTS (SELECT 1
+                                               FROM worker_and_bad_response b
+                                               WHERE b.worker_id = :worker_id
+                                                 AND b.abs_id = a.id)
+                               AND NOT EXISTS (SELECT 1
+                                               FROM workers_and_abs wa
+                                               WHERE wa.worker_id = :worker_id
+                                                 AND wa.abs_id = a.id))
+               ''', params
+
+    @classmethod
+    async def get_feed_page(cls, worker_id: int, work_type_ids: list | None, before_id: int = None,
+                            after_id: int = None, limit: int = 1) -> tuple[list['Abs'], bool, bool]:
+        """
+        Страница ленты объявлений исполнителя (см. _feed_query) одним запросом, от новых к старым.
+        work_type_ids = None - подходят все типы работ, пустой список - ни один.
+
+        Навигация по id объявления (keyset): before_id - следующие, более старые объявления,
+        after_id - предыдущие, более новые. Возвращает (объявления, есть ли дальше, есть ли назад).
+        """
+        if work_type_ids is not None and not work_type_ids:
+            return [], False, False
+
+        feed_sql, params = cls._feed_query(worker_id, work_type_ids)
+        params['limit'] = limit + 1
+
+        if after_id is not None:
+            params['cursor'] = after_id
+            page_filter, order, other_side = 'id > :cursor', 'ASC', 'id <= :cursor'
+        elif before_id is not None:
+            params['cursor'] = before_id
+            page_filter, order, other_side = 'id < :cursor', 'DESC', 'id >= :cursor'
+        else:
+            page_filter, order, other_side = '1', 'DESC', '0'
+
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        try:
+            cursor = await conn.execute(feed_sql + f'''
+                                        SELECT page.*, EXISTS (SELECT 1 FROM feed WHERE {other_side}) AS other_side
+                                        FROM (SELECT * FROM feed WHERE {page_filter} ORDER BY id {order} LIMIT :limit) page
+                                        ORDER BY page.id {order}
+                                        ''', params)
+            records = await cursor.fetchall()
+            await cursor.close()
+        finally:
+            await conn.close()
+
+        has_more = len(records) > limit
+        has_other_side = bool(records[0][-1]) if records else False
+        advertisements = [cls(id=record[0],
+                              customer_id=record[1],
+                              work_type_id=record[2],
+                              city_id=record[3],
+                              photo_path=None if not record[4] else json.loads(record[4]) if '{' in record[4] else None if
+                              record[4] == 'null' else {'0': record[4]},
+                              text_path=record[5],
+                              date_to_delite=record[6],
+                              relevance=True if record[7] == 1 else False,
+                              views=record[8],
+                              count_photo=record[9]
+                              ) for record in records[:limit]]
+
+        if after_id is not None:
+            # Предыдущая страница выбрана по возрастанию id - разворачиваем к порядку ленты
+            advertisements.reverse()
+            return advertisements, has_other_side, has_more
+        return advertisements, has_more, has_other_side
+
+    @classmethod
+    async def get_feed_ids(cls, worker_id: int, work_type_ids: list | None) -> list[int]:
+        """
+        Вся лента исполнителя для снимка в feed_cache: id объявлений от новых к старым.
+        Объявления с жалобой, скрытые и с откликом исполнителя исключает сам запрос ленты
+        """
+        if work_type_ids is not None and not work_type_ids:
+            return []
+        feed_sql, params = cls._feed_query(worker_id, work_type_ids)
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute(feed_sql + 'SELECT id FROM feed ORDER BY id DESC', params)
+            ad_ids = [record[0] for record in await cursor.fetchall()]
+            await cursor.close()
+            return ad_ids
+        finally:
+            await conn.close()
+
 
 class WorkerAndSubscription:
     def __init__(self, worker_id: int, id: int = None, subscription_id: int = None,
@@ -2074,9 +2304,7 @@ class WorkerAndSubscription:
         self.notification = notification
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO worker_and_subscription (worker_id) VALUES (?)',
@@ -2087,21 +2315,22 @@ class WorkerAndSubscription:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
+            await WorkerWorkType.delete_by_worker(conn, self.worker_id)
             cursor = await conn.execute('DELETE FROM worker_and_subscription WHERE id = ?', [self.id])
             await conn.commit()
             await cursor.close()
         finally:
             await conn.close()
+        await routing_index.refresh_worker(self.worker_id)
+        feed_cache.invalidate_worker(self.worker_id)
 
     async def update(self, subscription_id: int = None, guaranteed_orders: int = None,
                      subscription_end: date = None, work_type_ids: list = None,
                      unlimited_orders: bool = None, unlimited_work_types: bool = None,
                      notification: bool = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -2119,6 +2348,7 @@ class WorkerAndSubscription:
                 params.append(subscription_end)
 
             if work_type_ids is not None:
+                await WorkerWorkType.replace(conn, self.worker_id, work_type_ids)
                 updates.append('work_type_ids = ?')
                 work_type_ids = '|'.join(work_type_ids)
                 params.append(work_type_ids)
@@ -2142,22 +2372,25 @@ class WorkerAndSubscription:
                 await conn.commit()
         finally:
             await conn.close()
+        if work_type_ids is not None:
+            await routing_index.refresh_worker(self.worker_id)
+        if work_type_ids is not None or unlimited_work_types is not None:
+            feed_cache.invalidate_worker(self.worker_id)
 
     @classmethod
     async def get_all(cls) -> list['WorkerAndSubscription']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_subscription')
             records = await cursor.fetchall()
             await cursor.close()
+            work_type_ids = await WorkerWorkType.get_work_type_ids(conn)
             return [cls(id=record[0],
                         worker_id=record[1],
                         subscription_id=record[2],
                         guaranteed_orders=record[3],
                         subscription_end=record[4],
-                        work_type_ids=record[5].split('|') if record[5] else None,
+                        work_type_ids=work_type_ids.get(record[1]),
                         unlimited_orders=record[6],
                         unlimited_work_types=record[7])
                     for record in records]
@@ -2166,60 +2399,62 @@ class WorkerAndSubscription:
 
     @classmethod
     async def get_by_worker(cls, worker_id: int) -> Optional['WorkerAndSubscription']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_subscription WHERE worker_id = ?', [worker_id])
             records = await cursor.fetchall()
             await cursor.close()
-            
-            if not records:
-                return None
-            
-            # Если есть несколько записей, берем самую новую (с наибольшим id)
-            # и удаляем дублирующие записи
-            if len(records) > 1:
-                # Сортируем по id (самая новая запись будет последней)
-                records.sort(key=lambda x: x[0])
-                latest_record = records[-1]
-                
-                # Удаляем старые дублирующие записи
-                old_ids = [record[0] for record in records[:-1]]
-                if old_ids:
-                    placeholders = ','.join(['?' for _ in old_ids])
-                    await conn.execute(f'DELETE FROM worker_and_subscription WHERE id IN ({placeholders})', old_ids)
-                    await conn.commit()
-                    print(f"[CLEANUP] Removed {len(old_ids)} duplicate worker_and_subscription records for worker {worker_id}")
-            else:
-                latest_record = records[0]
-            
-            return cls(id=latest_record[0],
-                       worker_id=latest_record[1],
-                       subscription_id=latest_record[2],
-                       guaranteed_orders=latest_record[3],
-                       subscription_end=latest_record[4],
-                       work_type_ids=latest_record[5].split('|') if latest_record[5] else None,
-                       unlimited_orders=latest_record[6],
-                       unlimited_work_types=latest_record[7])
+            work_type_ids = await WorkerWorkType.get_work_type_ids(conn, worker_id=worker_id)
         finally:
             await conn.close()
 
+        if not records:
+            return None
+
+        # Если есть несколько записей, берем самую новую (с наибольшим id)
+        # и удаляем дублирующие записи
+        if len(records) > 1:
+            # Сортируем по id (самая новая запись будет последней)
+            records.sort(key=lambda x: x[0])
+            latest_record = records[-1]
+
+            # Удаляем старые дублирующие записи
+            old_ids = [record[0] for record in records[:-1]]
+            if old_ids:
+                placeholders = ','.join(['?' for _ in old_ids])
+                conn = await db_pool.writer()
+                try:
+                    await conn.execute(f'DELETE FROM worker_and_subscription WHERE id IN ({placeholders})', old_ids)
+                    await conn.commit()
+                finally:
+                    await conn.close()
+                print(f"[CLEANUP] Removed {len(old_ids)} duplicate worker_and_subscription records for worker {worker_id}")
+        else:
+            latest_record = records[0]
+
+        return cls(id=latest_record[0],
+                   worker_id=latest_record[1],
+                   subscription_id=latest_record[2],
+                   guaranteed_orders=latest_record[3],
+                   subscription_end=latest_record[4],
+                   work_type_ids=work_type_ids.get(worker_id),
+                   unlimited_orders=latest_record[6],
+                   unlimited_work_types=latest_record[7])
+
     @classmethod
     async def get_by_id(cls, id: int) -> Optional['WorkerAndSubscription']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_subscription WHERE id = ?', [id])
             record = await cursor.fetchall()
             await cursor.close()
+            work_type_ids = await WorkerWorkType.get_work_type_ids(conn, worker_id=record[0][1])
             return cls(id=record[0][0],
                        worker_id=record[0][1],
                        subscription_id=record[0][2],
                        guaranteed_orders=record[0][3],
                        subscription_end=record[0][4],
-                       work_type_ids=record[0][5].split('|') if record[0][5] else None,
+                       work_type_ids=work_type_ids.get(record[0][1]),
                        unlimited_orders=record[0][6],
                        unlimited_work_types=record[0][7])
         finally:
@@ -2282,7 +2517,7 @@ class WorkersAndAbs:
             self.message_timestamps = []
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO workers_and_abs (worker_id, abs_id) VALUES (?, ?)',
@@ -2292,9 +2527,10 @@ class WorkersAndAbs:
             await cursor.close()
         finally:
             await conn.close()
+        feed_cache.invalidate_worker(self.worker_id)
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM workers_and_abs WHERE id = ?', [self.id])
             await conn.commit()
@@ -2307,7 +2543,7 @@ class WorkersAndAbs:
                      send_by_customer: int = None, worker_messages: list = None,
                      customer_messages: list = None, turn: bool = None, 
                      message_timestamps: list = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -2361,7 +2597,7 @@ class WorkersAndAbs:
 
     @classmethod
     async def get_all(cls) -> list['WorkersAndAbs']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM workers_and_abs')
             records = await cursor.fetchall()
@@ -2383,7 +2619,7 @@ class WorkersAndAbs:
     @classmethod
     async def get_by_worker(cls, worker_id: int) -> list['WorkersAndAbs']:
         """Получить все отклики исполнителя"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM workers_and_abs WHERE worker_id = ?', [worker_id])
             records = await cursor.fetchall()
@@ -2404,7 +2640,7 @@ class WorkersAndAbs:
 
     @classmethod
     async def get_by_abs(cls, abs_id: int) -> list['WorkersAndAbs']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM workers_and_abs WHERE abs_id = ? ', [abs_id])
             records = await cursor.fetchall()
@@ -2427,7 +2663,7 @@ class WorkersAndAbs:
     @classmethod
     async def get_by_worker_and_abs(cls, worker_id: int, abs_id: int) -> Optional['WorkersAndAbs']:
         """Получить отклик конкретного исполнителя на конкретное объявление"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM workers_and_abs WHERE worker_id = ? AND abs_id = ?',
@@ -2455,8 +2691,12 @@ class WorkersAndAbs:
 
 
 class BannedAbs:
+    # Колонки в порядке аргументов конструктора
+    COLUMNS = 'id, customer_id, work_type_id, city_id, photo_path, text_path, date_to_delite, photos_len, review'
+
     def __init__(self, id: int | None, customer_id: int,
-                 work_type_id: int, city_id: int, photo_path: str | None, text_path: str, date_to_delite, photos_len):
+                 work_type_id: int, city_id: int, photo_path: str | None, text_path: str, date_to_delite, photos_len,
+                 review: bool = False):
         self.id = id
         self.customer_id = customer_id
         self.work_type_id = work_type_id
@@ -2465,36 +2705,65 @@ class BannedAbs:
         self.text_path = text_path
         self.date_to_delite = datetime.strptime(str(date_to_delite), '%Y-%m-%d %H:%M:%S.%f')
         self.photos_len = photos_len
+        # Объявление не заблокировано, а ждет ручной проверки (customer_proces.review_task)
+        self.review = bool(review)
+
+    @classmethod
+    async def create_review_column_if_not_exists(cls) -> None:
+        """Добавляет колонку review: 1 - объявление ждет ручной проверки, автора не блокировали"""
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute('PRAGMA table_info(banned_abs)')
+            columns = [record[1] for record in await cursor.fetchall()]
+            await cursor.close()
+            if 'review' not in columns:
+                await conn.execute('ALTER TABLE banned_abs ADD COLUMN review INTEGER NOT NULL DEFAULT 0')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    def _from_record(cls, record) -> 'BannedAbs':
+        return cls(id=record[0],
+                   customer_id=record[1],
+                   work_type_id=record[2],
+                   city_id=record[3],
+                   photo_path=None if not record[4] else json.loads(record[4]) if '{' in record[4] else None if
+                   record[4] == 'null' else {'0': record[4]},
+                   text_path=record[5],
+                   date_to_delite=record[6],
+                   photos_len=record[7],
+                   review=record[8])
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             photo_path_json = json.dumps(self.photo_path)
             cursor = await conn.execute(
-                'INSERT INTO banned_abs (customer_id, work_type_id, work_type_id, photo_path, text_path, date_to_delite, photos_len) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                'INSERT INTO banned_abs (customer_id, work_type_id, work_type_id, photo_path, text_path, date_to_delite, photos_len, review) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
                 [self.customer_id, self.work_type_id, self.city_id, photo_path_json, self.text_path,
-                 self.date_to_delite, self.photos_len])
+                 self.date_to_delite, self.photos_len, self.review])
+            self.id = cursor.lastrowid
             await conn.commit()
             await cursor.close()
         finally:
             await conn.close()
+        await self._store_photos()
 
     async def delete(self, delite_photo: bool) -> None:
         # Локальный импорт для избежания циклических зависимостей
         from app.untils import help_defs
 
+        # Фото из хранилища удаляются, когда на них не остается ссылок
+        await release_photos('banned_abs', self.id, delete_files=delite_photo)
         if delite_photo:
             if isinstance(self.photo_path, dict):
                 for _, item in self.photo_path.items():
                     help_defs.delete_file(item)
             else:
                 help_defs.delete_file(self.photo_path)
-        help_defs.delete_file(self.text_path)
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        # Текст хранится в ad_texts и может быть общим, его убирает AdText.delete_unused
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM banned_abs WHERE id = ?', [self.id])
             await conn.commit()
@@ -2502,33 +2771,41 @@ class BannedAbs:
         finally:
             await conn.close()
 
+    async def _store_photos(self) -> None:
+        """
+        Копирует фото в хранилище (app/untils/photo_store.py) и записывает их новые пути.
+        Исходные файлы удаляются только после записи: до нее запись указывает на них
+        """
+        photo_path_json = json.dumps(self.photo_path)
+
+        async def save(photo_path) -> None:
+            if json.dumps(photo_path) == photo_path_json:
+                return
+            conn = await db_pool.writer()
+            try:
+                cursor = await conn.execute('UPDATE banned_abs SET photo_path = ? WHERE id = ?',
+                                            [json.dumps(photo_path), self.id])
+                await conn.commit()
+                await cursor.close()
+            finally:
+                await conn.close()
+
+        self.photo_path = await store_photos('banned_abs', self.id, self.photo_path, save)
+
     @classmethod
     async def get_all(cls) -> list['BannedAbs']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
-            cursor = await conn.execute('SELECT * FROM banned_abs')
+            cursor = await conn.execute(f'SELECT {cls.COLUMNS} FROM banned_abs')
             records = await cursor.fetchall()
             await cursor.close()
-            return [cls(id=record[0],
-                        customer_id=record[1],
-                        work_type_id=record[2],
-                        city_id=record[3],
-                        photo_path=None if not record[4] else json.loads(record[4]) if '{' in record[4] else None if
-                        record[4] == 'null' else {'0': record[4]},
-                        text_path=record[5],
-                        date_to_delite=record[6],
-                        photos_len=record[7])
-                    for record in records]
+            return [cls._from_record(record) for record in records]
         finally:
             await conn.close()
 
     @classmethod
     async def count(cls) -> int:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
             cursor = await conn.execute('SELECT COUNT(1) FROM banned_abs')
             record = await cursor.fetchone()
@@ -2539,23 +2816,13 @@ class BannedAbs:
 
     @classmethod
     async def get_all_by_customer(cls, customer_id: int) -> list['BannedAbs'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
-            cursor = await conn.execute('SELECT * FROM banned_abs WHERE customer_id = ?', [customer_id])
+            cursor = await conn.execute(f'SELECT {cls.COLUMNS} FROM banned_abs WHERE customer_id = ?', [customer_id])
             records = await cursor.fetchall()
             await cursor.close()
             if records:
-                return [cls(id=record[0],
-                            customer_id=record[1],
-                            work_type_id=record[2],
-                            city_id=record[3],
-                            photo_path=None if not record[4] else json.loads(record[4]) if '{' in record[4] else None if
-                            record[4] == 'null' else {'0': record[4]},
-                            text_path=record[5],
-                            date_to_delite=record[6],
-                            photos_len=record[7]) for record in records]
+                return [cls._from_record(record) for record in records]
             else:
                 return None
         finally:
@@ -2563,23 +2830,13 @@ class BannedAbs:
 
     @classmethod
     async def get_one(cls, id: int) -> Optional['BannedAbs'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.reader(detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         try:
-            cursor = await conn.execute('SELECT * FROM banned_abs WHERE id = ?', [id])
+            cursor = await conn.execute(f'SELECT {cls.COLUMNS} FROM banned_abs WHERE id = ?', [id])
             record = await cursor.fetchone()
             await cursor.close()
             if record:
-                return cls(id=record[0],
-                           customer_id=record[1],
-                           work_type_id=record[2],
-                           city_id=record[3],
-                           photo_path=None if not record[4] else json.loads(record[4]) if '{' in record[4] else None if
-                           record[4] == 'null' else {'0': record[4]},
-                           text_path=record[5],
-                           date_to_delite=record[6],
-                           photos_len=record[7])
+                return cls._from_record(record)
             else:
                 return None
         finally:
@@ -2594,9 +2851,7 @@ class WorkerAndCustomer:
         self.worker_id = worker_id
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO worker_and_customer (customer_id, worker_id) VALUES (?, ?)',
@@ -2607,9 +2862,7 @@ class WorkerAndCustomer:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM worker_and_customer WHERE id = ?', [self.id])
             await conn.commit()
@@ -2619,7 +2872,7 @@ class WorkerAndCustomer:
 
     @classmethod
     async def get_by_worker_and_customer(cls, worker_id: int, customer_id: int) -> Optional['WorkerAndCustomer']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_customer WHERE worker_id = ? and customer_id = ?',
                                         [worker_id, customer_id])
@@ -2658,7 +2911,7 @@ class UserAndSupportQueue:
         self.turn = turn
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO user_and_support_queue (user_tg_id, user_messages) VALUES (?, ?)',
                                         [self.user_tg_id, ' | '.join(self.user_messages)])
@@ -2669,7 +2922,7 @@ class UserAndSupportQueue:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM user_and_support_queue WHERE id = ?', [self.id])
             await conn.commit()
@@ -2679,7 +2932,7 @@ class UserAndSupportQueue:
 
     async def update(self, user_messages: list = None,
                      admin_messages: list = None, turn: bool = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -2708,7 +2961,7 @@ class UserAndSupportQueue:
 
     @classmethod
     async def get_all(cls) -> list['UserAndSupportQueue'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM user_and_support_queue')
             records = await cursor.fetchall()
@@ -2723,7 +2976,7 @@ class UserAndSupportQueue:
 
     @classmethod
     async def get_one_by_tg_id(cls, user_tg_id: int) -> Optional['UserAndSupportQueue'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM user_and_support_queue WHERE user_tg_id = ?', [user_tg_id])
             record = await cursor.fetchone()
@@ -2738,7 +2991,7 @@ class UserAndSupportQueue:
 
     @classmethod
     async def get_one_by_id(cls, id: int) -> Optional['UserAndSupportQueue'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM user_and_support_queue WHERE id = ?', [id])
             record = await cursor.fetchone()
@@ -2758,7 +3011,7 @@ class InfoHaltura:
         self.text_path = text_path
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('INSERT INTO info (text_path) VALUES (?)', [self.text_path])
             await conn.commit()
@@ -2768,7 +3021,7 @@ class InfoHaltura:
             await conn.close()
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM info WHERE id = ?', [self.id])
             await conn.commit()
@@ -2778,7 +3031,7 @@ class InfoHaltura:
 
     @classmethod
     async def get_all(cls) -> list['InfoHaltura'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM info')
             records = await cursor.fetchall()
@@ -2792,7 +3045,7 @@ class InfoHaltura:
 
     @classmethod
     async def get_one_by_id(cls, id: int) -> Optional['InfoHaltura'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM info WHERE id', [id])
             record = await cursor.fetchone()
@@ -2812,9 +3065,7 @@ class WorkerAndReport:
         self.worker_id = worker_id
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO worker_and_report (abs_id, worker_id) VALUES (?, ?)',
@@ -2823,11 +3074,10 @@ class WorkerAndReport:
             await cursor.close()
         finally:
             await conn.close()
+        feed_cache.invalidate_worker(self.worker_id)
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM worker_and_report WHERE id = ?', [self.id])
             await conn.commit()
@@ -2839,7 +3089,7 @@ class WorkerAndReport:
 
     @classmethod
     async def get_by_worker(cls, worker_id: int) -> list['WorkerAndReport'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_report WHERE worker_id = ?', [worker_id])
             records = await cursor.fetchall()
@@ -2853,7 +3103,7 @@ class WorkerAndReport:
 
     @classmethod
     async def get_by_abs(cls, abs_id: int) -> list['WorkerAndReport'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_report WHERE abs_id = ?', [abs_id])
             records = await cursor.fetchall()
@@ -2873,9 +3123,7 @@ class WorkerAndBadResponse:
         self.worker_id = worker_id
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO worker_and_bad_response (abs_id, worker_id) VALUES (?, ?)',
@@ -2884,11 +3132,10 @@ class WorkerAndBadResponse:
             await cursor.close()
         finally:
             await conn.close()
+        feed_cache.invalidate_worker(self.worker_id)
 
     async def delete(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db',
-                                       detect_types=sqlite3.PARSE_DECLTYPES |
-                                                    sqlite3.PARSE_COLNAMES)
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM worker_and_bad_response WHERE id = ?', [self.id])
             await conn.commit()
@@ -2900,7 +3147,7 @@ class WorkerAndBadResponse:
 
     @classmethod
     async def get_by_worker(cls, worker_id: int) -> list['WorkerAndBadResponse'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_bad_response WHERE worker_id = ?', [worker_id])
             records = await cursor.fetchall()
@@ -2914,7 +3161,7 @@ class WorkerAndBadResponse:
 
     @classmethod
     async def get_by_abs(cls, abs_id: int) -> list['WorkerAndBadResponse'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM worker_and_bad_response WHERE abs_id = ?', [abs_id])
             records = await cursor.fetchall()
@@ -2935,7 +3182,7 @@ class AskAnswer:
 
     @classmethod
     async def get_all(cls) -> list['AskAnswer'] | None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM ask_answer')
             records = await cursor.fetchall()
@@ -2977,7 +3224,7 @@ class ContactTariff:
         self.unlimited_days = unlimited_days  # Количество дней для безлимита
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO contact_tariffs (name, contacts_count, price, unlimited, unlimited_days) VALUES (?, ?, ?, ?, ?)',
@@ -2989,7 +3236,7 @@ class ContactTariff:
 
     @classmethod
     async def get_all(cls) -> list['ContactTariff']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM contact_tariffs ORDER BY price ASC')
             records = await cursor.fetchall()
@@ -3012,7 +3259,7 @@ class ContactTariff:
 
     @classmethod
     async def get_by_id(cls, id: int) -> Optional['ContactTariff']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute('SELECT * FROM contact_tariffs WHERE id = ?', [id])
             record = await cursor.fetchone()
@@ -3045,7 +3292,7 @@ class WorkerRating:
         self.created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO worker_ratings (worker_id, customer_id, abs_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?, ?)',
@@ -3058,7 +3305,7 @@ class WorkerRating:
     @classmethod
     async def get_by_worker_and_abs(cls, worker_id: int, abs_id: int) -> Optional['WorkerRating']:
         """Получить оценку конкретного исполнителя за конкретное объявление"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM worker_ratings WHERE worker_id = ? AND abs_id = ?',
@@ -3083,7 +3330,7 @@ class WorkerRating:
 
     @classmethod
     async def get_by_worker(cls, worker_id: int) -> list['WorkerRating']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM worker_ratings WHERE worker_id = ? ORDER BY created_at DESC',
@@ -3126,7 +3373,7 @@ class WorkerCitySubscription:
     @classmethod
     async def create_table_if_not_exists(cls) -> None:
         """Создает таблицу если она не существует"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             await conn.execute('''
                                CREATE TABLE IF NOT EXISTS worker_city_subscriptions
@@ -3147,50 +3394,79 @@ class WorkerCitySubscription:
 
     async def save(self) -> None:
         await self.create_table_if_not_exists()  # Создаем таблицу если не существует
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             city_ids_str = '|'.join(map(str, self.city_ids))
             cursor = await conn.execute(
                 'INSERT INTO worker_city_subscriptions (worker_id, city_ids, subscription_start, subscription_end, subscription_months, price, active) VALUES (?, ?, ?, ?, ?, ?, ?)',
                 [self.worker_id, city_ids_str, self.subscription_start, self.subscription_end,
                  self.subscription_months, self.price, self.active])
-            await conn.commit()
             self.id = cursor.lastrowid
+            await WorkerCity.replace(conn, self.worker_id, self.city_ids, subscription_id=self.id)
+            await conn.commit()
             await cursor.close()
         finally:
             await conn.close()
+        await routing_index.refresh_worker(self.worker_id)
+        feed_cache.invalidate_worker(self.worker_id)
+
+    @classmethod
+    async def _from_records(cls, conn, records) -> list['WorkerCitySubscription']:
+        city_ids = await WorkerCity.get_subscription_city_ids(conn, [record[0] for record in records])
+        return [cls(
+            id=record[0],
+            worker_id=record[1],
+            city_ids=city_ids.get(record[0], []),
+            subscription_start=record[3],
+            subscription_end=record[4],
+            subscription_months=record[5],
+            price=record[6],
+            active=bool(record[7])
+        ) for record in records]
 
     @classmethod
     async def get_active_by_worker(cls, worker_id: int) -> list['WorkerCitySubscription']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM worker_city_subscriptions WHERE worker_id = ? AND active = 1',
                 [worker_id])
             records = await cursor.fetchall()
             await cursor.close()
+            return await cls._from_records(conn, records)
+        finally:
+            await conn.close()
 
-            subscriptions = []
-            for record in records:
-                city_ids = [int(x) for x in record[2].split('|')] if record[2] else []
-                subscriptions.append(cls(
-                    id=record[0],
-                    worker_id=record[1],
-                    city_ids=city_ids,
-                    subscription_start=record[3],
-                    subscription_end=record[4],
-                    subscription_months=record[5],
-                    price=record[6],
-                    active=bool(record[7])
-                ))
-            return subscriptions
+    @classmethod
+    async def get_all_by_worker(cls, worker_id: int) -> list['WorkerCitySubscription']:
+        """Все подписки исполнителя, включая неактивные"""
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute(
+                'SELECT * FROM worker_city_subscriptions WHERE worker_id = ?',
+                [worker_id])
+            records = await cursor.fetchall()
+            await cursor.close()
+            return await cls._from_records(conn, records)
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def get_by_id(cls, id: int) -> Optional['WorkerCitySubscription']:
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT * FROM worker_city_subscriptions WHERE id = ?', [id])
+            records = await cursor.fetchall()
+            await cursor.close()
+            subscriptions = await cls._from_records(conn, records)
+            return subscriptions[0] if subscriptions else None
         finally:
             await conn.close()
 
     @classmethod
     async def get_expiring_tomorrow(cls) -> list['WorkerCitySubscription']:
         from datetime import datetime, timedelta
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
             cursor = await conn.execute(
@@ -3198,26 +3474,27 @@ class WorkerCitySubscription:
                 [tomorrow])
             records = await cursor.fetchall()
             await cursor.close()
-
-            subscriptions = []
-            for record in records:
-                city_ids = [int(x) for x in record[2].split('|')] if record[2] else []
-                subscriptions.append(cls(
-                    id=record[0],
-                    worker_id=record[1],
-                    city_ids=city_ids,
-                    subscription_start=record[3],
-                    subscription_end=record[4],
-                    subscription_months=record[5],
-                    price=record[6],
-                    active=bool(record[7])
-                ))
-            return subscriptions
+            return await cls._from_records(conn, records)
         finally:
             await conn.close()
 
-    async def deactivate(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+    async def update_city_ids(self, city_ids: list) -> None:
+        conn = await db_pool.writer()
+        try:
+            await WorkerCity.replace(conn, self.worker_id, city_ids, subscription_id=self.id)
+            cursor = await conn.execute(
+                'UPDATE worker_city_subscriptions SET city_ids = ? WHERE id = ?',
+                ['|'.join(map(str, city_ids)), self.id])
+            await conn.commit()
+            await cursor.close()
+            self.city_ids = city_ids
+        finally:
+            await conn.close()
+        await routing_index.refresh_worker(self.worker_id)
+        feed_cache.invalidate_worker(self.worker_id)
+
+    async def deactivate(self) -> None:
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'UPDATE worker_city_subscriptions SET active = 0 WHERE id = ?',
@@ -3226,6 +3503,730 @@ class WorkerCitySubscription:
             await cursor.close()
         finally:
             await conn.close()
+        await routing_index.refresh_worker(self.worker_id)
+        feed_cache.invalidate_worker(self.worker_id)
+
+
+class WorkerCity:
+    """
+    Связь исполнителя с городами.
+
+    subscription_id = NULL - города из профиля исполнителя (workers.city_id, порядок сохраняется),
+    иначе - города из подписки worker_city_subscriptions с этим id.
+    Строковые колонки workers.city_id и worker_city_subscriptions.city_ids пока заполняются параллельно.
+    """
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS worker_cities
+                               (
+                                   worker_id       INTEGER NOT NULL,
+                                   city_id         INTEGER NOT NULL,
+                                   subscription_id INTEGER,
+                                   position        INTEGER NOT NULL DEFAULT 0,
+                                   FOREIGN KEY (worker_id) REFERENCES workers (id)
+                               )
+                               ''')
+
+            # Поиск исполнителей по городу
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_worker_cities_city_id
+                                   ON worker_cities (city_id, worker_id)
+                               ''')
+
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_worker_cities_worker_id
+                                   ON worker_cities (worker_id, subscription_id, position)
+                               ''')
+
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_worker_cities_subscription_id
+                                   ON worker_cities (subscription_id)
+                               ''')
+
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @staticmethod
+    async def replace(conn, worker_id: int, city_ids: list, subscription_id: int = None) -> None:
+        """Перезаписывает города исполнителя (или одной подписки) на уже выданном соединении для записи"""
+        if subscription_id is None:
+            await conn.execute('DELETE FROM worker_cities WHERE worker_id = ? AND subscription_id IS NULL',
+                               [worker_id])
+        else:
+            await conn.execute('DELETE FROM worker_cities WHERE subscription_id = ?', [subscription_id])
+        await conn.executemany(
+            'INSERT INTO worker_cities (worker_id, city_id, subscription_id, position) VALUES (?, ?, ?, ?)',
+            [(worker_id, int(city_id), subscription_id, position) for position, city_id in enumerate(city_ids)])
+
+    @staticmethod
+    async def delete_by_worker(conn, worker_id: int) -> None:
+        await conn.execute('DELETE FROM worker_cities WHERE worker_id = ?', [worker_id])
+
+    @staticmethod
+    async def get_main_city_ids(conn, worker_id: int = None) -> dict[int, list[int]]:
+        """Основные города исполнителя (или всех исполнителей): {worker_id: [city_id, ...]}"""
+        if worker_id is not None:
+            cursor = await conn.execute(
+                'SELECT worker_id, city_id FROM worker_cities '
+                'WHERE worker_id = ? AND subscription_id IS NULL ORDER BY position',
+                [worker_id])
+        else:
+            cursor = await conn.execute(
+                'SELECT worker_id, city_id FROM worker_cities '
+                'WHERE subscription_id IS NULL ORDER BY worker_id, position')
+        records = await cursor.fetchall()
+        await cursor.close()
+        return group_pairs(records)
+
+    @staticmethod
+    async def get_subscription_city_ids(conn, subscription_ids: list[int]) -> dict[int, list[int]]:
+        """Города подписок: {subscription_id: [city_id, ...]}"""
+        if not subscription_ids:
+            return {}
+        placeholders = ','.join(['?' for _ in subscription_ids])
+        cursor = await conn.execute(
+            f'SELECT subscription_id, city_id FROM worker_cities '
+            f'WHERE subscription_id IN ({placeholders}) ORDER BY subscription_id, position',
+            subscription_ids)
+        records = await cursor.fetchall()
+        await cursor.close()
+        return group_pairs(records)
+
+
+class WorkerWorkType:
+    """
+    Направления (типы работ) исполнителя из подписки worker_and_subscription.
+
+    work_type_id = 0 - безлимит по направлениям, как '0' в worker_and_subscription.work_type_ids.
+    Нет строк - направления не выбраны (исполнитель получает все типы).
+    """
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS worker_work_types
+                               (
+                                   worker_id    INTEGER NOT NULL,
+                                   work_type_id INTEGER NOT NULL,
+                                   position     INTEGER NOT NULL DEFAULT 0,
+                                   FOREIGN KEY (worker_id) REFERENCES workers (id)
+                               )
+                               ''')
+
+            # Поиск исполнителей по типу работы
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_worker_work_types_work_type_id
+                                   ON worker_work_types (work_type_id, worker_id)
+                               ''')
+
+            await conn.execute('''
+                               CREATE INDEX IF NOT EXISTS idx_worker_work_types_worker_id
+                                   ON worker_work_types (worker_id, position)
+                               ''')
+
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @staticmethod
+    async def replace(conn, worker_id: int, work_type_ids: list) -> None:
+        """Перезаписывает направления исполнителя на уже выданном соединении для записи"""
+        await conn.execute('DELETE FROM worker_work_types WHERE worker_id = ?', [worker_id])
+        await conn.executemany(
+            'INSERT INTO worker_work_types (worker_id, work_type_id, position) VALUES (?, ?, ?)',
+            [(worker_id, int(work_type_id), position) for position, work_type_id in enumerate(work_type_ids)
+             if str(work_type_id).strip()])
+
+    @staticmethod
+    async def delete_by_worker(conn, worker_id: int) -> None:
+        await conn.execute('DELETE FROM worker_work_types WHERE worker_id = ?', [worker_id])
+
+    @staticmethod
+    async def get_work_type_ids(conn, worker_id: int = None) -> dict[int, list[str]]:
+        """Направления исполнителя (или всех исполнителей) строками, как в work_type_ids: {worker_id: ['1', ...]}"""
+        if worker_id is not None:
+            cursor = await conn.execute(
+                'SELECT worker_id, work_type_id FROM worker_work_types WHERE worker_id = ? ORDER BY position',
+                [worker_id])
+        else:
+            cursor = await conn.execute(
+                'SELECT worker_id, work_type_id FROM worker_work_types ORDER BY worker_id, position')
+        records = await cursor.fetchall()
+        await cursor.close()
+        return {key: [str(x) for x in values] for key, values in group_pairs(records).items()}
+
+
+class OutboundMessage:
+    """
+    Исходящее сообщение в очереди отправки (app/untils/outbound_queue.py).
+
+    method - метод бота (send_message, send_photo), payload - его аргументы кроме chat_id,
+    kind - тип рассылки для обработчика заблокировавших бота пользователей,
+    not_before - unix-время, раньше которого сообщение не отправляется.
+    Строка удаляется после отправки, поэтому после перезапуска в таблице остаются только неотправленные.
+    """
+
+    def __init__(self, id: int | None, method: str, chat_id: int, payload: dict, kind: str = None,
+                 attempts: int = 0, not_before: float = 0.0, created_at: float = None):
+        self.id = id
+        self.method = method
+        self.chat_id = chat_id
+        self.payload = payload
+        self.kind = kind
+        self.attempts = attempts
+        self.not_before = not_before
+        self.created_at = created_at
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS outbound_messages
+                               (
+                                   id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                                   method     TEXT    NOT NULL,
+                                   chat_id    INTEGER NOT NULL,
+                                   payload    TEXT    NOT NULL,
+                                   kind       TEXT,
+                                   attempts   INTEGER NOT NULL DEFAULT 0,
+                                   not_before REAL    NOT NULL DEFAULT 0,
+                                   created_at REAL    NOT NULL
+                               )
+                               ''')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def save_many(cls, messages: list['OutboundMessage']) -> None:
+        """Сохраняет сообщения одной операцией записи и проставляет им id"""
+        if not messages:
+            return
+        conn = await db_pool.writer()
+        try:
+            for message in messages:
+                cursor = await conn.execute(
+                    'INSERT INTO outbound_messages (method, chat_id, payload, kind, attempts, not_before, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [message.method, message.chat_id, json.dumps(message.payload, ensure_ascii=False),
+                     message.kind, message.attempts, message.not_before, message.created_at])
+                message.id = cursor.lastrowid
+                await cursor.close()
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def get_pending(cls) -> list['OutboundMessage']:
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT * FROM outbound_messages ORDER BY id')
+            records = await cursor.fetchall()
+            await cursor.close()
+            return [cls(
+                id=record[0],
+                method=record[1],
+                chat_id=record[2],
+                payload=json.loads(record[3]),
+                kind=record[4],
+                attempts=record[5],
+                not_before=record[6],
+                created_at=record[7]
+            ) for record in records]
+        finally:
+            await conn.close()
+
+    async def reschedule(self, not_before: float) -> None:
+        """Откладывает повторную отправку и увеличивает счетчик попыток"""
+        self.attempts += 1
+        self.not_before = not_before
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute(
+                'UPDATE outbound_messages SET attempts = ?, not_before = ? WHERE id = ?',
+                [self.attempts, self.not_before, self.id])
+            await conn.commit()
+            await cursor.close()
+        finally:
+            await conn.close()
+
+    async def delete(self) -> None:
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute('DELETE FROM outbound_messages WHERE id = ?', [self.id])
+            await conn.commit()
+            await cursor.close()
+        finally:
+            await conn.close()
+
+
+class AdText:
+    """
+    Тексты объявлений (abs и banned_abs), адресуемые по содержимому.
+
+    В колонке text_path хранится ключ вида "db:<sha256>" вместо пути к .txt файлу.
+    Одинаковые тексты хранятся один раз, поэтому при удалении объявления текст не удаляется,
+    неиспользуемые тексты убирает delete_unused(). Перед БД стоит LRU-кэш в памяти.
+    """
+
+    KEY_PREFIX = 'db:'
+    CACHE_SIZE = 2000
+    _cache: OrderedDict = OrderedDict()
+
+    @classmethod
+    def is_key(cls, text_path) -> bool:
+        return isinstance(text_path, str) and text_path.startswith(cls.KEY_PREFIX)
+
+    @classmethod
+    def make_key(cls, text: str) -> str:
+        return cls.KEY_PREFIX + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _remember(cls, key: str, text: str) -> None:
+        cls._cache[key] = text
+        cls._cache.move_to_end(key)
+        while len(cls._cache) > cls.CACHE_SIZE:
+            cls._cache.popitem(last=False)
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS ad_texts
+                               (
+                                   key        TEXT PRIMARY KEY,
+                                   text       TEXT NOT NULL,
+                                   created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                               )
+                               ''')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def save(cls, text: str, conn=None) -> str:
+        """Сохраняет текст и возвращает ключ для text_path. conn - уже выданное соединение для записи"""
+        key = cls.make_key(text)
+        if conn is not None:
+            await conn.execute('INSERT OR IGNORE INTO ad_texts (key, text) VALUES (?, ?)', [key, text])
+        else:
+            conn = await db_pool.writer()
+            try:
+                await conn.execute('INSERT OR IGNORE INTO ad_texts (key, text) VALUES (?, ?)', [key, text])
+                await conn.commit()
+            finally:
+                await conn.close()
+        cls._remember(key, text)
+        return key
+
+    @classmethod
+    async def get(cls, key: str) -> Optional[str]:
+        if key in cls._cache:
+            cls._cache.move_to_end(key)
+            return cls._cache[key]
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT text FROM ad_texts WHERE key = ?', [key])
+            record = await cursor.fetchone()
+            await cursor.close()
+        finally:
+            await conn.close()
+        if record is None:
+            return None
+        cls._remember(key, record[0])
+        return record[0]
+
+    @classmethod
+    async def delete_unused(cls) -> int:
+        """Удаляет тексты, на которые не ссылается ни одно объявление (кроме только что сохраненных)"""
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute('''
+                                        DELETE
+                                        FROM ad_texts
+                                        WHERE created_at < datetime('now', '-1 day')
+                                          AND key NOT IN (SELECT text_path FROM abs WHERE text_path IS NOT NULL)
+                                          AND key NOT IN (SELECT text_path FROM banned_abs WHERE text_path IS NOT NULL)
+                                        ''')
+            deleted = cursor.rowcount
+            await conn.commit()
+            await cursor.close()
+        finally:
+            await conn.close()
+        if deleted:
+            cls._cache.clear()
+        return deleted
+
+
+class TelegramFileId:
+    """
+    file_id, который Telegram вернул после загрузки локального файла (app/untils/file_id_cache.py).
+
+    mtime_ns и size - состояние файла на момент загрузки: если файл перезаписали, file_id не используется.
+    """
+
+    def __init__(self, path: str, mtime_ns: int, size: int, file_id: str):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.file_id = file_id
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS telegram_file_ids
+                               (
+                                   path     TEXT PRIMARY KEY,
+                                   mtime_ns INTEGER NOT NULL,
+                                   size     INTEGER NOT NULL,
+                                   file_id  TEXT    NOT NULL
+                               )
+                               ''')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def get_all(cls) -> list['TelegramFileId']:
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT path, mtime_ns, size, file_id FROM telegram_file_ids')
+            records = await cursor.fetchall()
+            await cursor.close()
+            return [cls(path=record[0], mtime_ns=record[1], size=record[2], file_id=record[3]) for record in records]
+        finally:
+            await conn.close()
+
+    async def save(self) -> None:
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute(
+                'INSERT OR REPLACE INTO telegram_file_ids (path, mtime_ns, size, file_id) VALUES (?, ?, ?, ?)',
+                [self.path, self.mtime_ns, self.size, self.file_id])
+            await conn.commit()
+            await cursor.close()
+        finally:
+            await conn.close()
+
+    @staticmethod
+    async def delete_by_path(path: str) -> None:
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute('DELETE FROM telegram_file_ids WHERE path = ?', [path])
+            await conn.commit()
+            await cursor.close()
+        finally:
+            await conn.close()
+
+
+class ModerationVerdict:
+    """
+    Сохраненные вердикты проверки текста по стоп-словам (app/untils/verdict_cache.py).
+
+    key - хеш вида проверки, ее параметров и нормализованного текста, version - версия стоп-слов,
+    verdict - результат в JSON. Вердикты другой версии не используются и удаляются delete_stale().
+    """
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS moderation_verdicts
+                               (
+                                   key        TEXT PRIMARY KEY,
+                                   version    INTEGER NOT NULL,
+                                   verdict    TEXT    NOT NULL,
+                                   created_at TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+                               )
+                               ''')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def get(cls, key: str, version: int) -> Optional[str]:
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT verdict FROM moderation_verdicts WHERE key = ? AND version = ?',
+                                        [key, version])
+            record = await cursor.fetchone()
+            await cursor.close()
+            return record[0] if record else None
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def save_many(cls, rows: list[tuple[str, int, str]]) -> None:
+        """Записывает вердикты [(key, version, verdict), ...] одной транзакцией"""
+        conn = await db_pool.writer()
+        try:
+            await conn.executemany(
+                'INSERT OR REPLACE INTO moderation_verdicts (key, version, verdict) VALUES (?, ?, ?)', rows)
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def delete_stale(cls, version: int, max_age_days: int) -> int:
+        """Удаляет вердикты других версий стоп-слов и старше max_age_days дней"""
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute('''
+                                        DELETE
+                                        FROM moderation_verdicts
+                                        WHERE version != ?
+                                           OR created_at < datetime('now', ?)
+                                        ''', [version, f'-{max_age_days} days'])
+            deleted = cursor.rowcount
+            await conn.commit()
+            await cursor.close()
+        finally:
+            await conn.close()
+        return deleted
+
+
+class PhotoBlob:
+    """
+    Фото, адресуемые по содержимому (app/untils/photo_store.py).
+
+    photo_blobs - файлы хранилища по SHA-256 содержимого. photo_refs - ссылки на них:
+    owner_type ('abs', 'banned_abs', 'portfolio', 'profile') и id записи-владельца.
+    Число ссылок на фото - число строк photo_refs с его sha256 (индекс photo_refs_sha256).
+    """
+
+    # Владелец ссылки -> таблица, в которой он хранится
+    OWNER_TABLES = {'abs': 'abs', 'banned_abs': 'banned_abs', 'portfolio': 'workers', 'profile': 'workers'}
+
+    @classmethod
+    async def create_tables_if_not_exist(cls) -> None:
+        """Создает таблицы если они не существуют"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS photo_blobs
+                               (
+                                   sha256     TEXT PRIMARY KEY,
+                                   size       INTEGER NOT NULL,
+                                   created_at TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+                               )
+                               ''')
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS photo_refs
+                               (
+                                   sha256     TEXT    NOT NULL,
+                                   owner_type TEXT    NOT NULL,
+                                   owner_id   INTEGER NOT NULL,
+                                   PRIMARY KEY (owner_type, owner_id, sha256)
+                               )
+                               ''')
+            await conn.execute('CREATE INDEX IF NOT EXISTS photo_refs_sha256 ON photo_refs (sha256)')
+            # Старый путь фото -> sha256, для migration_photo_blobs: по нему запись, которая указывает
+            # на уже перенесенный и удаленный файл, получает путь хранилища и после перезапуска миграции
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS photo_sources
+                               (
+                                   path   TEXT PRIMARY KEY,
+                                   sha256 TEXT NOT NULL
+                               )
+                               ''')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def save(cls, sha256: str, size: int) -> None:
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('INSERT OR IGNORE INTO photo_blobs (sha256, size) VALUES (?, ?)', [sha256, size])
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def get_sources(cls) -> dict[str, str]:
+        """{старый путь: sha256} фото, перенесенных миграцией"""
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT path, sha256 FROM photo_sources')
+            records = await cursor.fetchall()
+            await cursor.close()
+            return {record[0]: record[1] for record in records}
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def save_sources(cls, sources: dict[str, str], conn) -> None:
+        """Запоминает {старый путь: sha256} в транзакции conn (без COMMIT)"""
+        await conn.executemany('INSERT OR REPLACE INTO photo_sources (path, sha256) VALUES (?, ?)',
+                               list(sources.items()))
+
+    @classmethod
+    async def set_refs(cls, owner_type: str, owner_id: int, sha256s: set[str]) -> set[str]:
+        """Заменяет ссылки владельца на sha256s и возвращает фото, на которые он больше не ссылается"""
+        conn = await db_pool.writer()
+        try:
+            cursor = await conn.execute('SELECT sha256 FROM photo_refs WHERE owner_type = ? AND owner_id = ?',
+                                        [owner_type, owner_id])
+            current = {record[0] for record in await cursor.fetchall()}
+            await cursor.close()
+            removed = current - sha256s
+            await conn.executemany('DELETE FROM photo_refs WHERE owner_type = ? AND owner_id = ? AND sha256 = ?',
+                                   [(owner_type, owner_id, sha256) for sha256 in removed])
+            await conn.executemany('INSERT OR IGNORE INTO photo_refs (sha256, owner_type, owner_id) VALUES (?, ?, ?)',
+                                   [(sha256, owner_type, owner_id) for sha256 in sha256s - current])
+            await conn.commit()
+        finally:
+            await conn.close()
+        return removed
+
+    @classmethod
+    async def get_photo_values(cls) -> list[str]:
+        """
+        Все ссылки на фото одним запросом: photo_path объявлений, portfolio_photo и profile_photo
+        исполнителей, photo_path сообщений в очереди отправки. Значения как в БД: JSON-словарь или путь
+        """
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('''
+                                        SELECT photo_path FROM abs WHERE photo_path IS NOT NULL
+                                        UNION ALL
+                                        SELECT photo_path FROM banned_abs WHERE photo_path IS NOT NULL
+                                        UNION ALL
+                                        SELECT portfolio_photo FROM workers WHERE portfolio_photo IS NOT NULL
+                                        UNION ALL
+                                        SELECT profile_photo FROM workers WHERE profile_photo IS NOT NULL
+                                        UNION ALL
+                                        SELECT json_extract(payload, '$.photo_path')
+                                        FROM outbound_messages
+                                        WHERE json_extract(payload, '$.photo_path') IS NOT NULL
+                                        ''')
+            records = await cursor.fetchall()
+            await cursor.close()
+            return [record[0] for record in records]
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def delete_dangling_refs(cls) -> int:
+        """Удаляет ссылки владельцев, которых уже нет в своих таблицах"""
+        conn = await db_pool.writer()
+        try:
+            deleted = 0
+            for owner_type, table in cls.OWNER_TABLES.items():
+                cursor = await conn.execute(
+                    f'DELETE FROM photo_refs WHERE owner_type = ? AND owner_id NOT IN (SELECT id FROM {table})',
+                    [owner_type])
+                deleted += cursor.rowcount
+                await cursor.close()
+            await conn.commit()
+            return deleted
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def delete_unreferenced(cls, sha256s: set[str] | None = None) -> list[tuple[str, int]]:
+        """
+        Удаляет записи фото без ссылок (из sha256s или все) и возвращает [(sha256, размер), ...]
+        для удаления файлов
+        """
+        conn = await db_pool.writer()
+        try:
+            query = '''
+                    SELECT sha256, size
+                    FROM photo_blobs b
+                    WHERE NOT EXISTS (SELECT 1 FROM photo_refs r WHERE r.sha256 = b.sha256)
+                    '''
+            params = []
+            if sha256s is not None:
+                if not sha256s:
+                    return []
+                params = list(sha256s)
+                query += f' AND sha256 IN ({", ".join("?" * len(params))})'
+            cursor = await conn.execute(query, params)
+            records = await cursor.fetchall()
+            await cursor.close()
+            await conn.executemany('DELETE FROM photo_blobs WHERE sha256 = ?', [(record[0],) for record in records])
+            await conn.commit()
+            return [(record[0], record[1]) for record in records]
+        finally:
+            await conn.close()
+
+
+class JobCheckpoint:
+    """
+    Состояние долгой задачи планировщика (например, time_checker.check_worker_statuses).
+    Задача сохраняет его вместе со своими изменениями и после перезапуска бота продолжает с него
+    """
+
+    @classmethod
+    async def create_table_if_not_exists(cls) -> None:
+        """Создает таблицу если она не существует"""
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('''
+                               CREATE TABLE IF NOT EXISTS job_checkpoints
+                               (
+                                   name       TEXT PRIMARY KEY,
+                                   state      TEXT NOT NULL,
+                                   updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                               )
+                               ''')
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def get(cls, name: str) -> Optional[dict]:
+        conn = await db_pool.reader()
+        try:
+            cursor = await conn.execute('SELECT state FROM job_checkpoints WHERE name = ?', [name])
+            record = await cursor.fetchone()
+            await cursor.close()
+            return json.loads(record[0]) if record else None
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def save(cls, name: str, state: dict, conn=None) -> None:
+        """conn - уже выданное соединение для записи: состояние сохраняется в его транзакции (без COMMIT)"""
+        query = ('INSERT OR REPLACE INTO job_checkpoints (name, state, updated_at) '
+                 'VALUES (?, ?, CURRENT_TIMESTAMP)')
+        if conn is not None:
+            await conn.execute(query, [name, json.dumps(state)])
+            return
+        conn = await db_pool.writer()
+        try:
+            await conn.execute(query, [name, json.dumps(state)])
+            await conn.commit()
+        finally:
+            await conn.close()
+
+    @classmethod
+    async def delete(cls, name: str) -> None:
+        conn = await db_pool.writer()
+        try:
+            await conn.execute('DELETE FROM job_checkpoints WHERE name = ?', [name])
+            await conn.commit()
+        finally:
+            await conn.close()
 
 
 class ContactExchange:
@@ -3245,7 +4246,7 @@ class ContactExchange:
         self.updated_at = updated_at
 
     async def save(self) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO contact_exchanges (worker_id, customer_id, abs_id, contacts_sent, contacts_purchased, message_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
@@ -3258,7 +4259,7 @@ class ContactExchange:
             await conn.close()
 
     async def update(self, contacts_sent: bool = None, contacts_purchased: bool = None, message_id: int = None) -> None:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             updates = []
             params = []
@@ -3297,7 +4298,7 @@ class ContactExchange:
 
     @classmethod
     async def get_by_worker_and_abs(cls, worker_id: int, abs_id: int) -> Optional['ContactExchange']:
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM contact_exchanges WHERE worker_id = ? AND abs_id = ?',
@@ -3349,7 +4350,7 @@ class ContactExchange:
 
     async def delete(self) -> None:
         """Удаляет запись ContactExchange"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute('DELETE FROM contact_exchanges WHERE id = ?', [self.id])
             await conn.commit()
@@ -3360,7 +4361,7 @@ class ContactExchange:
     @classmethod
     async def get_by_abs(cls, abs_id: int) -> list['ContactExchange']:
         """Получает все записи ContactExchange для объявления"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM contact_exchanges WHERE abs_id = ?',
@@ -3385,7 +4386,7 @@ class ContactExchange:
     @classmethod
     async def count_by_worker(cls, worker_id: int) -> int:
         """Подсчитывает количество купленных контактов исполнителем"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT COUNT(*) FROM contact_exchanges WHERE worker_id = ? AND contacts_purchased = 1',
@@ -3448,7 +4449,7 @@ class WorkerRank:
     @classmethod
     async def create_table_if_not_exists(cls) -> None:
         """Создает таблицу если она не существует"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             await conn.execute('''
                                CREATE TABLE IF NOT EXISTS worker_ranks
@@ -3488,7 +4489,7 @@ class WorkerRank:
     async def save(self) -> None:
         """Сохраняет ранг в базу данных"""
         await self.create_table_if_not_exists()
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             if self.id is None:
                 # Создание нового ранга
@@ -3512,7 +4513,7 @@ class WorkerRank:
     async def get_by_worker(cls, worker_id: int) -> 'WorkerRank | None':
         """Получает ранг исполнителя"""
         await cls.create_table_if_not_exists()
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM worker_ranks WHERE worker_id = ? ORDER BY last_updated DESC LIMIT 1',
@@ -3541,7 +4542,7 @@ class WorkerRank:
         from datetime import datetime, timedelta
 
         # Получаем количество выполненных заказов за последние 30 дней
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             # Вычисляем дату 30 дней назад
             date_30_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
@@ -3661,7 +4662,7 @@ class WorkerDailyResponses:
 
     async def save(self) -> None:
         """Сохраняет или обновляет запись об откликах в день"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             if self.id:
                 # Обновляем существующую запись
@@ -3684,7 +4685,7 @@ class WorkerDailyResponses:
     @classmethod
     async def get_by_worker_and_date(cls, worker_id: int, date: str) -> Optional['WorkerDailyResponses']:
         """Получает запись об откликах исполнителя за конкретную дату"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM worker_daily_responses WHERE worker_id = ? AND date = ?',
@@ -3709,23 +4710,19 @@ class WorkerDailyResponses:
     @classmethod
     async def increment_responses_count(cls, worker_id: int, date: str) -> int:
         """Увеличивает счетчик откликов на 1 и возвращает новое значение"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
-        try:
-            # Пытаемся получить существующую запись
-            existing = await cls.get_by_worker_and_date(worker_id, date)
+        # Пытаемся получить существующую запись
+        existing = await cls.get_by_worker_and_date(worker_id, date)
 
-            if existing:
-                # Обновляем существующую запись
-                existing.responses_count += 1
-                await existing.save()
-                return existing.responses_count
-            else:
-                # Создаем новую запись
-                new_record = cls(worker_id=worker_id, date=date, responses_count=1)
-                await new_record.save()
-                return 1
-        finally:
-            await conn.close()
+        if existing:
+            # Обновляем существующую запись
+            existing.responses_count += 1
+            await existing.save()
+            return existing.responses_count
+        else:
+            # Создаем новую запись
+            new_record = cls(worker_id=worker_id, date=date, responses_count=1)
+            await new_record.save()
+            return 1
 
     @classmethod
     async def get_responses_count(cls, worker_id: int, date: str) -> int:
@@ -3757,7 +4754,7 @@ class WorkerStatus:
 
     async def save(self) -> None:
         """Создает или обновляет запись о статусе исполнителя"""
-        conn = await aiosqlite.connect('app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             # Проверяем, есть ли уже запись
             cursor = await conn.execute(
@@ -3802,7 +4799,7 @@ class WorkerStatus:
     @classmethod
     async def get_by_worker(cls, worker_id: int) -> Optional['WorkerStatus']:
         """Получает статус исполнителя по worker_id"""
-        conn = await aiosqlite.connect('app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM worker_statuses WHERE worker_id = ?',
@@ -3812,19 +4809,7 @@ class WorkerStatus:
             await cursor.close()
 
             if record:
-                return cls(
-                    id=record[0],
-                    worker_id=record[1],
-                    has_ip=bool(record[2]),
-                    ip_number=record[3],
-                    has_ooo=bool(record[4]),
-                    ooo_number=record[5],
-                    has_sz=bool(record[6]),
-                    sz_number=record[7],
-                    last_status_check=record[8],
-                    created_at=record[9],
-                    updated_at=record[10]
-                )
+                return cls._from_record(record)
             return None
         finally:
             await conn.close()
@@ -3839,42 +4824,73 @@ class WorkerStatus:
         return status
 
     @classmethod
-    async def get_all_for_recheck(cls) -> list['WorkerStatus']:
-        """Получает все статусы, которые нужно перепроверить (старше 6 месяцев)"""
-        conn = await aiosqlite.connect('app/data/database/database.db')
-        try:
-            from datetime import timedelta
-            six_months_ago = (datetime.now() - timedelta(days=180)).isoformat()
+    def _from_record(cls, record) -> 'WorkerStatus':
+        return cls(
+            id=record[0],
+            worker_id=record[1],
+            has_ip=bool(record[2]),
+            ip_number=record[3],
+            has_ooo=bool(record[4]),
+            ooo_number=record[5],
+            has_sz=bool(record[6]),
+            sz_number=record[7],
+            last_status_check=record[8],
+            created_at=record[9],
+            updated_at=record[10]
+        )
 
+    @classmethod
+    async def get_for_recheck(cls, checked_before: str, after_id: int = 0,
+                              limit: int = 200) -> list[tuple['WorkerStatus', int]]:
+        """
+        Статусы, которые нужно перепроверить (проверены раньше checked_before), вместе с tg_id исполнителя.
+        Одна страница по id: следующая начинается после последнего id предыдущей
+        """
+        conn = await db_pool.reader()
+        try:
             cursor = await conn.execute('''
-                                        SELECT *
-                                        FROM worker_statuses
-                                        WHERE (has_ip = 1 OR has_ooo = 1 OR has_sz = 1)
-                                          AND (last_status_check IS NULL OR last_status_check < ?)
-                                        ''', (six_months_ago,))
-
+                                        SELECT ws.id, ws.worker_id, ws.has_ip, ws.ip_number, ws.has_ooo,
+                                               ws.ooo_number, ws.has_sz, ws.sz_number, ws.last_status_check,
+                                               ws.created_at, ws.updated_at, w.tg_id
+                                        FROM worker_statuses ws
+                                                 JOIN workers w ON w.id = ws.worker_id
+                                        WHERE (ws.has_ip = 1 OR ws.has_ooo = 1 OR ws.has_sz = 1)
+                                          AND (ws.last_status_check IS NULL OR ws.last_status_check < ?)
+                                          AND ws.id > ?
+                                        ORDER BY ws.id
+                                        LIMIT ?
+                                        ''', (checked_before, after_id, limit))
             records = await cursor.fetchall()
             await cursor.close()
-
-            statuses = []
-            for record in records:
-                statuses.append(cls(
-                    id=record[0],
-                    worker_id=record[1],
-                    has_ip=bool(record[2]),
-                    ip_number=record[3],
-                    has_ooo=bool(record[4]),
-                    ooo_number=record[5],
-                    has_sz=bool(record[6]),
-                    sz_number=record[7],
-                    last_status_check=record[8],
-                    created_at=record[9],
-                    updated_at=record[10]
-                ))
-            return statuses
+            return [(cls._from_record(record), record[11]) for record in records]
         finally:
             await conn.close()
 
+    @classmethod
+    async def save_recheck(cls, changed: list['WorkerStatus'], checked_ids: list[int], checked_at: str,
+                           conn) -> None:
+        """
+        Записывает итог перепроверки в транзакцию conn (без COMMIT): у changed - статусы целиком,
+        у остальных checked_ids - только дату проверки
+        """
+        updated_at = datetime.now().isoformat()
+        await conn.executemany('''
+                               UPDATE worker_statuses
+                               SET has_ip            = ?,
+                                   ip_number         = ?,
+                                   has_ooo           = ?,
+                                   ooo_number        = ?,
+                                   has_sz            = ?,
+                                   sz_number         = ?,
+                                   last_status_check = ?,
+                                   updated_at        = ?
+                               WHERE id = ?
+                               ''', [(status.has_ip, status.ip_number, status.has_ooo, status.ooo_number,
+                                      status.has_sz, status.sz_number, status.last_status_check, updated_at,
+                                      status.id) for status in changed])
+        await conn.executemany('UPDATE worker_statuses SET last_status_check = ? WHERE id = ?',
+                               [(checked_at, status_id) for status_id in checked_ids])
+
 
 class WorkerResponseCancellation:
     """Модель для отслеживания отмен откликов исполнителями"""
@@ -3888,7 +4904,7 @@ class WorkerResponseCancellation:
 
     async def save(self) -> None:
         """Сохраняет запись об отмене отклика"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'INSERT INTO worker_response_cancellations (worker_id, abs_id) VALUES (?, ?)',
@@ -3903,7 +4919,7 @@ class WorkerResponseCancellation:
     @classmethod
     async def get_cancellations_by_worker_and_date(cls, worker_id: int, date_from: str) -> int:
         """Получает количество отмен откликов исполнителя с указанной даты"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT COUNT(*) FROM worker_response_cancellations WHERE worker_id = ? AND cancelled_at >= ?',
@@ -3932,7 +4948,7 @@ class WorkerWorkTypeChanges:
     @classmethod
     async def create_table_if_not_exists(cls) -> None:
         """Создает таблицу если она не существует"""
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             await conn.execute('''
                                CREATE TABLE IF NOT EXISTS worker_work_type_changes
@@ -3960,7 +4976,7 @@ class WorkerWorkTypeChanges:
     async def save(self) -> None:
         """Сохраняет или обновляет запись об изменениях направлений"""
         await self.create_table_if_not_exists()
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             if self.id is None:
                 # Создание новой записи
@@ -3984,7 +5000,7 @@ class WorkerWorkTypeChanges:
     async def get_by_worker(cls, worker_id: int) -> Optional['WorkerWorkTypeChanges']:
         """Получает запись об изменениях направлений исполнителя"""
         await cls.create_table_if_not_exists()
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
+        conn = await db_pool.reader()
         try:
             cursor = await conn.execute(
                 'SELECT * FROM worker_work_type_changes WHERE worker_id = ?',
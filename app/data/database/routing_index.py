@@ -0,0 +1,166 @@
+"""
+Индекс рассылки объявлений в памяти: (city_id, work_type_id) -> tg_id подходящих исполнителей.
+
+Строится один раз при старте бота (main.run) из workers, worker_cities и worker_work_types
+(то есть из worker_and_subscription и worker_city_subscriptions) и дальше обновляется
+по одному исполнителю из методов моделей, которые меняют эти строки.
+
+Правила те же, что в Worker.get_active_workers_for_advertisement:
+- только активные исполнители;
+- города - основные города исполнителя и города активных подписок на города;
+- нет направлений или единственное направление '0' (безлимит) - подходят все типы работ,
+  иначе нужен точный тип.
+
+Пока индекс не построен (скрипты без main.run), методы обновления ничего не делают,
+а рассылка берет исполнителей запросом к БД.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from app.data.database.connection_pool import db_pool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class WorkerRoute:
+    """Данные одного исполнителя в индексе. work_type_ids = None - подходят все типы работ"""
+    tg_id: int
+    city_ids: frozenset
+    work_type_ids: frozenset | None
+
+
+class RoutingIndex:
+    def __init__(self):
+        self._routes: dict[int, WorkerRoute] = {}
+        self._by_pair: dict[tuple[int, int], set[int]] = {}
+        self._any_type: dict[int, set[int]] = {}
+        self._lock = asyncio.Lock()
+        self._ready = False
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    @staticmethod
+    async def _load(conn, worker_id: int = None) -> dict[int, WorkerRoute]:
+        """Читает маршруты всех исполнителей или одного исполнителя"""
+        worker_filter = '' if worker_id is None else 'AND id = ?'
+        link_filter = '' if worker_id is None else 'AND wc.worker_id = ?'
+        params = [] if worker_id is None else [worker_id]
+
+        cursor = await conn.execute(f'SELECT id, tg_id FROM workers WHERE active = 1 {worker_filter}', params)
+        workers = await cursor.fetchall()
+        await cursor.close()
+        if not workers:
+            return {}
+
+        cursor = await conn.execute(f'''
+                                    SELECT wc.worker_id, wc.city_id
+                                    FROM worker_cities wc
+                                             LEFT JOIN worker_city_subscriptions s ON s.id = wc.subscription_id
+                                    WHERE (wc.subscription_id IS NULL OR s.active = 1) {link_filter}
+                                    ''', params)
+        cities = {}
+        for owner, city_id in await cursor.fetchall():
+            cities.setdefault(owner, set()).add(city_id)
+        await cursor.close()
+
+        cursor = await conn.execute(
+            'SELECT worker_id, work_type_id FROM worker_work_types'
+            + ('' if worker_id is None else ' WHERE worker_id = ?'), params)
+        work_types = {}
+        for owner, work_type_id in await cursor.fetchall():
+            work_types.setdefault(owner, set()).add(work_type_id)
+        await cursor.close()
+
+        routes = {}
+        for owner, tg_id in workers:
+            owner_types = work_types.get(owner)
+            if not owner_types or owner_types == {0}:
+                owner_types = None
+            routes[owner] = WorkerRoute(tg_id=tg_id,
+                                        city_ids=frozenset(cities.get(owner, ())),
+                                        work_type_ids=frozenset(owner_types) if owner_types else None)
+        return routes
+
+    def _add(self, worker_id: int, route: WorkerRoute) -> None:
+        self._routes[worker_id] = route
+        for city_id in route.city_ids:
+            if route.work_type_ids is None:
+                self._any_type.setdefault(city_id, set()).add(worker_id)
+            else:
+                for work_type_id in route.work_type_ids:
+                    self._by_pair.setdefault((city_id, work_type_id), set()).add(worker_id)
+
+    def _remove(self, worker_id: int) -> None:
+        route = self._routes.pop(worker_id, None)
+        if route is None:
+            return
+        for city_id in route.city_ids:
+            if route.work_type_ids is None:
+                keys = [(self._any_type, city_id)]
+            else:
+                keys = [(self._by_pair, (city_id, work_type_id)) for work_type_id in route.work_type_ids]
+            for mapping, key in keys:
+                worker_ids = mapping.get(key)
+                if worker_ids is not None:
+                    worker_ids.discard(worker_id)
+                    if not worker_ids:
+                        del mapping[key]
+
+    async def build(self) -> None:
+        """Полностью перестраивает индекс из БД"""
+        async with self._lock:
+            async with db_pool.reader() as conn:
+                routes = await self._load(conn)
+            self._routes = {}
+            self._by_pair = {}
+            self._any_type = {}
+            for worker_id, route in routes.items():
+                self._add(worker_id, route)
+            self._ready = True
+        logger.info(f'Индекс рассылки построен: {len(self._routes)} активных исполнителей, '
+                    f'{len(self._by_pair)} пар (город, направление), {len(self._any_type)} городов без ограничений')
+
+    async def refresh_worker(self, worker_id: int) -> None:
+        """Перечитывает одного исполнителя после изменения его строк в БД"""
+        if not self._ready or worker_id is None:
+            return
+        try:
+            # Обновления одного исполнителя не должны применяться в обратном порядке
+            async with self._lock:
+                async with db_pool.reader() as conn:
+                    routes = await self._load(conn, worker_id)
+                self._remove(worker_id)
+                if worker_id in routes:
+                    self._add(worker_id, routes[worker_id])
+        except Exception as e:
+            # Индекс не должен ломать операцию записи, которая уже зафиксирована
+            logger.error(f'Не удалось обновить индекс рассылки для исполнителя {worker_id}: {e}')
+
+    async def remove_by_tg_id(self, tg_id: int) -> None:
+        """Убирает из индекса все записи исполнителя с этим tg_id (удаление без id)"""
+        async with self._lock:
+            for worker_id in [worker_id for worker_id, route in self._routes.items() if route.tg_id == tg_id]:
+                self._remove(worker_id)
+
+    def get_tg_ids(self, city_id: int, work_type_id: int) -> list[int]:
+        """tg_id исполнителей, которым нужно отправить объявление, без дублей"""
+        worker_ids = self._by_pair.get((city_id, work_type_id), set()) | self._any_type.get(city_id, set())
+        tg_ids = []
+        seen = set()
+        for worker_id in sorted(worker_ids):
+            tg_id = self._routes[worker_id].tg_id
+            if tg_id not in seen:
+                seen.add(tg_id)
+                tg_ids.append(tg_id)
+        return tg_ids
+
+
+routing_index = RoutingIndex()
@@ -16,12 +16,26 @@ from app.data.database.models import Customer, Banned, BannedAbs, Abs, Worker, W
 from app.keyboards import KeyboardCollection
 from app.states import AdminStates, UserStates, BannedStates
 from app.untils import help_defs
+from app.untils.outbound_queue import outbound_queue
 from loaders import bot
 
 router = Router()
 router.message.filter(F.from_user.id != F.bot.id)
 logger = logging.getLogger()
 
+
+async def broadcast_referral_links(workers: list[Worker], text: str, photo: str = None) -> None:
+    """Ставит в очередь исходящих сообщений text с реферальной ссылкой каждого исполнителя. photo - file_id"""
+    messages = []
+    for worker in workers:
+        worker_text = text + f'\n\nВаша реферальная ссылка: https://t.me/Rus_haltura_bot?start={worker.ref_code}'
+        if photo:
+            messages.append(outbound_queue.build('send_photo', worker.tg_id, photo=photo, caption=worker_text))
+        else:
+            messages.append(outbound_queue.build('send_message', worker.tg_id, text=worker_text))
+    await outbound_queue.enqueue(messages)
+    logger.info(f'broadcast_referral_links: в очередь поставлено {len(messages)} сообщений')
+
 # Simple in-memory cache for admin summary
 _admin_summary_cache = {"data": None, "ts": 0.0, "ttl": 60.0}  # Кеш на 30 секунд
 
@@ -74,9 +88,9 @@ async def admin_menu(callback: CallbackQuery, state: FSMContext) -> None:
             logger.debug(f"Admin loaded: {admin.id if admin else 'None'}")
             
             # Используем оптимизированные COUNT запросы вместо загрузки всех данных
-            import aiosqlite
+            from app.data.database.connection_pool import db_pool
             
-            async with aiosqlite.connect(database='app/data/database/database.db') as conn:
+            async with db_pool.reader() as conn:
                 logger.debug("Connected to database")
                 
                 # Подсчет заказчиков (проверяем существование таблицы)
@@ -947,7 +961,7 @@ async def abs_in_city(callback: CallbackQuery, state: FSMContext) -> None:
     else:
         btn_next = False
 
-    text = help_defs.read_text_file(abs_now.text_path)
+    text = await help_defs.read_ad_text(abs_now.text_path)
 
     text = f'Объявление {abs_now.id}\n\n' + text
 
@@ -1015,7 +1029,7 @@ async def banned_abs_in_city(callback: CallbackQuery, state: FSMContext) -> None
     else:
         btn_next = False
 
-    text = help_defs.read_text_file(abs_now.text_path)
+    text = await help_defs.read_ad_text(abs_now.text_path)
     text = f'Объявление {abs_now.id}\n\n' + text
 
     if abs_now.photo_path:
@@ -1356,15 +1370,9 @@ async def msg_to_worker_skip(callback: CallbackQuery, state: FSMContext) -> None
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
     workers = await Worker.get_all_in_city(city_id=city_id)
-    if workers:
-        for worker in workers:
-            if not await WorkerAndRefsAssociation.get_refs_by_worker(worker_id=worker.id):
-                try:
-                    message_to_worker = message_to_worker + f'\n\nВаша реферальная ссылка: https://t.me/Rus_haltura_bot?start={worker.ref_code}'
-                    await bot.send_message(chat_id=worker.tg_id, text=message_to_worker)
-                except Exception:
-                    pass
-                message_to_worker = str(state_data.get('message_to_worker'))
+    await broadcast_referral_links([worker for worker in workers or []
+                                    if not await WorkerAndRefsAssociation.get_refs_by_worker(worker_id=worker.id)],
+                                   text=message_to_worker)
 
     city = await City.get_city(id=city_id)
 
@@ -1391,22 +1399,8 @@ async def msg_to_worker_photo(message: Message, state: FSMContext) -> None:
         pass
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
     workers = await Worker.get_all_in_city(city_id=city_id)
-    if workers:
-        for worker in workers:
-            try:
-                message_to_worker = message_to_worker + f'\n\nВаша реферальная ссылка: https://t.me/Rus_haltura_bot?start={worker.ref_code}'
-                await bot.send_photo(chat_id=worker.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_worker)
-            except Exception:
-                pass
-            message_to_worker = str(state_data.get('message_to_worker'))
-
-    help_defs.delete_file(file_path_photo)
+    await broadcast_referral_links(workers or [], text=message_to_worker, photo=photo)
 
     city = await City.get_city(id=city_id)
 
@@ -1456,15 +1450,9 @@ async def msg_to_worker_skip(callback: CallbackQuery, state: FSMContext) -> None
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
     workers = await Worker.get_all()
-    if workers:
-        for worker in workers:
-            if not await WorkerAndRefsAssociation.get_refs_by_worker(worker_id=worker.id):
-                try:
-                    message_to_worker = message_to_worker + f'\n\nВаша реферальная ссылка: https://t.me/Rus_haltura_bot?start={worker.ref_code}'
-                    await bot.send_message(chat_id=worker.tg_id, text=message_to_worker)
-                except Exception:
-                    pass
-                message_to_worker = str(state_data.get('message_to_worker'))
+    await broadcast_referral_links([worker for worker in workers or []
+                                    if not await WorkerAndRefsAssociation.get_refs_by_worker(worker_id=worker.id)],
+                                   text=message_to_worker)
 
     await bot.delete_message(chat_id=callback.message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -1486,22 +1474,8 @@ async def msg_to_worker_photo(message: Message, state: FSMContext) -> None:
     await bot.delete_message(chat_id=message.from_user.id, message_id=msg)
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
     workers = await Worker.get_all()
-    if workers:
-        for worker in workers:
-            try:
-                message_to_worker = message_to_worker + f'\n\nВаша реферальная ссылка: https://t.me/Rus_haltura_bot?start={worker.ref_code}'
-                await bot.send_photo(chat_id=worker.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_worker)
-            except Exception:
-                pass
-            message_to_worker = str(state_data.get('message_to_worker'))
-
-    help_defs.delete_file(file_path_photo)
+    await broadcast_referral_links(workers or [], text=message_to_worker, photo=photo)
 
     await bot.delete_message(chat_id=message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -1533,7 +1507,7 @@ async def abs_in_city(callback: CallbackQuery, state: FSMContext) -> None:
     else:
         btn_next = False
 
-    text = help_defs.read_text_file(abs_now.text_path)
+    text = await help_defs.read_ad_text(abs_now.text_path)
 
 
     text = f'Объявление {abs_now.id}\n\n' + text
@@ -1599,7 +1573,7 @@ async def check_abs(callback: CallbackQuery, state: FSMContext) -> None:
     else:
         btn_back = True
 
-    text = help_defs.read_text_file(abs_now.text_path)
+    text = await help_defs.read_ad_text(abs_now.text_path)
 
 
     text = f'Объявление {abs_now.id}\n\n' + text
@@ -1743,17 +1717,18 @@ async def block_advertisement(callback: CallbackQuery, state: FSMContext) -> Non
         [await workers_and_report.delete() for workers_and_report in workers_and_reports]
 
     workers_and_abs = await WorkersAndAbs.get_by_abs(abs_id=advertisement.id)
+    notify_tg_ids = []
     if workers_and_abs:
         for worker_and_abs in workers_and_abs:
             worker = await Worker.get_worker(id=worker_and_abs.worker_id)
             worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
             sub = await SubscriptionType.get_subscription_type(id=worker_sub.subscription_id)
             if sub.notification:
-                try:
-                    await bot.send_message(chat_id=worker.tg_id, text=f'Объявление{advertisement.id} неактуально')
-                except Exception:
-                    pass
+                notify_tg_ids.append(worker.tg_id)
             await worker_and_abs.delete()
+    await outbound_queue.enqueue([outbound_queue.build('send_message', tg_id,
+                                                       text=f'Объявление{advertisement.id} неактуально')
+                                  for tg_id in notify_tg_ids])
 
     await advertisement.delete(delite_photo=True)
     await state.set_state(AdminStates.add_comment_to_lock)
@@ -1884,6 +1859,7 @@ async def block_advertisement(callback: CallbackQuery, state: FSMContext) -> Non
         [await workers_and_report.delete() for workers_and_report in workers_and_reports]
 
     workers_and_abs = await WorkersAndAbs.get_by_abs(abs_id=advertisement.id)
+    notify_tg_ids = []
     if workers_and_abs:
         for worker_and_abs in workers_and_abs:
             worker = await Worker.get_worker(id=worker_and_abs.worker_id)
@@ -1892,11 +1868,11 @@ async def block_advertisement(callback: CallbackQuery, state: FSMContext) -> Non
             worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
             sub = await SubscriptionType.get_subscription_type(id=worker_sub.subscription_id)
             if sub.notification:
-                try:
-                    await bot.send_message(chat_id=worker.tg_id, text=f'Объявление{advertisement.id} неактуально')
-                except Exception:
-                    pass
+                notify_tg_ids.append(worker.tg_id)
             await worker_and_abs.delete()
+    await outbound_queue.enqueue([outbound_queue.build('send_message', tg_id,
+                                                       text=f'Объявление{advertisement.id} неактуально')
+                                  for tg_id in notify_tg_ids])
 
     await advertisement.delete(delite_photo=True)
     advertisements = await Abs.get_all_by_customer(customer_id=customer.id)
@@ -1925,7 +1901,7 @@ async def block_advertisement(callback: CallbackQuery, state: FSMContext) -> Non
 
     advertisement_now = advertisements[advertisement_id]
 
-    text = f'Объявление{advertisement_now.id}\n\n' + help_defs.read_text_file(advertisement_now.text_path)
+    text = f'Объявление{advertisement_now.id}\n\n' + await help_defs.read_ad_text(advertisement_now.text_path)
     logger.debug(f"text {text}")
     if advertisement_now.photo_path:
         try:
@@ -2080,7 +2056,7 @@ async def banned_abs_in_city(callback: CallbackQuery, state: FSMContext) -> None
     else:
         btn_next = False
 
-    text = help_defs.read_text_file(abs_now.text_path)
+    text = await help_defs.read_ad_text(abs_now.text_path)
 
 
     text = f'Объявление {abs_now.id}\n\n' + text
@@ -2145,7 +2121,7 @@ async def check_banned_abs(callback: CallbackQuery, state: FSMContext) -> None:
     else:
         btn_back = True
 
-    text = help_defs.read_text_file(abs_now.text_path)
+    text = await help_defs.read_ad_text(abs_now.text_path)
 
 
     text = f'Объявление {abs_now.id}\n\n' + text
@@ -2250,7 +2226,8 @@ async def unblock_advertisement(callback: CallbackQuery, state: FSMContext) -> N
     customer = await Customer.get_customer(id=banned_advertisement.customer_id)
     banned = await Banned.get_banned(tg_id=customer.tg_id)
 
-    if banned:
+    # Объявление, ждавшее ручной проверки (customer_proces.review_task), не меняет блокировки автора
+    if banned and not banned_advertisement.review:
         if banned.ban_counter == 1:
             await banned.delete()
         else:
@@ -2269,6 +2246,9 @@ async def unblock_advertisement(callback: CallbackQuery, state: FSMContext) -> N
     if not text_path:
         await banned_advertisement.delete(delite_photo=True)
         await callback.message.delete()
+        if banned_advertisement.review:
+            await callback.message.answer('Объявление снято с проверки')
+            return
         await callback.message.answer('Пользователь разблокирован')
         try:
             await bot.send_message(chat_id=customer.tg_id,
@@ -2292,48 +2272,28 @@ async def unblock_advertisement(callback: CallbackQuery, state: FSMContext) -> N
     advertisements = await Abs.get_all_by_customer(customer_id=customer.id)
     advertisement = advertisements[-1]
 
-    text = help_defs.read_text_file(text_path)
+    text = await help_defs.read_ad_text(text_path)
 
 
     text = f'Объявление{advertisement.id}\n\n' + text
 
-    workers = await Worker.get_all_in_city(city_id=customer.city_id)
-
-    if workers:
-        for worker in workers:
-            if worker.tg_id == customer.tg_id:
-                continue
-            if not worker.active:
-                continue
-            worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
-            try:
-                if worker_sub.work_type_ids:
-                    if (advertisement.work_type_id in worker_sub.work_type_ids) or worker_sub.unlimited_work_types:
-                        if banned_advertisement.photo_path:
-                            await bot.send_photo(chat_id=worker.tg_id,
-                                                 photo=FSInputFile(banned_advertisement.photo_path['0']),
-                                                 caption=text,
-                                                 reply_markup=kbc.apply_btn(advertisement.id)
-                                                 )
-                        else:
-                            await bot.send_message(chat_id=worker.tg_id,
-                                                   text=text,
-                                                   reply_markup=kbc.apply_btn(advertisement.id)
-                                                   )
-                elif worker_sub.unlimited_work_types:
-                    if banned_advertisement.photo_path:
-                        await bot.send_photo(chat_id=worker.tg_id,
-                                             photo=FSInputFile(banned_advertisement.photo_path['0']),
-                                             caption=text,
-                                             reply_markup=kbc.apply_btn(advertisement.id)
-                                             )
-                    else:
-                        await bot.send_message(chat_id=worker.tg_id,
-                                               text=text,
-                                               reply_markup=kbc.apply_btn(advertisement.id)
-                                               )
-            except Exception:
-                pass
+    # Рассылка идет через общую очередь: лимиты Telegram и повторы после RetryAfter
+    messages = []
+    for worker in await Worker.get_all_in_city(city_id=customer.city_id) or []:
+        if worker.tg_id == customer.tg_id or not worker.active:
+            continue
+        worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
+        if not worker_sub or not (worker_sub.unlimited_work_types or (
+                worker_sub.work_type_ids and advertisement.work_type_id in worker_sub.work_type_ids)):
+            continue
+        if banned_advertisement.photo_path:
+            messages.append(outbound_queue.build('send_photo', worker.tg_id, kind='advertisement',
+                                                 photo_path=banned_advertisement.photo_path['0'], caption=text,
+                                                 reply_markup=kbc.apply_btn(advertisement.id)))
+        else:
+            messages.append(outbound_queue.build('send_message', worker.tg_id, kind='advertisement',
+                                                 text=text, reply_markup=kbc.apply_btn(advertisement.id)))
+    await outbound_queue.enqueue(messages)
 
     await banned_advertisement.delete(delite_photo=False)
     advertisements = await BannedAbs.get_all_by_customer(customer_id=customer.id)
@@ -2362,7 +2322,7 @@ async def unblock_advertisement(callback: CallbackQuery, state: FSMContext) -> N
 
     advertisement_now = advertisements[advertisement_id]
 
-    text = f'Объявление{advertisement_now.id}\n\n' + help_defs.read_text_file(advertisement_now.text_path)
+    text = f'Объявление{advertisement_now.id}\n\n' + await help_defs.read_ad_text(advertisement_now.text_path)
     logger.debug(f"text {text}")
     if advertisement_now.photo_path:
         try:
@@ -2457,7 +2417,7 @@ async def block_advertisement(callback: CallbackQuery, state: FSMContext) -> Non
 
     advertisement_now = advertisements[advertisement_id]
 
-    text = f'Объявление{advertisement_now.id}\n\n' + help_defs.read_text_file(advertisement_now.text_path)
+    text = f'Объявление{advertisement_now.id}\n\n' + await help_defs.read_ad_text(advertisement_now.text_path)
     logger.debug(f"text {text}")
     if advertisement_now.photo_path:
         try:
@@ -10,6 +10,7 @@ from app.data.database.models import ProfanityWord, BlockWordShort, BlockWord, W
     BlockWordShortMessage, BlockWordPersonal, BlockWordShortPersonal, BlockWordPhoto, BlockWordShortPhoto
 from app.keyboards import KeyboardCollection
 from app.states import AdminStates
+from app.untils.stop_words import stop_words
 from loaders import bot
 
 router = Router()
@@ -314,6 +315,7 @@ async def stop_words_profanity_delite_text(message: Message, state: FSMContext)
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -341,6 +343,7 @@ async def stop_words_long_message_delite_text(message: Message, state: FSMContex
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -368,6 +371,7 @@ async def stop_words_long_message_delite_text(message: Message, state: FSMContex
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -395,6 +399,7 @@ async def stop_words_short_message_delite_text(message: Message, state: FSMConte
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -422,6 +427,7 @@ async def stop_words_short_delite_text(message: Message, state: FSMContext) -> N
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -449,6 +455,7 @@ async def stop_words_long_delite_text(message: Message, state: FSMContext) -> No
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -476,6 +483,7 @@ async def stop_white_words_delite_text(message: Message, state: FSMContext) -> N
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -503,6 +511,7 @@ async def stop_words_short_message_delite_text(message: Message, state: FSMConte
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -530,6 +539,7 @@ async def stop_words_long_message_delite_text(message: Message, state: FSMContex
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -557,6 +567,7 @@ async def stop_words_short_message_delite_text(message: Message, state: FSMConte
 
     if target_word:
         await target_word.delete()
+        await stop_words.bump()
         text = f'Слово {word_to_delite} удалено\nЧто вы хотите сделать?'
     else:
         text = f'Слово {word_to_delite} Не найдено\nЧто вы хотите сделать?'
@@ -707,6 +718,7 @@ async def stop_words_profanity_insert_text(message: Message, state: FSMContext)
     else:
         target_word = ProfanityWord(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_stop_words_profanity)
@@ -735,6 +747,7 @@ async def stop_words_short_insert_text(message: Message, state: FSMContext) -> N
     else:
         target_word = BlockWordShort(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_stop_words_short)
@@ -763,6 +776,7 @@ async def stop_words_long_message_insert_text(message: Message, state: FSMContex
     else:
         target_word = BlockWordMessage(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_stop_words_long_message)
@@ -791,6 +805,7 @@ async def stop_words_long_message_insert_text(message: Message, state: FSMContex
     else:
         target_word = BlockWordPersonal(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_personal_stop_words)
@@ -819,6 +834,7 @@ async def stop_stop_words_short_message_insert_text(message: Message, state: FSM
     else:
         target_word = BlockWordShortMessage(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_stop_words_short_message)
@@ -847,6 +863,7 @@ async def stop_stop_words_short_personal_insert_text(message: Message, state: FS
     else:
         target_word = BlockWordShortPersonal(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_stop_words_short_personal)
@@ -875,6 +892,7 @@ async def stop_words_long_look_text(message: Message, state: FSMContext) -> None
     else:
         target_word = BlockWord(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_stop_words_long)
@@ -903,6 +921,7 @@ async def stop_words_long_look_text(message: Message, state: FSMContext) -> None
     else:
         target_word = BlockWord(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_white_words)
@@ -931,6 +950,7 @@ async def stop_words_long_message_insert_text(message: Message, state: FSMContex
     else:
         target_word = BlockWordPhoto(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_photo_stop_words)
@@ -959,6 +979,7 @@ async def stop_stop_words_short_photo_insert_text(message: Message, state: FSMCo
     else:
         target_word = BlockWordShortPhoto(id=None, word=word_to_insert.lower())
         await target_word.save()
+        await stop_words.bump()
         text = f'Слово {word_to_insert} Добавлено\nЧто вы хотите сделать?'
 
     await state.set_state(AdminStates.edit_stop_words_short_photo)
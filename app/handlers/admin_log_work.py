@@ -13,7 +13,7 @@ from app.data.database.models import Customer, Banned, BannedAbs, Abs, Worker, W
     SubscriptionType, UserAndSupportQueue, WorkType
 from app.keyboards import KeyboardCollection
 from app.states import AdminStates
-from app.untils import help_defs
+from app.untils import help_defs, photo_store
 from app.handlers.customer import send_to_workers_background
 from loaders import bot
 import config
@@ -32,25 +32,28 @@ async def unblock_advertisement(callback: CallbackQuery) -> None:
     banned_abs = await BannedAbs.get_one(id=banned_abs_id)
     customer = await Customer.get_customer(id=banned_abs.customer_id)
     banned = await Banned.get_banned(tg_id=customer.tg_id)
-
-    # Проверяем, найден ли пользователь в таблице заблокированных
-    if banned:
-        if banned.ban_counter == 1:
-            await banned.delete()
-        else:
-            if banned.forever:
-                await banned.update(ban_counter=banned.ban_counter - 1,
-                                    ban_now=False,
-                                    ban_end=None,
-                                    forever=False)
-            else:
-                await banned.update(ban_counter=banned.ban_counter - 1,
-                                    ban_now=False,
-                                    ban_end=None)
-    else:
-        # Если пользователь не найден в таблице заблокированных, 
+    # Объявление ждало ручной проверки (customer_proces.review_task), автора за него не блокировали
+    was_review = banned_abs.review
+
+    # Проверяем, найден ли пользователь в таблице заблокированных.
+    # Одобрение объявления с проверки не меняет блокировки автора
+    if was_review:
+        logger.info(f"Advertisement {banned_abs.id} of user {customer.tg_id} approved after review")
+    elif not banned:
+        # Если пользователь не найден в таблице заблокированных,
         # это означает, что он уже был разблокирован ранее
         logger.info(f"User {customer.tg_id} not found in banned table, proceeding with unblock")
+    elif banned.ban_counter == 1:
+        await banned.delete()
+    elif banned.forever:
+        await banned.update(ban_counter=banned.ban_counter - 1,
+                            ban_now=False,
+                            ban_end=None,
+                            forever=False)
+    else:
+        await banned.update(ban_counter=banned.ban_counter - 1,
+                            ban_now=False,
+                            ban_end=None)
 
     if banned_abs.photo_path:
         # banned_abs.photo_path - это словарь, копируем ВСЕ фото
@@ -67,7 +70,10 @@ async def unblock_advertisement(callback: CallbackQuery) -> None:
                 if old_photo_path:
                     # copy_file ожидает папку, а не полный путь к файлу
                     success = help_defs.copy_file(old_photo_path, new_photo_dir)
-                    if success and isinstance(success, str):
+                    if photo_store.is_blob(success):
+                        # Фото из хранилища не копируется: объявление ссылается на тот же файл
+                        copied_photos[photo_key] = success
+                    elif success and isinstance(success, str):
                         # Переименовываем файл в правильное имя
                         new_photo_path = f'{new_photo_dir}{photo_key}.jpg'
                         if success != new_photo_path:
@@ -80,7 +86,9 @@ async def unblock_advertisement(callback: CallbackQuery) -> None:
         else:
             # Если это не словарь, копируем как одно фото
             success = help_defs.copy_file(banned_abs.photo_path, new_photo_dir)
-            if success and isinstance(success, str):
+            if photo_store.is_blob(success):
+                copied_photos['0'] = success
+            elif success and isinstance(success, str):
                 # Переименовываем в 0.jpg
                 new_photo_path = f'{new_photo_dir}0.jpg'
                 if success != new_photo_path:
@@ -89,6 +97,10 @@ async def unblock_advertisement(callback: CallbackQuery) -> None:
                 copied_photos['0'] = success
                 logger.info(f"[UNBLOCK] Copied single photo: {success}")
         
+        # Все фото взяты из хранилища - папка не понадобилась
+        if os.path.isdir(new_photo_dir) and not os.listdir(new_photo_dir):
+            os.rmdir(new_photo_dir)
+
         photo_path = copied_photos if copied_photos else None
         logger.info(f"[UNBLOCK] Final copied_photos: {photo_path}")
     else:
@@ -126,7 +138,7 @@ async def unblock_advertisement(callback: CallbackQuery) -> None:
     advertisements = await Abs.get_all_by_customer(customer_id=customer.id)
     advertisement = advertisements[-1]
 
-    text = help_defs.read_text_file(text_path)
+    text = await help_defs.read_ad_text(text_path)
 
     # Подготавливаем текст для рассылки (новый функционал)
     work_type = await WorkType.get_work_type(id=advertisement.work_type_id)
@@ -174,7 +186,11 @@ async def unblock_advertisement(callback: CallbackQuery) -> None:
     
     # Отправляем уведомление заказчику с информацией об оставшихся объявлениях
     remaining_ads = customer.abs_count - 1  # -1 потому что мы только что уменьшили счетчик
-    if remaining_ads > 0:
+    if was_review:
+        notification_text = (f'Ваше объявление прошло проверку и опубликовано\n\n'
+                             f'Осталось объявлений сегодня: {max(remaining_ads, 0)}\n'
+                             f'Вызовите команду /menu чтобы продолжить работу')
+    elif remaining_ads > 0:
         notification_text = (f'Вы были разблокированы, приносим извинения за предоставленные неудобства.\n'
                            f'Объявление было опубликовано\n\n'
                            f'Осталось объявлений сегодня: {remaining_ads}\n'
@@ -2,13 +2,14 @@ import logging
 
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, FSInputFile, Message
+from aiogram.types import CallbackQuery, Message
 
 # Импорт вспомогательных модулей и компонентов из приложения
 from app.data.database.models import Customer, Worker, City
 from app.keyboards import KeyboardCollection
 from app.states import AdminStates
 from app.untils import help_defs
+from app.untils.outbound_queue import outbound_queue
 from loaders import bot
 
 router = Router()
@@ -16,6 +17,17 @@ router.message.filter(F.from_user.id != F.bot.id)
 logger = logging.getLogger()
 
 
+async def broadcast(tg_ids: list[int], text: str, photo: str = None) -> None:
+    """Ставит рассылку в очередь исходящих сообщений, каждому tg_id - одно сообщение. photo - file_id"""
+    tg_ids = list(dict.fromkeys(tg_ids))
+    if photo:
+        messages = [outbound_queue.build('send_photo', tg_id, photo=photo, caption=text) for tg_id in tg_ids]
+    else:
+        messages = [outbound_queue.build('send_message', tg_id, text=text) for tg_id in tg_ids]
+    await outbound_queue.enqueue(messages)
+    logger.info(f'broadcast: в очередь поставлено {len(messages)} сообщений')
+
+
 @router.callback_query(F.data == 'msg_to_worker', AdminStates.menu)
 async def msg_to_worker(callback: CallbackQuery, state: FSMContext) -> None:
     logger.debug(f'msg_to_worker...')
@@ -55,12 +67,7 @@ async def msg_to_worker_skip(callback: CallbackQuery, state: FSMContext) -> None
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
     workers = await Worker.get_all()
-    if workers:
-        for worker in workers:
-            try:
-                await bot.send_message(chat_id=worker.tg_id, text=message_to_worker)
-            except Exception:
-                pass
+    await broadcast([worker.tg_id for worker in workers or []], text=message_to_worker)
 
     await bot.delete_message(chat_id=callback.message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -81,20 +88,8 @@ async def msg_to_worker_photo(message: Message, state: FSMContext) -> None:
     await bot.delete_message(chat_id=message.from_user.id, message_id=msg)
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
     workers = await Worker.get_all()
-    if workers:
-        for worker in workers:
-            try:
-                await bot.send_photo(chat_id=worker.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_worker)
-            except Exception:
-                pass
-
-    help_defs.delete_file(file_path_photo)
+    await broadcast([worker.tg_id for worker in workers or []], text=message_to_worker, photo=photo)
 
     await bot.delete_message(chat_id=message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -138,13 +133,8 @@ async def msg_to_customer_skip(callback: CallbackQuery, state: FSMContext) -> No
 
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
-    customer = await Customer.get_all()
-    if customer:
-        for customer in customer:
-            try:
-                await bot.send_message(chat_id=customer.tg_id, text=message_to_customer)
-            except Exception:
-                pass
+    customers = await Customer.get_all()
+    await broadcast([customer.tg_id for customer in customers or []], text=message_to_customer)
 
     await bot.delete_message(chat_id=callback.message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -165,20 +155,8 @@ async def msg_to_customer_photo(message: Message, state: FSMContext) -> None:
     await bot.delete_message(chat_id=message.from_user.id, message_id=msg)
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
     customers = await Customer.get_all()
-    if customers:
-        for customer in customers:
-            try:
-                await bot.send_photo(chat_id=customer.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_customer)
-            except Exception:
-                pass
-
-    help_defs.delete_file(file_path_photo)
+    await broadcast([customer.tg_id for customer in customers or []], text=message_to_customer, photo=photo)
 
     await bot.delete_message(chat_id=message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -222,25 +200,10 @@ async def msg_to_all_skip(callback: CallbackQuery, state: FSMContext) -> None:
 
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
-    user_send = []
-
-    customer = await Customer.get_all()
-    if customer:
-        for customer in customer:
-            try:
-                await bot.send_message(chat_id=customer.tg_id, text=message_to_all)
-                user_send.append(customer.tg_id)
-            except Exception:
-                pass
-
+    customers = await Customer.get_all()
     workers = await Worker.get_all()
-    if workers:
-        for worker in workers:
-            if worker.tg_id not in user_send:
-                try:
-                    await bot.send_message(chat_id=worker.tg_id, text=message_to_all)
-                except Exception:
-                    pass
+    # Пользователь с обеими ролями получит сообщение один раз
+    await broadcast([user.tg_id for user in (customers or []) + (workers or [])], text=message_to_all)
 
     await bot.delete_message(chat_id=callback.message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -263,33 +226,10 @@ async def msg_to_all_photo(message: Message, state: FSMContext) -> None:
         pass
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
-    user_send = []
-
     customers = await Customer.get_all()
-    if customers:
-        for customer in customers:
-            try:
-                await bot.send_photo(chat_id=customer.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_all)
-                user_send.append(customer.tg_id)
-            except Exception:
-                pass
-
     workers = await Worker.get_all()
-    if workers:
-        for worker in workers:
-            try:
-                if worker.tg_id not in user_send:
-                    await bot.send_photo(chat_id=worker.tg_id, photo=FSInputFile(file_path_photo),
-                                         caption=message_to_all)
-            except Exception:
-                pass
-
-    help_defs.delete_file(file_path_photo)
+    # Пользователь с обеими ролями получит сообщение один раз
+    await broadcast([user.tg_id for user in (customers or []) + (workers or [])], text=message_to_all, photo=photo)
 
     await bot.delete_message(chat_id=message.chat.id, message_id=msg.message_id)
     await state.set_state(AdminStates.menu)
@@ -391,12 +331,7 @@ async def msg_to_worker_skip(callback: CallbackQuery, state: FSMContext) -> None
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
     workers = await Worker.get_all_in_city(city_id=city_id)
-    if workers:
-        for worker in workers:
-            try:
-                await bot.send_message(chat_id=worker.tg_id, text=message_to_worker)
-            except Exception:
-                pass
+    await broadcast([worker.tg_id for worker in workers or []], text=message_to_worker)
 
     city = await City.get_city(id=city_id)
 
@@ -421,20 +356,8 @@ async def msg_to_worker_photo(message: Message, state: FSMContext) -> None:
     await bot.delete_message(chat_id=message.сhat.id, message_id=msg)
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
     workers = await Worker.get_all_in_city(city_id=city_id)
-    if workers:
-        for worker in workers:
-            try:
-                await bot.send_photo(chat_id=worker.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_worker)
-            except Exception:
-                pass
-
-    help_defs.delete_file(file_path_photo)
+    await broadcast([worker.tg_id for worker in workers or []], text=message_to_worker, photo=photo)
 
     city = await City.get_city(id=city_id)
 
@@ -538,12 +461,7 @@ async def msg_to_customer_skip(callback: CallbackQuery, state: FSMContext) -> No
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
     customers = await Customer.get_all_in_city(city_id=city_id)
-    if customers:
-        for customer in customers:
-            try:
-                await bot.send_message(chat_id=customer.tg_id, text=message_to_customer)
-            except Exception:
-                pass
+    await broadcast([customer.tg_id for customer in customers or []], text=message_to_customer)
 
     city = await City.get_city(id=city_id)
 
@@ -568,20 +486,8 @@ async def msg_to_customer_photo(message: Message, state: FSMContext) -> None:
     await bot.delete_message(chat_id=message.сhat.id, message_id=msg)
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
     customers = await Customer.get_all_in_city(city_id=city_id)
-    if customers:
-        for customer in customers:
-            try:
-                await bot.send_photo(chat_id=customer.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_customer)
-            except Exception:
-                pass
-
-    help_defs.delete_file(file_path_photo)
+    await broadcast([customer.tg_id for customer in customers or []], text=message_to_customer, photo=photo)
     city = await City.get_city(id=city_id)
 
     await bot.delete_message(chat_id=message.chat.id, message_id=msg.message_id)
@@ -683,25 +589,10 @@ async def msg_to_all_skip(callback: CallbackQuery, state: FSMContext) -> None:
 
     msg = await callback.message.edit_text('Подождите, идет отправка')
 
-    user_send = []
-
-    customer = await Customer.get_all_in_city(city_id=city_id)
-    if customer:
-        for customer in customer:
-            try:
-                await bot.send_message(chat_id=customer.tg_id, text=message_to_all)
-                user_send.append(customer.tg_id)
-            except Exception:
-                pass
-
+    customers = await Customer.get_all_in_city(city_id=city_id)
     workers = await Worker.get_all_in_city(city_id=city_id)
-    if workers:
-        for worker in workers:
-            try:
-                if worker.tg_id not in user_send:
-                    await bot.send_message(chat_id=worker.tg_id, text=message_to_all)
-            except Exception:
-                pass
+    # Пользователь с обеими ролями получит сообщение один раз
+    await broadcast([user.tg_id for user in (customers or []) + (workers or [])], text=message_to_all)
 
     city = await City.get_city(id=city_id)
 
@@ -726,33 +617,10 @@ async def msg_to_all_photo(message: Message, state: FSMContext) -> None:
     await bot.delete_message(chat_id=message.from_user.id, message_id=msg)
     msg = await message.answer('Подождите, идет отправка')
 
-    file_path_photo = await help_defs.save_photo(id=message.from_user.id,
-                                                 path='app/data/database/abs_from_admin_photo/')
-    await bot.download(file=photo, destination=file_path_photo)
-
-    user_send = []
-
     customers = await Customer.get_all_in_city(city_id=city_id)
-    if customers:
-        for customer in customers:
-            try:
-                await bot.send_photo(chat_id=customer.tg_id, photo=FSInputFile(file_path_photo),
-                                     caption=message_to_all)
-                user_send.append(customer.tg_id)
-            except Exception:
-                pass
-
     workers = await Worker.get_all_in_city(city_id=city_id)
-    if workers:
-        for worker in workers:
-            try:
-                if worker.tg_id not in user_send:
-                    await bot.send_photo(chat_id=worker.tg_id, photo=FSInputFile(file_path_photo),
-                                         caption=message_to_all)
-            except Exception:
-                pass
-
-    help_defs.delete_file(file_path_photo)
+    # Пользователь с обеими ролями получит сообщение один раз
+    await broadcast([user.tg_id for user in (customers or []) + (workers or [])], text=message_to_all, photo=photo)
 
     city = await City.get_city(id=city_id)
 
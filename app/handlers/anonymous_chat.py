@@ -1693,7 +1693,7 @@ async def view_my_response(callback: CallbackQuery, state: FSMContext):
         # Формируем текст
         from app.untils import help_defs
         text = f"📋 **Объявление #{abs_id}**\n\n"
-        text += help_defs.read_text_file(advertisement.text_path)
+        text += await help_defs.read_ad_text(advertisement.text_path)
         text += "\n\n" + "=" * 30 + "\n\n"
         
         # Показываем историю переписки
@@ -2374,8 +2374,8 @@ async def confirm_token_purchase(callback: CallbackQuery, state: FSMContext):
         # Сейчас - заглушка для демонстрации атомарности
 
         # Атомарное списание и обновление
-        import aiosqlite
-        conn = await aiosqlite.connect('app/data/database/database.db')
+        from app.data.database.connection_pool import db_pool
+        conn = await db_pool.writer()
         try:
             if tokens == -1:
                 # Безлимит
@@ -2395,6 +2395,9 @@ async def confirm_token_purchase(callback: CallbackQuery, state: FSMContext):
                 )
 
             await conn.commit()
+            # Соединение для записи возвращаем сразу: дальше идут вызовы моделей,
+            # которым оно тоже понадобится
+            await conn.close()
 
             kbc = KeyboardCollection()
 
@@ -2486,7 +2489,7 @@ async def confirm_token_purchase(callback: CallbackQuery, state: FSMContext):
             await state.set_state(WorkStates.worker_menu)
 
         except Exception as e:
-            await conn.rollback()
+            # Незакоммиченные изменения откатываются при возврате соединения в пул
             logger.error(f"Error in atomic purchase: {e}")
             await callback.answer("❌ Ошибка при обработке платежа", show_alert=True)
         finally:
@@ -2623,7 +2626,7 @@ async def navigate_photo_worker_response(callback: CallbackQuery, state: FSMCont
     # Формируем текст (используем тот же текст что и в view_my_response)
     from app.untils import help_defs
     text = f"📋 **Объявление #{abs_id}**\n\n"
-    text += help_defs.read_text_file(advertisement.text_path)
+    text += await help_defs.read_ad_text(advertisement.text_path)
     text += "\n\n" + "=" * 30 + "\n\n"
     
     if has_contacts:
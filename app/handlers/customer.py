@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 
 from pydantic_core import ValidationError
 from aiogram import Router, F
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import StateFilter
 from aiogram.types import CallbackQuery, Message, FSInputFile, LabeledPrice, PreCheckoutQuery, InputMediaPhoto, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -13,11 +13,16 @@ from aiogram.fsm.context import FSMContext
 import config
 import loaders
 from app.data.database.models import Customer, Worker, City, Banned, WorkType, Abs, \
-    WorkerAndSubscription, WorkersAndAbs, Admin, BannedAbs, WorkerAndBadResponse, WorkerAndReport, ContactExchange
+    WorkerAndSubscription, WorkersAndAbs, Admin, BannedAbs, WorkerAndBadResponse, WorkerAndReport, ContactExchange, \
+    AdText
+from app.data.database.routing_index import routing_index
 from app.keyboards import KeyboardCollection
 from app.states import UserStates, CustomerStates, BannedStates
 from app.untils import help_defs, checks, yandex_ocr
-from app.untils.customer_proces import ban_task, same_task, close_task
+from app.untils.customer_proces import ban_task, review_task, same_task, close_task
+from app.untils.image_pipeline import image_pipeline
+from app.untils.moderation import moderation
+from app.untils.outbound_queue import outbound_queue
 from loaders import bot
 
 router = Router()
@@ -580,9 +585,9 @@ async def create_new_abs_back(callback: CallbackQuery, state: FSMContext) -> Non
 
 async def get_customer_ads_optimized(customer_id: int):
     """Оптимизированное получение всех данных объявлений заказчика одним запросом"""
-    import aiosqlite
+    from app.data.database.connection_pool import db_pool
     
-    conn = await aiosqlite.connect(database='app/data/database/database.db')
+    conn = await db_pool.reader()
     try:
         cursor = await conn.execute('''
             SELECT 
@@ -650,7 +655,7 @@ async def my_abs(callback: CallbackQuery, state: FSMContext) -> None:
     # Используем данные из оптимизированного запроса
     city_name = abs_now['city_name']
     
-    text = help_defs.read_text_file(abs_now['text_path'])
+    text = await help_defs.read_ad_text(abs_now['text_path'])
 
 
     text = f'Объявление {abs_now["id"]} г. {city_name}\n\n' + text + f'\n\nПросмотров: {abs_now["views"]}'
@@ -777,7 +782,7 @@ async def check_abs(callback: CallbackQuery, state: FSMContext) -> None:
 
     city_name = abs_now['city_name']
 
-    text = help_defs.read_text_file(abs_now['text_path'])
+    text = await help_defs.read_ad_text(abs_now['text_path'])
 
 
     text = f'Объявление {abs_now["id"]} г. {city_name}\n\n' + text + f'\n\nПросмотров: {abs_now["views"]}'
@@ -922,7 +927,7 @@ async def check_abs(callback: CallbackQuery, state: FSMContext) -> None:
 
     city_name = abs_now['city_name']
 
-    text = help_defs.read_text_file(abs_now['text_path'])
+    text = await help_defs.read_ad_text(abs_now['text_path'])
 
 
     text = f'Объявление {abs_now["id"]} г. {city_name}\n\n' + text + f'\n\nПросмотров: {abs_now["views"]}'
@@ -1651,7 +1656,13 @@ async def create_abs_no_photo(callback: CallbackQuery, state: FSMContext) -> Non
     time = str(state_data.get('time'))
 
     all_text = f'{task}'
-    if ban_reason := await checks.fool_check(text=all_text):
+    verdict = await moderation.check_text(all_text, check_phone=True)
+    if verdict.review:
+        await review_task(message=callback.message, work_type_id=work_type_id, task=task, time=time, msg=msg)
+        await state.set_state(CustomerStates.customer_menu)
+        return
+
+    if ban_reason := verdict.ban_reason:
         await ban_task(message=callback.message, work_type_id=work_type_id, task=task, time=time, ban_reason=ban_reason,
                        msg=msg)
         await state.set_state(BannedStates.banned)
@@ -1660,7 +1671,7 @@ async def create_abs_no_photo(callback: CallbackQuery, state: FSMContext) -> Non
     work_type = await WorkType.get_work_type(id=int(work_type_id))
     work = work_type.work_type.capitalize()
 
-    if checks.phone_finder(all_text):
+    if verdict.has_phone:
         await state.set_state(CustomerStates.customer_menu)
         await callback.message.answer(
             'Упс, похоже вы указали номер телефона, вернитесь в меню и создайте объявление заново 🤔',
@@ -1692,17 +1703,14 @@ async def create_abs_no_photo(callback: CallbackQuery, state: FSMContext) -> Non
     customer = await Customer.get_customer(tg_id=callback.message.chat.id)
     city = await City.get_city(id=customer.city_id)
 
-    # Проверяем только объявления текущего заказчика на дубликаты
-    customer_advertisements = await Abs.get_all_by_customer(customer.id)
-
-    if customer_advertisements:
-        if await same_task(message=callback.message, advertisements=customer_advertisements, text=text):
-            await state.set_state(CustomerStates.customer_menu)
-            return
+    if await same_task(message=callback.message, customer_id=customer.id, city_id=city.id,
+                       work_type_id=work_type_id, text=text):
+        await state.set_state(CustomerStates.customer_menu)
+        return
 
     logger.debug('win')
 
-    file_path = help_defs.create_file_in_directory_with_timestamp(id=callback.message.chat.id, text=text)
+    text_path = await AdText.save(text)
 
     if time == 'В ближайшее время':
         # 12 часов = 0.5 дня
@@ -1723,7 +1731,7 @@ async def create_abs_no_photo(callback: CallbackQuery, state: FSMContext) -> Non
         work_type_id=int(work_type_id),
         city_id=city.id,
         photo_path=None,
-        text_path=file_path,
+        text_path=text_path,
         date_to_delite=datetime.today() + timedelta(days=delta),
         count_photo=0
     )
@@ -1807,6 +1815,7 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
     msg = await callback.message.answer(text='Подождите идет проверка')
 
     text_photo_bool = False
+    text_photo_review = False
 
     photos = {}
     photos_len = len(album)
@@ -1822,16 +1831,24 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
 
         file_path_photo = f'{file_path}{i}.jpg'
         await bot.download(file=file_id, destination=file_path_photo)
-        text_photo = yandex_ocr.analyze_file(file_path_photo)
-
-        if text_photo:
-            if await checks.fool_check(text=text_photo):
-                text_photo_bool = True
 
         print(file_path_photo)
 
         photos[str(i)] = file_path_photo
 
+    # Уменьшаем и пересжимаем фото вне цикла событий
+    await image_pipeline.process_many(list(photos.values()))
+
+    # Все фото распознаются одним запросом, тексты проверяются параллельно
+    texts_photo = await yandex_ocr.analyze_files(list(photos.values()))
+    photo_verdicts = await asyncio.gather(*(moderation.check_text(text_photo)
+                                            for text_photo in texts_photo if text_photo))
+    for photo_verdict in photo_verdicts:
+        if photo_verdict.ban_reason:
+            text_photo_bool = True
+        elif photo_verdict.review:
+            text_photo_review = True
+
     file_path_photo = None
 
     if text_photo_bool:
@@ -1849,8 +1866,7 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
 
         text = help_defs.escape_markdown(text=text)
 
-        file_path = help_defs.create_file_in_directory_with_timestamp(id=callback.message.chat.id, text=text,
-                                                                      path='app/data/banned/text/')
+        text_path = await AdText.save(text)
 
         banned_abs = BannedAbs(
             id=None,
@@ -1858,7 +1874,7 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
             work_type_id=int(work_type_id),
             city_id=customer.city_id,
             photo_path=photos,
-            text_path=file_path,
+            text_path=text_path,
             date_to_delite=datetime.today() + timedelta(days=30),
             photos_len=photos_len
         )
@@ -1908,7 +1924,14 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
 
     all_text = f'{task}'
 
-    if ban_reason := await checks.fool_check(text=all_text):
+    verdict = await moderation.check_text(all_text, check_phone=True)
+    if verdict.review or text_photo_review:
+        await review_task(message=callback.message, work_type_id=work_type_id, task=task, time=time, msg=msg,
+                          photos=photos, photos_len=photos_len)
+        await state.set_state(CustomerStates.customer_menu)
+        return
+
+    if ban_reason := verdict.ban_reason:
         banned = await Banned.get_banned(tg_id=callback.message.chat.id)
         ban_end = str(datetime.now() + timedelta(hours=24))
         if file_path_photo:
@@ -1925,8 +1948,7 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
 
         text = help_defs.escape_markdown(text=text)
 
-        file_path = help_defs.create_file_in_directory_with_timestamp(id=callback.message.chat.id, text=text,
-                                                                      path='app/data/banned/text/')
+        text_path = await AdText.save(text)
         # Удаляем этот блок кода, так как photo всегда None в этой функции
         # и скачивание None файла вызывает ошибку
 
@@ -1936,7 +1958,7 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
             work_type_id=int(work_type_id),
             city_id=customer.city_id,
             photo_path=photos,
-            text_path=file_path,
+            text_path=text_path,
             date_to_delite=datetime.today() + timedelta(days=10),
             photos_len=photos_len
         )
@@ -1988,7 +2010,7 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
 
     await bot.delete_message(chat_id=callback.message.chat.id, message_id=msg.message_id)
 
-    if checks.phone_finder(all_text):
+    if verdict.has_phone:
         await state.set_state(CustomerStates.customer_menu)
         await callback.message.answer(
             'Упс, похоже вы указали номер телефона, вернитесь в меню и создайте объявление заново 🤔',
@@ -2024,20 +2046,14 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
     customer = await Customer.get_customer(tg_id=callback.message.chat.id)
     city = await City.get_city(id=customer.city_id)
 
-    advertisements_customer = await Abs.get_all_by_customer(customer_id=customer.id)
-
-    if advertisements_customer:
-        old_text = help_defs.read_text_file(advertisements_customer[-1].text_path) if advertisements_customer[-1].text_path else "Текст не найден"
-        if await checks.are_texts_similar(old_text, text):
-            await callback.message.answer(
-                'Вы предлагали схожий запрос, удалите предыдущий и попробуйте снова',
-                reply_markup=kbc.menu_btn())
-            await state.set_state(CustomerStates.customer_menu)
-            help_defs.delete_file(file_path_photo)
-            return
+    if await same_task(message=callback.message, customer_id=customer.id, city_id=city.id,
+                       work_type_id=work_type_id, text=text):
+        await state.set_state(CustomerStates.customer_menu)
+        help_defs.delete_file(file_path_photo)
+        return
 
     text = help_defs.escape_markdown(text=text)
-    file_path = help_defs.create_file_in_directory_with_timestamp(id=callback.message.chat.id, text=text)
+    text_path = await AdText.save(text)
 
     if time == 'В ближайшее время':
         # 12 часов = 0.5 дня
@@ -2058,7 +2074,7 @@ async def create_abs_skip_photo(callback: CallbackQuery, state: FSMContext) -> N
         work_type_id=int(work_type_id),
         city_id=city.id,
         photo_path=photos,
-        text_path=file_path,
+        text_path=text_path,
         date_to_delite=datetime.today() + timedelta(days=delta),
         count_photo=photos_len
     )
@@ -2335,66 +2351,23 @@ async def create_abs_choose_time(callback: CallbackQuery, state: FSMContext) ->
 
 # Функции для оптимизированной рассылки объявлений
 
-async def send_single_message_to_worker(worker: Worker, advertisement_id: int, text: str, photo_path: dict = None, photos_len: int = 0, retry_count: int = 0):
-    """
-    Отправляет сообщение одному исполнителю с обработкой ошибок.
-    """
-    # Проверяем, не отправляли ли уже это сообщение этому исполнителю
-    message_key = f"{worker.tg_id}_{advertisement_id}"
-    if message_key in _sent_messages:
-        logger.warning(f'[DEBUG] Message already sent to worker {worker.tg_id} for advertisement {advertisement_id}, skipping')
-        return
-    
-    try:
-        kbc = KeyboardCollection()
-        
-        logger.info(f'[DEBUG] send_single_message_to_worker: worker_id={worker.tg_id}, advertisement_id={advertisement_id}, retry_count={retry_count}')
-        logger.info(f'[DEBUG] Photo check: photo_path={photo_path}, photos_len={photos_len}, has_key_0={"0" in photo_path if photo_path else False}')
-        
-        if photo_path and photos_len > 0 and '0' in photo_path:
-            logger.info(f'[DEBUG] Sending photo to worker {worker.tg_id}')
-            await bot.send_photo(
-                chat_id=worker.tg_id,
-                photo=FSInputFile(photo_path['0']),
-                caption=text,
-                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_id)
-            )
-        else:
-            logger.info(f'[DEBUG] Sending text message to worker {worker.tg_id}')
-            await bot.send_message(
-                chat_id=worker.tg_id,
-                text=text,
-                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_id)
-            )
-        
-        # Отмечаем сообщение как отправленное
-        _sent_messages.add(message_key)
-        logger.info(f'[DEBUG] Message sent successfully to worker {worker.tg_id} for advertisement {advertisement_id}')
-            
-    except TelegramForbiddenError:
-        # Пользователь заблокировал бота - помечаем как неактивного
-        logger.debug(f'Worker {worker.tg_id} blocked bot, marking as inactive')
+async def deactivate_blocked_worker(worker_tg_id: int) -> None:
+    """Исполнитель заблокировал бота - помечаем как неактивного (вызывается очередью отправки)"""
+    logger.debug(f'Worker {worker_tg_id} blocked bot, marking as inactive')
+    worker = await Worker.get_worker(tg_id=worker_tg_id)
+    if worker:
         await worker.update_active(False)
-    except TelegramRetryAfter as e:
-        # Rate limit - ждем указанное время, но ограничиваем количество попыток
-        if retry_count < 3:  # Максимум 3 попытки
-            logger.debug(f'Rate limit for worker {worker.tg_id}, waiting {e.retry_after} seconds (attempt {retry_count + 1}/3)')
-            await asyncio.sleep(e.retry_after)
-            # Повторяем отправку с увеличенным счетчиком
-            await send_single_message_to_worker(worker, advertisement_id, text, photo_path, photos_len, retry_count + 1)
-        else:
-            logger.error(f'Max retry attempts reached for worker {worker.tg_id}, skipping')
-    except Exception as e:
-        logger.error(f"Failed to send message to worker {worker.tg_id}: {e}")
 
 
-# Глобальные словари для отслеживания активных рассылок и отправленных сообщений
+outbound_queue.register_forbidden_handler('advertisement', deactivate_blocked_worker)
+
+# Глобальный набор для отслеживания активных рассылок
 _active_sends = set()
-_sent_messages = set()  # Отслеживаем уже отправленные сообщения
 
 async def send_to_workers_background(advertisement_id: int, city_id: int, work_type_id: int, text: str, photo_path: dict = None, photos_len: int = 0):
     """
-    Фоновая рассылка объявлений исполнителям с батчингом и обработкой ошибок.
+    Фоновая рассылка объявлений исполнителям через общую очередь исходящих сообщений.
+    Лимиты Telegram и повторы при ошибках соблюдает очередь.
     """
     # Проверяем, не запущена ли уже рассылка для этого объявления
     send_key = f"{advertisement_id}_{city_id}_{work_type_id}"
@@ -2410,69 +2383,47 @@ async def send_to_workers_background(advertisement_id: int, city_id: int, work_t
         logger.info(f'[DEBUG] Starting send_to_workers_background: city_id={city_id}, work_type_id={work_type_id}, advertisement_id={advertisement_id}')
         logger.info(f'[DEBUG] Photo params: photo_path={photo_path}, photos_len={photos_len}')
         
-        # Используем оптимизированный метод для получения исполнителей
-        workers = await Worker.get_active_workers_for_advertisement(city_id, work_type_id)
+        # Исполнители берутся из индекса в памяти, запрос к БД - только если индекс еще не построен
+        if routing_index.ready:
+            worker_ids = routing_index.get_tg_ids(city_id, work_type_id)
+        else:
+            workers = await Worker.get_active_workers_for_advertisement(city_id, work_type_id)
+            worker_ids = list(dict.fromkeys(worker.tg_id for worker in workers))
         
-        if not workers:
+        if not worker_ids:
             logger.info(f'[DEBUG] No active workers found for city {city_id} and work_type {work_type_id}')
             return
         
-        # ДЕДУПЛИКАЦИЯ: убираем дублирующих исполнителей
-        unique_workers = []
-        seen_worker_ids = set()
-        for worker in workers:
-            if worker.tg_id not in seen_worker_ids:
-                unique_workers.append(worker)
-                seen_worker_ids.add(worker.tg_id)
-            else:
-                logger.warning(f'[DEBUG] Duplicate worker found: {worker.tg_id}, skipping')
-        
-        workers = unique_workers
-        logger.info(f'[DEBUG] Found {len(workers)} unique workers for advertisement {advertisement_id} (removed {len(await Worker.get_active_workers_for_advertisement(city_id, work_type_id)) - len(workers)} duplicates)')
-        logger.info(f'[DEBUG] Starting background send to {len(workers)} workers for advertisement {advertisement_id}')
-        
-        # Логируем всех исполнителей
-        worker_ids = [worker.tg_id for worker in workers]
-        logger.info(f'[DEBUG] Worker IDs: {worker_ids}')
-        
-        # Отправляем по 5 сообщений в батче с паузой
-        batch_size = 5
-        for i in range(0, len(workers), batch_size):
-            batch = workers[i:i + batch_size]
-            batch_worker_ids = [worker.tg_id for worker in batch]
-            logger.info(f'[DEBUG] Processing batch {i//batch_size + 1}: workers {batch_worker_ids}')
-            
-            # Создаем задачи для параллельной отправки
-            tasks = [
-                send_single_message_to_worker(worker, advertisement_id, text, photo_path, photos_len)
-                for worker in batch
+        logger.info(f'[DEBUG] Queueing advertisement {advertisement_id} for {len(worker_ids)} workers: {worker_ids}')
+        
+        kbc = KeyboardCollection()
+        reply_markup = kbc.advertisement_response_buttons(abs_id=advertisement_id)
+        if photo_path and photos_len > 0 and '0' in photo_path:
+            messages = [
+                outbound_queue.build('send_photo', worker_tg_id, kind='advertisement',
+                                     photo_path=photo_path['0'], caption=text, reply_markup=reply_markup)
+                for worker_tg_id in worker_ids
             ]
-            
-            # Выполняем батч параллельно
-            await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Пауза между батчами для соблюдения rate limits
-            if i + batch_size < len(workers):
-                await asyncio.sleep(0.5)  # 500ms пауза
+        else:
+            messages = [
+                outbound_queue.build('send_message', worker_tg_id, kind='advertisement',
+                                     text=text, reply_markup=reply_markup)
+                for worker_tg_id in worker_ids
+            ]
+        await outbound_queue.enqueue(messages)
         
         # Обновляем счетчик просмотров один раз для всего объявления
         advertisement = await Abs.get_one(advertisement_id)
         if advertisement:
-            await advertisement.update(views=len(workers))
+            await advertisement.update(views=len(worker_ids))
         
-        logger.debug(f'Completed background send to workers for advertisement {advertisement_id}')
+        logger.debug(f'Queued background send to workers for advertisement {advertisement_id}')
         
     except Exception as e:
         logger.error(f"Error in background send to workers: {e}")
     finally:
         # Убираем из активных рассылок
         _active_sends.discard(send_key)
-        
-        # Очищаем старые записи об отправленных сообщениях для этого объявления
-        # (оставляем только записи для других объявлений)
-        global _sent_messages
-        _sent_messages = {key for key in _sent_messages if not key.endswith(f'_{advertisement_id}')}
-        logger.debug(f'[DEBUG] Cleaned up sent messages for advertisement {advertisement_id}')
 
 
 # Новые обработчики для системы покупки контактов
@@ -2512,7 +2463,7 @@ async def send_contacts_to_worker_from_request(callback: CallbackQuery, state: F
         await callback.answer("У исполнителя нет купленных контактов для получения ваших контактов", show_alert=True)
         
         # Уведомляем исполнителя о необходимости купить контакты
-        worker_message = f"Заказчик хочет отправить вам контакты, но у вас нет купленных контактов.\n\nОбъявление #{abs_id}\n{help_defs.read_text_file(advertisement.text_path) if advertisement.text_path else 'Текст не найден'}\n\nКупите контакты, чтобы получить контактные данные заказчика."
+        worker_message = f"Заказчик хочет отправить вам контакты, но у вас нет купленных контактов.\n\nОбъявление #{abs_id}\n{await help_defs.read_ad_text(advertisement.text_path) if advertisement.text_path else 'Текст не найден'}\n\nКупите контакты, чтобы получить контактные данные заказчика."
         
         try:
             await bot.send_message(
@@ -2722,7 +2673,7 @@ async def send_contacts_to_worker(callback: CallbackQuery, state: FSMContext) ->
         return
     
     # Отправляем уведомление исполнителю
-    text = f"Заказчик отправил свои контакты\n\nОбъявление #{abs_id}\n{help_defs.read_text_file(advertisement.text_path) if advertisement.text_path else 'Текст не найден'}"
+    text = f"Заказчик отправил свои контакты\n\nОбъявление #{abs_id}\n{await help_defs.read_ad_text(advertisement.text_path) if advertisement.text_path else 'Текст не найден'}"
     
     try:
         await bot.send_message(
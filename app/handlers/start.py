@@ -38,9 +38,9 @@ async def ping_cmd(message: Message) -> None:
 
 async def get_user_data_optimized(tg_id: int):
     """Оптимизированное получение всех данных пользователя одним запросом"""
-    import aiosqlite
+    from app.data.database.connection_pool import db_pool
 
-    conn = await aiosqlite.connect(database='app/data/database/database.db')
+    conn = await db_pool.reader()
     try:
         cursor = await conn.execute('''
                                     SELECT (SELECT id FROM ban_list WHERE tg_id = ? AND (ban_now = 1 OR forever = 1)) as banned_id,
@@ -1,4 +1,5 @@
 import os
+import asyncio
 from datetime import timedelta, datetime, date
 import logging
 from functools import lru_cache
@@ -38,8 +39,7 @@ async def update_worker_activity_fallback(worker, new_activity):
         await worker.update_activity_level(new_activity)
     else:
         # Fallback: обновляем напрямую через SQL
-        import aiosqlite
-        conn = await aiosqlite.connect('app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             cursor = await conn.execute(
                 'UPDATE workers SET activity_level = ? WHERE id = ?',
@@ -62,7 +62,8 @@ from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 
 import config
-import aiosqlite
+from app.data.database.connection_pool import db_pool
+from app.data.database.feed_cache import feed_cache
 from app.data.database.models import (
     Customer, Worker, City, SubscriptionType, WorkerAndSubscription, WorkType, Banned, Abs, WorkersAndAbs, Admin,
     WorkerAndRefsAssociation, WorkerAndReport, WorkerAndBadResponse, WorkerCitySubscription
@@ -70,6 +71,9 @@ from app.data.database.models import (
 from app.keyboards import KeyboardCollection
 from app.states import WorkStates, UserStates, BannedStates
 from app.untils import help_defs, checks, yandex_ocr
+from app.untils.image_pipeline import image_pipeline
+from app.untils.moderation import moderation
+from app.untils.outbound_queue import outbound_queue
 from loaders import bot
 
 router = Router()
@@ -391,7 +395,6 @@ async def show_worker_menu_for_message(message: Message, state: FSMContext, user
     
     # Получаем данные для профиля
     from app.data.database.models import WorkerRank, WorkerStatus, ContactExchange, WorkerCitySubscription
-    import aiosqlite
     
     # Получаем подписку
     worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=user_worker.id)
@@ -421,15 +424,7 @@ async def show_worker_menu_for_message(message: Message, state: FSMContext, user
     main_city = await City.get_city(id=user_worker.city_id[0])
     
     # Получаем ВСЕ подписки (активные и неактивные) для подсчета купленных городов
-    conn = await aiosqlite.connect(database='app/data/database/database.db')
-    try:
-        cursor = await conn.execute(
-            'SELECT city_ids, active, price FROM worker_city_subscriptions WHERE worker_id = ?',
-            [user_worker.id])
-        all_subscriptions = await cursor.fetchall()
-        await cursor.close()
-    finally:
-        await conn.close()
+    all_subscriptions = await WorkerCitySubscription.get_all_by_worker(user_worker.id)
     
     # Подсчитываем купленные и выбранные города
     total_purchased_cities = 1  # Основной город
@@ -438,20 +433,14 @@ async def show_worker_menu_for_message(message: Message, state: FSMContext, user
     # Словарь соответствия цены и количества купленных городов
     prices = {90: 1, 180: 2, 270: 3, 360: 4, 450: 5, 900: 10, 1800: 20}
     
-    for sub_data in all_subscriptions:
-        city_ids_str = sub_data[0]
-        is_active = bool(sub_data[1])
-        price = sub_data[2]
-        
+    for subscription in all_subscriptions:
         # Определяем КУПЛЕННОЕ количество городов по цене
-        purchased_count = prices.get(price, 1)
+        purchased_count = prices.get(subscription.price, 1)
         total_purchased_cities += purchased_count
         
         # Определяем ВЫБРАННОЕ количество городов
-        if city_ids_str:
-            selected_count = len(city_ids_str.split('|'))
-            if is_active:
-                total_selected_cities += selected_count
+        if subscription.city_ids and subscription.active:
+            total_selected_cities += len(subscription.city_ids)
     
     if total_selected_cities == 1:
         city_text = f"Ваш город: {main_city.city}"
@@ -534,7 +523,6 @@ async def show_worker_menu(callback: CallbackQuery, state: FSMContext, user_work
     
     # Получаем данные для профиля
     from app.data.database.models import WorkerRank, WorkerStatus, ContactExchange, WorkerCitySubscription
-    import aiosqlite
     
     # Получаем подписку
     worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=user_worker.id)
@@ -564,15 +552,7 @@ async def show_worker_menu(callback: CallbackQuery, state: FSMContext, user_work
     main_city = await City.get_city(id=user_worker.city_id[0])
     
     # Получаем ВСЕ подписки (активные и неактивные) для подсчета купленных городов
-    conn = await aiosqlite.connect(database='app/data/database/database.db')
-    try:
-        cursor = await conn.execute(
-            'SELECT city_ids, active, price FROM worker_city_subscriptions WHERE worker_id = ?',
-            [user_worker.id])
-        all_subscriptions = await cursor.fetchall()
-        await cursor.close()
-    finally:
-        await conn.close()
+    all_subscriptions = await WorkerCitySubscription.get_all_by_worker(user_worker.id)
     
     # Подсчитываем купленные и выбранные города
     total_purchased_cities = 1  # Основной город
@@ -581,20 +561,14 @@ async def show_worker_menu(callback: CallbackQuery, state: FSMContext, user_work
     # Словарь соответствия цены и количества купленных городов
     prices = {90: 1, 180: 2, 270: 3, 360: 4, 450: 5, 900: 10, 1800: 20}
     
-    for sub_data in all_subscriptions:
-        city_ids_str = sub_data[0]
-        is_active = bool(sub_data[1])
-        price = sub_data[2]
-        
+    for subscription in all_subscriptions:
         # Определяем КУПЛЕННОЕ количество городов по цене
-        purchased_count = prices.get(price, 1)
+        purchased_count = prices.get(subscription.price, 1)
         total_purchased_cities += purchased_count
         
         # Определяем ВЫБРАННОЕ количество городов
-        if city_ids_str:
-            selected_count = len(city_ids_str.split('|'))
-            if is_active:
-                total_selected_cities += selected_count
+        if subscription.city_ids and subscription.active:
+            total_selected_cities += len(subscription.city_ids)
     
     if total_selected_cities == 1:
         city_text = f"Ваш город: {main_city.city}"
@@ -1057,21 +1031,26 @@ async def create_abs_no_photo(callback: CallbackQuery, state: FSMContext) -> Non
         )
         file_path_photo = os.path.join(portfolio_dir, filename)
         await bot.download(file=file_id, destination=file_path_photo)
-        text_photo = yandex_ocr.analyze_file(file_path_photo)
-
-        if text_photo:
-            if await checks.fool_check(text=text_photo):
-                await bot.delete_message(chat_id=callback.message.chat.id, message_id=msg.message_id)
-                await callback.message.answer(text='На фото содержится недопустимый текст!\nПопробуйте еще раз')
-                await state.clear()
-                await state.set_state(WorkStates.portfolio_upload_photo)
-                return
 
         print(file_path_photo)
 
         photos[str(new_key)] = file_path_photo
         logger.info(f"[PORTFOLIO_UPLOAD] Добавлено фото: ключ={new_key}, путь={file_path_photo}")
 
+    # Уменьшаем и пересжимаем фото вне цикла событий
+    await image_pipeline.process_many(list(photos.values()))
+
+    # Все фото распознаются одним запросом, тексты проверяются параллельно
+    texts_photo = await yandex_ocr.analyze_files(list(photos.values()))
+    verdicts = await asyncio.gather(*(moderation.check_text(text_photo) for text_photo in texts_photo if text_photo))
+    # Непроверенный текст (таймаут проверки) тоже не принимаем - пользователь повторит попытку
+    if any(verdict.ban_reason or verdict.review for verdict in verdicts):
+        await bot.delete_message(chat_id=callback.message.chat.id, message_id=msg.message_id)
+        await callback.message.answer(text='На фото содержится недопустимый текст!\nПопробуйте еще раз')
+        await state.clear()
+        await state.set_state(WorkStates.portfolio_upload_photo)
+        return
+
     # Объединяем портфолио правильно
     if worker.portfolio_photo:
         worker.portfolio_photo.update(photos)
@@ -1155,13 +1134,15 @@ async def process_photos(message: Message, state: FSMContext):
     photo = message.photo[-1].file_id
     file_path_photo = await help_defs.save_photo(id=message.from_user.id)
     await bot.download(file=photo, destination=file_path_photo)
+    await image_pipeline.process(file_path_photo)
 
     worker = await Worker.get_worker(tg_id=message.chat.id)
 
-    text_photo = yandex_ocr.analyze_file(file_path_photo)
+    text_photo = await yandex_ocr.analyze_file(file_path_photo)
     logger.info(f'{text_photo}')
     if text_photo:
-        if await checks.fool_check(text=text_photo):
+        verdict = await moderation.check_text(text_photo)
+        if verdict.ban_reason or verdict.review:
             is_photo = True if worker.profile_photo else False
             await message.answer(
                 text='Упс, похоже вы пытались прикрепить не соответствующее фото, повторите попытку снова 😌',
@@ -1182,7 +1163,7 @@ async def process_photos(message: Message, state: FSMContext):
 
     await bot.send_photo(chat_id=config.ADVERTISEMENT_LOG,
                          caption=f'ID #{message.chat.id}\nЗагружено новое фото профиля',
-                         photo=FSInputFile(file_path_photo),
+                         photo=FSInputFile(worker.profile_photo),
                          protect_content=False, reply_markup=kbc.delite_it_photo(worker_id=worker.id))
 
 
@@ -1216,7 +1197,8 @@ async def process_photos(message: Message, state: FSMContext):
 
     name = message.text
 
-    if await checks.fool_check(name):
+    verdict = await moderation.check_text(name)
+    if verdict.ban_reason or verdict.review:
         text = f'Упс, кажется Вы ввели не корректно свое имя, попробуйте пожалуйста еще раз.'
 
         msg = await message.answer(
@@ -1245,86 +1227,10 @@ async def abs_in_city(callback: CallbackQuery, state: FSMContext) -> None:
 
     worker = await Worker.get_worker(tg_id=callback.message.chat.id)
     worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
-    
-    # Получаем все города исполнителя (основной + дополнительные из подписок)
-    all_city_ids = list(worker.city_id)  # Основной город
-    
-    # Добавляем дополнительные города из активных подписок
-    from app.data.database.models import WorkerCitySubscription
-    city_subscriptions = await WorkerCitySubscription.get_active_by_worker(worker.id)
-    for subscription in city_subscriptions:
-        all_city_ids.extend(subscription.city_ids)
-    
-    # Убираем дубликаты
-    all_city_ids = list(set(all_city_ids))
-    
-    advertisements = []
-    for city_id in all_city_ids:
-        advertisements_temp = await Abs.get_all_in_city(city_id=city_id)
-        if advertisements_temp:
-            advertisements += advertisements_temp
-    
-    # Сортируем по ID (самые новые первыми, так как ID автоинкрементный)
-    advertisements.sort(key=lambda x: x.id, reverse=True)
-
-    bad_abs = []
 
-    worker_and_reports = await WorkerAndReport.get_by_worker(worker_id=worker.id)
-    worker_and_bad_responses = await WorkerAndBadResponse.get_by_worker(worker_id=worker.id)
-    worker_and_abs = await WorkersAndAbs.get_by_worker(worker_id=worker.id)
-
-    # Собираем ID объявлений, на которые исполнитель уже откликнулся или которые заблокированы
-    if worker_and_reports:
-        bad_abs += [worker_and_report.abs_id for worker_and_report in worker_and_reports]
-    if worker_and_bad_responses:
-        bad_abs += [worker_and_bad_response.abs_id for worker_and_bad_response in worker_and_bad_responses]
-    if worker_and_abs:
-        bad_abs += [response.abs_id for response in worker_and_abs]
-    
-    # Убираем дубликаты и преобразуем в set для быстрого поиска
-    bad_abs = set(bad_abs)
-    print(f"[ABS_FILTER] Worker {worker.id} bad_abs: {bad_abs}")
-
-    advertisements_final = []
+    advertisements, btn_next, _ = await get_filtered_advertisements_for_worker(worker, worker_sub)
 
     if not advertisements:
-        await callback.message.answer(text='Пока нет объявлений', reply_markup=kbc.menu())
-        try:
-            await callback.message.delete()
-        except TelegramBadRequest:
-            pass
-        await state.set_state(WorkStates.worker_menu)
-        return
-
-    for advertisement in advertisements:
-        customer = await Customer.get_customer(id=advertisement.customer_id)
-        if customer.tg_id == worker.tg_id:
-            print(f"[ABS_FILTER] Skipping own ad: {advertisement.id}")
-            continue
-        if advertisement.id in bad_abs:
-            print(f"[ABS_FILTER] Skipping already responded ad: {advertisement.id}")
-            continue
-        # Проверяем, подходит ли объявление по типу работы
-        # Если нет направлений и нет безлимитного доступа - пропускаем
-        if not worker_sub.work_type_ids and not worker_sub.unlimited_work_types:
-            continue
-            
-        is_unlimited = (worker_sub.unlimited_work_types or 
-                       (len(worker_sub.work_type_ids) == 1 and worker_sub.work_type_ids[0] == '0'))
-        
-        if is_unlimited or (worker_sub.work_type_ids and str(advertisement.work_type_id) in worker_sub.work_type_ids):
-                if advertisement.relevance:
-                    advertisements_final.append(advertisement)
-        elif worker_sub.unlimited_work_types:
-            logger.debug(f'worker_sub.unlimited_work_types')
-            if advertisement.relevance:
-                advertisements_final.append(advertisement)
-        else:
-            logger.debug(f'no one')
-
-    print(f"[ABS_FILTER] Total ads found: {len(advertisements)}, after filtering: {len(advertisements_final)}")
-    
-    if not advertisements_final:
         await callback.message.answer(text='По вашим выбранным направлениям, пока нет объявлений',
                                       reply_markup=kbc.menu())
         try:
@@ -1336,18 +1242,14 @@ async def abs_in_city(callback: CallbackQuery, state: FSMContext) -> None:
 
     await state.set_state(WorkStates.worker_check_abs)
 
-    abs_now: Abs = advertisements_final[0]
+    abs_now: Abs = advertisements[0]
     await abs_now.update(views=1)
-    if len(advertisements_final) > 1:
-        btn_next = True
-    else:
-        btn_next = False
 
     btn_back = False  # В первом объявлении кнопка "Назад" не нужна
 
     # Проверка на уже откликнутые объявления убрана - теперь используется новая система откликов
 
-    text = help_defs.read_text_file(abs_now.text_path)
+    text = await help_defs.read_ad_text(abs_now.text_path)
 
 
     text = f'Объявление {abs_now.id}\n\n' + text
@@ -1368,16 +1270,16 @@ async def abs_in_city(callback: CallbackQuery, state: FSMContext) -> None:
         
         if 'https' in abs_now.photo_path['0']:
             await callback.message.answer(text=text,
-                                          reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=0, count_photo=count_photo, photo_num=0))
+                                          reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0))
             return
         await callback.message.answer_photo(photo=FSInputFile(abs_now.photo_path['0']), caption=text,
-                                            reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=0, count_photo=count_photo, photo_num=0))
+                                            reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0))
         return
     try:
         await callback.message.delete()
     except TelegramBadRequest:
         pass
-    await callback.message.answer(text=text, reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=0))
+    await callback.message.answer(text=text, reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back))
 
 
 @router.callback_query(lambda c: c.data.startswith('go_worker_'), WorkStates.worker_check_abs)
@@ -1385,98 +1287,32 @@ async def check_abs_navigation(callback: CallbackQuery, state: FSMContext) -> No
     """Обработчик навигации между объявлениями для исполнителей"""
     logger.debug(f'check_abs_navigation...')
     kbc = KeyboardCollection()
-    abs_list_id = int(callback.data.split('_')[2])
+    # go_worker_next_{abs_id} - объявления старше abs_id, go_worker_back_{abs_id} - новее
+    parts = callback.data.split('_')
+    direction = parts[2] if len(parts) > 3 else None
+    anchor_id = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else None
 
     worker = await Worker.get_worker(tg_id=callback.message.chat.id)
     worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
-    
-    # Получаем все города исполнителя (основной + дополнительные из подписок)
-    all_city_ids = list(worker.city_id)  # Основной город
-    
-    # Добавляем дополнительные города из активных подписок
-    from app.data.database.models import WorkerCitySubscription
-    city_subscriptions = await WorkerCitySubscription.get_active_by_worker(worker.id)
-    for subscription in city_subscriptions:
-        all_city_ids.extend(subscription.city_ids)
-    
-    # Убираем дубликаты
-    all_city_ids = list(set(all_city_ids))
-    
-    advertisements = []
-    for city_id in all_city_ids:
-        advertisements_temp = await Abs.get_all_in_city(city_id=city_id)
-        if advertisements_temp:  # Проверяем, что не None
-            advertisements += advertisements_temp
-    
-    # Сортируем по дате создания (самые свежие первыми)
-    advertisements.sort(key=lambda x: x.id, reverse=True)
-
-    # Получаем списки скрытых объявлений и жалоб
-    from app.data.database.models import WorkerAndReport, WorkerAndBadResponse
-    worker_and_reports = await WorkerAndReport.get_by_worker(worker_id=worker.id)
-    worker_and_bad_responses = await WorkerAndBadResponse.get_by_worker(worker_id=worker.id)
-    worker_and_abs = await WorkersAndAbs.get_by_worker(worker_id=worker.id)
-
-    # Собираем ID объявлений, которые не должны показываться
-    bad_abs = []
-    if worker_and_reports:
-        bad_abs += [worker_and_report.abs_id for worker_and_report in worker_and_reports]
-    if worker_and_bad_responses:
-        bad_abs += [worker_and_bad_response.abs_id for worker_and_bad_response in worker_and_bad_responses]
-    if worker_and_abs:
-        bad_abs += [response.abs_id for response in worker_and_abs]
-    
-    # Убираем дубликаты и преобразуем в set для быстрого поиска
-    bad_abs = set(bad_abs)
-    print(f"[ABS_FILTER_NAV] Worker {worker.id} bad_abs: {bad_abs}")
 
-    advertisements_final = []
+    advertisements, btn_next, btn_back = await get_filtered_advertisements_for_worker(
+        worker, worker_sub,
+        before_id=anchor_id if direction == 'next' else None,
+        after_id=anchor_id if direction == 'back' else None)
+    if not advertisements and anchor_id is not None:
+        # В эту сторону объявлений не осталось (скрыты или удалены) - начинаем ленту сначала
+        advertisements, btn_next, btn_back = await get_filtered_advertisements_for_worker(worker, worker_sub)
 
     if not advertisements:
-        await callback.message.edit_text(text='У вас в городе пока нет объявлений', reply_markup=kbc.menu())
-        await state.set_state(WorkStates.worker_menu)
-        return
-
-    for advertisement in advertisements:
-        customer = await Customer.get_customer(id=advertisement.customer_id)
-        if customer.tg_id == worker.tg_id:
-            print(f"[ABS_FILTER_NAV] Skipping own ad: {advertisement.id}")
-            continue
-        if advertisement.id in bad_abs:
-            print(f"[ABS_FILTER_NAV] Skipping hidden/responded ad: {advertisement.id}")
-            continue
-        # Проверяем, подходит ли объявление по типу работы
-        # Если нет направлений и нет безлимитного доступа - пропускаем
-        if not worker_sub.work_type_ids and not worker_sub.unlimited_work_types:
-            continue
-            
-        is_unlimited = (worker_sub.unlimited_work_types or 
-                       (len(worker_sub.work_type_ids) == 1 and worker_sub.work_type_ids[0] == '0'))
-        
-        if is_unlimited or (worker_sub.work_type_ids and str(advertisement.work_type_id) in worker_sub.work_type_ids):
-            if advertisement.relevance:
-                advertisements_final.append(advertisement)
-
-    if not advertisements_final or abs_list_id >= len(advertisements_final):
         await callback.message.edit_text(text='Объявление не найдено', reply_markup=kbc.menu())
         await state.set_state(WorkStates.worker_menu)
         return
 
-    advertisement_now = advertisements_final[abs_list_id]
-
-    btn_next = True if (len(advertisements_final) - 1 > abs_list_id) else False
-    btn_back = True if abs_list_id > 0 else False
-
-    if await WorkersAndAbs.get_by_worker_and_abs(worker_id=worker.id, abs_id=advertisement_now.id):
-        btn_apply = False
-        report_btn = False
-    else:
-        btn_apply = True
-        report_btn = True
+    advertisement_now = advertisements[0]
 
     await advertisement_now.update(views=1)
 
-    text = help_defs.read_text_file(advertisement_now.text_path)
+    text = await help_defs.read_ad_text(advertisement_now.text_path)
     text = f'Объявление {advertisement_now.id}\n\n' + text
 
     # Парсим JSON строку photo_path для получения количества фото
@@ -1503,18 +1339,18 @@ async def check_abs_navigation(callback: CallbackQuery, state: FSMContext) -> No
                 await callback.message.answer_photo(
                     photo=advertisement_now.photo_path['0'],
                     caption=text,
-                    reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0)
+                    reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0)
                 )
             else:
                 await callback.message.answer_photo(
                     photo=FSInputFile(advertisement_now.photo_path['0']),
                     caption=text,
-                    reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0)
+                    reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0)
                 )
         else:
             await callback.message.answer(
                 text=text,
-                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0)
+                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0)
             )
         return
     
@@ -1526,259 +1362,29 @@ async def check_abs_navigation(callback: CallbackQuery, state: FSMContext) -> No
                 media=InputMediaPhoto(
                     media=advertisement_now.photo_path['0'],
                     caption=text),
-                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0)
+                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0)
             )
         else:
             await callback.message.edit_media(
                 media=InputMediaPhoto(
                     media=FSInputFile(advertisement_now.photo_path['0']),
                     caption=text),
-                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0)
+                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0)
             )
     else:
         # Текст к тексту
         await callback.message.edit_text(
             text=text,
-            reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0)
+            reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id, btn_next=btn_next, btn_back=btn_back, count_photo=count_photo, photo_num=0)
         )
 
 
-@router.callback_query(lambda c: c.data.startswith('go_'), WorkStates.worker_check_abs)
+@router.callback_query(lambda c: c.data.startswith('go_') or c.data.startswith('go-to-next_'),
+                       WorkStates.worker_check_abs)
 async def check_abs(callback: CallbackQuery, state: FSMContext) -> None:
+    """Кнопки старых сообщений, где объявления листались по номеру в списке: открываем ленту сначала"""
     logger.debug(f'check_abs...')
-    kbc = KeyboardCollection()
-    abs_list_id = int(callback.data.split('_')[1])
-
-    worker = await Worker.get_worker(tg_id=callback.message.chat.id)
-    worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
-    
-    # Получаем все города исполнителя (основной + дополнительные из подписок)
-    all_city_ids = list(worker.city_id)  # Основной город
-    
-    # Добавляем дополнительные города из активных подписок
-    from app.data.database.models import WorkerCitySubscription
-    city_subscriptions = await WorkerCitySubscription.get_active_by_worker(worker.id)
-    for subscription in city_subscriptions:
-        all_city_ids.extend(subscription.city_ids)
-    
-    # Убираем дубликаты
-    all_city_ids = list(set(all_city_ids))
-    
-    advertisements = []
-    for city_id in all_city_ids:
-        advertisements_temp = await Abs.get_all_in_city(city_id=city_id)
-        if advertisements_temp:  # Проверяем, что не None
-            advertisements += advertisements_temp
-    
-    # Сортируем по дате создания (самые свежие первыми)
-    advertisements.sort(key=lambda x: x.id, reverse=True)
-
-    advertisements_final = []
-
-    if not advertisements:
-        await callback.message.edit_text(text='У вас в городе пока нет объявлений', reply_markup=kbc.menu())
-        await state.set_state(WorkStates.worker_menu)
-        return
-
-    for advertisement in advertisements:
-        customer = await Customer.get_customer(id=advertisement.customer_id)
-        if customer.tg_id == worker.tg_id:
-            continue
-        # Проверяем, не откликался ли уже исполнитель на это объявление
-        if await WorkersAndAbs.get_by_worker_and_abs(worker_id=worker.id, abs_id=advertisement.id):
-            continue
-        # Проверяем, подходит ли объявление по типу работы
-        # Если нет направлений и нет безлимитного доступа - пропускаем
-        if not worker_sub.work_type_ids and not worker_sub.unlimited_work_types:
-            continue
-            
-        is_unlimited = (worker_sub.unlimited_work_types or 
-                       (len(worker_sub.work_type_ids) == 1 and worker_sub.work_type_ids[0] == '0'))
-        
-        if is_unlimited or (worker_sub.work_type_ids and advertisement.work_type_id in worker_sub.work_type_ids):
-            advertisements_final.append(advertisement)
-
-    if not advertisements_final:
-        await callback.message.edit_text(text='У вас в городе пока нет объявлений', reply_markup=kbc.menu())
-        await state.set_state(WorkStates.worker_menu)
-        return
-
-    abs_now = advertisements_final[abs_list_id]
-
-    if len(advertisements_final) - 1 > abs_list_id:
-        btn_next = True
-    else:
-        btn_next = False
-
-    if abs_list_id == 0:
-        btn_back = False
-    else:
-        btn_back = True
-
-    # Проверка на уже откликнутые объявления убрана - теперь используется новая система откликов
-
-    text = help_defs.read_text_file(abs_now.text_path)
-
-
-    text = f'Объявление {abs_now.id}\n\n' + text
-
-    # Парсим JSON строку photo_path для получения количества фото
-    import json
-    try:
-        photo_dict = json.loads(abs_now.photo_path) if isinstance(abs_now.photo_path, str) else abs_now.photo_path
-        count_photo = len(photo_dict) if isinstance(photo_dict, dict) else 0
-    except (json.JSONDecodeError, TypeError, AttributeError):
-        count_photo = 1
-
-    await abs_now.update(views=1)
-
-    if abs_now.photo_path:
-        try:
-            await callback.message.delete()
-        except TelegramBadRequest:
-            pass
-
-        if 'https' in abs_now.photo_path['0']:
-            await callback.message.answer_photo(photo=abs_now.photo_path['0'],
-                                               caption=text,
-                                               reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0))
-            return
-
-        await callback.message.answer_photo(photo=FSInputFile(abs_now.photo_path['0']),
-                                            caption=text,
-                                            reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0))
-        return
-    try:
-        await callback.message.delete()
-    except TelegramBadRequest:
-        pass
-    await callback.message.answer(text=text, reply_markup=kbc.advertisement_response_buttons(abs_id=abs_now.id, btn_next=btn_next, btn_back=btn_back, abs_list_id=abs_list_id, count_photo=count_photo, photo_num=0))
-
-
-@router.callback_query(lambda c: c.data.startswith('go-to-next_'), WorkStates.worker_check_abs)
-async def check_abs(callback: CallbackQuery, state: FSMContext) -> None:
-    logger.debug(f'check_abs...')
-    kbc = KeyboardCollection()
-
-    photo_id = int(callback.data.split('_')[1])
-    abs_list_id = int(callback.data.split('_')[2])
-
-    worker = await Worker.get_worker(tg_id=callback.message.chat.id)
-    worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
-    
-    # Получаем все города исполнителя (основной + дополнительные из подписок)
-    all_city_ids = list(worker.city_id)  # Основной город
-    
-    # Добавляем дополнительные города из активных подписок
-    from app.data.database.models import WorkerCitySubscription
-    city_subscriptions = await WorkerCitySubscription.get_active_by_worker(worker.id)
-    for subscription in city_subscriptions:
-        all_city_ids.extend(subscription.city_ids)
-    
-    # Убираем дубликаты
-    all_city_ids = list(set(all_city_ids))
-    
-    advertisements = []
-    for city_id in all_city_ids:
-        advertisements_temp = await Abs.get_all_in_city(city_id=city_id)
-        if advertisements_temp:  # Проверяем, что не None
-            advertisements += advertisements_temp
-    
-    # Сортируем по дате создания (самые свежие первыми)
-    advertisements.sort(key=lambda x: x.id, reverse=True)
-
-    # Получаем списки скрытых объявлений и жалоб
-    from app.data.database.models import WorkerAndReport, WorkerAndBadResponse
-    worker_and_reports = await WorkerAndReport.get_by_worker(worker_id=worker.id)
-    worker_and_bad_responses = await WorkerAndBadResponse.get_by_worker(worker_id=worker.id)
-    worker_and_abs = await WorkersAndAbs.get_by_worker(worker_id=worker.id)
-
-    # Собираем ID объявлений, которые не должны показываться
-    bad_abs = []
-    if worker_and_reports:
-        bad_abs += [worker_and_report.abs_id for worker_and_report in worker_and_reports]
-    if worker_and_bad_responses:
-        bad_abs += [worker_and_bad_response.abs_id for worker_and_bad_response in worker_and_bad_responses]
-    if worker_and_abs:
-        bad_abs += [response.abs_id for response in worker_and_abs]
-    
-    # Убираем дубликаты и преобразуем в set для быстрого поиска
-    bad_abs = set(bad_abs)
-    print(f"[ABS_FILTER_NEXT] Worker {worker.id} bad_abs: {bad_abs}")
-
-    advertisements_final = []
-
-    if not advertisements:
-        await callback.message.edit_text(text='У вас в городе пока нет объявлений', reply_markup=kbc.menu())
-        await state.set_state(WorkStates.worker_menu)
-        return
-
-    for advertisement in advertisements:
-        customer = await Customer.get_customer(id=advertisement.customer_id)
-        if customer.tg_id == worker.tg_id:
-            print(f"[ABS_FILTER_NEXT] Skipping own ad: {advertisement.id}")
-            continue
-        if advertisement.id in bad_abs:
-            print(f"[ABS_FILTER_NEXT] Skipping hidden/responded ad: {advertisement.id}")
-            continue
-        # Проверяем, подходит ли объявление по типу работы
-        # Если нет направлений и нет безлимитного доступа - пропускаем
-        if not worker_sub.work_type_ids and not worker_sub.unlimited_work_types:
-            continue
-            
-        is_unlimited = (worker_sub.unlimited_work_types or 
-                       (len(worker_sub.work_type_ids) == 1 and worker_sub.work_type_ids[0] == '0'))
-        
-        if is_unlimited or (worker_sub.work_type_ids and str(advertisement.work_type_id) in worker_sub.work_type_ids):
-            if advertisement.relevance:
-                advertisements_final.append(advertisement)
-
-    if not advertisements_final:
-        await callback.message.edit_text(text='У вас в городе пока нет объявлений', reply_markup=kbc.menu())
-        await state.set_state(WorkStates.worker_menu)
-        return
-
-    advertisement_now = advertisements_final[abs_list_id]
-
-    btn_next = True if (len(advertisements_final) - 1 > abs_list_id) else False
-
-    if abs_list_id == 0:
-        btn_back = False
-    else:
-        btn_back = True
-
-    if await WorkersAndAbs.get_by_worker_and_abs(worker_id=worker.id, abs_id=advertisement_now.id):
-        btn_apply = False
-        report_btn = False
-    else:
-        btn_apply = True
-        report_btn = True
-
-    await advertisement_now.update(views=1)
-
-    if photo_id <= -1:
-        photo_id = advertisement_now.count_photo - 1
-    elif photo_id > (advertisement_now.count_photo - 1):
-        photo_id = 0
-
-    if advertisement_now.photo_path:
-        photo_path = advertisement_now.photo_path[str(photo_id)]
-        
-        if 'https' in photo_path:
-            await callback.message.edit_media(
-                media=InputMediaPhoto(
-                    media=photo_path,
-                    caption=callback.message.caption),
-                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id)
-            )
-        else:
-            await callback.message.edit_media(
-                media=InputMediaPhoto(
-                    media=FSInputFile(photo_path),
-                    caption=callback.message.caption),
-                reply_markup=kbc.advertisement_response_buttons(abs_id=advertisement_now.id)
-            )
-        return
+    await abs_in_city(callback, state)
 
 
 @router.callback_query(lambda c: c.data.startswith('go-to-photo-worker_'), WorkStates.worker_check_abs)
@@ -1787,11 +1393,13 @@ async def navigate_photo_worker(callback: CallbackQuery, state: FSMContext) -> N
     logger.debug(f'navigate_photo_worker...')
     kbc = KeyboardCollection()
     
-    # Парсим данные: go-to-photo-worker_{photo_num}_{abs_id}_{abs_list_id}
+    # Парсим данные: go-to-photo-worker_{photo_num}_{abs_id}_{кнопки «Дальше» и «Назад»: 1/0}
     parts = callback.data.split('_')
     photo_num = int(parts[1])
     abs_id = int(parts[2])
-    abs_list_id = int(parts[3])
+    # Кнопки навигации по ленте остаются те же, что и под текущим объявлением
+    btn_next = parts[3][:1] == '1'
+    btn_back = parts[3][1:2] == '1'
     
     # Получаем объявление
     advertisement = await Abs.get_one(id=abs_id)
@@ -1816,67 +1424,6 @@ async def navigate_photo_worker(callback: CallbackQuery, state: FSMContext) -> N
     # Получаем путь к фото
     photo_path = advertisement.photo_path[str(photo_num)]
     
-    # Определяем кнопки навигации для объявлений
-    worker = await Worker.get_worker(tg_id=callback.message.chat.id)
-    worker_sub = await WorkerAndSubscription.get_by_worker(worker_id=worker.id)
-    
-    # Получаем все города исполнителя
-    all_city_ids = list(worker.city_id)
-    from app.data.database.models import WorkerCitySubscription
-    city_subscriptions = await WorkerCitySubscription.get_active_by_worker(worker.id)
-    for subscription in city_subscriptions:
-        all_city_ids.extend(subscription.city_ids)
-    all_city_ids = list(set(all_city_ids))
-    
-    # Получаем все объявления для определения навигации
-    advertisements = []
-    for city_id in all_city_ids:
-        advertisements_temp = await Abs.get_all_in_city(city_id=city_id)
-        if advertisements_temp:
-            advertisements += advertisements_temp
-    
-    advertisements.sort(key=lambda x: x.id, reverse=True)
-    
-    # Фильтруем объявления
-    from app.data.database.models import WorkerAndReport, WorkerAndBadResponse
-    worker_and_reports = await WorkerAndReport.get_by_worker(worker_id=worker.id)
-    worker_and_bad_responses = await WorkerAndBadResponse.get_by_worker(worker_id=worker.id)
-    worker_and_abs = await WorkersAndAbs.get_by_worker(worker_id=worker.id)
-    
-    bad_abs = []
-    if worker_and_reports:
-        bad_abs += [worker_and_report.abs_id for worker_and_report in worker_and_reports]
-    if worker_and_bad_responses:
-        bad_abs += [worker_and_bad_response.abs_id for worker_and_bad_response in worker_and_bad_responses]
-    if worker_and_abs:
-        bad_abs += [response.abs_id for response in worker_and_abs]
-    
-    bad_abs = set(bad_abs)
-    
-    advertisements_final = []
-    for ad in advertisements:
-        customer = await Customer.get_customer(id=ad.customer_id)
-        if customer.tg_id == worker.tg_id:
-            continue
-        if ad.id in bad_abs:
-            continue
-        if not worker_sub.work_type_ids and not worker_sub.unlimited_work_types:
-            continue
-            
-        is_unlimited = (worker_sub.unlimited_work_types or 
-                       (len(worker_sub.work_type_ids) == 1 and worker_sub.work_type_ids[0] == '0'))
-        
-        if is_unlimited or (worker_sub.work_type_ids and str(ad.work_type_id) in worker_sub.work_type_ids):
-            if ad.relevance:
-                advertisements_final.append(ad)
-        elif worker_sub.unlimited_work_types:
-            if ad.relevance:
-                advertisements_final.append(ad)
-    
-    # Определяем кнопки навигации
-    btn_next = abs_list_id < len(advertisements_final) - 1
-    btn_back = abs_list_id > 0
-    
     # Обновляем медиа
     if 'https' in photo_path:
         await callback.message.edit_media(
@@ -1887,7 +1434,6 @@ async def navigate_photo_worker(callback: CallbackQuery, state: FSMContext) -> N
                 abs_id=abs_id, 
                 btn_next=btn_next, 
                 btn_back=btn_back, 
-                abs_list_id=abs_list_id,
                 count_photo=count_photo,
                 photo_num=photo_num
             )
@@ -1901,7 +1447,6 @@ async def navigate_photo_worker(callback: CallbackQuery, state: FSMContext) -> N
                 abs_id=abs_id, 
                 btn_next=btn_next, 
                 btn_back=btn_back, 
-                abs_list_id=abs_list_id,
                 count_photo=count_photo,
                 photo_num=photo_num
             )
@@ -2085,74 +1630,36 @@ async def get_worker_selected_ids(worker_sub) -> list:
     return []
 
 
-async def get_filtered_advertisements_for_worker(worker, worker_sub):
+def get_feed_work_type_ids(worker_sub) -> list[int] | None:
+    """Направления исполнителя для ленты объявлений: None - все направления, пустой список - ни одного"""
+    work_type_ids = [str(id) for id in (worker_sub.work_type_ids or []) if id]
+    if worker_sub.unlimited_work_types or work_type_ids == ['0']:
+        return None
+    return [int(id) for id in work_type_ids if id.isdigit()]
+
+
+async def get_filtered_advertisements_for_worker(worker, worker_sub, before_id: int = None, after_id: int = None,
+                                                 limit: int = 1):
     """
-    Получить отфильтрованный список объявлений для исполнителя
+    Получить страницу ленты объявлений исполнителя: (объявления, есть ли дальше, есть ли назад)
     Исключает: собственные объявления, скрытые, жалобы, уже откликнутые
+    before_id / after_id - id объявления, от которого листаем дальше / назад
+    Лента считается один раз и листается по снимку из feed_cache
     """
-    # Получаем все города исполнителя (основной + дополнительные из подписок)
-    all_city_ids = list(worker.city_id)  # Основной город
-    
-    # Добавляем дополнительные города из активных подписок
-    from app.data.database.models import WorkerCitySubscription
-    city_subscriptions = await WorkerCitySubscription.get_active_by_worker(worker.id)
-    for subscription in city_subscriptions:
-        all_city_ids.extend(subscription.city_ids)
-    
-    # Убираем дубликаты
-    all_city_ids = list(set(all_city_ids))
-    
-    advertisements = []
-    for city_id in all_city_ids:
-        advertisements_temp = await Abs.get_all_in_city(city_id=city_id)
-        if advertisements_temp:  # Проверяем, что не None
-            advertisements += advertisements_temp
-    
-    # Сортируем по дате создания (самые свежие первыми)
-    advertisements.sort(key=lambda x: x.id, reverse=True)
+    snapshot = feed_cache.get(worker.id)
+    if snapshot is None:
+        ad_ids = await Abs.get_feed_ids(worker_id=worker.id, work_type_ids=get_feed_work_type_ids(worker_sub))
+        snapshot = feed_cache.put(worker.id, ad_ids)
 
-    # Получаем списки скрытых объявлений и жалоб
-    from app.data.database.models import WorkerAndReport, WorkerAndBadResponse
-    worker_and_reports = await WorkerAndReport.get_by_worker(worker_id=worker.id)
-    worker_and_bad_responses = await WorkerAndBadResponse.get_by_worker(worker_id=worker.id)
-    worker_and_abs = await WorkersAndAbs.get_by_worker(worker_id=worker.id)
+    page_ids, btn_next, btn_back = snapshot.page(before_id=before_id, after_id=after_id, limit=limit)
+    advertisements = [await Abs.get_one(id=abs_id) for abs_id in page_ids]
+    if all(advertisements):
+        return advertisements, btn_next, btn_back
 
-    # Собираем ID объявлений, которые не должны показываться
-    bad_abs = []
-    if worker_and_reports:
-        bad_abs += [worker_and_report.abs_id for worker_and_report in worker_and_reports]
-    if worker_and_bad_responses:
-        bad_abs += [worker_and_bad_response.abs_id for worker_and_bad_response in worker_and_bad_responses]
-    if worker_and_abs:
-        bad_abs += [response.abs_id for response in worker_and_abs]
-    
-    # Убираем дубликаты и преобразуем в set для быстрого поиска
-    bad_abs = set(bad_abs)
-    print(f"[ABS_FILTER] Worker {worker.id} bad_abs: {bad_abs}")
-
-    advertisements_final = []
-
-    for advertisement in advertisements:
-        customer = await Customer.get_customer(id=advertisement.customer_id)
-        if customer.tg_id == worker.tg_id:
-            print(f"[ABS_FILTER] Skipping own ad: {advertisement.id}")
-            continue
-        if advertisement.id in bad_abs:
-            print(f"[ABS_FILTER] Skipping hidden/responded ad: {advertisement.id}")
-            continue
-        # Проверяем, подходит ли объявление по типу работы
-        # Если нет направлений и нет безлимитного доступа - пропускаем
-        if not worker_sub.work_type_ids and not worker_sub.unlimited_work_types:
-            continue
-            
-        is_unlimited = (worker_sub.unlimited_work_types or 
-                       (len(worker_sub.work_type_ids) == 1 and worker_sub.work_type_ids[0] == '0'))
-        
-        if is_unlimited or (worker_sub.work_type_ids and str(advertisement.work_type_id) in worker_sub.work_type_ids):
-            if advertisement.relevance:
-                advertisements_final.append(advertisement)
-
-    return advertisements_final
+    # Объявление удалили в обход моделей - снимок устарел, берем страницу из БД
+    feed_cache.invalidate_worker(worker.id)
+    return await Abs.get_feed_page(worker_id=worker.id, work_type_ids=get_feed_work_type_ids(worker_sub),
+                                   before_id=before_id, after_id=after_id, limit=limit)
 
 
 @router.callback_query(F.data == 'choose_work_types', WorkStates.worker_menu)
@@ -2879,7 +2386,7 @@ async def report_order(callback: CallbackQuery, state: FSMContext) -> None:
 
     customer = await Customer.get_customer(id=advertisement.customer_id)
 
-    text = f'Заказчик ID {customer.tg_id}\nОбъявление {advertisement.id}\n\n' + help_defs.read_text_file(
+    text = f'Заказчик ID {customer.tg_id}\nОбъявление {advertisement.id}\n\n' + await help_defs.read_ad_text(
         advertisement.text_path)
     if advertisement.photo_path:
         await bot.send_photo(chat_id=config.REPORT_LOG,
@@ -3161,7 +2668,7 @@ async def process_ip_confirmation(message: Message, state: FSMContext) -> None:
     
     # Проверяем ОГРНИП
     from app.untils import help_defs
-    result = help_defs.check_ip_status_by_ogrnip(ogrnip=ogrnip)
+    result = await help_defs.check_ip_status_by_ogrnip(ogrnip=ogrnip)
     
     if msg_id:
         try:
@@ -3171,7 +2678,12 @@ async def process_ip_confirmation(message: Message, state: FSMContext) -> None:
     
     await state.set_state(WorkStates.worker_menu)
     
-    if result:
+    if result == "error":
+        await message.answer(
+            text="⚠️ К сожалению произошла ошибка, повторите попытку пожалуйста позже...",
+            reply_markup=kbc.menu()
+        )
+    elif result:
         # Сохраняем статус
         worker = await Worker.get_worker(tg_id=message.chat.id)
         from app.data.database.models import WorkerStatus
@@ -3230,7 +2742,7 @@ async def process_ooo_confirmation(message: Message, state: FSMContext) -> None:
     
     # Проверяем ОГРН
     from app.untils import help_defs
-    result = help_defs.check_ooo(query=ogrn)
+    result = await help_defs.check_ooo(query=ogrn)
     
     if msg_id:
         try:
@@ -3301,7 +2813,7 @@ async def process_sz_confirmation(message: Message, state: FSMContext) -> None:
     
     # Проверяем ИНН
     from app.untils import help_defs
-    result = help_defs.check_npd(inn=inn)
+    result = await help_defs.check_npd(inn=inn)
     
     if msg_id:
         try:
@@ -4223,13 +3735,9 @@ async def subscription_cities_final_confirm(callback: CallbackQuery, state: FSMC
             all_selected_cities = selected_cities
         
         # Обновляем подписку с объединенными городами
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
-        city_ids_str = '|'.join(map(str, all_selected_cities))
-        await conn.execute(
-            'UPDATE worker_city_subscriptions SET city_ids = ? WHERE id = ?',
-            [city_ids_str, subscription_id])
-        await conn.commit()
-        await conn.close()
+        subscription = existing_subscription or await WorkerCitySubscription.get_by_id(subscription_id)
+        if subscription:
+            await subscription.update_city_ids(all_selected_cities)
         
         # Получаем названия всех городов для сообщения
         all_city_names = []
@@ -4442,12 +3950,9 @@ async def confirm_cancel_subscription(callback: CallbackQuery, state: FSMContext
     
     try:
         # Деактивируем подписку
-        conn = await aiosqlite.connect(database='app/data/database/database.db')
-        await conn.execute(
-            'UPDATE worker_city_subscriptions SET active = 0 WHERE id = ?',
-            [subscription_id])
-        await conn.commit()
-        await conn.close()
+        subscription = await WorkerCitySubscription.get_by_id(subscription_id)
+        if subscription:
+            await subscription.deactivate()
         
         text = f"✅ **Подписка отменена**\n\n"
         text += f"Подписка на дополнительные города деактивирована.\n"
@@ -4473,6 +3978,8 @@ async def send_city_subscription_expiry_notifications():
         
         expiring_subscriptions = await WorkerCitySubscription.get_expiring_tomorrow()
         
+        # Уведомления уходят через общую очередь одной пачкой
+        messages = []
         for subscription in expiring_subscriptions:
             worker = await Worker.get_worker(id=subscription.worker_id)
             if not worker:
@@ -4502,16 +4009,11 @@ async def send_city_subscription_expiry_notifications():
             builder.add(kbc._inline("❌ Отказаться", f"city_subscription_cancel_{subscription.id}"))
             builder.adjust(1)
             
-            try:
-                await bot.send_message(
-                    chat_id=worker.tg_id,
-                    text=text,
-                    reply_markup=builder.as_markup(),
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"Failed to send notification to worker {worker.tg_id}: {e}")
-                
+            messages.append(outbound_queue.build('send_message', worker.tg_id, text=text,
+                                                 reply_markup=builder.as_markup(), parse_mode='Markdown'))
+        
+        await outbound_queue.enqueue(messages)
+        
     except Exception as e:
         logger.error(f"Error in send_city_subscription_expiry_notifications: {e}")
 
@@ -1120,18 +1120,20 @@ class KeyboardCollection:
 
     # ========== НОВЫЕ КНОПКИ ДЛЯ ОТКЛИКОВ И АНОНИМНОГО ЧАТА ==========
     
-    def advertisement_response_buttons(self, abs_id: int, btn_next: bool = False, btn_back: bool = False, abs_list_id: int = 0, count_photo: int = 0, photo_num: int = 0) -> InlineKeyboardMarkup:
+    def advertisement_response_buttons(self, abs_id: int, btn_next: bool = False, btn_back: bool = False, count_photo: int = 0, photo_num: int = 0) -> InlineKeyboardMarkup:
         """Кнопки под объявлением для исполнителя с навигацией"""
         builder = InlineKeyboardBuilder()
+        # Листание фото сохраняет кнопки навигации по ленте
+        nav = f'{int(btn_next)}{int(btn_back)}'
         
         # Кнопки листания фотографий (если их больше одной)
         if count_photo > 1:
             builder.add(self._inline(button_text="◀️", 
-                                     callback_data=f"go-to-photo-worker_{photo_num - 1}_{abs_id}_{abs_list_id}"))
+                                     callback_data=f"go-to-photo-worker_{photo_num - 1}_{abs_id}_{nav}"))
             builder.add(self._inline(button_text=f"{photo_num + 1}/{count_photo}", 
                                      callback_data="do_nothing"))
             builder.add(self._inline(button_text="▶️", 
-                                     callback_data=f"go-to-photo-worker_{photo_num + 1}_{abs_id}_{abs_list_id}"))
+                                     callback_data=f"go-to-photo-worker_{photo_num + 1}_{abs_id}_{nav}"))
         
         builder.add(self._inline(button_text="✅ Откликнуться", 
                                  callback_data=f"respond_to_ad_{abs_id}"))
@@ -1143,10 +1145,10 @@ class KeyboardCollection:
         # Кнопки навигации
         if btn_next:
             builder.add(self._inline(button_text="▶️ Дальше", 
-                                     callback_data=f"go_worker_{abs_list_id + 1}"))
+                                     callback_data=f"go_worker_next_{abs_id}"))
         if btn_back:
             builder.add(self._inline(button_text="◀️ Назад", 
-                                     callback_data=f"go_worker_{abs_list_id - 1}"))
+                                     callback_data=f"go_worker_back_{abs_id}"))
         
         builder.add(self._inline(button_text="🏠 В меню", 
                                  callback_data="back_to_ads"))
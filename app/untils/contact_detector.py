@@ -0,0 +1,300 @@
+"""
+Поиск контактов в тексте: один набор скомпилированных правил вместо трех детекторов.
+
+Раньше одно сообщение проверяли три набора регулярок: checks.phone_finder (объявления),
+ContactFilter.check_message (чат и отклики) и help_defs.is_content_forbidden (текст задачи) -
+около 25 re.search по строке с разбором шаблона на каждый вызов, плюс цикл по запрещенным словам.
+
+Здесь все правила компилируются один раз. ContactDetector.scan(text) сначала за один проход строит
+профиль текста (сколько цифр, есть ли латиница) и пропускает правила, которые на таком тексте
+сработать не могут: номер телефона без 10 цифр, ссылка без латиницы и т.п. Обычное сообщение
+на русском без цифр проверяется несколькими регулярками вместо 25.
+Остальные правила считаются при первом обращении и запоминаются, так что каждое правило проходит
+текст не больше одного раза на сообщение, а ContactScan.detections отдает все категории с позициями.
+
+Одно общее выражение с lookahead на каждое правило проверялось и оказалось медленнее:
+re не может быстро пропускать позиции, где правила заведомо не совпадут.
+
+Прежние функции остались обертками: каждая смотрит только на свои правила, ответы не изменились.
+Для NormalizedText результат запоминается (NormalizedText.contacts) - несколько проверок
+одного сообщения используют одно сканирование.
+"""
+
+import re
+from typing import Iterable, NamedTuple
+
+# Категории
+PHONE = 'phone'
+SPELLED_PHONE = 'spelled_phone'
+EMAIL = 'email'
+LINK = 'link'
+MESSENGER = 'messenger'
+BROKEN_CONTACT = 'broken_contact'
+CONTACT_WORD = 'contact_word'
+NUMBER_WORD = 'number_word'
+LATIN = 'latin'
+
+_DIGITS = '(?:ноль|один|два|три|четыре|пять|шесть|семь|восемь|девять)'
+_SEPARATOR = r'[-\s.,/\\()\[\]{}:;\'"?!@#%^&*_+=|<>~`]'
+
+# Правила checks.phone_finder (объявления), регистр важен
+AD_PHONE_PATTERNS = [
+    r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
+    r'\b[78]\d{10}\b',
+    r'\b(?:\d{3}[-.\s()]?\d{3}[-.\s()]?\d{4}|\d{10})\b',
+    # 5 и больше цифр подряд, если не считать пробелов
+    r'\d(?: *\d){4,}',
+    rf'\d{{3}}{_SEPARATOR}\d{{3}}{_SEPARATOR}\d{{2}}{_SEPARATOR}\d{{2}}',
+    rf'\d{_SEPARATOR}\d{{3}}{_SEPARATOR}\d{{3}}{_SEPARATOR}\d{{2}}{_SEPARATOR}\d{{2}}',
+    rf'\d{_SEPARATOR}\d{{3}}{_SEPARATOR}\d{{2}}{_SEPARATOR}\d{{3}}',
+    rf'\d{{3}}{_SEPARATOR}\d{{2}}{_SEPARATOR}\d{{3}}',
+]
+# Номер прописью: 11 слов-цифр, первая 7 или 8
+AD_SPELLED_PHONE_PATTERN = rf'\b(?:семь|восемь)(?:\s{_DIGITS}){{10}}\b'
+
+# Правила ContactFilter (чат), без учета регистра
+CHAT_PHONE_PATTERNS = [
+    # Российские номера
+    r'(?:\+7|8|7)[\s\-]?\(?[489][0-9]{2}\)?[\s\-]?[0-9]{3}[\s\-]?[0-9]{2}[\s\-]?[0-9]{2}',
+    # Международные номера
+    r'(?:\+|00)[1-9]\d{1,14}',
+    # Разбитые номера с пробелами/тире/точками
+    r'\b[0-9]{1,4}[\s\.\-_][0-9]{1,4}[\s\.\-_][0-9]{1,4}[\s\.\-_][0-9]{1,4}',
+    # Номера в тексте
+    r'\b[0-9]{10,15}\b',
+]
+
+CHAT_EMAIL_PATTERNS = [
+    r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    r'\b[A-Za-z0-9._%+-]+\s*[@собака]\s*[A-Za-z0-9.-]+\s*[\.точка]\s*[A-Z|a-z]{2,}\b',
+]
+
+CHAT_LINK_PATTERNS = [
+    r'(?:https?://|www\.)[^\s]+',
+    r'\b[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    r't\.me/[A-Za-z0-9_]+',
+]
+
+CHAT_MESSENGER_PATTERNS = [
+    r'@[A-Za-z0-9_]{5,}',  # Telegram username
+    r'viber|whatsapp|vk\.com|vkontakte|instagram|facebook|skype',
+    r'вайбер|ватсап|вацап|инста|фейсбук|скайп|телега',
+]
+
+# Паттерны для обнаружения "разбитых" контактов
+CHAT_BROKEN_CONTACT_PATTERNS = [
+    r'[0-9]{2,}[\s\-_\.\,]+[0-9]{2,}[\s\-_\.\,]+[0-9]{2,}',  # Числа с разделителями
+    r'[A-Za-z0-9]{3,}[\s]+собака[\s]+[A-Za-z0-9]{3,}',  # email через "собака"
+    r'[A-Za-z0-9]{3,}[\s]+точка[\s]+[A-Za-z]{2,}',  # домены через "точка"
+]
+
+# Запрещенные слова, связанные с контактами (ищутся как подстрока)
+CHAT_CONTACT_WORDS = [
+    'номер', 'телефон', 'позвони', 'позвоните', 'звони', 'напиши',
+    'пиши', 'свяжись', 'связаться', 'контакт', 'почта', 'email',
+    'мейл', 'whatsapp', 'viber', 'telegram', 'вайбер', 'ватсап',
+    'вацап', 'телега', 'инста', 'вк', 'вконтакте'
+]
+
+# Латиница (запрещена в чате)
+CHAT_LATIN_PATTERN = r'[A-Za-z]{3,}'
+
+# Правила help_defs.is_content_forbidden (текст задачи), без учета регистра
+TASK_LINK_PATTERNS = [
+    r'https?://',  # http:// или https://
+    r'www\.',  # www.
+    r'\.(com|ru|org|net|info|biz|co|io|me|tv|cc|tk|ml|ga|cf)',  # домены
+    r'[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',  # общий паттерн доменов
+]
+TASK_MENTION_PATTERN = r'@[a-zA-Z0-9_]+'
+# Номера прописью (русские), целыми словами
+TASK_NUMBER_WORDS = [
+    'ноль', 'один', 'два', 'три', 'четыре', 'пять', 'шесть', 'семь', 'восемь', 'девять',
+    'десять', 'одиннадцать', 'двенадцать', 'тринадцать', 'четырнадцать', 'пятнадцать',
+    'шестнадцать', 'семнадцать', 'восемнадцать', 'девятнадцать', 'двадцать',
+    'тридцать', 'сорок', 'пятьдесят', 'шестьдесят', 'семьдесят', 'восемьдесят', 'девяносто',
+    'сто', 'двести', 'триста', 'четыреста', 'пятьсот', 'шестьсот', 'семьсот', 'восемьсот', 'девятьсот',
+    'тысяча', 'тысяч', 'миллион', 'миллионов'
+]
+# Комбинации цифр и слов (например: "8 девять")
+TASK_DIGIT_WORD_PATTERN = rf'\d+\s+{_DIGITS}'
+
+
+# Признак "в тексте есть латинская буква" для Rule.needs
+LATIN_MARKER = 'latin'
+
+
+class Rule(NamedTuple):
+    name: str
+    category: str
+    pattern: str
+    # Проверяется по тексту в нижнем регистре
+    ignore_case: bool = False
+    # Правило не может сработать, если в тексте меньше цифр
+    min_digits: int = 0
+    # ... или если в тексте нет ни одной из этих подстрок (LATIN_MARKER - любая латинская буква)
+    needs: tuple[str, ...] = ()
+    # Вместо pattern: все вхождения этих слов как подстрок, в том числе перекрывающиеся
+    words: tuple[str, ...] = ()
+
+
+def _words_pattern(words: Iterable[str], whole_words: bool = False) -> str:
+    pattern = '(?:' + '|'.join(re.escape(word) for word in words) + ')'
+    return rf'\b{pattern}\b' if whole_words else pattern
+
+
+_LATIN = (LATIN_MARKER,)
+
+# Минимальное число цифр - по самому короткому варианту шаблона
+AD_PHONE_RULES = [
+    Rule('ad_phone_0', PHONE, AD_PHONE_PATTERNS[0], min_digits=10),
+    Rule('ad_phone_1', PHONE, AD_PHONE_PATTERNS[1], min_digits=11),
+    Rule('ad_phone_2', PHONE, AD_PHONE_PATTERNS[2], min_digits=10),
+    Rule('ad_phone_3', PHONE, AD_PHONE_PATTERNS[3], min_digits=5),
+    Rule('ad_phone_4', PHONE, AD_PHONE_PATTERNS[4], min_digits=10),
+    Rule('ad_phone_5', PHONE, AD_PHONE_PATTERNS[5], min_digits=11),
+    Rule('ad_phone_6', PHONE, AD_PHONE_PATTERNS[6], min_digits=9),
+    Rule('ad_phone_7', PHONE, AD_PHONE_PATTERNS[7], min_digits=8),
+    Rule('ad_spelled_phone', SPELLED_PHONE, AD_SPELLED_PHONE_PATTERN, needs=('семь',)),
+]
+
+# В порядке проверки ContactFilter. '|' входит в класс [A-Z|a-z] шаблонов email и ссылок
+CHAT_RULES = [
+    Rule('chat_phone_0', PHONE, CHAT_PHONE_PATTERNS[0], True, min_digits=11),
+    Rule('chat_phone_1', PHONE, CHAT_PHONE_PATTERNS[1], True, min_digits=2),
+    Rule('chat_phone_2', PHONE, CHAT_PHONE_PATTERNS[2], True, min_digits=4),
+    Rule('chat_phone_3', PHONE, CHAT_PHONE_PATTERNS[3], True, min_digits=10),
+    Rule('chat_email_0', EMAIL, CHAT_EMAIL_PATTERNS[0], True, needs=('@',)),
+    Rule('chat_email_1', EMAIL, CHAT_EMAIL_PATTERNS[1], True, needs=(LATIN_MARKER, '|')),
+    Rule('chat_link_0', LINK, CHAT_LINK_PATTERNS[0], True, needs=_LATIN),
+    Rule('chat_link_1', LINK, CHAT_LINK_PATTERNS[1], True, needs=(LATIN_MARKER, '|')),
+    Rule('chat_link_2', LINK, CHAT_LINK_PATTERNS[2], True, needs=_LATIN),
+    Rule('chat_messenger_0', MESSENGER, CHAT_MESSENGER_PATTERNS[0], True, needs=('@',)),
+    Rule('chat_messenger_1', MESSENGER, CHAT_MESSENGER_PATTERNS[1], True, needs=_LATIN),
+    Rule('chat_messenger_2', MESSENGER, CHAT_MESSENGER_PATTERNS[2], True),
+    Rule('chat_broken_0', BROKEN_CONTACT, CHAT_BROKEN_CONTACT_PATTERNS[0], True, min_digits=6),
+    Rule('chat_broken_1', BROKEN_CONTACT, CHAT_BROKEN_CONTACT_PATTERNS[1], True, needs=('собака',)),
+    Rule('chat_broken_2', BROKEN_CONTACT, CHAT_BROKEN_CONTACT_PATTERNS[2], True, needs=('точка',)),
+    # ContactFilter сообщает первое слово по списку, поэтому нужны все вхождения
+    Rule('chat_contact_word', CONTACT_WORD, '', True, words=tuple(CHAT_CONTACT_WORDS)),
+    Rule('chat_latin', LATIN, CHAT_LATIN_PATTERN, needs=_LATIN),
+]
+
+TASK_RULES = [
+    Rule('task_link_0', LINK, TASK_LINK_PATTERNS[0], True, needs=_LATIN),
+    Rule('task_link_1', LINK, TASK_LINK_PATTERNS[1], True, needs=_LATIN),
+    Rule('task_link_2', LINK, TASK_LINK_PATTERNS[2], True, needs=_LATIN),
+    Rule('task_link_3', LINK, TASK_LINK_PATTERNS[3], True, needs=_LATIN),
+    Rule('task_mention', MESSENGER, TASK_MENTION_PATTERN, True, needs=('@',)),
+    Rule('task_number_word', NUMBER_WORD, _words_pattern(TASK_NUMBER_WORDS, whole_words=True), True),
+    Rule('task_digit_word', NUMBER_WORD, TASK_DIGIT_WORD_PATTERN, True, min_digits=1),
+]
+
+RULES = AD_PHONE_RULES + CHAT_RULES + TASK_RULES
+
+
+class Detection(NamedTuple):
+    rule: str
+    category: str
+    start: int
+    end: int
+    text: str
+
+
+_digit_re = re.compile(r'\d')
+_latin_re = re.compile(r'[A-Za-z]')
+
+
+class ContactScan:
+    """
+    Результат поиска контактов в одном тексте.
+    Правила считаются при первом обращении и запоминаются
+    """
+
+    def __init__(self, detector: 'ContactDetector', text: str):
+        self._detector = detector
+        self.text = text
+        self._lower: str | None = None
+        self._has_latin: dict[bool, bool] = {}
+        self._by_rule: dict[str, list[Detection]] = {}
+        self.digit_count = len(_digit_re.findall(text))
+
+    def view(self, ignore_case: bool) -> str:
+        """Текст, по которому проверяется правило"""
+        if not ignore_case:
+            return self.text
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    def _can_match(self, rule: Rule) -> bool:
+        if self.digit_count < rule.min_digits:
+            return False
+        if not rule.needs:
+            return True
+        view = self.view(rule.ignore_case)
+        for marker in rule.needs:
+            if marker == LATIN_MARKER:
+                if rule.ignore_case not in self._has_latin:
+                    self._has_latin[rule.ignore_case] = _latin_re.search(view) is not None
+                if self._has_latin[rule.ignore_case]:
+                    return True
+            elif marker in view:
+                return True
+        return False
+
+    def by_rule(self, name: str) -> list[Detection]:
+        """Все срабатывания правила name"""
+        detections = self._by_rule.get(name)
+        if detections is None:
+            rule = self._detector.rules[name]
+            detections = []
+            view = self.view(rule.ignore_case)
+            if not self._can_match(rule):
+                pass
+            elif rule.words:
+                # str.find по каждому слову быстрее, чем regex с lookahead в каждой позиции
+                for word in rule.words:
+                    position = view.find(word)
+                    while position != -1:
+                        detections.append(Detection(name, rule.category, position, position + len(word), word))
+                        position = view.find(word, position + 1)
+                detections.sort(key=lambda detection: detection.start)
+            else:
+                for match in self._detector.patterns[name].finditer(view):
+                    detections.append(Detection(name, rule.category, match.start(), match.end(), match.group()))
+            self._by_rule[name] = detections
+        return detections
+
+    def by_category(self, category: str, rules: Iterable[Rule] = RULES) -> list[Detection]:
+        """Срабатывания категории, только среди правил rules"""
+        return [detection for rule in rules if rule.category == category for detection in self.by_rule(rule.name)]
+
+    def first(self, rules: Iterable[Rule]) -> Detection | None:
+        """Срабатывание первого по порядку правила из rules, у которого оно есть"""
+        for rule in rules:
+            if detections := self.by_rule(rule.name):
+                return detections[0]
+        return None
+
+    @property
+    def detections(self) -> list[Detection]:
+        """Все срабатывания всех правил по порядку в тексте"""
+        return sorted((detection for rule in self._detector.rules for detection in self.by_rule(rule)),
+                      key=lambda detection: (detection.start, detection.end))
+
+    @property
+    def categories(self) -> set[str]:
+        return {detection.category for detection in self.detections}
+
+
+class ContactDetector:
+    def __init__(self, rules: list[Rule]):
+        self.rules = {rule.name: rule for rule in rules}
+        self.patterns = {rule.name: re.compile(rule.pattern) for rule in rules if not rule.words}
+
+    def scan(self, text: str) -> ContactScan:
+        return ContactScan(self, text)
+
+
+contact_detector = ContactDetector(RULES)
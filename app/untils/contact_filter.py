@@ -3,132 +3,102 @@
 Блокирует номера телефонов, email, ссылки, ID мессенджеров и "разбитые" контакты.
 """
 
-import re
 import logging
 from typing import Tuple
 
+from app.untils import contact_detector as detector
+from app.untils.text_normalizer import NormalizedText, normalized
+from app.untils.verdict_cache import verdict_cache
+
 logger = logging.getLogger(__name__)
 
 
 class ContactFilter:
     """Фильтр для обнаружения контактной информации в сообщениях"""
     
-    # Паттерны для обнаружения контактов
-    PHONE_PATTERNS = [
-        # Российские номера
-        r'(?:\+7|8|7)[\s\-]?\(?[489][0-9]{2}\)?[\s\-]?[0-9]{3}[\s\-]?[0-9]{2}[\s\-]?[0-9]{2}',
-        # Международные номера
-        r'(?:\+|00)[1-9]\d{1,14}',
-        # Разбитые номера с пробелами/тире/точками
-        r'\b[0-9]{1,4}[\s\.\-_][0-9]{1,4}[\s\.\-_][0-9]{1,4}[\s\.\-_][0-9]{1,4}',
-        # Номера в тексте
-        r'\b[0-9]{10,15}\b',
-    ]
-    
-    EMAIL_PATTERNS = [
-        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-        r'\b[A-Za-z0-9._%+-]+\s*[@собака]\s*[A-Za-z0-9.-]+\s*[\.точка]\s*[A-Z|a-z]{2,}\b',
-    ]
-    
-    LINK_PATTERNS = [
-        r'(?:https?://|www\.)[^\s]+',
-        r'\b[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-        r't\.me/[A-Za-z0-9_]+',
-    ]
-    
-    MESSENGER_PATTERNS = [
-        r'@[A-Za-z0-9_]{5,}',  # Telegram username
-        r'viber|whatsapp|vk\.com|vkontakte|instagram|facebook|skype',
-        r'вайбер|ватсап|вацап|инста|фейсбук|скайп|телега',
-    ]
-    
-    # Паттерны для обнаружения "разбитых" контактов
-    BROKEN_CONTACT_PATTERNS = [
-        r'[0-9]{2,}[\s\-_\.\,]+[0-9]{2,}[\s\-_\.\,]+[0-9]{2,}',  # Числа с разделителями
-        r'[A-Za-z0-9]{3,}[\s]+собака[\s]+[A-Za-z0-9]{3,}',  # email через "собака"
-        r'[A-Za-z0-9]{3,}[\s]+точка[\s]+[A-Za-z]{2,}',  # домены через "точка"
-    ]
+    # Паттерны для обнаружения контактов (сами правила - в contact_detector)
+    PHONE_PATTERNS = detector.CHAT_PHONE_PATTERNS
+    EMAIL_PATTERNS = detector.CHAT_EMAIL_PATTERNS
+    LINK_PATTERNS = detector.CHAT_LINK_PATTERNS
+    MESSENGER_PATTERNS = detector.CHAT_MESSENGER_PATTERNS
+    BROKEN_CONTACT_PATTERNS = detector.CHAT_BROKEN_CONTACT_PATTERNS
+    FORBIDDEN_WORDS = detector.CHAT_CONTACT_WORDS
+    LATIN_PATTERN = detector.CHAT_LATIN_PATTERN
     
-    # Запрещенные слова, связанные с контактами
-    FORBIDDEN_WORDS = [
-        'номер', 'телефон', 'позвони', 'позвоните', 'звони', 'напиши',
-        'пиши', 'свяжись', 'связаться', 'контакт', 'почта', 'email',
-        'мейл', 'whatsapp', 'viber', 'telegram', 'вайбер', 'ватсап',
-        'вацап', 'телега', 'инста', 'вк', 'вконтакте'
+    # Категория -> (сообщение в лог, ответ пользователю), в порядке проверки
+    VIOLATIONS = [
+        (detector.PHONE, "Phone number detected in message",
+         "❌ Обнаружен номер телефона. Используйте кнопку 'Запросить контакт'."),
+        (detector.EMAIL, "Email detected in message",
+         "❌ Обнаружен email. Используйте кнопку 'Запросить контакт'."),
+        (detector.LINK, "Link detected in message",
+         "❌ Обнаружена ссылка. Обмен контактами запрещен в чате."),
+        (detector.MESSENGER, "Messenger detected in message",
+         "❌ Обнаружено упоминание мессенджера. Используйте кнопку 'Запросить контакт'."),
+        (detector.BROKEN_CONTACT, "Broken contact detected in message",
+         "❌ Обнаружена попытка передачи контакта. Используйте кнопку 'Запросить контакт'."),
     ]
     
-    # Паттерны для латиницы (запрещена в чате)
-    LATIN_PATTERN = r'[A-Za-z]{3,}'
+    MAX_DIGITS = 7
     
     @classmethod
-    def check_message(cls, text: str) -> Tuple[bool, str]:
+    def check_message(cls, text: 'str | NormalizedText') -> Tuple[bool, str]:
         """
         Проверяет сообщение на наличие контактной информации.
         
         Args:
-            text: Текст сообщения для проверки
+            text: Текст сообщения для проверки (строка или NormalizedText)
             
         Returns:
             Tuple[bool, str]: (is_valid, error_message)
                 - is_valid: True если сообщение допустимо, False если содержит контакты
                 - error_message: Описание нарушения (если есть)
         """
-        if not text:
+        normalized_text = normalized(text)
+        if not normalized_text:
             return True, ""
         
-        text_lower = text.lower()
-        
-        # Проверка на номера телефонов
-        for pattern in cls.PHONE_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                logger.warning(f"Phone number detected in message: {text[:50]}")
-                return False, "❌ Обнаружен номер телефона. Используйте кнопку 'Запросить контакт'."
-        
-        # Проверка на email
-        for pattern in cls.EMAIL_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                logger.warning(f"Email detected in message: {text[:50]}")
-                return False, "❌ Обнаружен email. Используйте кнопку 'Запросить контакт'."
+        # Повторные сообщения ("Здравствуйте, когда удобно?") не сканируются заново
+        key = verdict_cache.make_key('check_message', normalized_text.key)
+        verdict = verdict_cache.get(key)
+        if verdict is None:
+            verdict = cls._find_violation(normalized_text)
+            verdict_cache.put(key, verdict)
         
-        # Проверка на ссылки
-        for pattern in cls.LINK_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                logger.warning(f"Link detected in message: {text[:50]}")
-                return False, "❌ Обнаружена ссылка. Обмен контактами запрещен в чате."
-        
-        # Проверка на мессенджеры
-        for pattern in cls.MESSENGER_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                logger.warning(f"Messenger detected in message: {text[:50]}")
-                return False, "❌ Обнаружено упоминание мессенджера. Используйте кнопку 'Запросить контакт'."
+        is_valid, error_message, log_message = verdict
+        if log_message:
+            logger.warning(f"{log_message}: {normalized_text.text[:50]}")
+        return is_valid, error_message
+    
+    @classmethod
+    def _find_violation(cls, normalized_text: NormalizedText) -> Tuple[bool, str, str]:
+        """(is_valid, error_message, сообщение в лог)"""
+        scan = normalized_text.contacts
         
-        # Проверка на "разбитые" контакты
-        for pattern in cls.BROKEN_CONTACT_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                logger.warning(f"Broken contact detected in message: {text[:50]}")
-                return False, "❌ Обнаружена попытка передачи контакта. Используйте кнопку 'Запросить контакт'."
+        # Номера телефонов, email, ссылки, мессенджеры, "разбитые" контакты
+        for category, log_message, error_message in cls.VIOLATIONS:
+            if scan.by_category(category, detector.CHAT_RULES):
+                return False, error_message, log_message
         
-        # Проверка на запрещенные слова
+        # Проверка на запрещенные слова - первое по списку
+        found_words = {detection.text for detection in scan.by_rule('chat_contact_word')}
         for word in cls.FORBIDDEN_WORDS:
-            if word in text_lower:
-                logger.warning(f"Forbidden word '{word}' detected in message: {text[:50]}")
-                return False, f"❌ Обнаружено запрещенное слово '{word}'. Используйте кнопку 'Запросить контакт'."
+            if word in found_words:
+                return (False, f"❌ Обнаружено запрещенное слово '{word}'. Используйте кнопку 'Запросить контакт'.",
+                        f"Forbidden word '{word}' detected in message")
         
         # Проверка на латиницу (более 2 латинских букв подряд)
-        if re.search(cls.LATIN_PATTERN, text):
-            logger.warning(f"Latin text detected in message: {text[:50]}")
-            return False, "❌ Использование латиницы в чате запрещено."
+        if scan.by_rule('chat_latin'):
+            return False, "❌ Использование латиницы в чате запрещено.", "Latin text detected in message"
         
         # Проверка на цифры (подозрительное количество)
-        digit_count = sum(c.isdigit() for c in text)
-        if digit_count > 7:
-            logger.warning(f"Too many digits in message: {text[:50]}")
-            return False, "❌ Сообщение содержит слишком много цифр. Возможна попытка передачи контакта."
+        if scan.digit_count > cls.MAX_DIGITS:
+            return (False, "❌ Сообщение содержит слишком много цифр. Возможна попытка передачи контакта.",
+                    "Too many digits in message")
         
-        return True, ""
-
+        return True, "", ""
 
-def check_message_for_contacts(text: str) -> Tuple[bool, str]:
+def check_message_for_contacts(text: 'str | NormalizedText') -> Tuple[bool, str]:
     """
     Удобная функция-обертка для проверки сообщения.
     
@@ -1,14 +1,19 @@
+import logging
 from datetime import datetime, timedelta
 
 from aiogram.exceptions import TelegramForbiddenError
+from aiogram.types import FSInputFile
 
 import config
 from app.data.database.models import Banned, WorkType, Customer, BannedAbs, Worker, WorkerAndSubscription, \
-    SubscriptionType, City, WorkerAndCustomer, WorkerAndRefsAssociation
+    SubscriptionType, City, WorkerAndCustomer, WorkerAndRefsAssociation, AdText
 from app.keyboards import KeyboardCollection
-from app.untils import help_defs, checks
+from app.data.database.duplicate_index import duplicate_index
+from app.untils import help_defs
 from loaders import bot
 
+logger = logging.getLogger(__name__)
+
 
 async def ban_task(message, work_type_id, task, time, ban_reason, msg):
     kbc = KeyboardCollection()
@@ -29,8 +34,7 @@ async def ban_task(message, work_type_id, task, time, ban_reason, msg):
 
     text = help_defs.escape_markdown(text)
 
-    file_path = help_defs.create_file_in_directory_with_timestamp(id=message.chat.id, text=text,
-                                                                  path='app/data/banned/text/')
+    text_path = await AdText.save(text)
 
     banned_abs = BannedAbs(
         id=None,
@@ -38,7 +42,7 @@ async def ban_task(message, work_type_id, task, time, ban_reason, msg):
         work_type_id=int(work_type_id_list[0]),
         city_id=customer.city_id,
         photo_path=None,
-        text_path=file_path,
+        text_path=text_path,
         date_to_delite=datetime.today() + timedelta(days=30),
         photos_len=0
     )
@@ -84,20 +88,90 @@ async def ban_task(message, work_type_id, task, time, ban_reason, msg):
         reply_markup=kbc.support_btn())
 
 
-async def same_task(message, advertisements, text):
+async def review_task(message, work_type_id, task, time, msg, photos: dict = None, photos_len: int = 0):
+    """
+    Автопроверка объявления не завершилась (moderation): объявление не публикуется и не блокирует
+    пользователя, а уходит администраторам в BLOCKED_CHAT. Кнопка "Разблокировать и разместить" публикует его
+    """
     kbc = KeyboardCollection()
 
-    double = False
+    work_type_id_list = work_type_id.split('|')
+    work_type = await WorkType.get_work_type(id=int(work_type_id_list[0]))
+    work = work_type.work_type.capitalize()
+
+    customer = await Customer.get_customer(tg_id=message.chat.id)
+
+    text = (f'{work}\n\n'
+            f'Задача: {task}\n'
+            f'Время: {time}\n')
+
+    text = help_defs.escape_markdown(text)
+
+    text_path = await AdText.save(text)
+
+    banned_abs = BannedAbs(
+        id=None,
+        customer_id=customer.id,
+        work_type_id=int(work_type_id_list[0]),
+        city_id=customer.city_id,
+        photo_path=photos,
+        text_path=text_path,
+        date_to_delite=datetime.today() + timedelta(days=10),
+        photos_len=photos_len,
+        review=True
+    )
+    await banned_abs.save()
 
-    if advertisements:
-        for advertisement in advertisements:
-            text_old = help_defs.read_text_file(advertisement.text_path) if advertisement.text_path else "Текст не найден"
-            if await checks.are_texts_similar(text_old, text):
-                await message.answer(
-                    'Вы предлагали схожий запрос, удалите предыдущий и попробуйте снова',
-                    reply_markup=kbc.menu_btn())
-                double = True
-    return double
+    banned_abs = await BannedAbs.get_all_by_customer(customer_id=customer.id)
+    banned_abs = banned_abs[-1]
+
+    text = (f'Требуется ручная проверка: автопроверка не завершилась\n'
+            f'Пользователь @{customer.tg_name}\n'
+            f'ID: #{customer.tg_id}\n\n'
+            f'{work}\n\n'
+            f'Задача: {task}\n'
+            f'Время: {time}\n')
+
+    text = help_defs.escape_markdown(text)
+
+    await bot.delete_message(chat_id=message.chat.id, message_id=msg.message_id)
+
+    if photos:
+        await bot.send_photo(chat_id=config.BLOCKED_CHAT, photo=FSInputFile(photos['0']), caption=text,
+                             protect_content=False,
+                             reply_markup=kbc.unban(banned_abs.id, photo_num=0, photo_len=photos_len))
+    else:
+        await bot.send_message(chat_id=config.BLOCKED_CHAT,
+                               text=text,
+                               protect_content=False, reply_markup=kbc.unban(banned_abs.id))
+
+    await message.answer(
+        'Объявление отправлено на проверку модератору. После проверки оно будет опубликовано.',
+        reply_markup=kbc.menu_btn())
+
+
+async def same_task(message, customer_id, city_id, work_type_id, text):
+    """
+    Ищет повтор объявления среди живых объявлений того же города и направления (duplicate_index),
+    в том числе объявлений других заказчиков. True - повтор найден, заказчику отправлено сообщение
+    """
+    kbc = KeyboardCollection()
+
+    match = duplicate_index.find(city_id=city_id, work_type_id=int(work_type_id), text=text, customer_id=customer_id)
+    if match is None:
+        return False
+
+    if match.customer_id == customer_id:
+        await message.answer(
+            'Вы предлагали схожий запрос, удалите предыдущий и попробуйте снова',
+            reply_markup=kbc.menu_btn())
+    else:
+        logger.info(f'Заказчик {customer_id} повторяет объявление {match.ad_id} заказчика {match.customer_id} '
+                    f'(сходство {match.similarity:.2f})')
+        await message.answer(
+            'Похожее объявление уже опубликовано в вашем городе, измените текст и попробуйте снова',
+            reply_markup=kbc.menu_btn())
+    return True
 
 
 async def close_task(workers_and_abs, advertisement_now, workers_for_assessments, customer):
@@ -110,7 +184,7 @@ async def close_task(workers_and_abs, advertisement_now, workers_for_assessments
         if sub.notification:
 
             city = await City.get_city(id=advertisement_now.city_id)
-            text = f'Заказчик закрыл объявление {advertisement_now.id}\nг. {city.city}\n' + help_defs.read_text_file(
+            text = f'Заказчик закрыл объявление {advertisement_now.id}\nг. {city.city}\n' + await help_defs.read_ad_text(
                 advertisement_now.text_path)
 
             try:
@@ -0,0 +1,185 @@
+"""
+Кэш file_id для локальных фото и видео.
+
+Обработчики по-прежнему передают FSInputFile(path). Middleware сессии бота подменяет его на file_id,
+если этот файл уже загружался в Telegram и с тех пор не менялся (совпадают mtime и размер),
+а после первой загрузки запоминает file_id из ответа. Так фото объявления, разосланного
+200 исполнителям, загружается один раз.
+
+Кэш хранится в таблице telegram_file_ids и в памяти. help_defs.delete_file и
+help_defs.remove_portfolio_photo убирают из кэша удаленные файлы.
+"""
+
+import asyncio
+import logging
+import os
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageMedia, SendDocument, SendMediaGroup, SendPhoto, SendVideo
+from aiogram.types import FSInputFile, Message
+
+from app.data.database.models import TelegramFileId
+
+logger = logging.getLogger(__name__)
+
+# Метод бота -> поле с файлом и тип файла в ответе
+SINGLE_FILE_METHODS = {
+    SendPhoto: ('photo', 'photo'),
+    SendVideo: ('video', 'video'),
+    SendDocument: ('document', 'document'),
+}
+
+# Ошибки Telegram, после которых файл загружается заново вместо file_id из кэша
+FILE_ID_ERRORS = ('wrong file identifier', 'wrong remote file identifier', 'file reference', 'file_reference')
+
+
+def file_id_from_message(message, media_type: str) -> str | None:
+    """file_id файла нужного типа из отправленного сообщения"""
+    if not isinstance(message, Message):
+        return None
+    if media_type == 'photo':
+        return message.photo[-1].file_id if message.photo else None
+    media = getattr(message, media_type, None)
+    return media.file_id if media else None
+
+
+class FileIdCache:
+    def __init__(self):
+        self._entries: dict[str, TelegramFileId] = {}
+        self._loaded = False
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normpath(path)
+
+    async def load(self) -> None:
+        await TelegramFileId.create_table_if_not_exists()
+        self._entries = {entry.path: entry for entry in await TelegramFileId.get_all()}
+        self._loaded = True
+        logger.info(f'Кэш file_id загружен: {len(self._entries)} файлов')
+
+    def get(self, path: str) -> str | None:
+        """file_id файла, если он уже загружался и не изменился"""
+        entry = self._entries.get(self._key(path))
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.forget(path)
+            return None
+        if stat.st_mtime_ns != entry.mtime_ns or stat.st_size != entry.size:
+            return None
+        return entry.file_id
+
+    async def remember(self, path: str, file_id: str) -> None:
+        if not self._loaded or not file_id:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        entry = TelegramFileId(path=self._key(path), mtime_ns=stat.st_mtime_ns, size=stat.st_size, file_id=file_id)
+        self._entries[entry.path] = entry
+        try:
+            await entry.save()
+        except Exception as e:
+            logger.error(f'Не удалось сохранить file_id для {path}: {e}')
+
+    def forget(self, path: str) -> None:
+        """Убирает файл из кэша. Можно вызывать из синхронного кода"""
+        if not path or self._entries.pop(self._key(path), None) is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self._delete(self._key(path)))
+
+    @staticmethod
+    async def _delete(path: str) -> None:
+        try:
+            await TelegramFileId.delete_by_path(path)
+        except Exception as e:
+            logger.error(f'Не удалось удалить file_id для {path}: {e}')
+
+
+file_id_cache = FileIdCache()
+
+
+def is_file_id_error(error: TelegramBadRequest) -> bool:
+    """Telegram не принял file_id: файл удален или ссылка на него устарела"""
+    message = error.message.lower()
+    return any(marker in message for marker in FILE_ID_ERRORS)
+
+
+class FileIdMiddleware(BaseRequestMiddleware):
+    """Подменяет FSInputFile на file_id из кэша и запоминает file_id после загрузки"""
+
+    def __init__(self, cache: FileIdCache = file_id_cache):
+        self.cache = cache
+
+    async def __call__(self, make_request, bot, method):
+        prepared, uploads, substituted = self._prepare(method)
+        if not uploads and not substituted:
+            return await make_request(bot, method)
+
+        try:
+            response = await make_request(bot, prepared)
+        except TelegramBadRequest as e:
+            # Ошибки текста, разметки и т.п. не связаны с file_id - повторная загрузка их не исправит
+            if not substituted or not is_file_id_error(e):
+                raise
+            # file_id мог стать недействительным - забываем его и загружаем файл заново
+            logger.warning(f'file_id не принят Telegram ({e}), файлы загружаются заново: {substituted}')
+            for path in substituted:
+                self.cache.forget(path)
+            prepared, uploads, _ = self._prepare(method, use_cache=False)
+            response = await make_request(bot, prepared)
+
+        await self._remember(response.result, uploads)
+        return response
+
+    def _prepare(self, method, use_cache: bool = True):
+        """
+        Возвращает (метод для отправки, [(индекс, путь, тип)] загружаемых файлов, [пути, замененные на file_id]).
+        Индекс - номер сообщения в ответе send_media_group, для остальных методов None.
+        """
+        uploads = []
+        substituted = []
+
+        def resolve(value, media_type, index=None):
+            if not isinstance(value, FSInputFile):
+                return value
+            file_id = self.cache.get(value.path) if use_cache else None
+            if file_id:
+                substituted.append(value.path)
+                return file_id
+            uploads.append((index, value.path, media_type))
+            return value
+
+        if type(method) in SINGLE_FILE_METHODS:
+            field, media_type = SINGLE_FILE_METHODS[type(method)]
+            value = resolve(getattr(method, field), media_type)
+            if value is not getattr(method, field):
+                method = method.model_copy(update={field: value})
+        elif isinstance(method, EditMessageMedia):
+            media = method.media
+            value = resolve(media.media, media.type)
+            if value is not media.media:
+                method = method.model_copy(update={'media': media.model_copy(update={'media': value})})
+        elif isinstance(method, SendMediaGroup):
+            media_list = []
+            for index, media in enumerate(method.media):
+                value = resolve(media.media, media.type, index)
+                media_list.append(media if value is media.media else media.model_copy(update={'media': value}))
+            if substituted:
+                method = method.model_copy(update={'media': media_list})
+        return method, uploads, substituted
+
+    async def _remember(self, result, uploads) -> None:
+        for index, path, media_type in uploads:
+            message = result[index] if index is not None and isinstance(result, list) and index < len(result) \
+                else result
+            await self.cache.remember(path, file_id_from_message(message, media_type))
@@ -0,0 +1,110 @@
+"""
+Нечеткий поиск стоп-слов для checks.levenshtein_distance_check.
+
+Правило прежнее: слово длины L найдено, если какой-то фрагмент фразы phrase[p:p + L] отличается
+от него не больше чем на L * 0.10 правок (расстояние Левенштейна), и этот фрагмент не из белого списка.
+Результат тоже прежний - первое по порядку списка слово и первый по позиции подходящий фрагмент.
+
+Вместо расчета расстояния для каждой позиции фразы и каждого слова:
+- слова короче 10 символов (0 правок) ищутся точным поиском подстроки;
+- длинное слово с допуском k правок делится на k + 1 кусков. Если фрагмент отличается от слова
+  не больше чем на k правок, хотя бы один кусок входит в него без изменений со сдвигом не больше k.
+  Поэтому расстояние считается только для позиций рядом с точными вхождениями кусков.
+"""
+
+import math
+
+
+def distance(a, b):
+    """Calculates the Levenshtein distance between a and b."""
+    n, m = len(a), len(b)
+    if n > m:
+        # Make sure n <= m, to use O(min(n, m)) space
+        a, b = b, a
+        n, m = m, n
+
+    current_row = range(n + 1)  # Keep current and previous row, not entire matrix
+    for i in range(1, m + 1):
+        previous_row, current_row = current_row, [i] + [0] * n
+        for j in range(1, n + 1):
+            add, delete, change = previous_row[j] + 1, current_row[j - 1] + 1, previous_row[j - 1]
+            if a[j - 1] != b[i - 1]:
+                change += 1
+            current_row[j] = min(add, delete, change)
+
+    return current_row[n]
+
+
+class _FuzzyWord:
+    __slots__ = ('word', 'max_distance', 'pieces')
+
+    def __init__(self, word: str):
+        self.word = word.lower()
+        # Та же граница, что в проверке distance(...) <= len(word) * 0.10
+        self.max_distance = math.floor(len(self.word) * 0.10)
+        self.pieces = []
+        if self.max_distance:
+            count = self.max_distance + 1
+            for i in range(count):
+                start = len(self.word) * i // count
+                end = len(self.word) * (i + 1) // count
+                self.pieces.append((start, self.word[start:end]))
+
+    def candidates(self, lower_phrase: str) -> list[int]:
+        """Позиции начала фрагментов, которые могут подойти, по возрастанию"""
+        if not self.word:
+            return list(range(len(lower_phrase)))
+        if not self.max_distance:
+            positions = []
+            position = lower_phrase.find(self.word)
+            while position != -1:
+                positions.append(position)
+                position = lower_phrase.find(self.word, position + 1)
+            return positions
+
+        positions = set()
+        k = self.max_distance
+        for offset, piece in self.pieces:
+            position = lower_phrase.find(piece)
+            while position != -1:
+                start = position - offset
+                positions.update(range(max(0, start - k), min(len(lower_phrase), start + k + 1)))
+                position = lower_phrase.find(piece, position + 1)
+        return sorted(positions)
+
+
+class FuzzyMatcher:
+    def __init__(self, words):
+        self.words = tuple(words)
+        self._entries = [_FuzzyWord(word) for word in self.words]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def find(self, phrase: str, white_words) -> tuple[str, str] | None:
+        """(слово, похожий фрагмент фразы) или None"""
+        lower_phrase = phrase.lower()
+        if len(lower_phrase) != len(phrase):
+            # Редкие символы, которые в нижнем регистре длиннее - позиции не совпадают, считаем по-старому
+            return self._find_slow(phrase, white_words)
+
+        for entry in self._entries:
+            length = len(entry.word)
+            for part in entry.candidates(lower_phrase):
+                fragment = phrase[part: part + length]
+                if entry.max_distance and distance(lower_phrase[part: part + length], entry.word) > entry.max_distance:
+                    continue
+                if fragment in white_words:
+                    continue
+                return entry.word, fragment
+        return None
+
+    def _find_slow(self, phrase: str, white_words) -> tuple[str, str] | None:
+        for entry in self._entries:
+            for part in range(len(phrase)):
+                fragment = phrase[part: part + len(entry.word)]
+                if distance(fragment.lower(), entry.word) <= len(entry.word) * 0.10:
+                    if fragment in white_words:
+                        continue
+                    return entry.word, fragment
+        return None
@@ -4,101 +4,33 @@ import json
 import shutil
 import logging
 import requests
-import time
-from datetime import datetime, date
-from bs4 import BeautifulSoup
-from PIL import Image, ImageEnhance
+from datetime import datetime
 from aiogram.types import Message
 
+from app.untils.contact_detector import TASK_RULES
+from app.untils import photo_store
+from app.untils.file_id_cache import file_id_cache
+from app.untils.registry_client import registry_client
+from app.untils.text_normalizer import NormalizedText, normalized
+from app.untils.verdict_cache import verdict_cache
 
-logger = logging.getLogger(__name__)
-
-
-def check_ip_status_by_ogrnip(ogrnip) -> str | None:
-    """Проверка ИП по ОГРНИП"""
-    url = f"https://www.rusprofile.ru/ip/{ogrnip}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
 
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+logger = logging.getLogger(__name__)
 
-        soup = BeautifulSoup(response.text, 'html.parser')
 
-        status_element = soup.find('h2', class_='company-name')
-        if status_element:
-            company_name = status_element.text.strip()
-            return company_name
-        else:
-            return None
+async def check_ip_status_by_ogrnip(ogrnip) -> str | None:
+    """Проверка ИП по ОГРНИП: название ИП, None - не найден, "error" - реестр не ответил"""
+    return await registry_client.check_ip(ogrnip)
 
-    except requests.exceptions.RequestException:
-        return None
 
-
-def check_ooo(query) -> bool | str:
+async def check_ooo(query) -> bool | str:
     """Проверка ООО по ОГРН"""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1",
-        "Referer": "https://egrul.nalog.ru/index.html",
-        "X-Requested-With": "XMLHttpRequest",
-    }
-    try:
-        response = requests.post("https://egrul.nalog.ru/", data={"query": query}, headers=headers)
-        response.raise_for_status()
-
-        data = response.json()  # вернёт строку с ID
-        request_id = data.get("t")
-        if request_id:
-            time.sleep(1.5)
-
-            params = {
-                "r": str(int(time.time() * 1000)),
-                "_": str(int(time.time() * 1000)),
-            }
-            result = requests.get(
-                f"https://egrul.nalog.ru/search-result/{request_id}", 
-                headers=headers, 
-                params=params,
-                timeout=10
-            )
-            result.raise_for_status()
-
-            data = result.json()
-            rows = data.get("rows", [])
-            for row in rows:
-                if row.get("k") == "ul" and row.get("cnt", 0) != 0:
-                    return True
-        return False
-    except Exception as e:
-        logger.warning(f"Error in check_ooo: {e}")
-        return "error"
+    return await registry_client.check_ooo(query)
 
 
-def check_npd(inn) -> bool | str:
+async def check_npd(inn) -> bool | str:
     """Проверка самозанятого (НПД) по ИНН"""
-    url = "https://statusnpd.nalog.ru/api/v1/tracker/taxpayer_status"
-
-    payload = {
-        "inn": inn,
-        "requestDate": str(date.today())
-    }
-
-    headers = {
-        "Content-Type": "application/json"
-    }
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("status", False)
-        return False
-    except Exception as e:
-        logger.warning(f"Error in check_npd: {e}")
-        return "error"
+    return await registry_client.check_npd(inn)
 
 
 def get_obj_name_and_id_for_btn(names: list, ids: list, id_now: int):
@@ -245,7 +177,10 @@ def migrate_portfolio_to_user_folder(portfolio_dict: dict, user_id: int):
     new_portfolio = {}
     
     for key, old_path in portfolio_dict.items():
-        if os.path.exists(old_path):
+        if photo_store.is_blob(old_path):
+            # Фото уже в хранилище (app/untils/photo_store.py)
+            new_portfolio[key] = old_path
+        elif os.path.exists(old_path):
             # Создаем новое имя файла
             new_filename = f'{key}.jpg'
             new_path = os.path.join(portfolio_dir, new_filename)
@@ -279,7 +214,11 @@ def delete_file(file_path):
     """
     if not file_path:
         return False
+    # Файл хранилища может быть общим, его удаляет photo_store, когда на него не остается ссылок
+    if photo_store.is_blob(file_path):
+        return True
 
+    file_id_cache.forget(file_path)
     try:
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -311,123 +250,6 @@ def delete_folder(folder_path):
         pass
 
 
-def cleanup_orphaned_portfolio_files():
-    """
-    Очищает "осиротевшие" файлы портфолио, которые не связаны ни с одним исполнителем.
-    Эта функция должна вызываться периодически для поддержания чистоты файловой системы.
-    
-    Returns:
-        int: Количество удаленных файлов
-    """
-    portfolio_base_path = 'app/data/photo/'
-    if not os.path.exists(portfolio_base_path):
-        logger.info("Папка портфолио не существует, очистка не требуется")
-        return 0
-
-    logger.info("Начинаем очистку осиротевших файлов портфолио...")
-
-    # Получаем все папки с ID пользователей
-    user_folders = [f for f in os.listdir(portfolio_base_path)
-                    if os.path.isdir(os.path.join(portfolio_base_path, f)) and f.isdigit()]
-
-    cleaned_count = 0
-    checked_folders = 0
-
-    for folder in user_folders:
-        folder_path = os.path.join(portfolio_base_path, folder)
-        checked_folders += 1
-
-        # Получаем все файлы в папке
-        try:
-            files = os.listdir(folder_path)
-            for file in files:
-                if file.endswith('.jpg'):
-                    file_path = os.path.join(folder_path, file)
-
-                    # Проверяем, используется ли файл в портфолио какого-либо исполнителя
-                    if is_file_orphaned(file_path):
-                        # Удаляем осиротевший файл
-                        if delete_file(file_path):
-                            cleaned_count += 1
-                            logger.info(f"Удален осиротевший файл портфолио: {file_path}")
-                        else:
-                            logger.warning(f"Не удалось удалить осиротевший файл: {file_path}")
-                    else:
-                        logger.debug(f"Файл используется в портфолио: {file_path}")
-
-        except Exception as e:
-            logger.error(f"Ошибка при проверке папки {folder_path}: {e}")
-
-    logger.info(f"Очистка завершена. Проверено папок: {checked_folders}, удалено файлов: {cleaned_count}")
-    return cleaned_count
-
-
-def is_file_orphaned(file_path):
-    """
-    Проверяет, является ли файл "осиротевшим" (не используется в портфолио исполнителей).
-    
-    Args:
-        file_path: Путь к файлу для проверки
-        
-    Returns:
-        bool: True если файл осиротевший, False если используется
-    """
-    try:
-        # Импортируем модель Worker для проверки БД
-        import asyncio
-
-        # Создаем новый event loop для синхронного вызова
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        # Выполняем асинхронную проверку синхронно
-        return loop.run_until_complete(_check_file_in_database(file_path))
-
-    except Exception as e:
-        logger.error(f"Ошибка при проверке файла {file_path}: {e}")
-        # В случае ошибки считаем файл не осиротевшим (безопасный подход)
-        return False
-
-
-async def _check_file_in_database(file_path):
-    """
-    Асинхронная проверка использования файла в базе данных.
-    
-    Args:
-        file_path: Путь к файлу для проверки
-        
-    Returns:
-        bool: True если файл осиротевший, False если используется
-    """
-    try:
-        # Локальный импорт для избежания циклических зависимостей
-        from app.data.database.models import Worker
-        
-        # Получаем всех исполнителей
-        workers = await Worker.get_all()
-
-        for worker in workers:
-            if worker.portfolio_photo:
-                # Проверяем, используется ли файл в портфолио этого исполнителя
-                for photo_path in worker.portfolio_photo.values():
-                    if photo_path == file_path:
-                        return False  # Файл используется
-
-            # Также проверяем фото профиля
-            if worker.profile_photo == file_path:
-                return False  # Файл используется как фото профиля
-
-        # Если файл не найден ни в одном портфолио
-        return True
-
-    except Exception as e:
-        logger.error(f"Ошибка при проверке файла в БД {file_path}: {e}")
-        return False
-
-
 def read_text_file(file_path):
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
@@ -439,34 +261,15 @@ def read_text_file(file_path):
         return "Ошибка чтения файла"
 
 
-def add_watermark(input_image_path, transparency=0.5):
-    output_image_path = input_image_path
-    watermark_image_path = 'app/data/database/watermark.png'
-    base_image = Image.open(input_image_path).convert("RGBA")
-    watermark = Image.open(watermark_image_path).convert("RGBA")
-
-    # Установка прозрачности водяного знака
-    watermark = ImageEnhance.Brightness(watermark).enhance(transparency)
-
-    base_width, base_height = base_image.size
-    watermark_width, watermark_height = watermark.size
-
-    # Координаты для правого нижнего угла
-    position = (
-        base_width - watermark_width,
-        base_height - watermark_height
-    )
-
-    # Создание нового изображения с прозрачным фоном
-    transparent = Image.new('RGBA', (base_width, base_height), (0, 0, 0, 0))
+async def read_ad_text(text_path) -> str:
+    """Текст объявления по text_path: ключ AdText в БД или (для старых записей) путь к .txt файлу"""
+    # Локальный импорт для избежания циклических зависимостей
+    from app.data.database.models import AdText
 
-    # Копирование базового изображения и водяного знака на новое изображение
-    transparent.paste(base_image, (0, 0))
-    transparent.paste(watermark, position, mask=watermark)
-
-    # Конвертация изображения в формат RGB и сохранение результата
-    result = transparent.convert("RGB")
-    result.save(output_image_path)
+    if AdText.is_key(text_path):
+        text = await AdText.get(text_path)
+        return text if text is not None else "Файл не найден"
+    return read_text_file(text_path)
 
 
 def copy_file(source_path: str, destination_dir: str):
@@ -476,6 +279,12 @@ def copy_file(source_path: str, destination_dir: str):
     :param source_path: Путь к исходному файлу.
     :param destination_dir: Путь к целевой директории.
     """
+    # Локальный импорт для избежания циклических зависимостей
+    from app.data.database.models import AdText
+
+    # Ключ текста объявления в БД и фото из хранилища не копируются: они общие и адресуются по содержимому
+    if AdText.is_key(source_path) or photo_store.is_blob(source_path):
+        return source_path
     try:
         file_name = os.path.basename(source_path)
         destination_path = os.path.join(destination_dir, file_name)
@@ -542,58 +351,27 @@ def escape_markdown(text: str) -> str:
     return re.sub(r'([%s])' % re.escape(escape_chars), r'\\\1', text)
 
 
-def is_content_forbidden(text: str) -> bool:
+def is_content_forbidden(text: 'str | NormalizedText') -> bool:
     """
     Проверяет, содержит ли текст запрещенный контент (ссылки, упоминания, номера прописью).
     
     Args:
-        text: Текст для проверки
+        text: Текст для проверки (строка или NormalizedText)
         
     Returns:
         bool: True если контент запрещен, False если разрешен
     """
+    text = normalized(text)
     if not text:
         return False
-    
-    text_lower = text.lower().strip()
-    
-    # Проверка на ссылки (http, https, www, домены)
-    url_patterns = [
-        r'https?://',  # http:// или https://
-        r'www\.',      # www.
-        r'\.(com|ru|org|net|info|biz|co|io|me|tv|cc|tk|ml|ga|cf)',  # домены
-        r'[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',  # общий паттерн доменов
-    ]
-    
-    for pattern in url_patterns:
-        if re.search(pattern, text_lower):
-            return True
-    
-    # Проверка на упоминания через @ (только латиница)
-    if re.search(r'@[a-zA-Z0-9_]+', text_lower):
-        return True
-    
-    # Проверка на номера прописью (русские)
-    forbidden_numbers = [
-        'ноль', 'один', 'два', 'три', 'четыре', 'пять', 'шесть', 'семь', 'восемь', 'девять',
-        'десять', 'одиннадцать', 'двенадцать', 'тринадцать', 'четырнадцать', 'пятнадцать',
-        'шестнадцать', 'семнадцать', 'восемнадцать', 'девятнадцать', 'двадцать',
-        'тридцать', 'сорок', 'пятьдесят', 'шестьдесят', 'семьдесят', 'восемьдесят', 'девяносто',
-        'сто', 'двести', 'триста', 'четыреста', 'пятьсот', 'шестьсот', 'семьсот', 'восемьсот', 'девятьсот',
-        'тысяча', 'тысяч', 'миллион', 'миллионов'
-    ]
-    
-    # Разбиваем текст на слова и проверяем каждое
-    words = re.findall(r'\b\w+\b', text_lower)
-    for word in words:
-        if word in forbidden_numbers:
-            return True
-    
-    # Проверка на комбинации цифр и слов (например: "8 девять")
-    if re.search(r'\d+\s+(ноль|один|два|три|четыре|пять|шесть|семь|восемь|девять)', text_lower):
-        return True
-    
-    return False
+
+    key = verdict_cache.make_key('is_content_forbidden', text.key)
+    forbidden = verdict_cache.get(key)
+    if forbidden is None:
+        # Ссылки, упоминания через @, номера прописью и комбинации цифр и слов
+        forbidden = text.contacts.first(TASK_RULES) is not None
+        verdict_cache.put(key, forbidden)
+    return forbidden
 
 
 # Функция check_dialog_active удалена - использовалась только для откликов
@@ -922,7 +700,7 @@ async def send_targeted_notifications_to_workers(advertisement_id: int, customer
             f"🔔 Новое объявление в вашем городе!\n\n"
             f"📍 Город: {city.city}\n"
             f"💼 Направление: {work_type.work_type}\n"
-            f"📋 Описание: {read_text_file(advertisement.text_path)}\n\n"
+            f"📋 Описание: {await read_ad_text(advertisement.text_path)}\n\n"
             f"💰 Размер: {advertisement.price} ₽\n"
             f"📅 Срок: {advertisement.date_end}\n\n"
             f"Нажмите /menu чтобы откликнуться!"
@@ -1154,6 +932,7 @@ def remove_portfolio_photo(d, removed_key):
     # Создаем копию словаря и удаляем нужный ключ
     new_dict = d.copy()
     removed_file_path = new_dict.pop(removed_key, None)
+    file_id_cache.forget(removed_file_path)
 
     return new_dict, removed_file_path
 
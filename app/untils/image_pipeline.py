@@ -0,0 +1,192 @@
+"""
+Обработка загруженных фото в отдельном процессе: уменьшение, водяной знак, пересжатие.
+
+Фото объявлений и портфолио раньше сохранялись как пришли из Telegram, вместе с EXIF.
+Прежний help_defs.add_watermark работал с PIL синхронно: на каждый вызов заново открывал
+и осветлял watermark.png, собирал полноразмерный RGBA-холст и сохранял JPEG в исходном размере.
+
+Теперь:
+
+    await image_pipeline.process(path)                  # уменьшить и пересжать на месте
+    await image_pipeline.process(path, watermark=True)  # то же с водяным знаком
+    await image_pipeline.process_many(paths)
+
+- работа с PIL идет в ProcessPoolExecutor, цикл событий не ждет;
+- водяной знак загружается и осветляется один раз при старте процесса, уменьшенные копии
+  под каждый размер фото запоминаются;
+- фото уменьшается до MAX_SIDE по большей стороне (больше Telegram все равно не показывает),
+  поворачивается по EXIF, метаданные EXIF не сохраняются;
+- JPEG сохраняется с качеством JPEG_QUALITY, optimize и progressive;
+- процесс пула пишет результат во временный файл, исходный заменяет (os.replace) вызывающий код,
+  только если дождался результата: при ошибке или таймауте остается исходный, а процессы
+  зависшего пула завершаются и уже не перезапишут файл.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from PIL import Image, ImageEnhance, ImageOps
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_PATH = 'app/data/database/watermark.png'
+# Прозрачность водяного знака, как в прежнем add_watermark
+WATERMARK_TRANSPARENCY = 0.5
+# Водяной знак не шире этой доли меньшей стороны фото
+WATERMARK_MAX_SHARE = 0.3
+
+# Большая сторона фото после обработки (пиксели)
+MAX_SIDE = 1280
+JPEG_QUALITY = 82
+
+# Число процессов обработки
+WORKERS = 2
+# Сколько ждать обработку одного фото (секунды)
+TIMEOUT = 30
+
+
+# Водяной знак внутри процесса пула
+_watermark: Image.Image | None = None
+
+
+def _load_watermark(path: str = WATERMARK_PATH, transparency: float = WATERMARK_TRANSPARENCY) -> Image.Image:
+    watermark = Image.open(path).convert("RGBA")
+    return ImageEnhance.Brightness(watermark).enhance(transparency)
+
+
+def _init_worker(watermark_path: str) -> None:
+    global _watermark
+    try:
+        _watermark = _load_watermark(watermark_path)
+    except OSError as e:
+        logger.error(f'Не удалось загрузить водяной знак {watermark_path}: {e}')
+
+
+@lru_cache(maxsize=64)
+def _scaled_watermark(width: int, height: int) -> Image.Image:
+    """Водяной знак под размер фото. Одинаковые размеры фото встречаются часто, поэтому копии запоминаются"""
+    limit = int(min(width, height) * WATERMARK_MAX_SHARE)
+    if max(_watermark.size) <= limit:
+        return _watermark
+    scale = limit / max(_watermark.size)
+    size = (max(1, round(_watermark.width * scale)), max(1, round(_watermark.height * scale)))
+    return _watermark.resize(size, Image.LANCZOS)
+
+
+def apply_watermark(image: Image.Image) -> Image.Image:
+    """Водяной знак в правый нижний угол, без полноразмерного RGBA-холста"""
+    if _watermark is None:
+        return image
+    watermark = _scaled_watermark(*image.size)
+    position = (image.width - watermark.width, image.height - watermark.height)
+    image.paste(watermark, position, mask=watermark)
+    return image
+
+
+def process_file(path: str, temp_path: str, watermark: bool = False, max_side: int = MAX_SIDE,
+                 quality: int = JPEG_QUALITY) -> int:
+    """
+    Обрабатывает фото, записывает результат в temp_path и возвращает его размер.
+    Выполняется в процессе пула, исходный файл не меняет
+    """
+    with Image.open(path) as source:
+        # Большой JPEG декодируется сразу в уменьшенном масштабе (1/2, 1/4, 1/8)
+        source.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(source)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if watermark:
+        image = apply_watermark(image)
+
+    image.save(temp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return os.path.getsize(temp_path)
+
+
+def _terminate(executor: ProcessPoolExecutor) -> None:
+    """Закрывает пул и завершает его процессы, не дожидаясь начатой обработки"""
+    # У ProcessPoolExecutor нет публичного способа остановить занятый процесс
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(1)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ImagePipeline:
+    def __init__(self, workers: int = WORKERS, timeout: float = TIMEOUT, watermark_path: str = WATERMARK_PATH):
+        self.workers = workers
+        self.timeout = timeout
+        self.watermark_path = watermark_path
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, а не fork: в процессе бота работают потоки aiosqlite, fork с ними небезопасен
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker,
+                                                 initargs=(self.watermark_path,))
+        return self._executor
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            await asyncio.to_thread(_terminate, self._executor)
+            self._executor = None
+
+    async def process(self, path: str, watermark: bool = False) -> bool:
+        """Уменьшает и пересжимает фото на месте. False - фото оставлено как есть"""
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            size_before = os.path.getsize(path)
+            size = await asyncio.wait_for(
+                loop.run_in_executor(executor, process_file, path, temp_path, watermark), self.timeout)
+            os.replace(temp_path, path)
+        except asyncio.TimeoutError:
+            logger.warning(f'Обработка фото {path} не уложилась в {self.timeout} с, оставлено исходное')
+            await self._restart(executor)
+            await asyncio.to_thread(_remove, temp_path)
+            return False
+        except BrokenProcessPool as e:
+            logger.error(f'Пул обработки фото сломан: {e}')
+            await self._restart(executor)
+            await asyncio.to_thread(_remove, temp_path)
+            return False
+        except Exception as e:
+            logger.error(f'Не удалось обработать фото {path}: {e}')
+            await asyncio.to_thread(_remove, temp_path)
+            return False
+        logger.debug(f'Фото {path}: {size_before} -> {size} байт')
+        return True
+
+    async def process_many(self, paths: list[str], watermark: bool = False) -> list[bool]:
+        return list(await asyncio.gather(*(self.process(path, watermark) for path in paths)))
+
+    async def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Зависший процесс не держит очередь: процессы пула завершаются, следующие фото пойдут в новый пул.
+        Остальные фото старого пула получат BrokenProcessPool и останутся исходными
+        """
+        if self._executor is executor:
+            self._executor = None
+            await asyncio.to_thread(_terminate, executor)
+
+
+image_pipeline = ImagePipeline()
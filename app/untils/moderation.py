@@ -0,0 +1,163 @@
+"""
+Проверка текстов в отдельных процессах, чтобы тяжелые проверки не останавливали цикл событий бота.
+
+fool_check (нечеткий поиск стоп-слов) и phone_finder - чистая работа процессора. Пока длинное
+объявление проверяется прямо в цикле aiogram, все остальные пользователи ждут ответа на свои кнопки.
+
+moderation держит ProcessPoolExecutor. Каждый процесс при старте получает снимок стоп-слов
+(stop_words) и строит автоматы поиска один раз. Если версия стоп-слов изменилась, пул пересоздается
+с новыми списками.
+
+Результаты запоминаются в verdict_cache, повторный текст в пул не отправляется.
+
+У каждой проверки есть таймаут. Если проверка не уложилась или пул сломался, возвращается
+вердикт review=True: объявление уходит на ручную проверку администратору (customer_proces.review_task),
+а не публикуется и не блокируется автоматически. Зависший процесс не держит очередь:
+процессы пула завершаются, пул пересоздается, новые проверки идут в свежие процессы.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+
+from app.untils import checks
+from app.untils.stop_words import StopWords, stop_words
+from app.untils.text_normalizer import NormalizedText, normalized
+from app.untils.verdict_cache import verdict_cache
+
+logger = logging.getLogger(__name__)
+
+# Число процессов проверки
+WORKERS = 2
+# Сколько ждать одну проверку (секунды)
+TIMEOUT = 10
+
+
+@dataclass(frozen=True)
+class TextVerdict:
+    # Причина блокировки, как у checks.fool_check, или False
+    ban_reason: str | bool = False
+    has_phone: bool = False
+    # Проверка не завершилась - нужна ручная проверка
+    review: bool = False
+
+
+# Снимок стоп-слов внутри процесса пула
+_words: StopWords | None = None
+
+
+def _init_worker(version: int, lists: dict[str, tuple[str, ...]]) -> None:
+    global _words
+    _words = StopWords(version=version, **lists).prebuild()
+
+
+def _ping() -> int:
+    return _words.version
+
+
+def _terminate(executor: ProcessPoolExecutor) -> None:
+    """Закрывает пул и завершает его процессы, не дожидаясь начатых проверок"""
+    # У ProcessPoolExecutor нет публичного способа остановить занятый процесс
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def _check_text(text: str, is_message: bool, is_personal: bool, check_phone: bool) -> TextVerdict:
+    """Выполняется в процессе пула"""
+    ban_reason = checks.find_ban_reason(text, _words, is_message=is_message, is_personal=is_personal)
+    if ban_reason:
+        return TextVerdict(ban_reason=ban_reason)
+    return TextVerdict(has_phone=check_phone and checks.phone_finder(text))
+
+
+class ModerationService:
+    def __init__(self, workers: int = WORKERS, timeout: float = TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._version: int | None = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Запускает процессы заранее, чтобы первая проверка не ждала их старта"""
+        executor = await self._get_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.workers)))
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            _terminate(self._executor)
+            self._executor = None
+
+    async def _get_executor(self) -> ProcessPoolExecutor:
+        """Пул со стоп-словами текущей версии"""
+        words = await stop_words.get()
+        if self._executor is not None and self._version == words.version:
+            return self._executor
+        async with self._lock:
+            if self._executor is None or self._version != words.version:
+                self._restart(words)
+        return self._executor
+
+    def _restart(self, words: StopWords, terminate: bool = False) -> None:
+        """terminate=True - процессы старого пула завершаются сразу (один из них завис на проверке)"""
+        old_executor = self._executor
+        # spawn, а не fork: в процессе бота работают потоки aiosqlite, fork с ними небезопасен
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker,
+                                             initargs=(words.version, words.word_lists()))
+        self._version = words.version
+        if old_executor is not None and terminate:
+            # Остальные проверки старого пула получат BrokenProcessPool и уйдут на ручную проверку
+            _terminate(old_executor)
+        elif old_executor is not None:
+            # Стоп-слова обновились: начатые и уже поставленные в очередь проверки досчитаются в старых процессах
+            old_executor.shutdown(wait=False)
+        logger.info(f'Пул проверки текстов запущен: {self.workers} процесса, стоп-слова версии {words.version}')
+
+    async def _run(self, name: str, function, *args):
+        """Результат function(*args) из пула или None, если проверка не уложилась в таймаут"""
+        executor = await self._get_executor()
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(executor, function, *args), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'Проверка {name} не уложилась в {self.timeout} с, нужна ручная проверка')
+        except BrokenProcessPool as e:
+            logger.error(f'Пул проверки текстов сломан: {e}')
+        # Процесс, который не успел, может быть занят еще долго: он завершается,
+        # следующие проверки пойдут в новый пул
+        async with self._lock:
+            if self._executor is executor:
+                self._restart(await stop_words.get(), terminate=True)
+        return None
+
+    async def check_text(self, text: 'str | NormalizedText', is_message: bool = False, is_personal: bool = False,
+                         check_phone: bool = False) -> TextVerdict:
+        """
+        fool_check и при check_phone - phone_finder одним заданием в пуле.
+        Повторный текст берется из кэша вердиктов (verdict_cache).
+        Если проверка не завершилась, TextVerdict.review = True
+        """
+        text = normalized(text)
+        version = (await stop_words.get()).version
+        params = (is_message, is_personal, check_phone)
+        # Сообщения чата почти не повторяются после перезапуска - их вердикты только в памяти
+        persist = not is_message
+        if cached := await verdict_cache.get_verdict('check_text', text.key, version, params, persist):
+            return TextVerdict(**cached)
+        verdict = await self._run('текста', _check_text, text.text, *params)
+        if verdict is None:
+            return TextVerdict(review=True)
+        verdict_cache.put_verdict('check_text', text.key, version, asdict(verdict), params, persist)
+        return verdict
+
+
+moderation = ModerationService()
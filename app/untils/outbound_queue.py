@@ -0,0 +1,278 @@
+"""
+Общая очередь исходящих сообщений бота.
+
+Рассылки (объявления исполнителям, сообщения от администратора, уведомления планировщика)
+не вызывают bot.send_* сами, а ставят сообщения в очередь:
+
+    await outbound_queue.send_message(chat_id, text, reply_markup=...)
+    await outbound_queue.send_photo(chat_id, photo=file_id, caption=...)
+    await outbound_queue.enqueue([outbound_queue.build('send_message', chat_id, text=...), ...])
+
+Очередь:
+- отправляет не больше GLOBAL_RATE сообщений в секунду и не чаще раза в PER_CHAT_INTERVAL в один чат;
+- при TelegramRetryAfter приостанавливает всю отправку на указанное время и повторяет сообщение;
+- хранит неотправленные сообщения в таблице outbound_messages, после перезапуска рассылка продолжается;
+- считает метрики: глубину очереди, отправленные за минуту, ошибки и повторы (metrics()).
+
+Ответы пользователю в обработчиках (message.answer и т.п.) идут напрямую: им нужен результат сразу.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import FSInputFile, InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove
+
+from app.data.database.models import OutboundMessage
+from loaders import bot
+
+logger = logging.getLogger(__name__)
+
+# Общий лимит Telegram - около 30 сообщений в секунду
+GLOBAL_RATE = 30
+
+# Не чаще одного сообщения в секунду в один чат (секунды)
+PER_CHAT_INTERVAL = 1.0
+
+# Одновременных запросов к Telegram
+MAX_CONCURRENT_SENDS = 10
+
+# Попыток при сетевых ошибках и первая пауза между ними (секунды, дальше удваивается)
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 5.0
+
+# Сколько ждать отправок в процессе при остановке (секунды)
+STOP_TIMEOUT = 10.0
+
+ALLOWED_METHODS = ('send_message', 'send_photo')
+
+MARKUP_TYPES = {markup.__name__: markup for markup in (InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove)}
+
+
+class OutboundQueue:
+    def __init__(self):
+        self._heap: list[tuple[float, int, OutboundMessage]] = []
+        self._chat_ready_at: dict[int, float] = {}
+        self._in_flight: set[int] = set()
+        self._sends: set[asyncio.Task] = set()
+        self._forbidden_handlers: dict[str, Callable[[int], Awaitable[None]]] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._sent_times: deque[float] = deque()
+        self._counters = {'enqueued': 0, 'sent': 0, 'failed': 0, 'retried': 0, 'flood_waits': 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def register_forbidden_handler(self, kind: str, handler: Callable[[int], Awaitable[None]]) -> None:
+        """Обработчик chat_id пользователя, заблокировавшего бота, для сообщений с этим kind"""
+        self._forbidden_handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Создает таблицу, загружает неотправленные сообщения и запускает отправку"""
+        if self.running:
+            return
+        await OutboundMessage.create_table_if_not_exists()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+        pending = await OutboundMessage.get_pending()
+        for message in pending:
+            heapq.heappush(self._heap, (message.not_before, message.id, message))
+        self._task = asyncio.create_task(self._dispatch_loop())
+        logger.info(f'Очередь исходящих сообщений запущена, неотправленных с прошлого запуска: {len(pending)}')
+
+    async def stop(self) -> None:
+        """Останавливает отправку. Неотправленные сообщения остаются в БД до следующего запуска"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._sends:
+            await asyncio.wait(self._sends, timeout=STOP_TIMEOUT)
+        self._heap.clear()
+        self._in_flight.clear()
+        logger.info(f'Очередь исходящих сообщений остановлена: {self.metrics()}')
+
+    @staticmethod
+    def build(method: str, chat_id: int, kind: str = None, **kwargs) -> OutboundMessage:
+        """
+        Готовит сообщение для enqueue(). kwargs - аргументы метода бота.
+        Фото передается как photo=file_id или photo_path=путь к файлу (файл должен дожить до отправки).
+        """
+        if method not in ALLOWED_METHODS:
+            raise ValueError(f'Метод {method} не поддерживается очередью')
+        payload = {key: value for key, value in kwargs.items() if value is not None}
+        reply_markup = payload.pop('reply_markup', None)
+        if reply_markup is not None:
+            payload['reply_markup'] = {'type': type(reply_markup).__name__,
+                                       'data': reply_markup.model_dump(mode='json', exclude_none=True)}
+        now = time.time()
+        return OutboundMessage(id=None, method=method, chat_id=chat_id, payload=payload, kind=kind,
+                               not_before=now, created_at=now)
+
+    async def enqueue(self, messages: list[OutboundMessage]) -> None:
+        """Сохраняет сообщения в БД одной операцией и ставит их в очередь"""
+        if not messages:
+            return
+        await OutboundMessage.save_many(messages)
+        for message in messages:
+            heapq.heappush(self._heap, (message.not_before, message.id, message))
+        self._counters['enqueued'] += len(messages)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def send_message(self, chat_id: int, text: str, kind: str = None, **kwargs) -> None:
+        await self.enqueue([self.build('send_message', chat_id, kind, text=text, **kwargs)])
+
+    async def send_photo(self, chat_id: int, photo: str = None, photo_path: str = None, kind: str = None,
+                         **kwargs) -> None:
+        await self.enqueue([self.build('send_photo', chat_id, kind, photo=photo, photo_path=photo_path, **kwargs)])
+
+    def metrics(self) -> dict:
+        now = time.time()
+        self._trim_sent_times(now)
+        return {
+            'depth': len(self._heap),
+            'in_flight': len(self._sends),
+            'sent_last_minute': len(self._sent_times),
+            'paused_for': round(max(0.0, self._paused_until - now), 1),
+            **self._counters,
+        }
+
+    async def log_metrics(self) -> None:
+        """Для планировщика: пишет метрики в лог, если очередь не простаивает"""
+        metrics = self.metrics()
+        if metrics['depth'] or metrics['in_flight'] or metrics['sent_last_minute']:
+            logger.info(f'Очередь исходящих сообщений: {metrics}')
+
+    def _trim_sent_times(self, now: float) -> None:
+        while self._sent_times and self._sent_times[0] < now - 60:
+            self._sent_times.popleft()
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            if not self._heap:
+                # Очередь пуста - забываем чаты, лимит которых уже истек
+                now = time.time()
+                self._chat_ready_at = {chat_id: ready_at for chat_id, ready_at in self._chat_ready_at.items()
+                                       if ready_at > now}
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.time()
+            ready_at, _, message = self._heap[0]
+            wait = max(ready_at, self._paused_until, self._next_slot) - now
+            if wait > 0:
+                # Ждем своего времени, но просыпаемся раньше, если в очередь добавили сообщения
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            chat_ready_at = self._chat_ready_at.get(message.chat_id, 0.0)
+            if message.chat_id in self._in_flight or chat_ready_at > now:
+                # В этот чат уже отправляем - откладываем, порядок сообщений чата сохраняется по id
+                chat_ready_at = max(chat_ready_at, now + PER_CHAT_INTERVAL / 5)
+                self._chat_ready_at[message.chat_id] = chat_ready_at
+                heapq.heappush(self._heap, (chat_ready_at, message.id, message))
+                continue
+
+            await self._semaphore.acquire()
+            now = time.time()
+            self._next_slot = max(now, self._next_slot) + 1 / GLOBAL_RATE
+            self._chat_ready_at[message.chat_id] = now + PER_CHAT_INTERVAL
+            self._in_flight.add(message.chat_id)
+            task = asyncio.create_task(self._deliver(message))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _deliver(self, message: OutboundMessage) -> None:
+        try:
+            await self._call(message)
+        except TelegramRetryAfter as e:
+            # Ограничение на весь бот: останавливаем всю отправку, а не только этот чат
+            self._counters['flood_waits'] += 1
+            self._paused_until = max(self._paused_until, time.time() + e.retry_after)
+            logger.warning(f'Telegram просит подождать {e.retry_after} с, отправка приостановлена')
+            await self._retry(message, time.time() + e.retry_after)
+        except TelegramForbiddenError:
+            self._counters['failed'] += 1
+            await self._drop(message)
+            handler = self._forbidden_handlers.get(message.kind)
+            if handler is not None:
+                try:
+                    await handler(message.chat_id)
+                except Exception as e:
+                    logger.error(f'Ошибка обработчика блокировки для {message.chat_id}: {e}')
+        except (TelegramBadRequest, FileNotFoundError, ValueError) as e:
+            # Повтор не поможет: чат не найден, неверный текст, файл удален
+            self._counters['failed'] += 1
+            logger.error(f'Сообщение {message.id} в чат {message.chat_id} не отправлено: {e}')
+            await self._drop(message)
+        except Exception as e:
+            if message.attempts + 1 >= MAX_ATTEMPTS:
+                self._counters['failed'] += 1
+                logger.error(f'Сообщение {message.id} в чат {message.chat_id} не отправлено '
+                             f'после {MAX_ATTEMPTS} попыток: {e}')
+                await self._drop(message)
+            else:
+                logger.warning(f'Ошибка отправки сообщения {message.id} в чат {message.chat_id}, повтор: {e}')
+                await self._retry(message, time.time() + RETRY_DELAY * 2 ** message.attempts)
+        else:
+            self._counters['sent'] += 1
+            now = time.time()
+            self._sent_times.append(now)
+            self._trim_sent_times(now)
+            await self._drop(message)
+        finally:
+            self._in_flight.discard(message.chat_id)
+            self._semaphore.release()
+            self._wakeup.set()
+
+    @staticmethod
+    async def _call(message: OutboundMessage) -> None:
+        if message.method not in ALLOWED_METHODS:
+            raise ValueError(f'Метод {message.method} не поддерживается очередью')
+        kwargs = dict(message.payload)
+        if 'photo_path' in kwargs:
+            photo_path = kwargs.pop('photo_path')
+            if 'photo' not in kwargs:
+                kwargs['photo'] = FSInputFile(photo_path)
+        reply_markup = kwargs.pop('reply_markup', None)
+        if reply_markup is not None:
+            kwargs['reply_markup'] = MARKUP_TYPES[reply_markup['type']].model_validate(reply_markup['data'])
+        await getattr(bot, message.method)(chat_id=message.chat_id, **kwargs)
+
+    async def _retry(self, message: OutboundMessage, not_before: float) -> None:
+        self._counters['retried'] += 1
+        try:
+            await message.reschedule(not_before)
+        except Exception as e:
+            logger.error(f'Не удалось сохранить повтор сообщения {message.id}: {e}')
+        heapq.heappush(self._heap, (message.not_before, message.id, message))
+
+    @staticmethod
+    async def _drop(message: OutboundMessage) -> None:
+        try:
+            await message.delete()
+        except Exception as e:
+            logger.error(f'Не удалось удалить сообщение {message.id} из очереди: {e}')
+
+
+outbound_queue = OutboundQueue()
@@ -0,0 +1,302 @@
+"""
+Хранилище фото, адресуемых по содержимому.
+
+Раньше каждое фото лежало в своей папке: app/data/photo/<tg_id>/<tg_id>_<timestamp>/<n>.jpg,
+app/data/photo/<tg_id>/portfolio/<n>.jpg. Повторно загруженное фото и копии для banned_abs
+(help_defs.copy_file) хранились отдельными файлами.
+
+Теперь при сохранении владельца (Abs.save, BannedAbs.save, Worker.update_portfolio_photo,
+Worker.update_profile_photo) файл копируется в BLOB_DIR/<первые 2 символа>/<sha256>.jpg:
+
+    photo_path = await photo_store.attach('abs', ad.id, photo_path, save)
+    await photo_store.release('abs', ad.id)
+
+save(photo_path) записывает новые пути у владельца. Исходный файл удаляется только после нее:
+если процесс прервется раньше, запись указывает на старый файл, и он на месте.
+
+- одинаковое содержимое хранится одним файлом, повторная копия удаляется;
+- ссылки владельцев на фото - в таблице photo_refs (PhotoBlob), файл удаляется, когда на него
+  не осталось ссылок: проверка по индексу, без обхода папок и загрузки всех исполнителей;
+- в БД по-прежнему хранится путь к файлу, поэтому FSInputFile и кэш file_id работают как раньше;
+- пути в словаре photo_path заменяются путями хранилища на месте: вызывающий код,
+  который держит тот же словарь, отправляет уже перенесенные файлы.
+
+Пока load() не вызван (скрипты без main.run), attach возвращает пути без изменений.
+Существующие фото переносит migration_photo_blobs.
+
+Файлы вне хранилища, на которые не ссылается ни одна запись (фото отклоненных объявлений,
+оставшиеся после ошибок загрузки), удаляет cleanup_orphaned_files().
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from app.data.database.models import PhotoBlob
+from app.untils.file_id_cache import file_id_cache
+
+logger = logging.getLogger(__name__)
+
+PHOTO_ROOT = 'app/data/photo'
+BLOB_DIR = 'app/data/photo/blobs'
+
+# Владельцы фото
+OWNER_ABS = 'abs'
+OWNER_BANNED_ABS = 'banned_abs'
+OWNER_PORTFOLIO = 'portfolio'
+OWNER_PROFILE = 'profile'
+
+# Размер блока при чтении файла для хеша
+HASH_CHUNK = 1 << 20
+
+# Файлы без ссылок моложе этого возраста не удаляются: объявление еще на проверке, загрузка не закончена (часы)
+ORPHAN_MIN_AGE_HOURS = 24
+# Файлов без ссылок, удаляемых за один проход в потоке
+ORPHAN_DELETE_BATCH = 200
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def blob_path(sha256: str) -> str:
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256}.jpg'
+
+
+def is_blob(path) -> bool:
+    return isinstance(path, str) and os.path.normpath(path).startswith(os.path.normpath(BLOB_DIR) + os.sep)
+
+
+def blob_sha256(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_to_blob(path: str) -> tuple[str, int]:
+    """
+    Копирует файл в хранилище, если такого фото там еще нет: (sha256, размер).
+    Копия пишется во временный файл и переименовывается - в хранилище не бывает недописанных фото
+    """
+    sha256 = file_sha256(path)
+    target = blob_path(sha256)
+    size = os.path.getsize(path)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f'{target}.{os.getpid()}.tmp'
+        try:
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, target)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return sha256, size
+
+
+def photo_paths(photo_path) -> list[str]:
+    """Пути из photo_path: словаря {номер: путь}, строки или None"""
+    if isinstance(photo_path, dict):
+        return [path for path in photo_path.values() if path]
+    return [photo_path] if photo_path else []
+
+
+def parse_photo_path(value):
+    """photo_path из БД так же, как его читают модели Abs и BannedAbs"""
+    if not value or value == 'null':
+        return None
+    return json.loads(value) if '{' in value else {'0': value}
+
+
+def find_orphaned_files(root: str, referenced: set[str], min_mtime: float) -> list[tuple[str, int]]:
+    """
+    Обходит root через os.scandir (без папки хранилища) и возвращает [(путь, размер), ...] фото,
+    которых нет в referenced (нормализованные пути) и которые не менялись после min_mtime
+    """
+    blob_dir = os.path.normpath(BLOB_DIR)
+    orphaned = []
+    directories = [os.path.normpath(root)]
+    while directories:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    path = os.path.normpath(entry.path)
+                    if entry.is_dir(follow_symlinks=False):
+                        if path != blob_dir:
+                            directories.append(path)
+                        continue
+                    if not entry.name.lower().endswith(PHOTO_EXTENSIONS) or path in referenced:
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < min_mtime:
+                        orphaned.append((path, stat.st_size))
+        except OSError as e:
+            logger.error(f'Не удалось прочитать папку фото: {e}')
+    return orphaned
+
+
+def delete_files(files: list[tuple[str, int]]) -> tuple[int, int]:
+    """Удаляет файлы [(путь, размер), ...]: (удалено, освобождено байт)"""
+    deleted = 0
+    reclaimed = 0
+    for path, size in files:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.error(f'Не удалось удалить файл {path}: {e}')
+            continue
+        deleted += 1
+        reclaimed += size
+    return deleted, reclaimed
+
+
+def remove_empty_dirs(paths, root: str = PHOTO_ROOT) -> None:
+    """Удаляет опустевшие папки файлов paths, не выше root"""
+    root = os.path.normpath(root)
+    for directory in sorted({os.path.dirname(os.path.normpath(path)) for path in paths}, reverse=True):
+        while directory.startswith(root + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+class PhotoStore:
+    def __init__(self):
+        self._loaded = False
+        # Перенос файла и изменение ссылок не должны пересекаться с удалением файла без ссылок
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        await PhotoBlob.create_tables_if_not_exist()
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        self._loaded = True
+
+    async def _store(self, path: str) -> str:
+        """Путь к фото в хранилище. Файл, которого нет на диске, остается по старому пути"""
+        if is_blob(path):
+            return path
+        try:
+            sha256, size = await asyncio.to_thread(copy_to_blob, path)
+        except OSError as e:
+            logger.warning(f'Фото {path} не перенесено в хранилище: {e}')
+            return path
+        await PhotoBlob.save(sha256, size)
+        return blob_path(sha256)
+
+    async def attach(self, owner_type: str, owner_id: int, photo_path, save=None):
+        """
+        Копирует фото владельца в хранилище, заменяет его ссылки и вызывает save(photo_path).
+        Возвращает photo_path с путями хранилища (словарь изменяется на месте).
+        После save удаляются исходные файлы и фото, на которые владелец больше не ссылается
+        (если на них нет других ссылок)
+        """
+        if not self._loaded or owner_id is None:
+            if save is not None:
+                await save(photo_path)
+            return photo_path
+        async with self._lock:
+            sources = []
+            if isinstance(photo_path, dict):
+                for key, path in photo_path.items():
+                    if path:
+                        photo_path[key] = await self._store(path)
+                        if photo_path[key] != path:
+                            sources.append(path)
+            elif photo_path:
+                source = photo_path
+                photo_path = await self._store(source)
+                if photo_path != source:
+                    sources.append(source)
+            sha256s = {blob_sha256(path) for path in photo_paths(photo_path) if is_blob(path)}
+            removed = await PhotoBlob.set_refs(owner_type, owner_id, sha256s)
+            if save is not None:
+                await save(photo_path)
+
+            await asyncio.to_thread(delete_files, [(path, 0) for path in sources])
+            for path in sources:
+                file_id_cache.forget(path)
+            await self._delete_unreferenced(removed)
+        return photo_path
+
+    async def release(self, owner_type: str, owner_id: int, delete_files: bool = True) -> None:
+        """Убирает ссылки владельца. delete_files=False - файлы без ссылок остаются до cleanup()"""
+        if not self._loaded or owner_id is None:
+            return
+        async with self._lock:
+            removed = await PhotoBlob.set_refs(owner_type, owner_id, set())
+            if delete_files:
+                await self._delete_unreferenced(removed)
+
+    async def cleanup(self) -> int:
+        """
+        Для планировщика: убирает ссылки удаленных владельцев (например, исполнителя, удаленного по tg_id)
+        и удаляет все фото без ссылок. Возвращает число удаленных фото
+        """
+        if not self._loaded:
+            return 0
+        async with self._lock:
+            dangling = await PhotoBlob.delete_dangling_refs()
+            if dangling:
+                logger.info(f'Удалено ссылок на фото от удаленных записей: {dangling}')
+            return await self._delete_unreferenced(None)
+
+    async def cleanup_orphaned_files(self, root: str = PHOTO_ROOT) -> tuple[int, int]:
+        """
+        Для планировщика: удаляет фото вне хранилища, на которые не ссылается ни одна запись.
+        Ссылки читаются из БД один раз, обход папок и удаление идут в потоке пачками
+        по ORPHAN_DELETE_BATCH. Возвращает (удалено файлов, освобождено байт)
+        """
+        referenced = set()
+        for value in await PhotoBlob.get_photo_values():
+            try:
+                photo_path = parse_photo_path(value)
+            except ValueError:
+                photo_path = value
+            referenced.update(os.path.normpath(path) for path in photo_paths(photo_path))
+
+        min_mtime = time.time() - ORPHAN_MIN_AGE_HOURS * 3600
+        orphaned = await asyncio.to_thread(find_orphaned_files, root, referenced, min_mtime)
+
+        deleted = 0
+        reclaimed = 0
+        for start in range(0, len(orphaned), ORPHAN_DELETE_BATCH):
+            batch = orphaned[start: start + ORPHAN_DELETE_BATCH]
+            batch_deleted, batch_reclaimed = await asyncio.to_thread(delete_files, batch)
+            deleted += batch_deleted
+            reclaimed += batch_reclaimed
+            for path, _ in batch:
+                file_id_cache.forget(path)
+        await asyncio.to_thread(remove_empty_dirs, [path for path, _ in orphaned], root)
+        logger.info(f'Фото без ссылок: проверено ссылок {len(referenced)}, удалено файлов {deleted}, '
+                    f'освобождено {reclaimed} байт')
+        return deleted, reclaimed
+
+    async def _delete_unreferenced(self, sha256s: set[str] | None) -> int:
+        deleted = await PhotoBlob.delete_unreferenced(sha256s)
+        reclaimed = 0
+        for sha256, size in deleted:
+            path = blob_path(sha256)
+            file_id_cache.forget(path)
+            try:
+                await asyncio.to_thread(os.remove, path)
+                reclaimed += size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f'Не удалось удалить фото {path}: {e}')
+        if deleted:
+            logger.info(f'Удалено фото без ссылок: {len(deleted)}, освобождено {reclaimed} байт')
+        return len(deleted)
+
+
+photo_store = PhotoStore()
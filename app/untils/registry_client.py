@@ -0,0 +1,199 @@
+"""
+Проверка статусов исполнителей в реестрах: ИП (rusprofile по ОГРНИП), ООО (ЕГРЮЛ по ОГРН),
+самозанятость (НПД по ИНН) - без блокировки цикла событий.
+
+Раньше help_defs.check_* делали requests прямо в цикле aiogram, check_ooo еще и ждал time.sleep(1.5),
+у части запросов не было таймаута, а недельная проверка статусов шла по исполнителям по очереди. Теперь:
+
+    name = await registry_client.check_ip(ogrnip)    # название ИП, None - не найден
+    found = await registry_client.check_ooo(ogrn)    # True / False
+    status = await registry_client.check_npd(inn)    # статус НПД / False
+
+При ошибке запроса методы возвращают ERROR ("error"), как раньше check_ooo и check_npd.
+
+- общий пул соединений aiohttp: не больше MAX_CONNECTIONS всего и PER_HOST_LIMIT на один реестр;
+- у запроса таймаут REQUEST_TIMEOUT, при сетевой ошибке, 429 и 5xx - RETRIES повторов с паузой;
+- ответы (кроме ошибок) запоминаются по номеру на CACHE_TTL, одновременные проверки одного номера
+  делают один запрос;
+- разбор страницы rusprofile выполняется в потоке.
+
+Адреса реестров задаются в конструкторе: RegistryClient(base_url=...) направляет все запросы
+на один адрес - так работает локальная замена реестров benchmarks/registry_stub.py.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import date
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+IP_URL = 'https://www.rusprofile.ru'
+EGRUL_URL = 'https://egrul.nalog.ru'
+NPD_URL = 'https://statusnpd.nalog.ru'
+
+# Одновременных соединений всего и с одним реестром
+MAX_CONNECTIONS = 50
+PER_HOST_LIMIT = 5
+# Таймаут одного запроса (секунды)
+REQUEST_TIMEOUT = 15
+# Повторов после неудачного запроса и первая пауза между ними (секунды, дальше удваивается)
+RETRIES = 2
+RETRY_DELAY = 1.0
+# Пауза ЕГРЮЛ между запросом поиска и получением результата (секунды)
+EGRUL_RESULT_DELAY = 1.5
+# Сколько помнить ответ реестра (секунды) и сколько ответов держать в памяти
+CACHE_TTL = 6 * 3600
+CACHE_SIZE = 20000
+
+ERROR = 'error'
+
+IP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+EGRUL_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1",
+    "Referer": "https://egrul.nalog.ru/index.html",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
+
+class RegistryError(Exception):
+    pass
+
+
+def parse_ip_name(html: str) -> str | None:
+    """Название ИП со страницы rusprofile"""
+    status_element = BeautifulSoup(html, 'html.parser').find('h2', class_='company-name')
+    return status_element.text.strip() if status_element else None
+
+
+class RegistryClient:
+    def __init__(self, base_url: str = None, ip_url: str = IP_URL, egrul_url: str = EGRUL_URL,
+                 npd_url: str = NPD_URL, cache_ttl: float = CACHE_TTL, result_delay: float = EGRUL_RESULT_DELAY):
+        self.ip_url = base_url or ip_url
+        self.egrul_url = base_url or egrul_url
+        self.npd_url = base_url or npd_url
+        self.cache_ttl = cache_ttl
+        self.result_delay = result_delay
+        self._session: aiohttp.ClientSession | None = None
+        self._cache: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._pending: dict[tuple, asyncio.Future] = {}
+        self.requests = 0
+        self.hits = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=PER_HOST_LIMIT),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def check_ip(self, ogrnip: str) -> str | None:
+        """Название ИП по ОГРНИП, None - не найден, ERROR - реестр не ответил"""
+        return await self._cached(('ip', str(ogrnip)), self._check_ip, str(ogrnip))
+
+    async def check_ooo(self, ogrn: str) -> bool | str:
+        """Есть ли действующее юрлицо с таким ОГРН, ERROR - реестр не ответил"""
+        return await self._cached(('ooo', str(ogrn)), self._check_ooo, str(ogrn))
+
+    async def check_npd(self, inn: str) -> bool | str:
+        """Статус самозанятого по ИНН (False - не самозанятый), ERROR - реестр не ответил"""
+        return await self._cached(('npd', str(inn)), self._check_npd, str(inn))
+
+    async def _cached(self, key: tuple, check, number: str):
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires, value = cached
+            if expires > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._cache[key]
+
+        # Одновременные проверки одного номера ждут один запрос
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        value = ERROR
+        try:
+            value = await check(number)
+        except (RegistryError, aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f'Реестр не ответил ({key[0]} {number}): {type(e).__name__} {e}')
+        finally:
+            del self._pending[key]
+            future.set_result(value)
+
+        if value != ERROR:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return value
+
+    async def _request(self, method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
+        """Запрос с повторами. Возвращает ответ с прочитанным телом; 4xx кроме 429 не повторяются"""
+        delay = RETRY_DELAY
+        for attempt in range(RETRIES + 1):
+            self.requests += 1
+            try:
+                async with self._get_session().request(method, url, **kwargs) as response:
+                    await response.read()
+                    if response.status != 429 and response.status < 500:
+                        return response
+                    error = RegistryError(f'HTTP {response.status}')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt == RETRIES:
+                raise error
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    async def _check_ip(self, ogrnip: str) -> str | None:
+        response = await self._request('GET', f'{self.ip_url}/ip/{ogrnip}', headers=IP_HEADERS)
+        if response.status == 404:
+            return None
+        if response.status >= 400:
+            raise RegistryError(f'HTTP {response.status}')
+        return await asyncio.to_thread(parse_ip_name, await response.text())
+
+    async def _check_ooo(self, ogrn: str) -> bool:
+        response = await self._request('POST', f'{self.egrul_url}/', data={"query": ogrn}, headers=EGRUL_HEADERS)
+        if response.status >= 400:
+            raise RegistryError(f'HTTP {response.status}')
+        request_id = (await response.json(content_type=None)).get("t")
+        if not request_id:
+            return False
+
+        await asyncio.sleep(self.result_delay)
+        params = {"r": str(int(time.time() * 1000)), "_": str(int(time.time() * 1000))}
+        result = await self._request('GET', f'{self.egrul_url}/search-result/{request_id}',
+                                     headers=EGRUL_HEADERS, params=params)
+        if result.status >= 400:
+            raise RegistryError(f'HTTP {result.status}')
+        rows = (await result.json(content_type=None)).get("rows", [])
+        return any(row.get("k") == "ul" and row.get("cnt", 0) != 0 for row in rows)
+
+    async def _check_npd(self, inn: str) -> bool | str:
+        payload = {"inn": inn, "requestDate": str(date.today())}
+        response = await self._request('POST', f'{self.npd_url}/api/v1/tracker/taxpayer_status', json=payload)
+        if response.status != 200:
+            # Как и раньше: реестр ответил, но статуса нет
+            return False
+        return (await response.json(content_type=None)).get("status", False)
+
+    def log_metrics(self) -> None:
+        logger.info(f'Реестры: запросов {self.requests}, ответов из кэша {self.hits}, в кэше {len(self._cache)}')
+
+
+registry_client = RegistryClient()
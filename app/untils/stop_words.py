@@ -0,0 +1,138 @@
+"""
+Списки стоп-слов в памяти для проверок текста (checks.fool_check).
+
+Все таблицы слов читаются один раз в StopWords - неизменяемый снимок с номером версии из
+stop_words_version. Проверки берут текущий снимок без обращений к БД.
+
+Изменение списков в админке (admin_edit_stop_words) вызывает stop_words.bump(): версия в БД
+увеличивается и снимок перечитывается сразу. Планировщик раз в REFRESH_INTERVAL секунд вызывает
+refresh_if_changed() - так изменения, сделанные другим процессом с той же БД, тоже подхватываются.
+Снимок заменяется целиком, поэтому проверка никогда не видит половину старых и половину новых списков.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from functools import cached_property
+
+from app.data.database.models import BlockWord, BlockWordMessage, BlockWordPersonal, BlockWordPhoto, \
+    BlockWordShort, BlockWordShortMessage, BlockWordShortPersonal, BlockWordShortPhoto, ProfanityWord, WhiteWord, \
+    StopWordsVersion
+from app.untils.fuzzy_matcher import FuzzyMatcher
+from app.untils.word_matcher import WordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Как часто сверять версию списков с БД (секунды)
+REFRESH_INTERVAL = 30
+
+# Списки, которые ищутся целыми словами (checks.contains_profanity) - автомат строится сразу при загрузке
+MATCHER_LISTS = ('profanity', 'short', 'short_message', 'short_personal')
+# Списки для нечеткого поиска (checks.levenshtein_distance_check)
+FUZZY_MATCHER_LISTS = ('block', 'block_message', 'block_personal')
+
+# Поле снимка -> модель таблицы слов
+WORD_MODELS = {
+    'block': BlockWord,
+    'block_message': BlockWordMessage,
+    'block_personal': BlockWordPersonal,
+    'block_photo': BlockWordPhoto,
+    'short': BlockWordShort,
+    'short_message': BlockWordShortMessage,
+    'short_personal': BlockWordShortPersonal,
+    'short_photo': BlockWordShortPhoto,
+    'profanity': ProfanityWord,
+    'white': WhiteWord,
+}
+
+
+@dataclass(frozen=True)
+class StopWords:
+    version: int
+    block: tuple[str, ...]
+    block_message: tuple[str, ...]
+    block_personal: tuple[str, ...]
+    block_photo: tuple[str, ...]
+    short: tuple[str, ...]
+    short_message: tuple[str, ...]
+    short_personal: tuple[str, ...]
+    short_photo: tuple[str, ...]
+    profanity: tuple[str, ...]
+    white: tuple[str, ...]
+    _matchers: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _fuzzy_matchers: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def matcher(self, name: str) -> WordMatcher:
+        """Поиск по списку name целыми словами. Строится один раз для снимка"""
+        matcher = self._matchers.get(name)
+        if matcher is None:
+            matcher = self._matchers[name] = WordMatcher(getattr(self, name))
+        return matcher
+
+    def fuzzy_matcher(self, name: str) -> FuzzyMatcher:
+        """Нечеткий поиск по списку name. Строится один раз для снимка"""
+        matcher = self._fuzzy_matchers.get(name)
+        if matcher is None:
+            matcher = self._fuzzy_matchers[name] = FuzzyMatcher(getattr(self, name))
+        return matcher
+
+    @cached_property
+    def white_set(self) -> frozenset[str]:
+        return frozenset(self.white)
+
+    def word_lists(self) -> dict[str, tuple[str, ...]]:
+        """Списки без построенных автоматов - для передачи в другой процесс (moderation)"""
+        return {name: getattr(self, name) for name in WORD_MODELS}
+
+    def prebuild(self) -> 'StopWords':
+        """Строит автоматы для всех проверок заранее, чтобы первая проверка не ждала"""
+        for name in MATCHER_LISTS:
+            self.matcher(name)
+        for name in FUZZY_MATCHER_LISTS:
+            self.fuzzy_matcher(name)
+        return self
+
+
+class StopWordRegistry:
+    def __init__(self):
+        self._words: StopWords | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int | None:
+        return self._words.version if self._words else None
+
+    async def get(self) -> StopWords:
+        """Текущий снимок. Первый вызов загружает списки (скрипты без main.run)"""
+        if self._words is None:
+            await self.load()
+        return self._words
+
+    async def load(self) -> None:
+        """Перечитывает все списки и заменяет снимок"""
+        async with self._lock:
+            await StopWordsVersion.create_table_if_not_exists()
+            # Версию читаем до списков: если их изменят во время чтения, следующая сверка перечитает снова
+            version = await StopWordsVersion.get()
+            lists = {}
+            for name, model in WORD_MODELS.items():
+                lists[name] = tuple(record.word for record in await model.get_all())
+            self._words = StopWords(version=version, **lists).prebuild()
+        logger.info(f'Стоп-слова загружены, версия {version}: '
+                    + ', '.join(f'{name} {len(word_list)}' for name, word_list in lists.items()))
+
+    async def bump(self) -> None:
+        """Вызывается после изменения любого списка слов"""
+        await StopWordsVersion.bump()
+        await self.load()
+
+    async def refresh_if_changed(self) -> None:
+        """Для планировщика: перечитывает списки, если версия в БД изменилась"""
+        try:
+            if self._words is None or await StopWordsVersion.get() != self._words.version:
+                await self.load()
+        except Exception as e:
+            logger.error(f'Не удалось обновить стоп-слова: {e}')
+
+
+stop_words = StopWordRegistry()
@@ -0,0 +1,136 @@
+"""
+Нормализация текста для проверок (checks.fool_check, ContactFilter, is_content_forbidden).
+
+Таблица замены leet-символов строится один раз при импорте: односимвольные варианты - через
+str.maketrans/str.translate, многосимвольные ('zh', 'sch', '}{', '|{' ...) - одним скомпилированным regex.
+
+NormalizedText(text) считает нужные представления текста (нижний регистр, ё -> е, leet) лениво и один раз,
+поэтому несколько проверок одного сообщения не нормализуют его заново. Там же запоминается
+результат поиска контактов (contact_detector).
+
+Сам текст приводится к канонической форме (canonical_text): Unicode NFC и без пробелов по краям.
+Проверки всегда видят одну форму текста, поэтому их вердикты можно кэшировать по NormalizedText.key
+(verdict_cache): «й», набранная буквой и знаком бреве, совпадает с обычной.
+"""
+
+import hashlib
+import re
+import unicodedata
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Только для аннотации: сам contact_detector загружается при первом обращении к contacts
+    from app.untils.contact_detector import ContactScan
+
+# Буква -> варианты ее написания
+LEET_VARIANTS = {
+    'а': ['а', 'a', '@'],
+    'б': ['б', '6', 'b'],
+    'в': ['в', 'b', 'v'],
+    'г': ['г', 'r', 'g'],
+    'д': ['д', 'd'],
+    'е': ['е', 'e'],
+    'ё': ['ё', 'e'],
+    'ж': ['ж', 'zh', '*'],
+    'з': ['з', '3', 'z'],
+    'и': ['и', 'u', 'i'],
+    'й': ['й', 'u', 'i'],
+    'к': ['к', 'k', 'i{', '|{'],
+    'л': ['л', 'l', 'ji'],
+    'м': ['м', 'm'],
+    'н': ['н', 'h', 'n'],
+    'о': ['о', 'o', '0'],
+    'п': ['п', 'n', 'p'],
+    'р': ['р', 'r', 'p'],
+    'с': ['с', 'c', 's'],
+    'т': ['т', 'm', 't'],
+    'у': ['у', 'y', 'u'],
+    'ф': ['ф', 'f'],
+    'х': ['х', 'x', 'h', '}{'],
+    'ц': ['ц', 'c', 'u,'],
+    'ч': ['ч', 'ch'],
+    'ш': ['ш', 'sh'],
+    'щ': ['щ', 'sch'],
+    'ь': ['ь', 'b'],
+    'ы': ['ы', 'bi'],
+    'ъ': ['ъ'],
+    'э': ['э', 'e'],
+    'ю': ['ю', 'io'],
+    'я': ['я', 'ya'],
+}
+
+
+def _build_tables(variants: dict[str, list[str]]) -> tuple[dict[int, str], dict[str, str]]:
+    """(таблица для str.translate, многосимвольный вариант -> буква). При повторах побеждает первая буква"""
+    single, multi = {}, {}
+    for letter, spellings in variants.items():
+        for spelling in spellings:
+            if spelling == letter:
+                continue
+            target = single if len(spelling) == 1 else multi
+            target.setdefault(spelling, letter)
+    return str.maketrans(single), multi
+
+
+LEET_TABLE, LEET_MULTI = _build_tables(LEET_VARIANTS)
+# Длинные варианты первыми, чтобы 'sch' не разбирался как 's' + 'ch'
+_leet_multi_re = re.compile('|'.join(re.escape(spelling) for spelling in sorted(LEET_MULTI, key=len, reverse=True)))
+
+
+def normalize_leet(text: str) -> str:
+    """Заменяет leet-написания русскими буквами: сначала многосимвольные, потом односимвольные"""
+    text = _leet_multi_re.sub(lambda match: LEET_MULTI[match.group()], text)
+    return text.translate(LEET_TABLE)
+
+
+def replace_yo_with_e(text: str) -> str:
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def canonical_text(text: str | None) -> str:
+    return unicodedata.normalize('NFC', text or '').strip()
+
+
+class NormalizedText:
+    """Текст сообщения и его нормализованные представления, каждое считается один раз"""
+
+    def __init__(self, text: str | None):
+        self.text = canonical_text(text)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    @cached_property
+    def key(self) -> str:
+        """Хеш текста для кэша вердиктов"""
+        return hashlib.sha256(self.text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def without_yo(self) -> str:
+        return replace_yo_with_e(self.text)
+
+    @cached_property
+    def leet(self) -> str:
+        return normalize_leet(self.without_yo)
+
+    @cached_property
+    def contacts(self) -> 'ContactScan':
+        """Контакты в исходном тексте (contact_detector), один проход на сообщение"""
+        from app.untils.contact_detector import contact_detector
+
+        return contact_detector.scan(self.text)
+
+
+def normalized(text: 'str | NormalizedText | None') -> NormalizedText:
+    """Проверки принимают и строку, и уже нормализованный текст"""
+    if isinstance(text, NormalizedText):
+        return text
+    return NormalizedText(text)
@@ -1,11 +1,13 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
 
 from app.data.database.models import Customer, Worker, Banned, WorkerAndSubscription, Abs, WorkersAndAbs, \
-    SubscriptionType, BannedAbs, City, WorkerAndRefsAssociation
+    SubscriptionType, BannedAbs, City, WorkerAndRefsAssociation, AdText
 from app.keyboards import KeyboardCollection
 from app.untils import help_defs
-from loaders import bot
+from app.untils.outbound_queue import outbound_queue
+from app.untils.photo_store import photo_store
 
 logger = logging.getLogger()
 
@@ -22,7 +24,7 @@ async def check_time_alive():
             users.append(customer)
     len_users = len(users) if users else 0
 
-    await bot.send_message(chat_id=-4215934637, text=f'Bot alive\n\nВсего пользователей {len_users}')
+    await outbound_queue.send_message(chat_id=-4215934637, text=f'Bot alive\n\nВсего пользователей {len_users}')
 
 
 async def check_time_banned():
@@ -35,7 +37,7 @@ async def check_time_banned():
             if banned_user.ban_end <= datetime.now():
                 await banned_user.update(ban_now=False)
                 try:
-                    await bot.send_message(chat_id=banned_user.tg_id,
+                    await outbound_queue.send_message(chat_id=banned_user.tg_id,
                                            text='Вы были разблокированы, чтобы продолжить работу вызовите команду /menu')
                 except Exception:
                     pass
@@ -57,7 +59,7 @@ async def check_time_workers_stars():
                         if customer := await Customer.get_customer(tg_id=worker.tg_id):
                             await customer.delete()
                         try:
-                            await bot.send_message(chat_id=worker.tg_id, text='Увы, к сожалению нам пришлось закрыть вам доступ за низкий рейтинг 😢')
+                            await outbound_queue.send_message(chat_id=worker.tg_id, text='Увы, к сожалению нам пришлось закрыть вам доступ за низкий рейтинг 😢')
                         except Exception:
                             pass
 
@@ -81,7 +83,7 @@ async def check_time_workers():
                                 btn_bonus = True
 
                         try:
-                            await bot.send_message(chat_id=worker.tg_id, text='У вас в скором времени закончится подписка', reply_markup=kbc.subscription_btn(btn_bonus=btn_bonus))
+                            await outbound_queue.send_message(chat_id=worker.tg_id, text='У вас в скором времени закончится подписка', reply_markup=kbc.subscription_btn(btn_bonus=btn_bonus))
                         except Exception:
                             pass
 
@@ -96,12 +98,12 @@ async def check_time_customer():
                 if worker := await Worker.get_worker(tg_id=customer.tg_id):
                     if not worker.active:
                         try:
-                            await bot.send_message(chat_id=customer.tg_id, text='Обновлен лимит объявлений на сегодня 0 из 3')
+                            await outbound_queue.send_message(chat_id=customer.tg_id, text='Обновлен лимит объявлений на сегодня 0 из 3')
                         except Exception:
                             pass
                 else:
                     try:
-                        await bot.send_message(chat_id=customer.tg_id, text='Обновлен лимит объявлений на сегодня 0 из 3')
+                        await outbound_queue.send_message(chat_id=customer.tg_id, text='Обновлен лимит объявлений на сегодня 0 из 3')
                     except Exception:
                         pass
 
@@ -142,7 +144,7 @@ async def handle_expired_advertisement(advertisement, kbc):
     
     workers_and_abs = await WorkersAndAbs.get_by_abs(abs_id=advertisement.id)
     customer = await Customer.get_customer(id=advertisement.customer_id)
-    text = help_defs.read_text_file(advertisement.text_path)
+    text = await help_defs.read_ad_text(advertisement.text_path)
 
     if workers_and_abs:
         workers_for_assessments = []
@@ -154,10 +156,10 @@ async def handle_expired_advertisement(advertisement, kbc):
             sub = await SubscriptionType.get_subscription_type(id=worker_sub.subscription_id)
             if sub.notification:
                 city = await City.get_city(id=advertisement.city_id)
-                text = f'Объявление {advertisement.id} г. {city.city}\n' + help_defs.read_text_file(
+                text = f'Объявление {advertisement.id} г. {city.city}\n' + await help_defs.read_ad_text(
                     advertisement.text_path)
                 try:
-                    await bot.send_message(chat_id=worker.tg_id,
+                    await outbound_queue.send_message(chat_id=worker.tg_id,
                                            text=f'Объявление закрыто за истечением срока давности\n\nОбъявление неактуально\n\n{text}')
                 except Exception:
                     pass
@@ -172,7 +174,7 @@ async def handle_expired_advertisement(advertisement, kbc):
             ids = [worker.id for worker in workers_for_assessments]
 
             try:
-                await bot.send_message(
+                await outbound_queue.send_message(
                     chat_id=customer.tg_id,
                     text=f'Срок актуальность объявления #{advertisement.id} истек!\n\n'
                          f'{text}\n\n'
@@ -184,7 +186,7 @@ async def handle_expired_advertisement(advertisement, kbc):
 
     else:
         try:
-            await bot.send_message(
+            await outbound_queue.send_message(
                 chat_id=customer.tg_id,
                 text=f'Срок актуальность объявления #{advertisement.id} истек!\n\n'
                      f'{text}'
@@ -200,10 +202,10 @@ async def handle_expiring_soon_advertisement(advertisement, kbc):
     logger.info(f'Handling expiring soon advertisement {advertisement.id}')
     
     customer = await Customer.get_customer(id=advertisement.customer_id)
-    text = help_defs.read_text_file(advertisement.text_path)
+    text = await help_defs.read_ad_text(advertisement.text_path)
     
     try:
-        await bot.send_message(
+        await outbound_queue.send_message(
             chat_id=customer.tg_id,
             text=f'⚠️ Объявление #{advertisement.id} истекает через 2 часа!\n\n'
                  f'{text}\n\n'
@@ -220,7 +222,7 @@ async def handle_expiring_tomorrow_advertisement(advertisement, kbc):
     customer = await Customer.get_customer(id=advertisement.customer_id)
     
     try:
-        await bot.send_message(
+        await outbound_queue.send_message(
             chat_id=customer.tg_id,
             text=f'📅 Завтра истекает срок вашего объявления #{advertisement.id}!'
         )
@@ -239,11 +241,16 @@ async def check_time_banned_advertisement():
 
 
 async def cleanup_orphaned_files():
-    """Очистка осиротевших файлов портфолио - запускается еженедельно"""
+    """Очистка осиротевших фото и текстов объявлений - запускается еженедельно"""
     logger.info('cleanup_orphaned_files')
     try:
-        cleaned_count = help_defs.cleanup_orphaned_portfolio_files()
-        logger.info(f'Очистка файлов завершена. Обработано файлов: {cleaned_count}')
+        deleted_files, reclaimed = await photo_store.cleanup_orphaned_files()
+        logger.info(f'Очистка файлов завершена. Удалено файлов: {deleted_files}, освобождено {reclaimed} байт')
+        # Фото хранилища удаляются сразу при снятии последней ссылки, здесь - оставшиеся без ссылок
+        deleted_photos = await photo_store.cleanup()
+        logger.info(f'Удалено фото хранилища без ссылок: {deleted_photos}')
+        deleted_texts = await AdText.delete_unused()
+        logger.info(f'Удалено неиспользуемых текстов объявлений: {deleted_texts}')
     except Exception as e:
         logger.error(f'Ошибка при очистке файлов: {e}')
 
@@ -253,9 +260,9 @@ async def restore_weekly_activity():
     logger.info('restore_weekly_activity: Starting weekly activity restoration')
     
     try:
-        import aiosqlite
+        from app.data.database.connection_pool import db_pool
         
-        conn = await aiosqlite.connect('app/data/database/database.db')
+        conn = await db_pool.writer()
         try:
             # Получаем всех активных исполнителей
             cursor = await conn.execute('SELECT id, activity_level FROM workers WHERE active = 1')
@@ -295,102 +302,132 @@ async def restore_weekly_activity():
         logger.error(f'restore_weekly_activity: Error - {e}')
 
 
+# Перепроверка статусов исполнителей: раз в сколько дней, статусов в одной пачке
+# (пачка записывается одной транзакцией вместе с контрольной точкой) и одновременных проверок в реестрах
+STATUS_RECHECK_DAYS = 180
+STATUS_BATCH_SIZE = 200
+STATUS_CHECK_CONCURRENCY = 20
+STATUS_CHECKPOINT = 'check_worker_statuses'
+
+STATUS_NOTIFICATION = (
+    "⚠️ **Уведомление о статусе**\n\n"
+    "Ваш статус **{names}** больше не действителен.\n\n"
+    "Статус изменен на: **Статус не подтвержден ⚠️**\n\n"
+    "Вы можете подтвердить статус заново в разделе 'Статус' вашего профиля."
+)
+
+
+async def recheck_worker_status(status) -> tuple[list[str], bool]:
+    """
+    Проверяет статусы исполнителя в реестрах и снимает недействительные (в объекте, без записи в БД).
+    Возвращает названия снятых статусов и были ли ответы всех реестров
+    """
+    from app.untils.registry_client import ERROR, registry_client
+
+    checks = []
+    if status.has_ip and status.ip_number:
+        checks.append(('ip', registry_client.check_ip(status.ip_number)))
+    if status.has_ooo and status.ooo_number:
+        checks.append(('ooo', registry_client.check_ooo(status.ooo_number)))
+    if status.has_sz and status.sz_number:
+        checks.append(('sz', registry_client.check_npd(status.sz_number)))
+    results = await asyncio.gather(*(check for _, check in checks))
+
+    revoked = []
+    answered = True
+    for (kind, _), result in zip(checks, results):
+        if result == ERROR:
+            answered = False
+        elif kind == 'ip' and result is None:
+            # ИП снимаем, только если реестр ответил, что его нет
+            status.has_ip = False
+            status.ip_number = None
+            revoked.append("ИП")
+        elif kind == 'ooo' and result is False:
+            status.has_ooo = False
+            status.ooo_number = None
+            revoked.append("ООО")
+        elif kind == 'sz' and result is False:
+            status.has_sz = False
+            status.sz_number = None
+            revoked.append("Самозанятость")
+    return revoked, answered
+
+
 async def check_worker_statuses():
     """
     Проверяет статусы исполнителей (ИП, ООО, СЗ) каждые 6 месяцев.
     Если статус больше не действителен - снимает его.
+
+    Статусы идут пачками по id вместе с tg_id исполнителей, в реестрах пачка проверяется параллельно.
+    Снятые статусы, дата проверки остальных и контрольная точка (до какого id дошли) записываются
+    одной транзакцией: после перезапуска бота проверка продолжается с контрольной точки.
+    Если реестр не ответил, дата проверки не обновляется - статус проверится в следующий раз.
     """
     try:
-        logger.info('check_worker_statuses: Starting...')
-        from app.data.database.models import WorkerStatus
-        
-        # Получаем все статусы, которые нужно проверить (старше 6 месяцев)
-        statuses_to_check = await WorkerStatus.get_all_for_recheck()
-        
-        if not statuses_to_check:
-            logger.info('check_worker_statuses: No statuses to check')
-            return
-        
-        logger.info(f'check_worker_statuses: Checking {len(statuses_to_check)} statuses...')
-        
-        checked_count = 0
-        revoked_count = 0
-        
-        for status in statuses_to_check:
-            status_changed = False
-            revoked_status_name = None
-            
-            # Проверяем ИП
-            if status.has_ip and status.ip_number:
-                result = help_defs.check_ip_status_by_ogrnip(status.ip_number)
-                if not result:
-                    # ИП больше не действует
-                    status.has_ip = False
-                    status.ip_number = None
-                    status_changed = True
-                    revoked_status_name = "ИП"
-                    revoked_count += 1
-                    logger.info(f'check_worker_statuses: Revoked IP for worker {status.worker_id}')
-            
-            # Проверяем ООО
-            if status.has_ooo and status.ooo_number:
-                result = help_defs.check_ooo(status.ooo_number)
-                if result != True:  # False or "error"
-                    # ООО больше не действует или ошибка
-                    if result == False:  # Только если точно не действует
-                        status.has_ooo = False
-                        status.ooo_number = None
-                        status_changed = True
-                        revoked_status_name = "ООО"
-                        revoked_count += 1
-                        logger.info(f'check_worker_statuses: Revoked OOO for worker {status.worker_id}')
-            
-            # Проверяем СЗ
-            if status.has_sz and status.sz_number:
-                result = help_defs.check_npd(status.sz_number)
-                if result != True:  # False or "error"
-                    # СЗ больше не действует или ошибка
-                    if result == False:  # Только если точно не действует
-                        status.has_sz = False
-                        status.sz_number = None
-                        status_changed = True
-                        revoked_status_name = "Самозанятость"
-                        revoked_count += 1
-                        logger.info(f'check_worker_statuses: Revoked SZ for worker {status.worker_id}')
-            
-            # Обновляем дату последней проверки
-            status.last_status_check = datetime.now().isoformat()
-            
-            # Сохраняем изменения
-            if status_changed or True:  # Всегда обновляем last_status_check
-                await status.save()
-                checked_count += 1
-                
-                # Отправляем уведомление исполнителю о снятии статуса
-                if status_changed and revoked_status_name:
-                    try:
-                        from app.data.database.models import Worker
-                        from loaders import bot
-                        
-                        worker = await Worker.get_worker(id=status.worker_id)
-                        if worker:
-                            notification_text = (
-                                f"⚠️ **Уведомление о статусе**\n\n"
-                                f"Ваш статус **{revoked_status_name}** больше не действителен.\n\n"
-                                f"Статус изменен на: **Статус не подтвержден ⚠️**\n\n"
-                                f"Вы можете подтвердить статус заново в разделе 'Статус' вашего профиля."
-                            )
-                            await bot.send_message(
-                                chat_id=worker.tg_id,
-                                text=notification_text,
-                                parse_mode='Markdown'
-                            )
-                            logger.info(f'check_worker_statuses: Notification sent to worker {status.worker_id}')
-                    except Exception as notify_error:
-                        logger.error(f'check_worker_statuses: Failed to send notification - {notify_error}')
-        
-        logger.info(f'check_worker_statuses: Checked {checked_count} statuses, revoked {revoked_count} statuses')
-        
+        from app.data.database.connection_pool import db_pool
+        from app.data.database.models import JobCheckpoint, WorkerStatus
+
+        checkpoint = await JobCheckpoint.get(STATUS_CHECKPOINT)
+        if checkpoint:
+            logger.info(f'check_worker_statuses: Resuming after status {checkpoint["last_id"]}...')
+        else:
+            checkpoint = {
+                'checked_before': (datetime.now() - timedelta(days=STATUS_RECHECK_DAYS)).isoformat(),
+                'last_id': 0, 'checked': 0, 'revoked': 0, 'failed': 0,
+            }
+            logger.info('check_worker_statuses: Starting...')
+
+        semaphore = asyncio.Semaphore(STATUS_CHECK_CONCURRENCY)
+
+        async def recheck(status):
+            async with semaphore:
+                return await recheck_worker_status(status)
+
+        while True:
+            batch = await WorkerStatus.get_for_recheck(checkpoint['checked_before'], checkpoint['last_id'],
+                                                       STATUS_BATCH_SIZE)
+            if not batch:
+                break
+
+            results = await asyncio.gather(*(recheck(status) for status, _ in batch))
+            checked_at = datetime.now().isoformat()
+            changed, checked_ids, messages = [], [], []
+            for (status, tg_id), (revoked, answered) in zip(batch, results):
+                if answered:
+                    status.last_status_check = checked_at
+                    checkpoint['checked'] += 1
+                else:
+                    checkpoint['failed'] += 1
+                if not revoked:
+                    if answered:
+                        checked_ids.append(status.id)
+                    continue
+
+                # Снятые статусы записываются целиком, вместе с датой проверки (если все реестры ответили)
+                changed.append(status)
+                checkpoint['revoked'] += len(revoked)
+                logger.info(f'check_worker_statuses: Revoked {", ".join(revoked)} for worker {status.worker_id}')
+                messages.append(outbound_queue.build('send_message', tg_id,
+                                                     text=STATUS_NOTIFICATION.format(names=", ".join(revoked)),
+                                                     parse_mode='Markdown'))
+            checkpoint['last_id'] = batch[-1][0].id
+
+            # Уведомления ставятся в очередь до записи: при сбое между ними пачка проверится заново
+            # и уведомление может прийти дважды, но не потеряется
+            await outbound_queue.enqueue(messages)
+            conn = await db_pool.writer()
+            try:
+                await WorkerStatus.save_recheck(changed, checked_ids, checked_at, conn)
+                await JobCheckpoint.save(STATUS_CHECKPOINT, checkpoint, conn=conn)
+                await conn.commit()
+            finally:
+                await conn.close()
+
+        await JobCheckpoint.delete(STATUS_CHECKPOINT)
+        logger.info(f'check_worker_statuses: Checked {checkpoint["checked"]} statuses, '
+                    f'revoked {checkpoint["revoked"]} statuses, registry errors {checkpoint["failed"]}')
+
     except Exception as e:
         logger.error(f'check_worker_statuses: Error - {e}')
 
@@ -409,7 +446,6 @@ async def update_worker_ranks():
     
     try:
         from app.data.database.models import Worker, WorkerRank, WorkerAndSubscription
-        from loaders import bot
         from aiogram.utils.keyboard import InlineKeyboardBuilder
         
         # Получаем всех исполнителей
@@ -503,7 +539,7 @@ async def update_worker_ranks():
                                     builder = InlineKeyboardBuilder()
                                     builder.button(text="✅ ОК", callback_data="rank_downgrade_ok")
                                     
-                                    await bot.send_message(
+                                    await outbound_queue.send_message(
                                         chat_id=worker.tg_id,
                                         text=notification_text,
                                         reply_markup=builder.as_markup(),
@@ -572,7 +608,7 @@ async def update_worker_ranks():
                                     )
                                 
                                 # Кнопка без callback (просто информационное сообщение)
-                                await bot.send_message(
+                                await outbound_queue.send_message(
                                     chat_id=worker.tg_id,
                                     text=notification_text,
                                     parse_mode='Markdown'
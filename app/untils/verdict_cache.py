@@ -0,0 +1,164 @@
+"""
+Кэш вердиктов проверки текстов.
+
+Одни и те же фразы проверяются снова и снова: типовые ответы в чате («Здравствуйте, когда удобно?»),
+повторные сообщения в поддержку, объявления, отправленные заново после отказа.
+Вердикт запоминается по NormalizedText.key - хешу нормализованного текста - вместе с видом проверки
+и ее параметрами.
+
+- Поиск контактов (ContactFilter.check_message, help_defs.is_content_forbidden) зависит только
+  от правил в коде, поэтому его вердикты хранятся только в памяти: сама проверка быстрее
+  обращения к БД, а новые правила приходят с перезапуском бота.
+- Вердикты по стоп-словам (moderation.check_text, checks.fool_check) хранятся в памяти
+  и в таблице moderation_verdicts и переживают перезапуск. Вердикт сразу попадает в память,
+  а в БД записывается фоновой задачей: новые вердикты копятся FLUSH_DELAY секунд и сохраняются
+  одной транзакцией, проверка сообщения не ждет записи. Вердикты сообщений чата (is_message)
+  в БД не пишутся и не ищутся: такие тексты почти не повторяются после перезапуска. В ключ входит версия стоп-слов
+  (stop_words.version): после изменения списков старые вердикты не находятся, память очищается,
+  строки прежних версий удаляются из БД. CHECKS_VERSION нужно увеличить, если меняется сама
+  логика проверок по стоп-словам.
+
+Память - LRU на CACHE_SIZE вердиктов. Пока load() не вызван (скрипты без main.run), кэш только в памяти.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+
+from app.data.database.models import ModerationVerdict
+
+logger = logging.getLogger(__name__)
+
+# Сколько вердиктов держать в памяти
+CACHE_SIZE = 5000
+# Сколько дней хранить вердикты в БД
+MAX_AGE_DAYS = 30
+# Версия логики проверок по стоп-словам
+CHECKS_VERSION = 1
+# Сколько секунд копить новые вердикты перед записью в БД
+FLUSH_DELAY = 2.0
+
+
+class VerdictCache:
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._memory: OrderedDict[str, object] = OrderedDict()
+        # Версия стоп-слов, к которой относятся вердикты в памяти
+        self._version: int | None = None
+        self._loaded = False
+        # Вердикты, еще не записанные в БД: {ключ: (версия стоп-слов, вердикт в JSON)}
+        self._pending: dict[str, tuple[int, str]] = {}
+        self._flush_task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind: str, text_key: str, *params) -> str:
+        """Ключ вердикта: вид проверки, ее параметры и хеш текста (NormalizedText.key)"""
+        return hashlib.sha256('\x1f'.join([kind, *map(str, params), text_key]).encode()).hexdigest()
+
+    def get(self, key: str):
+        """Вердикт из памяти или None"""
+        value = self._memory.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._memory.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    async def load(self, version: int) -> None:
+        await ModerationVerdict.create_table_if_not_exists()
+        self._loaded = True
+        await self._switch_version(version)
+
+    async def get_verdict(self, kind: str, text_key: str, version: int, params: tuple = (),
+                          persist: bool = True) -> dict | None:
+        """Вердикт по стоп-словам версии version: из памяти, затем (при persist) из БД"""
+        await self._switch_version(version)
+        key = self.make_key(kind, text_key, version, CHECKS_VERSION, *params)
+        value = self.get(key)
+        if value is not None or not self._loaded or not persist:
+            return value
+        try:
+            stored = await ModerationVerdict.get(key, version)
+        except Exception as e:
+            logger.error(f'Не удалось прочитать вердикт из кэша: {e}')
+            return None
+        if stored is None:
+            return None
+        value = json.loads(stored)
+        self.put(key, value)
+        # Промах в памяти оказался попаданием в БД
+        self.misses -= 1
+        self.hits += 1
+        return value
+
+    def put_verdict(self, kind: str, text_key: str, version: int, value: dict, params: tuple = (),
+                    persist: bool = True) -> None:
+        """Запоминает вердикт в памяти, при persist - ставит в очередь записи в БД"""
+        if version != self._version:
+            # Списки изменились, пока шла проверка - вердикт относится к старой версии
+            return
+        key = self.make_key(kind, text_key, version, CHECKS_VERSION, *params)
+        self.put(key, value)
+        if not self._loaded or not persist:
+            return
+        self._pending[key] = (version, json.dumps(value, ensure_ascii=False))
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(FLUSH_DELAY)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Записывает накопленные вердикты в БД одной транзакцией (и при остановке бота)"""
+        if not self._pending:
+            return
+        rows = [(key, version, verdict) for key, (version, verdict) in self._pending.items()]
+        self._pending.clear()
+        try:
+            await ModerationVerdict.save_many(rows)
+        except Exception as e:
+            logger.error(f'Не удалось сохранить вердикты в кэш: {e}')
+
+    async def _switch_version(self, version: int) -> None:
+        if version == self._version:
+            return
+        self._version = version
+        self._memory.clear()
+        self._pending.clear()
+        if self._loaded:
+            asyncio.get_running_loop().create_task(self._delete_stale(version))
+
+    async def _delete_stale(self, version: int) -> None:
+        try:
+            deleted = await ModerationVerdict.delete_stale(version, MAX_AGE_DAYS)
+            if deleted:
+                logger.info(f'Удалено устаревших вердиктов проверки: {deleted}')
+        except Exception as e:
+            logger.error(f'Не удалось удалить устаревшие вердикты: {e}')
+
+    async def cleanup(self) -> None:
+        """Для планировщика: удаляет из БД старые вердикты"""
+        if self._loaded and self._version is not None:
+            await self._delete_stale(self._version)
+
+    def log_metrics(self) -> None:
+        total = self.hits + self.misses
+        if total:
+            logger.info(f'Кэш вердиктов: {len(self._memory)} в памяти, попаданий {self.hits} из {total} '
+                        f'({self.hits / total:.0%})')
+
+
+verdict_cache = VerdictCache()
@@ -0,0 +1,100 @@
+"""
+Поиск слов из списка в тексте за один проход (автомат Ахо-Корасик).
+
+WordMatcher(words).find(text) возвращает то же слово, что и цикл
+
+    for word in words:
+        if re.search(r'\b' + re.escape(word) + r'\b', text):
+            return word
+
+то есть первое по порядку списка слово, которое встречается в тексте целым словом,
+но проходит текст один раз, а не по разу на каждое слово списка.
+"""
+
+import re
+from collections import deque
+from typing import Iterable
+
+# Тот же «символ слова», что у \b в re
+_is_word_char = re.compile(r'\w').match
+
+
+def _is_boundary(text: str, position: int) -> bool:
+    """Есть ли в позиции граница слова \\b"""
+    before = position > 0 and _is_word_char(text[position - 1]) is not None
+    after = position < len(text) and _is_word_char(text[position]) is not None
+    return before != after
+
+
+class WordMatcher:
+    def __init__(self, words: Iterable[str]):
+        self.words = tuple(words)
+        # Переходы, суффиксные ссылки, номер слова, которое кончается в состоянии,
+        # и ссылка на ближайшее по суффиксам состояние, где кончается слово
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._word_index: list[int | None] = [None]
+        self._output_link: list[int] = [0]
+        # Пустое слово совпадает с любой границей слова
+        self._empty_index: int | None = None
+
+        for index, word in enumerate(self.words):
+            if not word:
+                if self._empty_index is None:
+                    self._empty_index = index
+                continue
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._word_index.append(None)
+                    self._output_link.append(0)
+                state = next_state
+            # Для повторов в списке важен первый
+            if self._word_index[state] is None:
+                self._word_index[state] = index
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output_link[next_state] = fail if self._word_index[fail] is not None \
+                    else self._output_link[fail]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def find(self, text: str) -> str | None:
+        """Первое по порядку списка слово, которое есть в тексте целым словом, или None"""
+        best = None
+        if self._empty_index is not None and re.search(r'\b', text):
+            best = self._empty_index
+
+        goto, fail, word_index, output_link = self._goto, self._fail, self._word_index, self._output_link
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            match = state if word_index[state] is not None else output_link[state]
+            while match:
+                index = word_index[match]
+                if (best is None or index < best) and _is_boundary(text, end) \
+                        and _is_boundary(text, end - len(self.words[index])):
+                    best = index
+                    if best == 0:
+                        return self.words[0]
+                match = output_link[match]
+
+        return self.words[best] if best is not None else None
@@ -1,53 +1,214 @@
+"""
+Распознавание текста на фото (Yandex Vision, batchAnalyze) без блокировки цикла событий.
+
+Раньше analyze_file делал requests.post без таймаута прямо в цикле aiogram: пока Vision отвечал,
+бот не обрабатывал ничего. Теперь:
+
+    text = await yandex_ocr.analyze_file(path)
+    texts = await yandex_ocr.analyze_files(paths)   # все фото объявления одним запросом
+
+- запросы идут через aiohttp с общим пулом соединений (не больше MAX_CONNECTIONS);
+- фото одного вызова отправляются одним batchAnalyze, по MAX_BATCH файлов в запросе;
+- у запроса есть таймаут REQUEST_TIMEOUT, при сетевой ошибке, 429 и 5xx - RETRIES повторов с паузой;
+- чтение файлов и base64 выполняются в потоке.
+
+Если распознать не удалось, для фото возвращается None, как и раньше: фото без текста проверку проходит.
+
+Сервис распознавания подменяется: ocr_client.backend = LocalOcrBackend(...) - для тестов и отладки
+без обращений к Yandex Vision.
+"""
+
+import asyncio
 import base64
-import requests
+import logging
+import os
+from typing import NamedTuple
+
+import aiohttp
+
 import config
 import loaders
 
+logger = logging.getLogger(__name__)
+
+# Файлов в одном запросе batchAnalyze
+MAX_BATCH = 8
+# Одновременных соединений с Vision API
+MAX_CONNECTIONS = 10
+# Таймаут одного запроса (секунды)
+REQUEST_TIMEOUT = 20
+# Повторов после неудачного запроса и первая пауза между ними (секунды, дальше удваивается)
+RETRIES = 2
+RETRY_DELAY = 1.0
+
+LANGUAGE_CODES = ["en", "ru"]
+
 
-def analyze_file(file_path):
+def mime_type_for(file_path: str) -> str:
+    if file_path.lower().endswith(".pdf"):
+        return "application/pdf"
+    if file_path.lower().endswith(".png"):
+        return "image/png"
+    return "image/jpeg"
+
+
+def read_file_base64(file_path: str) -> str | None:
     try:
         with open(file_path, "rb") as file:
-            file_content = file.read()
+            return base64.b64encode(file.read()).decode('utf-8')
     except IOError:
-        return
+        return None
 
-    # Convert file content to base64
-    content = base64.b64encode(file_content)
-    content_str = content.decode('utf-8')
 
-    # Determine the mime type based on file extension
-    mime_type = "image/jpeg"
-    if file_path.lower().endswith(".pdf"):
-        mime_type = "application/pdf"
-    elif file_path.lower().endswith(".png"):
-        mime_type = "image/png"
-
-    # Construct request body
-    request_body = {
-        "folderId": config.FOLDER_ID,
-        "analyze_specs": {
-            "content": content_str,
+class OcrFile(NamedTuple):
+    path: str
+    # Содержимое в base64
+    content: str
+    mime_type: str
+
+
+class YandexVisionBackend:
+    """Yandex Vision batchAnalyze через aiohttp"""
+
+    def __init__(self, url: str = config.URL_VISION_API, folder_id: str = config.FOLDER_ID,
+                 headers: dict = None):
+        self.url = url
+        self.folder_id = folder_id
+        self.headers = headers or loaders.request_header
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS),
+                                                  timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                                                  headers=self.headers)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _spec(content: str, mime_type: str) -> dict:
+        return {
+            "content": content,
             "mime_type": mime_type,
-            "features": {
+            "features": [{
                 "type": "TEXT_DETECTION",
                 "text_detection_config": {
-                    "language_codes": ["en", "ru"]
+                    "language_codes": LANGUAGE_CODES
                 }
-            }
+            }]
         }
-    }
 
+    async def recognize(self, files: list[OcrFile]) -> list[str | None]:
+        """Текст для каждого файла, одним запросом"""
+        request_body = {"folderId": self.folder_id,
+                        "analyze_specs": [self._spec(file.content, file.mime_type) for file in files]}
+        response_data = await self._post(request_body)
+        if response_data is None:
+            return [None] * len(files)
+
+        results = response_data.get('results') or []
+        texts = []
+        for index in range(len(files)):
+            if index >= len(results) or results[index].get('error'):
+                texts.append(None)
+                continue
+            texts.append(" ".join(json_extract(results[index], 'text')))
+        return texts
+
+    async def _post(self, request_body: dict) -> dict | None:
+        delay = RETRY_DELAY
+        for attempt in range(RETRIES + 1):
+            try:
+                async with self._get_session().post(self.url, json=request_body) as response:
+                    if response.status == 429 or response.status >= 500:
+                        raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                          status=response.status, message=response.reason)
+                    if response.status >= 400:
+                        # Ошибка в запросе или ключе - повтор не поможет
+                        logger.error(f'Vision API ответил {response.status}: {await response.text()}')
+                        return None
+                    return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == RETRIES:
+                    logger.error(f'Vision API недоступен после {RETRIES + 1} попыток: {type(e).__name__} {e}')
+                    return None
+                logger.warning(f'Ошибка запроса к Vision API, повтор через {delay} с: {type(e).__name__} {e}')
+                await asyncio.sleep(delay)
+                delay *= 2
+        return None
+
+
+class LocalOcrBackend:
+    """
+    Замена Vision API без сети: текст берется из словаря texts по имени файла
+    или из файла рядом с фото с расширением .txt. Если текста нет - None
+    """
+
+    def __init__(self, texts: dict[str, str] = None, delay: float = 0):
+        self.texts = texts or {}
+        self.delay = delay
+        self.requests = 0
+
+    async def recognize(self, files: list[OcrFile]) -> list[str | None]:
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        texts = []
+        for file in files:
+            name = os.path.basename(file.path)
+            texts.append(self.texts[name] if name in self.texts else await asyncio.to_thread(_read_sidecar, file.path))
+        return texts
+
+    async def close(self) -> None:
+        pass
+
+
+def _read_sidecar(path: str) -> str | None:
     try:
-        response = requests.post(config.URL_VISION_API, headers=loaders.request_header, json=request_body)
-        response.raise_for_status()
-        response_data = response.json()
-    except requests.exceptions.HTTPError:
-        return
-    except requests.exceptions.RequestException:
-        return
-
-    words = json_extract(response_data, 'text')
-    return " ".join(words)
+        with open(os.path.splitext(path)[0] + '.txt', encoding='utf-8') as file:
+            return file.read()
+    except IOError:
+        return None
+
+
+class OcrClient:
+    def __init__(self, backend=None):
+        self.backend = backend or YandexVisionBackend()
+
+    async def analyze_files(self, file_paths: list[str]) -> list[str | None]:
+        """Текст на каждом фото (None - не прочитано или не распознано), по MAX_BATCH фото в запросе"""
+        contents = await asyncio.gather(*(asyncio.to_thread(read_file_base64, path) for path in file_paths))
+        files = [(index, OcrFile(path, content, mime_type_for(path)))
+                 for index, (path, content) in enumerate(zip(file_paths, contents)) if content is not None]
+
+        batches = [files[start: start + MAX_BATCH] for start in range(0, len(files), MAX_BATCH)]
+        results = await asyncio.gather(*(self.backend.recognize([file for _, file in batch]) for batch in batches))
+        texts: list[str | None] = [None] * len(file_paths)
+        for batch, batch_texts in zip(batches, results):
+            for (index, _), text in zip(batch, batch_texts):
+                texts[index] = text
+        return texts
+
+    async def analyze_file(self, file_path: str) -> str | None:
+        return (await self.analyze_files([file_path]))[0]
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+ocr_client = OcrClient()
+
+
+async def analyze_file(file_path: str) -> str | None:
+    return await ocr_client.analyze_file(file_path)
+
+
+async def analyze_files(file_paths: list[str]) -> list[str | None]:
+    return await ocr_client.analyze_files(file_paths)
 
 
 def json_extract(_object, key):
@@ -0,0 +1,90 @@
+"""
+Поиск повтора объявления: DuplicateIndex против сравнения SequenceMatcher со всеми объявлениями пары.
+
+Объявления генерируются (русские слова), запросы - наполовину правленые копии существующих
+объявлений (удаление, повтор и заглавная буква у пары слов, пунктуация), наполовину новые тексты.
+Для каждого запроса считается, нашел ли повтор каждый способ.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_duplicate_index [--ads 1000] [--queries 50]
+"""
+
+import argparse
+import random
+import time
+from difflib import SequenceMatcher
+
+from app.data.database.duplicate_index import DuplicateIndex
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+
+
+def make_text(task: str) -> str:
+    return f'Покраска\n\nЗадача: {task}\nВремя: Завтра\n\nДата публикации: 01.01.2025 в 10:00'
+
+
+def random_task(rng: random.Random, vocabulary: list[str]) -> str:
+    return ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(8, 30)))
+
+
+def edit_task(task: str, rng: random.Random) -> str:
+    words = task.split()
+    for _ in range(2):
+        roll = rng.random()
+        position = rng.randrange(len(words))
+        if roll < 0.33 and len(words) > 3:
+            del words[position]
+        elif roll < 0.66:
+            words[position] = words[position].capitalize() + ','
+        else:
+            words.insert(position, rng.choice(words))
+    return ' '.join(words) + '!'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ads', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(3, 10))) for _ in range(3000)]
+    tasks = [random_task(rng, vocabulary) for _ in range(args.ads)]
+    texts = [make_text(task) for task in tasks]
+
+    index = DuplicateIndex()
+    started = time.perf_counter()
+    for ad_id, text in enumerate(texts):
+        index._add(index._make(ad_id, ad_id, 1, 1, text))
+    build_time = time.perf_counter() - started
+
+    queries = []
+    for _ in range(args.queries):
+        if rng.random() < 0.5:
+            queries.append((True, make_text(edit_task(rng.choice(tasks), rng))))
+        else:
+            queries.append((False, make_text(random_task(rng, vocabulary))))
+
+    started = time.perf_counter()
+    found_index = [index.find(1, 1, text, customer_id=-1) is not None for _, text in queries]
+    index_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    found_scan = [any(SequenceMatcher(None, old, text).ratio() > 0.75 for old in texts) for _, text in queries]
+    scan_time = time.perf_counter() - started
+
+    for name, found in (('DuplicateIndex', found_index), ('SequenceMatcher', found_scan)):
+        hits = sum(1 for (copy, _), result in zip(queries, found) if copy and result)
+        false = sum(1 for (copy, _), result in zip(queries, found) if not copy and result)
+        copies = sum(1 for copy, _ in queries if copy)
+        print(f'{name}: найдено копий {hits}/{copies}, ложных срабатываний {false}/{len(queries) - copies}')
+
+    print(f'Объявлений: {len(texts)}, построение индекса: {build_time * 1000:.0f} мс')
+    print(f'SequenceMatcher по всем: {scan_time / len(queries) * 1000:.1f} мс на запрос')
+    print(f'DuplicateIndex:          {index_time / len(queries) * 1000:.3f} мс на запрос '
+          f'(в {scan_time / index_time:.0f} раз быстрее)')
+
+
+if __name__ == '__main__':
+    main()
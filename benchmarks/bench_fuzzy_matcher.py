@@ -0,0 +1,117 @@
+"""
+Сравнение checks.levenshtein_distance_check на FuzzyMatcher со старым перебором всех позиций фразы.
+
+Стоп-слова и тексты генерируются (русские буквы), в часть текстов вставляются стоп-слова
+с одной-двумя правками и слова из белого списка. Результаты обоих способов сверяются на каждом тексте.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_fuzzy_matcher [--words 100] [--texts 5] [--length 1000]
+"""
+
+import argparse
+import random
+import time
+
+from app.untils.fuzzy_matcher import FuzzyMatcher, distance
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def levenshtein_loop(phrase, words, white_words):
+    """Прежняя реализация checks.levenshtein_distance_check (без замены leet-символов)"""
+    for word in words:
+        word = word.lower()
+        for part in range(len(phrase)):
+            fragment = phrase[part: part + len(word)]
+            if distance(fragment.lower(), word) <= len(word) * 0.10:
+                if fragment in white_words:
+                    continue
+                return "Найдено: " + word + "\nПохоже на: " + fragment
+    return False
+
+
+def levenshtein_matcher(phrase, matcher: FuzzyMatcher, white_words):
+    if found := matcher.find(phrase, white_words):
+        word, fragment = found
+        return "Найдено: " + word + "\nПохоже на: " + fragment
+    return False
+
+
+def random_word(rng: random.Random, low: int, high: int) -> str:
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(low, high)))
+
+
+def mutate(word: str, edits: int, rng: random.Random) -> str:
+    for _ in range(edits):
+        position = rng.randrange(len(word) + 1)
+        roll = rng.random()
+        if roll < 0.33:
+            word = word[:position] + rng.choice(ALPHABET) + word[position + 1:]
+        elif roll < 0.66:
+            word = word[:position] + word[position + 1:]
+        else:
+            word = word[:position] + rng.choice(ALPHABET) + word[position:]
+    return word
+
+
+def make_texts(count: int, length: int, words: list[str], white_words: set[str],
+               rng: random.Random) -> list[str]:
+    texts = []
+    for _ in range(count):
+        parts = []
+        while sum(len(part) + 1 for part in parts) < length:
+            roll = rng.random()
+            if roll < 0.002:
+                word = rng.choice(words)
+                parts.append(mutate(word, rng.randint(0, len(word) // 10), rng).upper())
+            elif roll < 0.004 and white_words:
+                parts.append(rng.choice(sorted(white_words)))
+            else:
+                parts.append(random_word(rng, 1, 12))
+        texts.append(' '.join(parts))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, default=100)
+    parser.add_argument('--texts', type=int, default=5)
+    parser.add_argument('--length', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = [random_word(rng, 4, 25) for _ in range(args.words)]
+    # Белый список - точные и почти точные копии части стоп-слов
+    white_words = {mutate(word, rng.randint(0, 1), rng) for word in rng.sample(words, min(len(words), 20))}
+    texts = make_texts(args.texts, args.length, words, white_words, rng)
+
+    started = time.perf_counter()
+    matcher = FuzzyMatcher(words)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [levenshtein_loop(text, words, white_words) for text in texts]
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = [levenshtein_matcher(text, matcher, white_words) for text in texts]
+    matcher_time = time.perf_counter() - started
+
+    mismatches = [(text, old, new) for text, old, new in zip(texts, expected, actual) if old != new]
+    found = sum(1 for result in expected if result)
+
+    print(f'Слов: {len(words)}, текстов: {len(texts)} по ~{args.length} символов, найдено в {found}')
+    print(f'Построение FuzzyMatcher: {build_time * 1000:.1f} мс')
+    print(f'Перебор позиций: {loop_time / len(texts) * 1000:.1f} мс на текст')
+    print(f'FuzzyMatcher:    {matcher_time / len(texts) * 1000:.2f} мс на текст '
+          f'(в {loop_time / matcher_time:.0f} раз быстрее)')
+    print(f'Расхождений: {len(mismatches)}')
+    for text, old, new in mismatches[:5]:
+        print(f'  {old!r} != {new!r}: {text[:80]!r}...')
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
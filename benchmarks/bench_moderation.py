@@ -0,0 +1,277 @@
+"""
+Скорость и результаты проверок текста: fool_check, phone_finder, ContactFilter.check_message
+и help_defs.is_content_forbidden на корпусе объявлений и сообщений чата.
+
+Корпус генерируется (русский текст похожий на настоящие объявления и ответы в чате), в часть текстов
+вставлены стоп-слова (в том числе leet-написанием и с опечаткой), ругательства, номера телефонов
+(слитно, по частям, прописью), email, ссылки, упоминания и мессенджеры.
+
+Для каждой проверки выводятся p50/p95/p99 задержки одного вызова и пропускная способность,
+для каждого вида вставки - доля текстов, на которых сработала каждая проверка. Результаты
+сравниваются с эталоном (moderation_golden.json): сколько текстов стали проверку проходить
+или перестали, у скольких изменился ответ. Если есть расхождения, скрипт завершается с кодом 1.
+
+fool_check проверяется синхронной частью checks.find_ban_reason на постоянных списках стоп-слов
+из этого файла, без БД. Кэш вердиктов (verdict_cache) выключен, чтобы мерить сами проверки.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_moderation [--repeat 3] [--show 5]
+    python -m benchmarks.bench_moderation --update-golden [--size 600] [--seed 1]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import time
+
+from app.untils import checks, help_defs
+from app.untils.contact_filter import ContactFilter
+from app.untils.stop_words import StopWords
+from app.untils.verdict_cache import verdict_cache
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'moderation_golden.json')
+
+# Стоп-слова корпуса. Фразы от 10 символов ищутся с одной опечаткой
+BLOCK_WORDS = ('предоплата на карту', 'перевод на карту сбербанка', 'оплата наличными заранее',
+               'телефон', 'ватсап', 'телеграм', 'пишите в личку')
+SHORT_WORDS = ('тг', 'вк', 'лс')
+PROFANITY_WORDS = ('дурак', 'идиот', 'тупица', 'придурок')
+WHITE_WORDS = ('предоплата на карте',)
+
+WORDS = StopWords(version=0,
+                  block=BLOCK_WORDS, block_message=BLOCK_WORDS, block_personal=BLOCK_WORDS, block_photo=BLOCK_WORDS,
+                  short=SHORT_WORDS, short_message=SHORT_WORDS, short_personal=SHORT_WORDS,
+                  short_photo=SHORT_WORDS, profanity=PROFANITY_WORDS, white=WHITE_WORDS).prebuild()
+
+WORK_TYPES = ('Покраска', 'Сборка мебели', 'Уборка', 'Сантехника', 'Грузчики', 'Электрика')
+TIMES = ('В ближайшее время', 'Завтра', 'В течении недели', 'Не важно')
+TASKS = (
+    'Нужно покрасить забор на даче, примерно 40 метров, краска есть',
+    'Собрать шкаф-купе и две тумбочки, инструкция на месте',
+    'Поклеить обои в двух комнатах, обои и клей куплены',
+    'Перевезти диван и холодильник на 5 этаж, лифт грузовой',
+    'Починить кран на кухне, капает уже неделю',
+    'Убрать квартиру после ремонта, 3 комнаты, 75 квадратов',
+    'Выкопать траншею под кабель, 10 метров',
+    'Установить стиральную машину и подключить слив',
+    'Заменить розетки и выключатели, всего 12 штук',
+    'Помочь с переездом, вещей немного, к 18:00',
+)
+CHAT_MESSAGES = (
+    'Здравствуйте, когда удобно?',
+    'Добрый день! Сколько будет стоить?',
+    'Могу завтра после обеда',
+    'Спасибо, договорились',
+    'Какой адрес?',
+    'Материалы ваши или мои?',
+    'Сколько там метров?',
+    'Буду через 20 минут',
+    'Оплата после работы, хорошо?',
+)
+
+# Латинские буквы, похожие на русские
+LEET = {'а': 'a', 'о': 'o', 'е': 'e', 'р': 'p', 'с': 'c', 'х': 'x', 'у': 'y', 'к': 'k', 'т': 't'}
+DIGIT_WORDS = ('ноль', 'один', 'два', 'три', 'четыре', 'пять', 'шесть', 'семь', 'восемь', 'девять')
+
+
+def random_phone(rng: random.Random) -> str:
+    return rng.choice('78') + ''.join(rng.choice('0123456789') for _ in range(10))
+
+
+def leet_word(word: str, rng: random.Random) -> str:
+    return ''.join(LEET[char] if char in LEET and rng.random() < 0.6 else char for char in word)
+
+
+def typo(word: str, rng: random.Random) -> str:
+    position = rng.randrange(1, len(word) - 1)
+    return word[:position] + word[position + 1:]
+
+
+def inject_phone(rng: random.Random) -> str:
+    phone = random_phone(rng)
+    return rng.choice([
+        f'звоните {phone}',
+        f'мой номер +7 {phone[1:4]} {phone[4:7]}-{phone[7:9]}-{phone[9:]}',
+        f'тел {phone[0]} ({phone[1:4]}) {phone[4:7]} {phone[7:9]} {phone[9:]}',
+    ])
+
+
+def inject_split_phone(rng: random.Random) -> str:
+    phone = random_phone(rng)
+    return rng.choice([' '.join(phone), '-'.join([phone[:4], phone[4:7], phone[7:]]),
+                       f'{phone[:3]}.{phone[3:6]}.{phone[6:]}'])
+
+
+def inject_spelled_phone(rng: random.Random) -> str:
+    return 'номер ' + ' '.join(DIGIT_WORDS[int(digit)] for digit in random_phone(rng))
+
+
+INJECTIONS = {
+    'phone': inject_phone,
+    'split_phone': inject_split_phone,
+    'spelled_phone': inject_spelled_phone,
+    'email': lambda rng: rng.choice(['ivan.petrov@mail.ru', 'master2024@yandex.ru',
+                                     'пишите ivan собака mail точка ru']),
+    'link': lambda rng: rng.choice(['https://t.me/masterok', 'www.remont-spb.ru', 'смотрите vk.com/id123']),
+    'mention': lambda rng: rng.choice(['@master_remont', 'пишите @dom_uslugi']),
+    'messenger': lambda rng: rng.choice(['пишите в вацап', 'лучше в телегу', 'есть вайбер']),
+    'block': lambda rng: rng.choice(BLOCK_WORDS),
+    'leet_block': lambda rng: leet_word(rng.choice(BLOCK_WORDS), rng),
+    'typo_block': lambda rng: typo(rng.choice(BLOCK_WORDS[:3]), rng),
+    'white': lambda rng: rng.choice(WHITE_WORDS),
+    'profanity': lambda rng: rng.choice(PROFANITY_WORDS),
+    'short': lambda rng: f'напишите в {rng.choice(SHORT_WORDS)}',
+    'number': lambda rng: rng.choice(['за 1500 рублей', '2 комнаты', '3 этаж', 'дом 14, кв 7']),
+}
+
+
+def make_corpus(size: int, rng: random.Random) -> list[dict]:
+    items = []
+    for index in range(size):
+        kind = 'ad' if index % 2 == 0 else 'chat'
+        base = rng.choice(TASKS) if kind == 'ad' else rng.choice(CHAT_MESSAGES)
+        labels = []
+        if rng.random() < 0.6:
+            label = rng.choice(sorted(INJECTIONS))
+            labels.append(label)
+            base = f'{base}, {INJECTIONS[label](rng)}' if rng.random() < 0.5 else f'{INJECTIONS[label](rng)}. {base}'
+        if kind == 'ad':
+            text = f'{rng.choice(WORK_TYPES)}\n\nЗадача: {base}\nВремя: {rng.choice(TIMES)}'
+        else:
+            text = base
+        items.append({'kind': kind, 'labels': labels or ['clean'], 'text': text})
+    return items
+
+
+CHECKS = {
+    'fool_check': lambda item: checks.find_ban_reason(item['text'], WORDS, is_message=item['kind'] == 'chat'),
+    'phone_finder': lambda item: checks.phone_finder(item['text']),
+    'check_message': lambda item: ContactFilter.check_message(item['text']),
+    'is_content_forbidden': lambda item: help_defs.is_content_forbidden(item['text']),
+}
+
+
+def run_checks(item: dict) -> dict:
+    """Ответы всех проверок в виде, который сохраняется в JSON"""
+    results = {}
+    for name, check in CHECKS.items():
+        result = check(item)
+        results[name] = list(result) if isinstance(result, tuple) else result
+    return results
+
+
+def is_hit(name: str, result) -> bool:
+    """Проверка сработала: текст не прошел бы модерацию"""
+    if name == 'check_message':
+        return not result[0]
+    return bool(result)
+
+
+def measure(items: list[dict], repeat: int) -> dict[str, list[int]]:
+    """Время каждого вызова каждой проверки (нс)"""
+    samples = {name: [] for name in CHECKS}
+    for _ in range(repeat):
+        for name, check in CHECKS.items():
+            timings = samples[name]
+            for item in items:
+                started = time.perf_counter_ns()
+                check(item)
+                timings.append(time.perf_counter_ns() - started)
+    return samples
+
+
+def print_latency(samples: dict[str, list[int]]) -> None:
+    print(f'{"проверка":<22}{"p50, мкс":>10}{"p95, мкс":>10}{"p99, мкс":>10}{"текстов/с":>12}')
+    for name, timings in samples.items():
+        percentiles = statistics.quantiles(timings, n=100)
+        throughput = len(timings) / (sum(timings) / 1e9)
+        print(f'{name:<22}{percentiles[49] / 1000:>10.1f}{percentiles[94] / 1000:>10.1f}'
+              f'{percentiles[98] / 1000:>10.1f}{throughput:>12.0f}')
+
+
+def print_accuracy(items: list[dict], results: list[dict]) -> None:
+    """Доля текстов с каждым видом вставки, на которых сработала проверка"""
+    print(f'\n{"вставка":<16}{"текстов":>8}' + ''.join(f'{name:>22}' for name in CHECKS))
+    labels = sorted({label for item in items for label in item['labels']})
+    for label in labels:
+        rows = [result for item, result in zip(items, results) if label in item['labels']]
+        shares = [sum(is_hit(name, result[name]) for result in rows) / len(rows) for name in CHECKS]
+        print(f'{label:<16}{len(rows):>8}' + ''.join(f'{share:>22.0%}' for share in shares))
+
+
+def diff_golden(items: list[dict], results: list[dict], show: int) -> int:
+    """Печатает расхождения с эталоном, возвращает их число"""
+    total = 0
+    print('\nСравнение с эталоном:')
+    for name in CHECKS:
+        new_hits, lost_hits, changed = [], [], []
+        for item, result in zip(items, results):
+            expected, actual = item['results'][name], result[name]
+            if expected == actual:
+                continue
+            if is_hit(name, expected) and not is_hit(name, actual):
+                lost_hits.append((item, expected, actual))
+            elif not is_hit(name, expected) and is_hit(name, actual):
+                new_hits.append((item, expected, actual))
+            else:
+                changed.append((item, expected, actual))
+        hits = sum(is_hit(name, item['results'][name]) for item in items)
+        print(f'  {name}: срабатываний в эталоне {hits}, новых {len(new_hits)}, пропало {len(lost_hits)}, '
+              f'изменился ответ {len(changed)}')
+        for title, rows in (('новое', new_hits), ('пропало', lost_hits), ('изменилось', changed)):
+            for item, expected, actual in rows[:show]:
+                print(f'    {title}: {item["text"]!r}\n      было {expected!r}, стало {actual!r}')
+        total += len(new_hits) + len(lost_hits) + len(changed)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--show', type=int, default=5, help='сколько расхождений показать для каждой проверки')
+    parser.add_argument('--update-golden', action='store_true', help='перезаписать эталон текущими результатами')
+    args = parser.parse_args()
+
+    # Замеряются сами проверки, а не попадания в кэш; найденные контакты не пишутся в лог
+    verdict_cache.size = 0
+    logging.getLogger('app.untils.contact_filter').setLevel(logging.ERROR)
+
+    golden = None
+    if os.path.exists(GOLDEN_PATH) and not args.update_golden:
+        with open(GOLDEN_PATH, encoding='utf-8') as file:
+            golden = json.load(file)
+        items = golden['items']
+    else:
+        items = make_corpus(args.size, random.Random(args.seed))
+
+    results = [run_checks(item) for item in items]
+    samples = measure(items, args.repeat)
+
+    print(f'Текстов: {len(items)} (объявлений {sum(item["kind"] == "ad" for item in items)}), '
+          f'повторов: {args.repeat}\n')
+    print_latency(samples)
+    print_accuracy(items, results)
+
+    if args.update_golden:
+        # Один текст на строку, чтобы изменения эталона было удобно смотреть в diff
+        lines = [json.dumps(dict(item, results=result), ensure_ascii=False) for item, result in zip(items, results)]
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as file:
+            file.write(f'{{"seed": {args.seed}, "size": {args.size}, "items": [\n' + ',\n'.join(lines) + '\n]}\n')
+        print(f'\nЭталон записан: {GOLDEN_PATH}')
+        return
+    if golden is None:
+        print('\nЭталона нет, создайте его: --update-golden')
+        return
+    if mismatches := diff_golden(items, results, args.show):
+        print(f'Расхождений с эталоном: {mismatches}')
+        raise SystemExit(1)
+    print('Расхождений с эталоном нет')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Проверка статусов в реестрах: по очереди (как раньше делала недельная проверка) против
+параллельной проверки RegistryClient, на локальной замене реестров (benchmarks/registry_stub.py).
+
+Для каждого номера ответ сверяется с реестром стаба. Второй проход идет из кэша ответов.
+При --fail-rate часть ответов стаба - 503, клиент повторяет запросы. Стаб - один адрес, поэтому
+одновременных запросов не больше PER_HOST_LIMIT (с настоящими реестрами - по PER_HOST_LIMIT на каждый).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_registry [--numbers 300] [--latency 0.05] [--fail-rate 0.05]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.untils import registry_client as registry
+from app.untils.registry_client import ERROR, RegistryClient
+from benchmarks.registry_stub import RegistryStub, make_registry
+
+
+def make_registry_numbers(ip: dict, ooo: set, npd: set, count: int, rng: random.Random) -> list[tuple[str, str]]:
+    """Проверки: действующие номера из реестров и столько же несуществующих"""
+    known = [('ip', number) for number in ip] + [('ooo', number) for number in ooo] + \
+            [('npd', number) for number in npd]
+    unknown = [(kind, ''.join(rng.choice('0123456789') for _ in range(length)))
+               for kind, length in [('ip', 15), ('ooo', 13), ('npd', 12)] * (count // 2)]
+    checks = known + unknown[:len(known)]
+    rng.shuffle(checks)
+    return checks
+
+
+def expected_results(ip: dict, ooo: set, npd: set, checks: list[tuple[str, str]]) -> list:
+    expected = {'ip': lambda number: ip.get(number), 'ooo': lambda number: number in ooo,
+                'npd': lambda number: number in npd}
+    return [expected[kind](number) for kind, number in checks]
+
+
+async def run_checks(client: RegistryClient, checks: list[tuple[str, str]], concurrent: bool) -> list:
+    methods = {'ip': client.check_ip, 'ooo': client.check_ooo, 'npd': client.check_npd}
+    if concurrent:
+        return list(await asyncio.gather(*(methods[kind](number) for kind, number in checks)))
+    return [await methods[kind](number) for kind, number in checks]
+
+
+async def measure(name: str, client: RegistryClient, checks: list, expected: list, concurrent: bool) -> float:
+    started = time.perf_counter()
+    results = await run_checks(client, checks, concurrent)
+    elapsed = time.perf_counter() - started
+    errors = sum(result == ERROR for result in results)
+    wrong = sum(result != want and result != ERROR for result, want in zip(results, expected))
+    print(f'{name:<28} {elapsed:>8.2f} с  {len(checks) / elapsed:>8.1f} проверок/с  '
+          f'ошибок {errors}, неверных {wrong}')
+    return elapsed
+
+
+async def bench(args) -> None:
+    ip, ooo, npd = make_registry(args.numbers, args.seed)
+    rng = random.Random(args.seed)
+    numbers = make_registry_numbers(ip, ooo, npd, args.numbers, rng)
+    expected = expected_results(ip, ooo, npd, numbers)
+
+    stub = RegistryStub(ip=ip, ooo=ooo, npd=npd, latency=args.latency, fail_rate=args.fail_rate, seed=args.seed)
+    base_url = await stub.start()
+    # Повторы после 503 стаба - без секундных пауз
+    registry.RETRY_DELAY = 0.05
+    try:
+        print(f'{len(numbers)} проверок, задержка реестра {args.latency} с, 503: {args.fail_rate:.0%}\n')
+        if args.serial:
+            serial = RegistryClient(base_url=base_url, cache_ttl=0, result_delay=args.result_delay)
+            serial_time = await measure('по очереди', serial, numbers[:args.serial], expected[:args.serial], False)
+            print(f'{"":<28} оценка на все проверки: {serial_time / args.serial * len(numbers):.1f} с')
+            await serial.close()
+
+        client = RegistryClient(base_url=base_url, result_delay=args.result_delay)
+        stub.max_active = 0
+        await measure('параллельно', client, numbers, expected, True)
+        print(f'{"":<28} одновременных запросов к реестру: до {stub.max_active}')
+        await measure('параллельно, из кэша', client, numbers, expected, True)
+        print(f'\nЗапросов к стабу: {dict(stub.requests)}, у клиента: {client.requests}, из кэша: {client.hits}')
+        await client.close()
+    finally:
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--numbers', type=int, default=300, help='номеров каждого вида в реестре')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--fail-rate', type=float, default=0.05)
+    parser.add_argument('--result-delay', type=float, default=0.2, help='пауза ЕГРЮЛ перед результатом')
+    parser.add_argument('--serial', type=int, default=30, help='сколько проверок сделать по очереди (0 - не делать)')
+    parser.add_argument('--seed', type=int, default=1)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Сравнение checks.contains_profanity на WordMatcher со старым циклом re.search по каждому слову.
+
+Списки слов и тексты генерируются (русские буквы, часть слов со спецсимволами и пробелами),
+результаты обоих способов сверяются на каждом тексте.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_word_matcher [--words 10000] [--texts 200] [--length 1000]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.untils.word_matcher import WordMatcher
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def contains_profanity_loop(text, profanity_list):
+    """Прежняя реализация checks.contains_profanity"""
+    lower_text = text.lower()
+
+    for word in profanity_list:
+        if re.search(r'\b' + re.escape(word) + r'\b', lower_text):
+            return f'Найдено: {word}'
+    return False
+
+
+def contains_profanity_matcher(text, matcher: WordMatcher):
+    if word := matcher.find(text.lower()):
+        return f'Найдено: {word}'
+    return False
+
+
+def make_words(count: int, rng: random.Random) -> list[str]:
+    words = []
+    for _ in range(count):
+        word = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(2, 9)))
+        roll = rng.random()
+        if roll < 0.03:
+            word = word[:2] + '/' + word[2:]
+        elif roll < 0.05:
+            word = ' ' + word
+        elif roll < 0.07:
+            word = word + ' ' + ''.join(rng.choice(ALPHABET) for _ in range(3))
+        words.append(word)
+    return words
+
+
+def make_texts(count: int, length: int, words: list[str], rng: random.Random) -> list[str]:
+    texts = []
+    for _ in range(count):
+        parts = []
+        while sum(len(part) + 1 for part in parts) < length:
+            if rng.random() < 0.002:
+                parts.append(rng.choice(words).upper())
+            else:
+                parts.append(''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 12))))
+            if rng.random() < 0.1:
+                parts[-1] += rng.choice('.,!?')
+        texts.append(' '.join(parts))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, default=10000)
+    parser.add_argument('--texts', type=int, default=200)
+    parser.add_argument('--length', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = make_words(args.words, rng)
+    texts = make_texts(args.texts, args.length, words, rng)
+
+    started = time.perf_counter()
+    matcher = WordMatcher(words)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [contains_profanity_loop(text, words) for text in texts]
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = [contains_profanity_matcher(text, matcher) for text in texts]
+    matcher_time = time.perf_counter() - started
+
+    mismatches = [(text, old, new) for text, old, new in zip(texts, expected, actual) if old != new]
+    found = sum(1 for result in expected if result)
+
+    print(f'Слов: {len(words)}, текстов: {len(texts)} по ~{args.length} символов, найдено в {found}')
+    print(f'Построение WordMatcher: {build_time * 1000:.1f} мс')
+    print(f'Цикл re.search: {loop_time / len(texts) * 1000:.2f} мс на текст')
+    print(f'WordMatcher:    {matcher_time / len(texts) * 1000:.3f} мс на текст '
+          f'(в {loop_time / matcher_time:.0f} раз быстрее)')
+    print(f'Расхождений: {len(mismatches)}')
+    for text, old, new in mismatches[:5]:
+        print(f'  {old!r} != {new!r}: {text[:80]!r}...')
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
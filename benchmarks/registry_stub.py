@@ -0,0 +1,140 @@
+"""
+Локальная замена реестров для проверки app/untils/registry_client.py без обращений к rusprofile и nalog.ru.
+
+Отвечает на те же запросы, что и реестры:
+    GET  /ip/<ОГРНИП>                          страница ИП (h2.company-name) или страница без него
+    POST /  (query=<ОГРН>)                     {"t": <id запроса>}
+    GET  /search-result/<id запроса>           {"rows": [...]}
+    POST /api/v1/tracker/taxpayer_status       {"status": true/false}
+
+Задержка ответа и доля ответов 503 настраиваются, стаб считает запросы и наибольшее число
+одновременных запросов.
+
+    stub = RegistryStub(ip={'315...': 'ИП Иванов'}, ooo={'102...'}, npd={'7707...'}, latency=0.05)
+    base_url = await stub.start()
+    client = RegistryClient(base_url=base_url)
+
+Запуск отдельным сервером (случайные номера, печатает по несколько действующих):
+    python -m benchmarks.registry_stub [--port 8089] [--latency 0.05] [--fail-rate 0.05]
+"""
+
+import argparse
+import asyncio
+import random
+from collections import Counter
+
+from aiohttp import web
+
+
+class RegistryStub:
+    def __init__(self, ip: dict[str, str] = None, ooo: set[str] = None, npd: set[str] = None,
+                 latency: float = 0, fail_rate: float = 0, seed: int = 1):
+        self.ip = ip or {}
+        self.ooo = ooo or set()
+        self.npd = npd or set()
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self._searches: dict[str, str] = {}
+        self.requests = Counter()
+        self.active = 0
+        self.max_active = 0
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes([
+            web.get('/ip/{ogrnip}', self._ip),
+            web.post('/', self._egrul_search),
+            web.get('/search-result/{request_id}', self._egrul_result),
+            web.post('/api/v1/tracker/taxpayer_status', self._npd),
+        ])
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.requests[request.path.split('/')[1] or 'egrul'] += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.fail_rate and self._rng.random() < self.fail_rate:
+                return web.Response(status=503)
+            return await handler(request)
+        finally:
+            self.active -= 1
+
+    async def _ip(self, request: web.Request) -> web.Response:
+        name = self.ip.get(request.match_info['ogrnip'])
+        title = f'<h2 class="company-name">{name}</h2>' if name else '<p>Ничего не найдено</p>'
+        return web.Response(text=f'<html><body>{title}</body></html>', content_type='text/html')
+
+    async def _egrul_search(self, request: web.Request) -> web.Response:
+        query = (await request.post()).get('query', '')
+        request_id = f'{len(self._searches):08x}'
+        self._searches[request_id] = query
+        return web.json_response({'t': request_id})
+
+    async def _egrul_result(self, request: web.Request) -> web.Response:
+        query = self._searches.get(request.match_info['request_id'])
+        rows = [{'k': 'ul', 'cnt': 1, 'o': query}] if query in self.ooo else []
+        return web.json_response({'rows': rows})
+
+    async def _npd(self, request: web.Request) -> web.Response:
+        inn = (await request.json()).get('inn')
+        return web.json_response({'status': inn in self.npd, 'message': ''})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Запускает сервер и возвращает его адрес для RegistryClient(base_url=...)"""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f'http://{host}:{port}'
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def random_numbers(rng: random.Random, count: int, length: int) -> list[str]:
+    return [''.join(rng.choice('0123456789') for _ in range(length)) for _ in range(count)]
+
+
+def make_registry(count: int, seed: int = 1) -> tuple[dict[str, str], set[str], set[str]]:
+    """Случайные реестры: по count номеров ИП, ООО и ИНН, действует примерно половина"""
+    rng = random.Random(seed)
+    ip = {ogrnip: f'ИП Исполнитель {index}' for index, ogrnip in enumerate(random_numbers(rng, count, 15))
+          if rng.random() < 0.5}
+    ooo = {ogrn for ogrn in random_numbers(rng, count, 13) if rng.random() < 0.5}
+    npd = {inn for inn in random_numbers(rng, count, 12) if rng.random() < 0.5}
+    return ip, ooo, npd
+
+
+async def serve(port: int, latency: float, fail_rate: float) -> None:
+    ip, ooo, npd = make_registry(100)
+    stub = RegistryStub(ip=ip, ooo=ooo, npd=npd, latency=latency, fail_rate=fail_rate)
+    base_url = await stub.start(port=port)
+    print(f'Реестры на {base_url}')
+    print(f'ИП: {list(ip)[:3]}\nООО: {list(ooo)[:3]}\nНПД: {list(npd)[:3]}')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--fail-rate', type=float, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.latency, args.fail_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 import asyncio
 import logging
+from datetime import datetime
 
 print("[MAIN] Importing worker_responses...")
 try:
@@ -26,8 +27,24 @@ import config
 from aiogram.types import BotCommand
 from app.handlers import start, worker, customer, admin, admin_send_msg, admin_edit_stop_words, admin_log_work
 from app.untils import time_checker
-from app.untils.time_checker import restore_weekly_activity, check_worker_statuses, update_worker_ranks
+from app.untils.time_checker import restore_weekly_activity, check_worker_statuses, update_worker_ranks, \
+    STATUS_CHECKPOINT
 from app.handlers.worker import send_city_subscription_expiry_notifications
+from app.data.database.connection_pool import db_pool
+from app.data.database.migration_worker_links import migrate_worker_links
+from app.data.database.migration_ad_texts import migrate_ad_texts
+from app.data.database.migration_photo_blobs import migrate_photo_blobs
+from app.data.database.models import Abs, BannedAbs, JobCheckpoint
+from app.data.database.routing_index import routing_index
+from app.data.database.duplicate_index import duplicate_index
+from app.untils.outbound_queue import outbound_queue
+from app.untils.stop_words import stop_words, REFRESH_INTERVAL as STOP_WORDS_REFRESH_INTERVAL
+from app.untils.moderation import moderation
+from app.untils.verdict_cache import verdict_cache
+from app.untils.yandex_ocr import ocr_client
+from app.untils.registry_client import registry_client
+from app.untils.image_pipeline import image_pipeline
+from app.untils.file_id_cache import file_id_cache, FileIdMiddleware
 from loaders import bot, dp, scheduler
 from aiogram.types import CallbackQuery
 
@@ -52,6 +69,29 @@ async def run():
 
     logging.info(f"DEBUG_MODE: {config.DEBUG_MODE}")
 
+    # Пул соединений с БД открываем до первых обращений моделей
+    await db_pool.open()
+    await migrate_worker_links()
+    await migrate_ad_texts()
+    # Фото из папок пользователей - в хранилище по содержимому, дальше фото сохраняются туда
+    await migrate_photo_blobs()
+    await Abs.create_feed_indexes_if_not_exist()
+    await BannedAbs.create_review_column_if_not_exists()
+    # Контрольные точки долгих задач планировщика (check_worker_statuses)
+    await JobCheckpoint.create_table_if_not_exists()
+    await stop_words.load()
+    await verdict_cache.load(stop_words.version)
+    await moderation.start()
+    # Индекс рассылки объявлений строится после миграции таблиц связей
+    await routing_index.build()
+    # Индекс повторов объявлений - по текстам из ad_texts, после migrate_ad_texts
+    await duplicate_index.build()
+    # Повторные отправки локальных фото идут по file_id вместо новой загрузки
+    await file_id_cache.load()
+    bot.session.middleware(FileIdMiddleware(file_id_cache))
+    # Досылаем сообщения, оставшиеся в очереди с прошлого запуска
+    await outbound_queue.start()
+
     # Настройка команд бота
     commands = [
         BotCommand(command="menu", description="меню"),
@@ -78,13 +118,30 @@ async def run():
     scheduler.add_job(time_checker.cleanup_orphaned_files, "interval", days=7)  # Еженедельная очистка файлов
     scheduler.add_job(send_city_subscription_expiry_notifications, "interval", hours=24)  # Ежедневная проверка истекающих подписок на города
     scheduler.add_job(restore_weekly_activity, "interval", days=7)  # Еженедельное восстановление активности исполнителей
-    scheduler.add_job(check_worker_statuses, "interval", days=7)  # Еженедельная проверка статусов исполнителей (ИП, ООО, СЗ)
+    # Еженедельная проверка статусов исполнителей (ИП, ООО, СЗ). Прерванная проверка продолжается
+    # с контрольной точки сразу после запуска, а не через неделю
+    status_check_resume = {'next_run_time': datetime.now()} if await JobCheckpoint.get(STATUS_CHECKPOINT) else {}
+    scheduler.add_job(check_worker_statuses, "interval", days=7, **status_check_resume)
     scheduler.add_job(update_worker_ranks, "interval", hours=24)  # Ежедневное обновление рангов исполнителей на основе заказов за 30 дней
+    scheduler.add_job(outbound_queue.log_metrics, "interval", minutes=5)  # Метрики очереди исходящих сообщений
+    scheduler.add_job(stop_words.refresh_if_changed, "interval", seconds=STOP_WORDS_REFRESH_INTERVAL)  # Изменения стоп-слов из других процессов
+    scheduler.add_job(verdict_cache.cleanup, "interval", hours=24)  # Старые вердикты проверки текстов
+    scheduler.add_job(verdict_cache.log_metrics, "interval", minutes=30)  # Доля повторных текстов
     # scheduler.add_job(time_checker.check_time_workers_top, "interval", days=30)    # minutes=1
 
     await bot.delete_webhook(drop_pending_updates=False)
     scheduler.start()
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        scheduler.shutdown(wait=False)
+        await outbound_queue.stop()
+        await moderation.stop()
+        await ocr_client.close()
+        await registry_client.close()
+        await image_pipeline.stop()
+        await verdict_cache.flush()
+        await db_pool.close()
 
 
 if __name__ == "__main__":